@@ -3,21 +3,30 @@ from langgraph.graph import StateGraph, END, START
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain_core.runnables import Runnable
 from dataclasses import dataclass
+import logging
 import random
 
-from typing import Optional
+from typing import Dict, Optional, Set
+from agent import telemetry
+from agent.nodes.generate_question.candidates import rank_candidates
 from agent.pipeline_modes import (
     normalize_pipeline_mode,
     pipeline_gate_enabled,
     pipeline_refine_enabled,
 )
 
+logger = logging.getLogger(__name__)
+
 class AgentState(TypedDict):
     chunk: str
     question_type: str
+    question_types: Optional[List[str]]  # все типы чанка в режиме нескольких типов
+    candidates: Optional[int]  # кандидатов генерации; на валидацию идёт лучший
+    candidates_report: Optional[dict]  # {"generated": N, "issues": нарушения выбранного}
     source: str
     language: Optional[str]  # ru, be, tg
     pipeline_mode: str
+    validation_mode: Optional[str]  # per_block | single_call; None — режим валидатора
     chunk_pre_validated: bool
     chunk_gate_result: dict
     chunk_rejected: bool
@@ -25,6 +34,7 @@ class AgentState(TypedDict):
     sensitivity_score: dict
     difficulty_score: dict
     validation_result: dict
+    refined_from: Optional[dict]  # вопрос до последней доработки — для частичной повторной валидации
     final_json: dict
     questions: Optional[List[str]]
     retry_count: int
@@ -139,12 +149,12 @@ class GENAAssistant:
     def __post_init__(self):
         builder = StateGraph(AgentState)
 
-        builder.add_node("chunk_gate", self.chunk_gate_node)
-        builder.add_node("generate_question", self.generate_question_node)
-        builder.add_node("provocativeness", self.provocativeness_node)
-        builder.add_node("validation", self.validation_node)
-        builder.add_node("difficulty", self.difficulty_node)
-        builder.add_node("refine_question", self.refine_question_node)
+        builder.add_node("chunk_gate", self._chunk_gate_step)
+        builder.add_node("generate_question", self._staged("generate_question", self.generate_question_node))
+        builder.add_node("provocativeness", self._staged("provocativeness", self.provocativeness_node))
+        builder.add_node("validation", self._staged("validation", self.validation_node))
+        builder.add_node("difficulty", self._staged("difficulty", self.difficulty_node))
+        builder.add_node("refine_question", self._staged("refine_question", self.refine_question_node))
 
         builder.set_entry_point("chunk_gate")
         builder.add_conditional_edges("chunk_gate", self._should_generate, {
@@ -165,6 +175,66 @@ class GENAAssistant:
         else:
             self.graph = builder.compile()
 
+        self._reset_batch()
+
+    @staticmethod
+    def _staged(name: str, node):
+        """Узел как этап телеметрии (agent/telemetry.py): время, токены, модели."""
+        def run(state: AgentState) -> AgentState:
+            with telemetry.stage(name, question_type=state.get("question_type")):
+                return node(state)
+        run.__name__ = name
+        return run
+
+    def _reset_batch(self) -> None:
+        self._batch_questions: Dict[str, dict] = {}
+        self._batch_gates: Dict[str, dict] = {}
+        self._batch_rejected: Set[str] = set()
+        self._batch_generated = False
+
+    def _gate_batch(self, input_data: dict, question_types: List[str]) -> None:
+        """Gate по всем типам до общей генерации: отклонённые типы в неё не попадают.
+        Узел chunk_gate графа потом берёт готовый результат своего типа."""
+        gate = self._staged("chunk_gate", self.chunk_gate_node)
+        for question_type in question_types:
+            state = gate({**input_data, "question_type": question_type})
+            self._batch_gates[question_type] = {
+                key: state[key] for key in ("pipeline_mode", "chunk_rejected", "chunk_gate_result")
+            }
+            if state["chunk_rejected"]:
+                self._batch_rejected.add(question_type)
+
+    def invoke_many(
+        self,
+        input_data: dict,
+        question_types: List[str],
+        config: Optional[dict] = None,
+    ) -> List[dict]:
+        """Прогон графа по каждому типу вопроса для одного чанка.
+
+        Сначала gate проверяет чанк для всех типов, затем вопросы прошедших
+        типов генерируются одним вызовом LLM (исходный текст отправляется один
+        раз), оценки, валидация и доработка — как обычно, отдельно для каждого
+        типа. Возвращает выходы графа в порядке типов.
+        """
+        question_types = list(dict.fromkeys(question_types))
+        config = config or {}
+        thread_id = config.get("configurable", {}).get("thread_id")
+        self._reset_batch()
+        self._gate_batch(input_data, question_types)
+
+        outputs = []
+        for question_type in question_types:
+            type_config = config
+            if thread_id:
+                type_config = {**config, "configurable": {**config["configurable"], "thread_id": f"{thread_id}_{question_type}"}}
+            output = self.graph.invoke(
+                {**input_data, "question_type": question_type, "question_types": question_types},
+                config=type_config,
+            )
+            outputs.append(output)
+        return outputs
+
     @staticmethod
     def _should_generate(state: AgentState) -> Literal["end", "generate"]:
         if state.get("chunk_rejected", False):
@@ -182,6 +252,14 @@ class GENAAssistant:
             return "end"
         return "refine"
 
+    def _chunk_gate_step(self, state: AgentState) -> AgentState:
+        """Узел chunk_gate графа. В invoke_many gate уже пройден для всех типов
+        (_gate_batch, там же и этап телеметрии) — берётся готовый результат."""
+        gated = self._batch_gates.get(state["question_type"]) if state.get("question_types") else None
+        if gated is not None:
+            return {**state, **gated}
+        return self._staged("chunk_gate", self.chunk_gate_node)(state)
+
     def chunk_gate_node(self, state: AgentState) -> AgentState:
         """Предварительная валидация чанка — gate-фильтр.
 
@@ -231,16 +309,62 @@ class GENAAssistant:
         if "language" in state and state.get("language"):
             input_data["language"] = state["language"]
         
-        result = self.generate_question_chain.invoke(input_data)
+        question_types = state.get("question_types") or []
+        candidates = state.get("candidates") or 1
+        report = None
+        if len(question_types) > 1:
+            result = self._generate_batched(input_data, question_types)
+        elif candidates > 1:
+            result, report = self._generate_best_candidate(input_data, candidates)
+        else:
+            result = self.generate_question_chain.invoke(input_data)
         
         # Перемешиваем варианты ответа после генерации
         result = shuffle_answer_options(result, state["question_type"])
         
-        return {
+        update = {
             **state, 
             "generated_question": result
         }
-
+        if report is not None:
+            update["candidates_report"] = report
+        return update
+
+    def _generate_best_candidate(self, input_data: dict, candidates: int):
+        """N кандидатов одним запросом; лучший по дешёвым проверкам
+        (generate_question/candidates.py) идёт на LLM-валидацию.
+        Если ни один кандидат не разобрался — обычная генерация."""
+        generated = self.generate_question_chain.invoke({**input_data, "candidates": candidates})
+        if not generated:
+            logger.warning("No parseable candidates, falling back to a single generation")
+            return self.generate_question_chain.invoke(input_data), {"generated": 0, "issues": []}
+        ranked = rank_candidates(generated, input_data["question_type"], input_data.get("language"))
+        best, issues = ranked[0]
+        logger.info(f"Picked candidate with {len(issues)} issue(s) out of {len(generated)}: {issues}")
+        return best, {"generated": len(generated), "issues": issues}
+
+    def _generate_batched(self, input_data: dict, question_types: List[str]) -> dict:
+        """Вопрос из общей генерации по всем типам чанка.
+
+        Первый вызов генерирует вопросы всех типов, не отклонённых gate
+        (_gate_batch проверяет все типы заранее); следующие берут готовый. Если модель не вернула тип или общий вызов
+        упал — вопрос этого типа генерируется отдельно.
+        """
+        question_type = input_data["question_type"]
+        if not self._batch_generated:
+            self._batch_generated = True
+            pending = [t for t in question_types if t not in self._batch_rejected]
+            try:
+                questions = self.generate_question_chain.invoke({**input_data, "question_types": pending})
+                for question in questions:
+                    self._batch_questions[question.pop("question_type")] = question
+            except Exception as e:
+                logger.warning(f"Multi-type generation failed, falling back to per-type calls: {e}")
+
+        question = self._batch_questions.pop(question_type, None)
+        if question is None:
+            return self.generate_question_chain.invoke(input_data)
+        return question
 
     def provocativeness_node(self, state: AgentState) -> AgentState:
         """Оценка чувствительности"""
@@ -310,13 +434,21 @@ class GENAAssistant:
             else:
                 raise ValueError(f"Unexpected type for generated_question: {type(generated_question)}")
         
-        result = self.validation_chain.invoke({
+        validation_input = {
             "question_type": state["question_type"],
             "source_text": generated_question.get("source_text", ""),
-            "question": {k: v for k, v in generated_question.items() if k != "source_text" and v is not None}
-        })
+            "question": {k: v for k, v in generated_question.items() if k != "source_text" and v is not None},
+            "validation_mode": state.get("validation_mode"),
+        }
+        # После доработки валидатор переоценивает только затронутые ею блоки
+        if state.get("refined_from") and state.get("validation_result"):
+            validation_input["previous_question"] = state["refined_from"]
+            validation_input["previous_result"] = state["validation_result"]
+
+        result = self.validation_chain.invoke(validation_input)
         return {
             **state, 
+            "refined_from": None,
             "validation_result": {
                 "type": result.type,
                 "by_block": result.by_block,
@@ -324,7 +456,10 @@ class GENAAssistant:
                 "total": result.total,
                 "max_total": result.max_total,
                 "threshold": result.threshold,
-                "passed": result.passed
+                "passed": result.passed,
+                "skipped_blocks": getattr(result, "skipped_blocks", []),
+                "carried_blocks": getattr(result, "carried_blocks", []),
+                "rule_violations": getattr(result, "rule_violations", []),
             }
         }
 
@@ -340,10 +475,11 @@ class GENAAssistant:
             elif hasattr(generated_question, 'dict'):
                 generated_question = generated_question.dict()
 
+        question = {k: v for k, v in generated_question.items() if k != "source_text" and v is not None}
         result = self.refine_question_chain.invoke({
             "question_type": state["question_type"],
             "source_text": generated_question.get("source_text", ""),
-            "question": {k: v for k, v in generated_question.items() if k != "source_text" and v is not None},
+            "question": question,
             "validation_result": state.get("validation_result", {}),
         })
 
@@ -352,6 +488,7 @@ class GENAAssistant:
         return {
             **state,
             "generated_question": result,
+            "refined_from": question,
             "retry_count": state.get("retry_count", 0) + 1,
         }
 
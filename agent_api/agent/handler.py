@@ -1,14 +1,16 @@
 from typing import Tuple, List
-from langgraph.checkpoint.mongodb import MongoDBSaver
 from pydantic import BaseModel
-from pymongo import MongoClient
-from requests.auth import _basic_auth_str
-from config import MAX_LEN_USER_PROMPT, MONGO_DB_NAME
+from config import LLM_GENERATION_CANDIDATES, LLM_TELEMETRY, MAX_LEN_USER_PROMPT, MONGO_DB_NAME
+import metrics
+from agent import telemetry
 from agent.assistant_graph import GENAAssistant
 from agent.base import BaseHandler
 from agent.pipeline_modes import normalize_pipeline_mode
-from agent.runnables import create_GENA_runnables_ollama
-from typing import Optional, Dict, Any
+from agent.nodes.generate_question.language import SUPPORTED_LANGUAGES
+from agent.nodes.llm_validator.validator import normalize_validation_mode
+from agent.runnables import _extract_provider_kwargs, create_GENA_runnables_ollama
+from typing import Optional, Dict, Any, Iterator
+from contextlib import contextmanager, nullcontext
 import time
 import logging
 
@@ -35,11 +37,28 @@ class GENAHandler(BaseHandler):
         """
         Возвращает {"model_name", "base_url", "api_key", "provider", "extra"}
         по model_id из реестра, или None если model_id не задан / 'default'.
+        Для группы моделей — выбранная реплика.
         """
         if not model_id or model_id == "default":
             return None
         from models_registry import registry
-        cfg = registry.get_model(model_id)
+        return self._model_config_dict(model_id, registry.get_model(model_id))
+
+    @contextmanager
+    def _lease_model_config(self, model_id: Optional[str]) -> Iterator[Optional[Dict[str, str]]]:
+        """
+        То же, что _resolve_model_config, но реплика занята до выхода из
+        контекста: по числу занятых запросов реестр балансирует группы.
+        """
+        if not model_id or model_id == "default":
+            yield None
+            return
+        from models_registry import registry
+        with registry.lease(model_id) as cfg:
+            yield self._model_config_dict(model_id, cfg)
+
+    @staticmethod
+    def _model_config_dict(model_id: str, cfg) -> Optional[Dict[str, str]]:
         if cfg is None:
             logger.warning(f"Model id '{model_id}' not found in registry, using default")
             return None
@@ -59,9 +78,16 @@ class GENAHandler(BaseHandler):
         """
         Возвращает runnables — дефолтные или пересозданные под конкретную модель.
         """
-        gen_cfg = self._resolve_model_config(generation_model_id)
-        val_cfg = self._resolve_model_config(validation_model_id)
+        return self._runnables_for(
+            self._resolve_model_config(generation_model_id),
+            self._resolve_model_config(validation_model_id),
+        )
 
+    def _runnables_for(
+        self,
+        gen_cfg: Optional[Dict[str, str]],
+        val_cfg: Optional[Dict[str, str]],
+    ):
         if gen_cfg is None and val_cfg is None:
             return self._GENA_runnables
 
@@ -82,9 +108,27 @@ class GENAHandler(BaseHandler):
         validation_model_id: Optional[str] = None,
         chunk_pre_validated: bool = False,
         pipeline_mode: str = "full",
+        question_types: Optional[List[str]] = None,
+        validation_mode: Optional[str] = None,
+        candidates: Optional[int] = None,
     ) -> Dict[str, Any]:
+        """
+        Прогон графа по чанку. С question_types из нескольких типов вопросы
+        генерируются одним вызовом LLM, результат — {"outputs": [...]}
+        в порядке типов; иначе {"output": ...} для question_type.
+        validation_mode (per_block | single_call) — режим валидатора для запроса.
+        candidates — сколько кандидатов генерировать (по умолчанию
+        LLM_GENERATION_CANDIDATES); на валидацию идёт лучший.
+        С LLM_TELEMETRY в результате — telemetry: время, токены, повторы и
+        модели по этапам (agent/telemetry.py); они же идут в метрики /metrics.
+        language — язык документа из chunker'а; без него (или с неизвестным)
+        язык определяется по тексту чанка.
+        """
         source_text = source_text or prompt
         pipeline_mode = normalize_pipeline_mode(pipeline_mode)
+        question_types = list(dict.fromkeys(question_types or []))
+        if len(question_types) == 1:
+            question_type, question_types = question_types[0], []
 
         input_data = {
             "chunk": prompt,
@@ -94,8 +138,15 @@ class GENAHandler(BaseHandler):
             "pipeline_mode": pipeline_mode,
         }
 
-        if language:
+        if language in SUPPORTED_LANGUAGES:
             input_data["language"] = language
+        elif language:
+            logger.warning(f"Неизвестный язык '{language}', определяем по тексту чанка")
+        if validation_mode:
+            input_data["validation_mode"] = normalize_validation_mode(validation_mode)
+        candidates = candidates or LLM_GENERATION_CANDIDATES
+        if candidates > 1:
+            input_data["candidates"] = candidates
         if chunk_pre_validated:
             input_data["chunk_pre_validated"] = True
 
@@ -104,12 +155,47 @@ class GENAHandler(BaseHandler):
         unique_thread_id = f"{chat_id}_{int(time.time() * 1000)}"
         config = {"configurable": {"thread_id": unique_thread_id}} if use_checkpointer else {}
 
-        runnables = self._get_runnables(
-            generation_model_id=generation_model_id,
-            validation_model_id=validation_model_id,
-        )
+        with metrics.track_pipeline(pipeline_mode), \
+                self._lease_model_config(generation_model_id) as gen_cfg, \
+                self._lease_model_config(validation_model_id) as val_cfg:
+            runnables = self._runnables_for(gen_cfg, val_cfg)
+            with telemetry.collect() if LLM_TELEMETRY else nullcontext() as run_telemetry:
+                output = self._invoke_graph(
+                    runnables, input_data, config, use_checkpointer, unique_thread_id, question_types,
+                )
+
+        result = {'outputs': output} if question_types else {'output': output}
+        if run_telemetry is not None:
+            summary = run_telemetry.summary()
+            summary["generation_model_id"] = generation_model_id
+            summary["validation_model_id"] = validation_model_id
+            result['telemetry'] = summary
+            metrics.observe_telemetry(summary)
+            logger.info(
+                f"Telemetry chat_id={chat_id}: {summary['total_s']}s, {summary['llm_calls']} LLM calls, "
+                f"{summary['prompt_tokens']}+{summary['completion_tokens']} tokens, {summary['retries']} retries"
+            )
+        return result
+
+    def _invoke_graph(
+        self,
+        runnables,
+        input_data: Dict[str, Any],
+        config: Dict[str, Any],
+        use_checkpointer: bool,
+        unique_thread_id: str,
+        question_types: Optional[List[str]] = None,
+    ) -> Any:
+        def run(assistant: GENAAssistant):
+            if question_types:
+                return assistant.invoke_many(input_data, question_types, config=config)
+            return assistant.graph.invoke(input_data, config=config)
 
         if use_checkpointer:
+            # Чекпоинтер по умолчанию выключен — pymongo не грузим при старте
+            from langgraph.checkpoint.mongodb import MongoDBSaver
+            from pymongo import MongoClient
+
             mongodb_client = MongoClient(self._options.mongodb_uri)
             checkpointer = MongoDBSaver(mongodb_client, database_name=MONGO_DB_NAME)
 
@@ -124,7 +210,7 @@ class GENAHandler(BaseHandler):
             )
 
             try:
-                output = assistant.graph.invoke(input_data, config=config)
+                output = run(assistant)
             except Exception as e:
                 if "too many values to unpack" in str(e) or "checkpoint" in str(e).lower():
                     logger.warning(f"Error with checkpoint for thread_id {unique_thread_id}, retrying without checkpoint: {str(e)}")
@@ -137,7 +223,7 @@ class GENAHandler(BaseHandler):
                         refine_question_chain=runnables.refine_question_chain,
                         checkpointer=None,
                     )
-                    output = assistant_no_checkpoint.graph.invoke(input_data, config=config)
+                    output = run(assistant_no_checkpoint)
                 else:
                     raise
         else:
@@ -150,40 +236,47 @@ class GENAHandler(BaseHandler):
                 refine_question_chain=runnables.refine_question_chain,
                 checkpointer=None,
             )
-            output = assistant.graph.invoke(input_data, config=config)
+            output = run(assistant)
 
-        return {'output': output}
+        return output
 
     def ahandle_rephrase_questions(
         self,
         questions: List[str],
         model_id: Optional[str] = None,
     ) -> List[str]:
+        for _ in self.iter_rephrase_questions(questions, model_id):
+            pass
+        return questions
+
+    def iter_rephrase_questions(
+        self,
+        questions: List[Dict[str, Any]],
+        model_id: Optional[str] = None,
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Перефразирует task вопросов на месте; (индекс, вопрос) — по мере
+        готовности. Запросы к модели параллельны (LLM_REPHRASE_CONCURRENCY),
+        реплика модели занята до конца обхода.
+        """
         if not questions:
-            return []
-
-        from agent.nodes.dynamic_implementation.rephrase_question import rephrase_questions
-
-        model_cfg = self._resolve_model_config(model_id)
-        kwargs = {}
-        if model_cfg:
-            extra = model_cfg.get("extra", {})
-            kwargs = {
-                "model_name": model_cfg["model_name"],
-                "base_url": model_cfg["base_url"],
-                "api_key": model_cfg["api_key"],
-                "provider": model_cfg.get("provider", "openai"),
-            }
-            if "scope" in extra:
-                kwargs["scope"] = extra["scope"]
-            if "folder_id" in extra:
-                kwargs["folder_id"] = extra["folder_id"]
-
-        question_texts = [q.get('task', '') for q in questions]
-        rephrased_texts = rephrase_questions(question_texts, **kwargs)
-
-        for q, rephrased in zip(questions, rephrased_texts):
-            q['task'] = rephrased
+            return
 
-        return questions
+        from agent.nodes.dynamic_implementation.rephrase_question import iter_rephrased
+
+        with self._lease_model_config(model_id) as model_cfg:
+            kwargs = {}
+            if model_cfg:
+                kwargs = {
+                    "model_name": model_cfg["model_name"],
+                    "base_url": model_cfg["base_url"],
+                    "api_key": model_cfg["api_key"],
+                    "provider": model_cfg.get("provider", "openai"),
+                    **_extract_provider_kwargs(model_cfg),
+                }
+
+            question_texts = [q.get('task', '') for q in questions]
+            for i, rephrased in iter_rephrased(question_texts, **kwargs):
+                questions[i]['task'] = rephrased
+                yield i, questions[i]
     
\ No newline at end of file
@@ -44,7 +44,9 @@ def create_difficulty_chain(
     provider: str = "openai",
     **provider_kwargs,
 ) -> Runnable[DifficultyInput, DifficultyOutput]:
-    system_prompt = PromptTemplate.from_template(DIFFICULTY_PROMPT)
+    # Промпт без переменных: статичный префикс для серверного кэша префиксов,
+    # вопрос идёт после него, в сообщении пользователя
+    system_prompt = PromptTemplate.from_template(DIFFICULTY_PROMPT).format()
 
     llm = create_chat_llm(
         provider=provider,
@@ -54,6 +56,7 @@ def create_difficulty_chain(
         temperature=0.0,
         max_tokens=256,
         timeout=90,
+        response_schema=DifficultyOutput,
         **provider_kwargs,
     )
 
@@ -64,18 +67,11 @@ def create_difficulty_chain(
             question_data = input_data["generated_question"]
             question_data = StructuredQuestionOutput(**question_data)
 
-            prompt = system_prompt.format(
-                question=question_data.task,
-                context=(
-                    question_data.text
-                    if question_data.text
-                    else "Нет дополнительного контекста"
-                ),
-            )
+            context = question_data.text if question_data.text else "Нет дополнительного контекста"
 
             chat_prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content=prompt),
-                HumanMessage(content="Выполни оценку сложности."),
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"Вопрос: {question_data.task}\nКонтекст: {context}\n\nВыполни оценку сложности."),
             ])
 
             chain = chat_prompt | llm | parser
@@ -150,8 +150,7 @@ DIFFICULTY_PROMPT = """
 ### КОНЕЦ ПРИМЕРОВ ###
 
 
-Вопрос: {question}  
-Контекст: {context}  
+Вопрос и его контекст будут даны в сообщении пользователя.
 
 Верни JSON с полями:
 - "difficulty": число от 1 до 3
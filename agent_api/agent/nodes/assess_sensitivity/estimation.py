@@ -50,7 +50,9 @@ def create_provocativeness_chain(
     Runnable[ProvocativenessInput, ProvocativenessOutput]
 ):
 
-    system_prompt = PromptTemplate.from_template(PROVOCATIVENESS_PROMPT)
+    # Промпт без переменных: статичный префикс для серверного кэша префиксов,
+    # вопрос идёт после него, в сообщении пользователя
+    system_prompt = PromptTemplate.from_template(PROVOCATIVENESS_PROMPT).format()
 
     llm = create_chat_llm(
         provider=provider,
@@ -60,6 +62,7 @@ def create_provocativeness_chain(
         temperature=0.0,
         max_tokens=256,
         timeout=90,
+        response_schema=ProvocativenessOutput,
         **provider_kwargs,
     )
 
@@ -72,18 +75,12 @@ def create_provocativeness_chain(
             question_data = input_data["generated_question"]
             question_data = StructuredQuestionOutput(**question_data)
 
-            prompt = system_prompt.format(
-                question=question_data.task,
-                context=(
-                    question_data.text
-                    if question_data.text
-                    else "Нет дополнительного контекста"
-                ),
-            )
+            context = question_data.text if question_data.text else "Нет дополнительного контекста"
+
             # Создаем цепочку обработки
             prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content=prompt),
-                HumanMessage(content="Выполни оценку провокационности."),
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"Вопрос: {question_data.task}\nКонтекст: {context}\n\nВыполни оценку провокационности."),
             ])
             chain = prompt | llm | parser
             result = chain.invoke({})
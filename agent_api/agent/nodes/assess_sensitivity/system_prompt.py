@@ -13,8 +13,7 @@ PROVOCATIVENESS_PROMPT = """
     3 - Высокий уровень провокативности:
     Вопрос затрагивает крайне чувствительные или актуальные политические, исторические или культурные темы, может касаться текущих геополитических конфликтов или исторических травм. Существуют радикально противоположные мнения по данному вопросу, точка зрения у различных групп людей может отличаться диаметрально противоположно. Обсуждение темы может легко привести к острому конфликту или враждебности, вызывать чувствительную реакцию и провоцировать разгорячённые споры. Ответ может потребовать выражения личного мнения по крайне спорному вопросу.
     
-    Вопрос: {question}
-    Контекст: {context}
+    Вопрос и его контекст будут даны в сообщении пользователя.
     
     Верни ТОЛЬКО JSON без каких-либо пояснений, рассуждений или дополнительного текста.
     Формат:
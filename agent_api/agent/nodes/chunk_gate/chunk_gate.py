@@ -17,7 +17,7 @@ import json
 import re
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, TypedDict, Any
+from typing import Dict, List, Literal, Optional, TypedDict, Any
 
 from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -49,6 +49,19 @@ class ChunkGateOutput(BaseModel):
     rejection_reason: Optional[str] = Field(default=None)
 
 
+class ChunkGateResponse(BaseModel):
+    """Ответ LLM (без решения gate) — JSON-схема для guided decoding."""
+    c1_chunk_informative: List[Literal[0, 1]] = Field(min_length=1, max_length=1)
+    c1_reasoning: str
+    c1_confidence: float = Field(ge=0.0, le=1.0)
+    c2_chunk_reference_clarity: List[Literal[0, 1]] = Field(min_length=1, max_length=1)
+    c2_reasoning: str
+    c2_confidence: float = Field(ge=0.0, le=1.0)
+    c3_chunk_multi_suitability: List[Literal[0, 1]] = Field(min_length=1, max_length=1)
+    c3_reasoning: str
+    c3_confidence: float = Field(ge=0.0, le=1.0)
+
+
 def _read_gate_prompt() -> str:
     with _PROMPT_PATH.open("r", encoding="utf-8") as f:
         return f.read()
@@ -154,6 +167,7 @@ def create_chunk_gate_chain(
                 temperature=0.0,
                 max_tokens=512,
                 timeout=60,
+                response_schema=ChunkGateResponse,
                 **provider_kwargs,
             )
             self.system_prompt = _read_gate_prompt()
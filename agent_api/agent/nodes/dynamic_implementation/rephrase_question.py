@@ -1,11 +1,15 @@
 # agent/chains/rephrase_question.py
 
-from typing import List
+import json
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import Runnable
 
 import logging
+from config import LLM_REPHRASE_CONCURRENCY
 from llm_factory import create_chat_llm
 
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +47,28 @@ def _escape_curly_braces(text: str) -> str:
     return text.replace("{", "{{").replace("}", "}}")
 
 
+# Цепочки по модели: клиент LLM и парсер создаются один раз на процесс
+_CHAINS: Dict[str, Runnable] = {}
+_CHAINS_LOCK = threading.Lock()
+
+
+def get_rephrase_chain(
+    model_name: str = None,
+    base_url: str = None,
+    api_key: str = None,
+    provider: str = "openai",
+    **provider_kwargs,
+) -> Runnable:
+    """Цепочка перефразирования для модели — из кэша, при первом запросе создаётся."""
+    model_kwargs = dict(model_name=model_name, base_url=base_url, api_key=api_key, provider=provider,
+                        **provider_kwargs)
+    key = json.dumps(model_kwargs, sort_keys=True, default=str)
+    with _CHAINS_LOCK:
+        if key not in _CHAINS:
+            _CHAINS[key] = _get_rephrase_chain(**model_kwargs)
+        return _CHAINS[key]
+
+
 def _get_rephrase_chain(
     model_name: str = None,
     base_url: str = None,
@@ -58,6 +84,7 @@ def _get_rephrase_chain(
         temperature=0.0,
         max_tokens=256,
         timeout=90,
+        response_schema=RephrasedQuestionOutput,
         **provider_kwargs,
     )
 
@@ -91,7 +118,7 @@ def rephrase_question(
 ) -> str:
     try:
         logger.info(f"Rephrasing question: {question[:60]}...")
-        chain = _get_rephrase_chain(
+        chain = get_rephrase_chain(
             model_name=model_name,
             base_url=base_url,
             api_key=api_key,
@@ -106,18 +133,40 @@ def rephrase_question(
         return question
 
 
+def iter_rephrased(
+    questions: List[str],
+    max_concurrency: Optional[int] = None,
+    **model_kwargs,
+) -> Iterator[Tuple[int, str]]:
+    """(индекс, вопрос) по мере готовности — не больше max_concurrency
+    (по умолчанию LLM_REPHRASE_CONCURRENCY) запросов одновременно.
+    Пустые вопросы и вопросы, которые не удалось перефразировать, — как есть."""
+    pending = [(i, q) for i, q in enumerate(questions) if q and q.strip()]
+    for i, q in enumerate(questions):
+        if not (q and q.strip()):
+            yield i, q
+    if not pending:
+        return
+
+    chain = get_rephrase_chain(**model_kwargs)
+    config = {"max_concurrency": max_concurrency or LLM_REPHRASE_CONCURRENCY}
+    for j, result in chain.batch_as_completed(
+        [{"question": q} for _, q in pending], config=config, return_exceptions=True,
+    ):
+        i, original = pending[j]
+        if isinstance(result, Exception):
+            logger.error(f"Error rephrasing question {i}: {str(result)}")
+            yield i, original
+        else:
+            yield i, result.rephrased_question
+
+
 def rephrase_questions(
     questions: List[str],
-    model_name: str = None,
-    base_url: str = None,
-    api_key: str = None,
-    provider: str = "openai",
-    **provider_kwargs,
+    max_concurrency: Optional[int] = None,
+    **model_kwargs,
 ) -> List[str]:
-    return [
-        rephrase_question(
-            q, model_name=model_name, base_url=base_url, api_key=api_key,
-            provider=provider, **provider_kwargs,
-        )
-        for q in questions
-    ]
+    rephrased = list(questions)
+    for i, text in iter_rephrased(questions, max_concurrency=max_concurrency, **model_kwargs):
+        rephrased[i] = text
+    return rephrased
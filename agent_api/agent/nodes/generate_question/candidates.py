@@ -0,0 +1,98 @@
+"""
+Дешёвые детерминированные проверки кандидатов генерации.
+
+В режиме нескольких кандидатов (GENAAssistant, candidates > 1) генератор
+возвращает N вариантов вопроса одним запросом; полную LLM-валидацию проходит
+только лучший из них. Кандидаты ранжируются по числу нарушений — без вызовов LLM:
+  duplicate_options  — совпадающие варианты (rules.duplicate_pairs)
+  invalid_outputs    — outputs указывает на несуществующий / пустой вариант,
+                       или число правильных ответов не соответствует типу
+  too_long           — вопрос, вариант или открытый ответ длиннее лимита
+  wrong_language     — буквы чужого алфавита (ru / be / tg) или нет букв своего
+
+Лимиты и сравнение строк — общие с правилами валидатора (llm_validator/rules.py).
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.nodes.generate_question.language import TAJIK_LETTERS
+from agent.nodes.llm_validator.rules import (
+    CORRECT_COUNT,
+    MAX_OPEN_ANSWER_CHARS,
+    MAX_OPTION_CHARS,
+    MAX_TASK_CHARS,
+    duplicate_pairs,
+    output_numbers,
+    question_options,
+)
+
+# Буквы, встречающиеся только в одном из языков (таджикские — из language.py)
+_BELARUSIAN_LETTERS = re.compile(r"[ўЎіІ]")
+_RUSSIAN_ONLY_LETTERS = re.compile(r"[щЩъЪиИ]")  # нет в белорусском
+_LETTERS = re.compile(r"[^\W\d_]")
+
+# Меньше букв — язык по тексту не проверяем (цифры и знаки не считаются)
+_MIN_LANGUAGE_CHECK_LETTERS = 40
+
+
+def _language_issue(text: str, language: Optional[str]) -> bool:
+    if not language or len(_LETTERS.findall(text)) < _MIN_LANGUAGE_CHECK_LETTERS:
+        return False
+    tajik = bool(TAJIK_LETTERS.search(text))
+    belarusian = bool(_BELARUSIAN_LETTERS.search(text))
+    if language == "tg":
+        return not tajik
+    if language == "be":
+        return tajik or not belarusian or bool(_RUSSIAN_ONLY_LETTERS.search(text))
+    return tajik or belarusian
+
+
+def candidate_issues(question: Dict[str, Any], question_type: str, language: Optional[str] = None) -> List[str]:
+    """Нарушения кандидата (пустой список — проверки пройдены).
+    Без language проверка языка пропускается."""
+    issues = []
+    task = str(question.get("task") or "").strip()
+    options = question_options(question)
+
+    if not task:
+        issues.append("empty_task")
+    if len(task) > MAX_TASK_CHARS:
+        issues.append("too_long")
+
+    if question_type == "open":
+        answer = str(question.get("outputs") or "").strip()
+        if not answer:
+            issues.append("invalid_outputs")
+        elif len(answer) > MAX_OPEN_ANSWER_CHARS and "too_long" not in issues:
+            issues.append("too_long")
+        texts = [task, answer]
+    else:
+        if duplicate_pairs(options):
+            issues.append("duplicate_options")
+        if any(len(v) > MAX_OPTION_CHARS for v in options.values()) and "too_long" not in issues:
+            issues.append("too_long")
+        numbers = output_numbers(question.get("outputs"))
+        low, high = CORRECT_COUNT.get(question_type, (1, 9))
+        if (
+            numbers is None
+            or not all(n in options for n in numbers)
+            or len(set(numbers)) != len(numbers)
+            or not low <= len(numbers) <= high
+        ):
+            issues.append("invalid_outputs")
+        texts = [task, *options.values()]
+
+    if _language_issue(" ".join(texts), language):
+        issues.append("wrong_language")
+    return issues
+
+
+def rank_candidates(
+    candidates: List[Dict[str, Any]],
+    question_type: str,
+    language: Optional[str] = None,
+) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """Кандидаты с нарушениями, от лучшего к худшему; при равенстве — порядок генерации."""
+    scored = [(candidate, candidate_issues(candidate, question_type, language)) for candidate in candidates]
+    return sorted(scored, key=lambda item: len(item[1]))
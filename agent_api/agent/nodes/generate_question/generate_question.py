@@ -1,26 +1,26 @@
-from typing import Literal, Dict, Optional, TypedDict, List, Union
+from functools import lru_cache
+from typing import Literal, Dict, Optional, TypedDict, List, Tuple, Union
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.runnables import Runnable
 from langchain_core.output_parsers import JsonOutputParser
 import logging
-from llm_factory import create_chat_llm
+from config import LLM_CANDIDATES_TEMPERATURE
+from llm_factory import create_chat_llm, sample_completions
 from agent.nodes.generate_question.system_prompt import (
     PROMPT_TEMPLATE_ONE,
     PROMPT_TEMPLATE_MULTI,
     PROMPT_TEMPLATE_OPEN,
+    PROMPT_TEMPLATE_MULTI_TYPE,
+    SYSTEM_PROMPT_MULTI_TYPE_HEADER,
     SYSTEM_PROMPT_ONE,
     SYSTEM_PROMPT_MULTI,
     SYSTEM_PROMPT_OPEN,
 )
+from agent.nodes.generate_question.language import detect_language
 from langchain_core.output_parsers import PydanticOutputParser
-
-try:
-    from langdetect import detect, LangDetectException
-except ImportError:
-    detect = None
-    LangDetectException = Exception
+import re
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,12 +28,22 @@ logger = logging.getLogger(__name__)
 
 QuestionType = Literal["one", "multi", "open"]
 
+PROMPT_MAPPING = {
+    "one": {"system": SYSTEM_PROMPT_ONE, "template": PROMPT_TEMPLATE_ONE},
+    "multi": {"system": SYSTEM_PROMPT_MULTI, "template": PROMPT_TEMPLATE_MULTI},
+    "open": {"system": SYSTEM_PROMPT_OPEN, "template": PROMPT_TEMPLATE_OPEN},
+}
+
 
 class GenerateQuestionInput(TypedDict):
     input_text: str
     question_type: QuestionType
     source: Optional[str]
     language: Optional[str]  # ru, be, tg
+    # Режим нескольких типов: один вызов LLM на все типы, результат — список
+    question_types: Optional[List[QuestionType]]
+    # Режим кандидатов: N вариантов вопроса одним запросом, результат — список
+    candidates: Optional[int]
 
 
 class StructuredQuestionOutput(BaseModel):
@@ -58,83 +68,14 @@ class StructuredQuestionOutput(BaseModel):
     )
 
 
-def detect_language(text: str) -> str:
-    """
-    Определяет язык текста автоматически.
-
-    Args:
-        text: Текст для определения языка
-
-    Returns:
-        Код языка: 'ru', 'be', 'tg' или 'ru' по умолчанию
-    """
-    # Сначала проверяем наличие специфических символов таджикского языка
-    # Таджикский использует кириллицу с дополнительными символами: ҷ, ҳ, қ, ғ, ӯ, ӣ, ҳ
-    tajik_chars = ["ҷ", "ҳ", "қ", "ғ", "ӯ", "ӣ", "Ҷ", "Ҳ", "Қ", "Ғ", "Ӯ", "Ӣ"]
-    tajik_words = [
-        "тоҷик",
-        "Тоҷикистон",
-        "ҷумҳур",
-        "Ҷумҳур",
-        "забони",
-        "тоҷикӣ",
-        "давлат",
-        "конститутсия",
-    ]
-
-    # Проверяем наличие таджикских символов или слов
-    has_tajik_chars = any(char in text for char in tajik_chars)
-    has_tajik_words = any(word.lower() in text.lower() for word in tajik_words)
-
-    if has_tajik_chars or has_tajik_words:
-        logger.info(
-            f"Обнаружены таджикские символы или слова (символы: {has_tajik_chars}, слова: {has_tajik_words}), определяем язык как таджикский"
-        )
-        return "tg"
+class TypedQuestionOutput(StructuredQuestionOutput):
+    question_type: QuestionType = Field(description="Тип вопроса: 'one', 'multi' или 'open'.")
 
-    # Проверяем белорусский язык (специфические символы: ў, і, ё)
-    belarusian_chars = ["ў", "Ў"]
-    if any(char in text for char in belarusian_chars):
-        logger.info("Обнаружены белорусские символы, определяем язык как белорусский")
-        return "be"
 
-    if detect is None:
-        logger.warning(
-            "langdetect не установлен, используется русский язык по умолчанию"
-        )
-        return "ru"
-
-    try:
-        detected_lang = detect(text)
-        logger.info(f"langdetect определил язык: {detected_lang}")
-
-        # Маппинг кодов языков (включая персидский, который langdetect может вернуть для таджикского)
-        lang_mapping = {
-            "ru": "ru",  # русский
-            "be": "be",  # белорусский
-            "tg": "tg",  # таджикский
-            "fa": "tg",  # персидский (langdetect может определять таджикский как персидский)
-        }
-
-        # Если язык поддерживается, возвращаем его
-        if detected_lang in lang_mapping:
-            mapped_lang = lang_mapping[detected_lang]
-            logger.info(f"Язык определен как: {mapped_lang}")
-            return mapped_lang
-
-        # Если язык не поддерживается, используем русский по умолчанию
-        logger.warning(f"Язык {detected_lang} не поддерживается, используется русский")
-        return "ru"
-    except LangDetectException as e:
-        logger.warning(
-            f"Ошибка определения языка: {e}, используется русский по умолчанию"
-        )
-        return "ru"
-    except Exception as e:
-        logger.error(
-            f"Неожиданная ошибка при определении языка: {e}, используется русский по умолчанию"
-        )
-        return "ru"
+class MultiTypeQuestionOutput(BaseModel):
+    questions: List[TypedQuestionOutput] = Field(
+        description="Вопросы по исходному тексту, по одному на каждый запрошенный тип."
+    )
 
 
 def get_language_instruction(language: str, question_type: str = "one") -> str:
@@ -168,6 +109,167 @@ def get_language_instruction(language: str, question_type: str = "one") -> str:
         return instructions_one_multi.get(language, instructions_one_multi["ru"])
 
 
+_PARSER = PydanticOutputParser(pydantic_object=StructuredQuestionOutput)
+_MULTI_TYPE_PARSER = PydanticOutputParser(pydantic_object=MultiTypeQuestionOutput)
+
+
+def _resolve_language(input_data: GenerateQuestionInput) -> str:
+    # Язык из задачи (chunker определяет его по всему документу) не
+    # перепроверяется по чанку: таджикская цитата в русском документе язык
+    # вопросов не меняет
+    language = input_data.get("language")
+    if not language:
+        language = detect_language(input_data["input_text"])
+        logger.info(f"Язык определен автоматически: {language}")
+    else:
+        logger.info(f"Используется явно указанный язык: {language}")
+    return language
+
+
+# Строки инструкции по языку в системных промптах (one/multi, open и запасной вариант)
+_ONE_MULTI_LANGUAGE_LINE = re.compile(
+    r"1\.\s*\*\*ИСПОЛЬЗУЙТЕ ТОЛЬКО РУССКИЙ ЯЗЫК\*\*\s+для создания вопроса и вариантов ответов\."
+)
+_OPEN_LANGUAGE_LINE = re.compile(
+    r"1\.\s+ИСПОЛЬЗУЙТЕ ИСКЛЮЧИТЕЛЬНО РУССКИЙ ЯЗЫК\s+для формулировки вопроса и ответа\."
+)
+_ANY_LANGUAGE_LINE = re.compile(r"1\.\s+.*?РУССКИЙ ЯЗЫК.*?\.\s*\n")
+
+
+@lru_cache(maxsize=64)
+def _instruction_prompt(question_type: str, language: str) -> str:
+    """Инструкция типа вопроса с подставленным языком (без формата вывода).
+    Собирается один раз на пару (тип, язык)."""
+    prompts = PROMPT_MAPPING.get(question_type)
+    if not prompts:
+        raise ValueError(f"Unsupported question type: {question_type}")
+
+    # Получение инструкции по языку с учетом типа вопроса
+    language_instruction = get_language_instruction(language, question_type)
+    logger.info(
+        f"Используется язык: {language}, инструкция: {language_instruction[:50]}..."
+    )
+
+    # Замена инструкции по языку в системном промпте
+    system_prompt_base = prompts["system"]
+    original_prompt = system_prompt_base
+
+    # Заменяем старую инструкцию на новую
+    # Для типов one и multi
+    if "**ИСПОЛЬЗУЙТЕ ТОЛЬКО РУССКИЙ ЯЗЫК**" in system_prompt_base:
+        system_prompt_base = _ONE_MULTI_LANGUAGE_LINE.sub(
+            lambda _: f"1. {language_instruction}", system_prompt_base, count=1
+        )
+        logger.info(
+            f"Заменена инструкция для типов one/multi. Язык: {language}"
+        )
+    # Для типа open
+    elif "ИСПОЛЬЗУЙТЕ ИСКЛЮЧИТЕЛЬНО РУССКИЙ ЯЗЫК" in system_prompt_base:
+        system_prompt_base = _OPEN_LANGUAGE_LINE.sub(
+            lambda _: f"1. {language_instruction}", system_prompt_base, count=1
+        )
+        logger.info(f"Заменена инструкция для типа open. Язык: {language}")
+    else:
+        logger.warning(
+            "Не найдена инструкция по языку для замены в промпте"
+        )
+
+    # Проверяем, что замена произошла
+    if system_prompt_base == original_prompt and language != "ru":
+        logger.error(
+            f"ВНИМАНИЕ: Замена инструкции не произошла для языка {language}!"
+        )
+        # Пытаемся найти и заменить более гибко - ищем любую строку с "РУССКИЙ ЯЗЫК"
+        if _ANY_LANGUAGE_LINE.search(system_prompt_base):
+            system_prompt_base = _ANY_LANGUAGE_LINE.sub(
+                lambda _: f"1. {language_instruction}\n",
+                system_prompt_base,
+                count=1,
+            )
+            logger.info(
+                f"Выполнена замена через regex (гибкий паттерн) для языка {language}"
+            )
+
+    # Добавляем явную инструкцию по языку в начало промпта для таджикского и белорусского
+    if language != "ru":
+        language_warning = f"\n\n⚠️ ВАЖНО: {language_instruction}\n⚠️ ВСЕ ТЕКСТЫ (вопрос, варианты ответов, объяснения) ДОЛЖНЫ БЫТЬ НА ЗАБОНИ ТОҶИКӢ (таджикском языке) ЕСЛИ language=tg, НА БЕЛАРУСКАЙ МОВЕ (белорусском языке) ЕСЛИ language=be.\n\n"
+        if language == "tg":
+            language_warning = f"\n\n⚠️ ВАЖНО: {language_instruction}\n⚠️ ВСЕ ТЕКСТЫ (вопрос, варианты ответов) ДОЛЖНЫ БЫТЬ НА ЗАБОНИ ТОҶИКӢ (таджикском языке). НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
+        elif language == "be":
+            language_warning = f"\n\n⚠️ ВАЖНО: {language_instruction}\n⚠️ ВСЕ ТЕКСТЫ (вопрос, варианты ответов) ДОЛЖНЫ БЫТЬ НА БЕЛАРУСКАЙ МОВЕ (белорусском языке). НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
+
+        # Вставляем предупреждение после первой строки или в начало
+        if system_prompt_base.startswith("ВЫ —"):
+            # Находим конец первой строки
+            first_line_end = system_prompt_base.find(
+                "\n", system_prompt_base.find(".")
+            )
+            if first_line_end > 0:
+                system_prompt_base = (
+                    system_prompt_base[: first_line_end + 1]
+                    + language_warning
+                    + system_prompt_base[first_line_end + 1 :]
+                )
+            else:
+                system_prompt_base = language_warning + system_prompt_base
+        else:
+            system_prompt_base = language_warning + system_prompt_base
+        logger.info(
+            f"Добавлено явное предупреждение о языке в начало промпта для языка {language}"
+        )
+    return system_prompt_base
+
+
+def _format_instructions(output_parser: PydanticOutputParser, language: str) -> str:
+    format_instructions = output_parser.get_format_instructions()
+    if language != "ru":
+        if language == "tg":
+            format_instructions = (
+                f"⚠️ КРИТИЧЕСКИ ВАЖНО: ВСЕ ПОЛЯ (task, option_1, option_2, и т.д.) ДОЛЖНЫ БЫТЬ НА ЗАБОНИ ТОҶИКӢ! НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
+                + format_instructions
+            )
+        elif language == "be":
+            format_instructions = (
+                f"⚠️ КРИТИЧЕСКИ ВАЖНО: ВСЕ ПОЛЯ (task, option_1, option_2, и т.д.) ДОЛЖНЫ БЫТЬ НА БЕЛАРУСКАЙ МОВЕ! НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
+                + format_instructions
+            )
+    return format_instructions
+
+
+def _source_or_placeholder(source: Optional[str], language: str) -> str:
+    # Определяем текст "Не указан" в зависимости от языка
+    source_not_specified = {
+        "ru": "Не указан",
+        "be": "Не паказаны",
+        "tg": "Муайян нашудааст",
+    }.get(language, "Не указан")
+    return source if source else source_not_specified
+
+
+@lru_cache(maxsize=64)
+def build_system_prompt(question_type: str, language: str) -> str:
+    """
+    Системный промпт генерации: инструкция типа и формат вывода.
+
+    Для пары (тип, язык) строка байт-в-байт одинакова между запросами, поэтому
+    серверный кэш префиксов (vLLM, llama.cpp) переиспользует её KV; всё,
+    что меняется от запроса к запросу (источник, чанк), идёт после неё.
+    """
+    return f"{_instruction_prompt(question_type, language)}\n\n{_format_instructions(_PARSER, language)}"
+
+
+@lru_cache(maxsize=64)
+def build_multi_type_system_prompt(question_types: Tuple[str, ...], language: str) -> str:
+    """Системный промпт режима нескольких типов: стабилен для (типы, язык)."""
+    sections = [
+        f"###ТИП ВОПРОСА: {question_type}###\n\n{_instruction_prompt(question_type, language)}"
+        for question_type in question_types
+    ]
+    return "\n\n".join(
+        [SYSTEM_PROMPT_MULTI_TYPE_HEADER, *sections, _format_instructions(_MULTI_TYPE_PARSER, language)]
+    )
+
+
 def create_generate_question_chain(
     model_name: str = None,
     base_url: str = None,
@@ -177,12 +279,6 @@ def create_generate_question_chain(
 ) -> (
     Runnable[GenerateQuestionInput, StructuredQuestionOutput]
 ):
-    PROMPT_MAPPING = {
-        "one": {"system": SYSTEM_PROMPT_ONE, "template": PROMPT_TEMPLATE_ONE},
-        "multi": {"system": SYSTEM_PROMPT_MULTI, "template": PROMPT_TEMPLATE_MULTI},
-        "open": {"system": SYSTEM_PROMPT_OPEN, "template": PROMPT_TEMPLATE_OPEN},
-    }
-
     llm = create_chat_llm(
         provider=provider,
         model_name=model_name,
@@ -191,166 +287,122 @@ def create_generate_question_chain(
         temperature=0.0,
         max_tokens=1024,
         timeout=90,
+        response_schema=StructuredQuestionOutput,
         **provider_kwargs,
     )
 
-    parser = PydanticOutputParser(pydantic_object=StructuredQuestionOutput)
+    # Ответ в режиме нескольких типов — до трёх вопросов в одном JSON
+    multi_type_llm = create_chat_llm(
+        provider=provider,
+        model_name=model_name,
+        base_url=base_url,
+        api_key=api_key,
+        temperature=0.0,
+        max_tokens=1024 * len(PROMPT_MAPPING),
+        timeout=90 * 2,
+        response_schema=MultiTypeQuestionOutput,
+        **provider_kwargs,
+    )
+
+    # Кандидаты сэмплируются с повышенной температурой, чтобы различаться
+    candidates_llm = create_chat_llm(
+        provider=provider,
+        model_name=model_name,
+        base_url=base_url,
+        api_key=api_key,
+        temperature=LLM_CANDIDATES_TEMPERATURE,
+        max_tokens=1024,
+        timeout=90 * 2,
+        response_schema=StructuredQuestionOutput,
+        **provider_kwargs,
+    )
+
+    def _messages(input_data: GenerateQuestionInput, question_type: str) -> List:
+        if question_type not in PROMPT_MAPPING:
+            raise ValueError(f"Unsupported question type: {question_type}")
+        language = _resolve_language(input_data)
+        system_prompt = build_system_prompt(question_type, language)
+        human_prompt = PROMPT_MAPPING[question_type]["template"].format(
+            original_text=input_data["input_text"],
+            source=_source_or_placeholder(input_data.get("source", ""), language),
+        )
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=human_prompt),
+        ]
 
     class GenerateQuestionRunnable(
         Runnable[GenerateQuestionInput, StructuredQuestionOutput]
     ):
         def invoke(self, input_data: GenerateQuestionInput) -> StructuredQuestionOutput:
+            if input_data.get("question_types"):
+                return self._invoke_multi_type(input_data)
+            if (input_data.get("candidates") or 1) > 1:
+                return self._invoke_candidates(input_data)
             try:
                 question_type = input_data["question_type"]
                 logger.info(f"Processing question type: {question_type}")
 
-                # Определение языка
-                language = input_data.get("language")
-                if not language:
-                    language = detect_language(input_data["input_text"])
-                    logger.info(f"Язык определен автоматически: {language}")
-                else:
-                    logger.info(f"Используется явно указанный язык: {language}")
-
-                # Дополнительная проверка для таджикского - если в тексте есть таджикские символы, принудительно устанавливаем язык
-                if language != "tg":
-                    tajik_chars_check = [
-                        "ҷ",
-                        "ҳ",
-                        "қ",
-                        "ғ",
-                        "ӯ",
-                        "ӣ",
-                        "Ҷ",
-                        "Ҳ",
-                        "Қ",
-                        "Ғ",
-                        "Ӯ",
-                        "Ӣ",
-                    ]
-                    if any(
-                        char in input_data["input_text"] for char in tajik_chars_check
-                    ):
-                        logger.warning(
-                            f"Обнаружены таджикские символы, но язык определен как {language}. Принудительно устанавливаем tg."
-                        )
-                        language = "tg"
-
-                prompts = PROMPT_MAPPING.get(question_type)
-                if not prompts:
-                    raise ValueError(f"Unsupported question type: {question_type}")
-
-                # Получение инструкции по языку с учетом типа вопроса
-                language_instruction = get_language_instruction(language, question_type)
-                logger.info(
-                    f"Используется язык: {language}, инструкция: {language_instruction[:50]}..."
-                )
+                prompt = ChatPromptTemplate.from_messages(_messages(input_data, question_type))
+
+                chain = prompt | llm | _PARSER
+                pyd_out = chain.invoke({})
+                out: Dict = pyd_out.model_dump()
+                out["source_text"] = input_data["input_text"]
+                logger.info("Successfully generated question")
+                return out
+            except Exception as e:
+                logger.error(f"Error generating question: {str(e)}")
+                raise
+
+        def _invoke_candidates(self, input_data: GenerateQuestionInput) -> List[Dict]:
+            """
+            N кандидатов вопроса одного типа одним запросом (sample_completions).
+            Возвращает разобранные кандидаты в порядке генерации; ответы,
+            которые не разбираются парсером, отбрасываются.
+            """
+            try:
+                question_type = input_data["question_type"]
+                n = input_data["candidates"]
+                logger.info(f"Processing question type: {question_type}, {n} candidates")
+
+                messages = _messages(input_data, question_type)
+                answers = sample_completions(candidates_llm, messages, n, provider=provider)
+
+                outs = []
+                for answer in answers:
+                    try:
+                        out = _PARSER.invoke(answer).model_dump()
+                    except Exception as e:
+                        logger.warning(f"Skipping unparseable candidate: {e}")
+                        continue
+                    out["source_text"] = input_data["input_text"]
+                    outs.append(out)
+                logger.info(f"Successfully generated {len(outs)}/{n} candidates")
+                return outs
+            except Exception as e:
+                logger.error(f"Error generating candidates: {str(e)}")
+                raise
+
+        def _invoke_multi_type(self, input_data: GenerateQuestionInput) -> List[Dict]:
+            """
+            Несколько типов вопросов по одному чанку за один вызов LLM.
+
+            Инструкции типов идут подряд в системном промпте, исходный текст —
+            один раз в пользовательском сообщении. Возвращает список словарей
+            в порядке question_types; тип, который модель не вернула,
+            в списке отсутствует.
+            """
+            try:
+                question_types = list(dict.fromkeys(input_data["question_types"]))
+                logger.info(f"Processing question types in one call: {question_types}")
 
-                # Замена инструкции по языку в системном промпте
-                system_prompt_base = prompts["system"]
-                original_prompt = system_prompt_base
-
-                # Используем regex для более надежной замены
-                import re
-
-                # Заменяем старую инструкцию на новую
-                # Для типов one и multi
-                if "**ИСПОЛЬЗУЙТЕ ТОЛЬКО РУССКИЙ ЯЗЫК**" in system_prompt_base:
-                    # Используем regex для более гибкой замены
-                    pattern = r"1\.\s*\*\*ИСПОЛЬЗУЙТЕ ТОЛЬКО РУССКИЙ ЯЗЫК\*\*\s+для создания вопроса и вариантов ответов\."
-                    replacement = f"1. {language_instruction}"
-                    system_prompt_base = re.sub(
-                        pattern, replacement, system_prompt_base, count=1
-                    )
-                    logger.info(
-                        f"Заменена инструкция для типов one/multi. Язык: {language}"
-                    )
-                # Для типа open
-                elif "ИСПОЛЬЗУЙТЕ ИСКЛЮЧИТЕЛЬНО РУССКИЙ ЯЗЫК" in system_prompt_base:
-                    pattern = r"1\.\s+ИСПОЛЬЗУЙТЕ ИСКЛЮЧИТЕЛЬНО РУССКИЙ ЯЗЫК\s+для формулировки вопроса и ответа\."
-                    replacement = f"1. {language_instruction}"
-                    system_prompt_base = re.sub(
-                        pattern, replacement, system_prompt_base, count=1
-                    )
-                    logger.info(f"Заменена инструкция для типа open. Язык: {language}")
-                else:
-                    logger.warning(
-                        "Не найдена инструкция по языку для замены в промпте"
-                    )
-
-                # Проверяем, что замена произошла
-                if system_prompt_base == original_prompt and language != "ru":
-                    logger.error(
-                        f"ВНИМАНИЕ: Замена инструкции не произошла для языка {language}!"
-                    )
-                    # Пытаемся найти и заменить более гибко - ищем любую строку с "РУССКИЙ ЯЗЫК"
-                    pattern = r"1\.\s+.*?РУССКИЙ ЯЗЫК.*?\.\s*\n"
-                    if re.search(pattern, system_prompt_base):
-                        system_prompt_base = re.sub(
-                            pattern,
-                            f"1. {language_instruction}\n",
-                            system_prompt_base,
-                            count=1,
-                        )
-                        logger.info(
-                            f"Выполнена замена через regex (гибкий паттерн) для языка {language}"
-                        )
-
-                # Добавляем явную инструкцию по языку в начало промпта для таджикского и белорусского
-                if language != "ru":
-                    language_warning = f"\n\n⚠️ ВАЖНО: {language_instruction}\n⚠️ ВСЕ ТЕКСТЫ (вопрос, варианты ответов, объяснения) ДОЛЖНЫ БЫТЬ НА ЗАБОНИ ТОҶИКӢ (таджикском языке) ЕСЛИ language=tg, НА БЕЛАРУСКАЙ МОВЕ (белорусском языке) ЕСЛИ language=be.\n\n"
-                    if language == "tg":
-                        language_warning = f"\n\n⚠️ ВАЖНО: {language_instruction}\n⚠️ ВСЕ ТЕКСТЫ (вопрос, варианты ответов) ДОЛЖНЫ БЫТЬ НА ЗАБОНИ ТОҶИКӢ (таджикском языке). НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
-                    elif language == "be":
-                        language_warning = f"\n\n⚠️ ВАЖНО: {language_instruction}\n⚠️ ВСЕ ТЕКСТЫ (вопрос, варианты ответов) ДОЛЖНЫ БЫТЬ НА БЕЛАРУСКАЙ МОВЕ (белорусском языке). НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
-
-                    # Вставляем предупреждение после первой строки или в начало
-                    if system_prompt_base.startswith("ВЫ —"):
-                        # Находим конец первой строки
-                        first_line_end = system_prompt_base.find(
-                            "\n", system_prompt_base.find(".")
-                        )
-                        if first_line_end > 0:
-                            system_prompt_base = (
-                                system_prompt_base[: first_line_end + 1]
-                                + language_warning
-                                + system_prompt_base[first_line_end + 1 :]
-                            )
-                        else:
-                            system_prompt_base = language_warning + system_prompt_base
-                    else:
-                        system_prompt_base = language_warning + system_prompt_base
-                    logger.info(
-                        f"Добавлено явное предупреждение о языке в начало промпта для языка {language}"
-                    )
-
-                # Добавляем инструкцию по языку в формат инструкций парсера для таджикского и белорусского
-                format_instructions = parser.get_format_instructions()
-                if language != "ru":
-                    if language == "tg":
-                        format_instructions = (
-                            f"⚠️ КРИТИЧЕСКИ ВАЖНО: ВСЕ ПОЛЯ (task, option_1, option_2, и т.д.) ДОЛЖНЫ БЫТЬ НА ЗАБОНИ ТОҶИКӢ! НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
-                            + format_instructions
-                        )
-                    elif language == "be":
-                        format_instructions = (
-                            f"⚠️ КРИТИЧЕСКИ ВАЖНО: ВСЕ ПОЛЯ (task, option_1, option_2, и т.д.) ДОЛЖНЫ БЫТЬ НА БЕЛАРУСКАЙ МОВЕ! НЕ ИСПОЛЬЗУЙТЕ РУССКИЙ ЯЗЫК!\n\n"
-                            + format_instructions
-                        )
-
-                system_prompt = f"{system_prompt_base}\n\n{format_instructions}"
-                source = input_data.get("source", "")
-
-                # Определяем текст "Не указан" в зависимости от языка
-                source_not_specified = {
-                    "ru": "Не указан",
-                    "be": "Не паказаны",
-                    "tg": "Муайян нашудааст",
-                }.get(language, "Не указан")
-
-                human_prompt = prompts["template"].format(
+                language = _resolve_language(input_data)
+                system_prompt = build_multi_type_system_prompt(tuple(question_types), language)
+                human_prompt = PROMPT_TEMPLATE_MULTI_TYPE.format(
                     original_text=input_data["input_text"],
-                    source=source if source else source_not_specified,
+                    source=_source_or_placeholder(input_data.get("source", ""), language),
+                    question_types=", ".join(question_types),
                 )
 
                 prompt = ChatPromptTemplate.from_messages(
@@ -360,14 +412,24 @@ def create_generate_question_chain(
                     ]
                 )
 
-                chain = prompt | llm | parser
+                chain = prompt | multi_type_llm | _MULTI_TYPE_PARSER
                 pyd_out = chain.invoke({})
-                out: Dict = pyd_out.model_dump()
-                out["source_text"] = input_data["input_text"]
-                logger.info("Successfully generated question")
-                return out
+                by_type: Dict[str, Dict] = {}
+                for question in pyd_out.questions:
+                    by_type.setdefault(question.question_type, question.model_dump())
+
+                outs = []
+                for question_type in question_types:
+                    out = by_type.get(question_type)
+                    if out is None:
+                        logger.warning(f"Model returned no question of type {question_type}")
+                        continue
+                    out["source_text"] = input_data["input_text"]
+                    outs.append(out)
+                logger.info(f"Successfully generated {len(outs)}/{len(question_types)} questions")
+                return outs
             except Exception as e:
-                logger.error(f"Error generating question: {str(e)}")
+                logger.error(f"Error generating questions: {str(e)}")
                 raise
 
     return GenerateQuestionRunnable()
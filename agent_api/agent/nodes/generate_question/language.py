@@ -0,0 +1,76 @@
+"""
+Определение языка текста: ru, be или tg.
+
+Язык документа определяется один раз при нарезке на чанки (chunker) и
+приходит с задачей в поле language; здесь — запасной путь для запросов без
+него. Кириллица решается по классам символов (регулярки скомпилированы один
+раз): буквы ҷ ҳ қ ғ ӯ ӣ (не реже 1 на 200 букв, как в chunker) или
+таджикские слова — tg, ў (так же не реже 1 на 200) или і чаще и — be,
+иначе ru. langdetect (медленный и недетерминированный) — только для текста
+без кириллицы, импортируется при первом таком вызове. Результат кэшируется
+по тексту: повторы и доработки одного чанка получают тот же язык.
+"""
+
+import logging
+import re
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_LANGUAGES = ("ru", "be", "tg")
+DEFAULT_LANGUAGE = "ru"
+
+TAJIK_LETTERS = re.compile(r"[ҷҳқғӯӣҶҲҚҒӮӢ]")
+_TAJIK_WORDS = re.compile(r"тоҷик|ҷумҳур|забони|давлат|конститутсия", re.IGNORECASE)
+BELARUSIAN_LETTERS = re.compile(r"[ўЎ]")
+_BELARUSIAN_I = re.compile(r"[іІ]")
+_RUSSIAN_I = re.compile(r"[иИ]")
+_CYRILLIC = re.compile(r"[Ѐ-ӿ]")
+_LETTERS = re.compile(r"[^\W\d_]")
+
+# Коды langdetect → поддерживаемые языки (таджикский langdetect часто видит как персидский)
+_LANGDETECT_MAPPING = {"ru": "ru", "be": "be", "tg": "tg", "fa": "tg"}
+
+
+def _cyrillic_language(text: str, letters: int) -> str:
+    # Буквы одного языка — не реже 1 на 200, как в chunker (detect_document_language):
+    # единичная цитата язык не меняет
+    if len(TAJIK_LETTERS.findall(text)) * 200 >= letters or _TAJIK_WORDS.search(text):
+        return "tg"
+    if len(BELARUSIAN_LETTERS.findall(text)) * 200 >= letters:
+        return "be"
+    if len(_BELARUSIAN_I.findall(text)) > len(_RUSSIAN_I.findall(text)):
+        return "be"
+    return "ru"
+
+
+def _langdetect_language(text: str) -> str:
+    try:
+        from langdetect import DetectorFactory, LangDetectException, detect
+    except ImportError:
+        logger.warning("langdetect не установлен, используется русский язык по умолчанию")
+        return DEFAULT_LANGUAGE
+    # Фиксированный seed — одинаковый ответ для одного текста
+    DetectorFactory.seed = 0
+    try:
+        detected = detect(text)
+    except LangDetectException as e:
+        logger.warning(f"Ошибка определения языка: {e}, используется русский по умолчанию")
+        return DEFAULT_LANGUAGE
+    language = _LANGDETECT_MAPPING.get(detected)
+    if language is None:
+        logger.warning(f"Язык {detected} не поддерживается, используется русский")
+        return DEFAULT_LANGUAGE
+    return language
+
+
+@lru_cache(maxsize=1024)
+def detect_language(text: str) -> str:
+    """Код языка текста: 'ru', 'be' или 'tg' ('ru' по умолчанию)."""
+    text = text or ""
+    letters = len(_LETTERS.findall(text))
+    if letters and len(_CYRILLIC.findall(text)) * 2 >= letters:
+        return _cyrillic_language(text, letters)
+    if not letters:
+        return DEFAULT_LANGUAGE
+    return _langdetect_language(text)
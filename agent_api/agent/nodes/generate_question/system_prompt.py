@@ -25,6 +25,28 @@ PROMPT_TEMPLATE_OPEN = """
 **JSON**:  
 """
 
+# Режим нескольких типов: исходный текст передаётся один раз на все типы
+PROMPT_TEMPLATE_MULTI_TYPE = """
+**Источник**: {source}
+
+**Типы вопросов**: {question_types}
+
+**Исходный текст**:
+{original_text}
+
+**JSON**:
+"""
+
+SYSTEM_PROMPT_MULTI_TYPE_HEADER = """ВЫ СОСТАВЛЯЕТЕ НЕСКОЛЬКО ВОПРОСОВ РАЗНЫХ ТИПОВ ПО ОДНОМУ ИСХОДНОМУ ТЕКСТУ ЗА ОДИН ОТВЕТ.
+
+###ПОРЯДОК РАБОТЫ###
+
+1. Ниже для каждого типа вопроса приведена отдельная инструкция в разделе «ТИП ВОПРОСА». Каждый вопрос составляйте строго по инструкции своего типа.
+2. Составьте РОВНО ОДИН вопрос на каждый тип из поля «Типы вопросов», в том же порядке.
+3. Вопросы разных типов НЕ ДОЛЖНЫ повторять друг друга по формулировке.
+4. Ответ — ОДИН JSON-объект с полем "questions": список вопросов. Каждый элемент списка заполняется по формату JSON из инструкции своего типа и дополнительно содержит поле "question_type" ("one", "multi" или "open").
+"""
+
 import os
 
 def read_file(filename):
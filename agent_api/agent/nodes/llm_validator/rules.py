@@ -0,0 +1,266 @@
+"""
+Детерминированные проверки вопроса перед LLM-валидатором.
+
+Часть подкритериев решается без модели (RULE_CRITERIA):
+  question_bravity              — вопрос длиннее MAX_TASK_CHARS → 0
+  options_count                 — ровно OPTION_COUNT вариантов → 1, иначе 0
+  options_right_count           — число правильных ответов в outputs вне
+                                  CORRECT_COUNT → 0 (не мультипликатор)
+  options_bravity               — вариант длиннее MAX_OPTION_CHARS → 0
+  options_question_duplication  — вариант совпадает с вопросом → 0
+  options_duplication           — два варианта совпадают → 0
+  outputs_include / outputs_exclude — outputs пуст, не из номеров, указывает
+                                  на несуществующий / пустой вариант или (для
+                                  one) содержит больше одного номера → 0
+  outputs_bravity               — открытый ответ длиннее MAX_OPEN_ANSWER_CHARS → 0
+  outputs_question_duplication  — открытый ответ совпадает с вопросом → 0
+
+Совпадение — после normalize_text (регистр, ё/е, пунктуация) или нечёткое:
+SequenceMatcher.ratio() >= FUZZY_THRESHOLD при одинаковых числах и без
+различия в отрицании («является» / «не является» — разные варианты).
+
+Остальные оценки (UNDECIDED) ставит LLM; решённые правилом перекрывают её
+ответ. Если правило обнулило мультипликатор, либо вопрос / открытый ответ
+пуст, вопрос безнадёжен (rejected) — LLM не вызывается.
+
+check_questions работает на пачке вопросов одного типа и возвращает матрицу
+оценок NumPy — годится и для офлайн-переоценки датасета.
+"""
+
+import re
+from dataclasses import asdict, dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+UNDECIDED = -1
+
+# Лимиты длины: вопрос и ответы в промптах требуются краткими
+MAX_TASK_CHARS = 400
+MAX_OPTION_CHARS = 200
+MAX_OPEN_ANSWER_CHARS = 300
+
+# Число вариантов и правильных ответов (минимум, максимум) — как в промптах критериев
+OPTION_COUNT = {"one": 4, "multi": 6}
+CORRECT_COUNT = {"one": (1, 1), "multi": (2, 5)}
+
+FUZZY_THRESHOLD = 0.9
+
+# Подкритерии, решаемые правилами: (блок, индекс в блоке, имя)
+_CLOSED_CRITERIA = [
+    ("c1_question", 0, "question_bravity"),
+    ("c2_options", 0, "options_count"),
+    ("c2_options", 1, "options_right_count"),
+    ("c2_options", 2, "options_bravity"),
+    ("c2_options", 3, "options_question_duplication"),
+    ("c2_options", 4, "options_duplication"),
+    ("c3_outputs", 0, "outputs_include"),
+    ("c3_outputs", 1, "outputs_exclude"),
+]
+RULE_CRITERIA = {
+    "open": [
+        ("c1_question", 0, "question_bravity"),
+        ("c2_outputs", 0, "outputs_bravity"),
+        ("c2_outputs", 1, "outputs_question_duplication"),
+    ],
+    "one": _CLOSED_CRITERIA,
+    "multi": _CLOSED_CRITERIA,
+}
+
+# Подкритерии-мультипликаторы (совпадают с MULTIPLIER_INDICES валидатора):
+# их 0 обнуляет итоговый балл
+MULTIPLIER_CRITERIA = {
+    "options_question_duplication",
+    "options_duplication",
+    "outputs_include",
+    "outputs_exclude",
+    "outputs_question_duplication",
+}
+
+_NON_WORD = re.compile(r"[^\w]+")
+_DIGITS = re.compile(r"\d+")
+_NEGATIONS = {"не", "ни", "нет", "без"}
+
+
+def normalize_text(value: Any) -> str:
+    """Строка для сравнения: регистр, ё/е, пунктуация и пробелы не учитываются."""
+    text = str(value or "").casefold().replace("ё", "е")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def question_options(question: Dict[str, Any]) -> Dict[int, str]:
+    """Непустые варианты ответа: {номер: текст}."""
+    options = {}
+    for key, value in question.items():
+        if key.startswith("option_") and value not in (None, "", "None") and str(value).strip():
+            try:
+                options[int(key[len("option_"):])] = str(value)
+            except ValueError:
+                continue
+    return options
+
+
+def output_numbers(outputs: Any) -> Optional[List[int]]:
+    """Номера правильных вариантов из outputs ("2", 2, "1,3"); None — не номера."""
+    parts = [p.strip() for p in str(outputs if outputs is not None else "").split(",")]
+    if not parts or not all(p.isdigit() for p in parts):
+        return None
+    return [int(p) for p in parts]
+
+
+def similar(a: str, b: str) -> bool:
+    """Совпадение нормализованных строк: точное или нечёткое (опечатки, словоформы)."""
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    if _DIGITS.findall(a) != _DIGITS.findall(b):
+        return False
+    if _NEGATIONS & (set(a.split()) ^ set(b.split())):
+        return False
+    return SequenceMatcher(None, a, b).ratio() >= FUZZY_THRESHOLD
+
+
+def duplicate_pairs(options: Dict[int, str]) -> List[Tuple[int, int]]:
+    """Пары номеров совпадающих вариантов."""
+    items = sorted((number, normalize_text(text)) for number, text in options.items())
+    return [
+        (a, b)
+        for i, (a, text_a) in enumerate(items)
+        for b, text_b in items[i + 1:]
+        if similar(text_a, text_b)
+    ]
+
+
+@dataclass
+class Violation:
+    code: str
+    block: str
+    index: Optional[int]
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class RuleReport:
+    """Итог правил для одного вопроса."""
+    decided: Dict[str, Dict[int, int]]  # блок → {индекс подкритерия: 0/1}
+    violations: List[Violation]
+    rejected: bool
+
+
+@dataclass
+class RuleBatch:
+    """Итог правил для пачки вопросов одного типа.
+
+    scores[i, j] — оценка вопроса i по подкритерию criteria[j] (UNDECIDED — решает LLM).
+    """
+    question_type: str
+    criteria: List[Tuple[str, int, str]]
+    scores: np.ndarray
+    rejected: np.ndarray
+    violations: List[List[Violation]]
+
+    def report(self, i: int) -> RuleReport:
+        decided: Dict[str, Dict[int, int]] = {}
+        for (block, index, _), value in zip(self.criteria, self.scores[i]):
+            if value != UNDECIDED:
+                decided.setdefault(block, {})[index] = int(value)
+        return RuleReport(decided=decided, violations=self.violations[i], rejected=bool(self.rejected[i]))
+
+
+def check_questions(question_type: str, questions: Sequence[Dict[str, Any]]) -> RuleBatch:
+    """Правила для пачки вопросов одного типа."""
+    criteria = RULE_CRITERIA[question_type]
+    column = {name: j for j, (_, _, name) in enumerate(criteria)}
+    blocks = {name: (block, index) for block, index, name in criteria}
+    n = len(questions)
+    scores = np.full((n, len(criteria)), UNDECIDED, dtype=np.int8)
+    violations: List[List[Violation]] = [[] for _ in range(n)]
+
+    def fail(mask: np.ndarray, name: str, reason) -> None:
+        scores[mask, column[name]] = 0
+        block, index = blocks[name]
+        for i in np.flatnonzero(mask):
+            violations[i].append(Violation(name, block, index, reason(i)))
+
+    tasks = [str(q.get("task") or "").strip() for q in questions]
+    task_norms = [normalize_text(t) for t in tasks]
+    task_len = np.array([len(t) for t in tasks], dtype=np.int64)
+    empty_task = task_len == 0
+    fail(task_len > MAX_TASK_CHARS, "question_bravity",
+         lambda i: f"вопрос длиннее {MAX_TASK_CHARS} символов ({task_len[i]})")
+
+    if question_type == "open":
+        answers = [str(q.get("outputs") if q.get("outputs") is not None else "").strip() for q in questions]
+        answer_len = np.array([len(a) for a in answers], dtype=np.int64)
+        empty_outputs = answer_len == 0
+        fail(answer_len > MAX_OPEN_ANSWER_CHARS, "outputs_bravity",
+             lambda i: f"ответ длиннее {MAX_OPEN_ANSWER_CHARS} символов ({answer_len[i]})")
+        repeats = np.array([similar(normalize_text(a), t) for a, t in zip(answers, task_norms)], dtype=bool)
+        fail(repeats, "outputs_question_duplication", lambda i: "ответ повторяет вопрос")
+    else:
+        options = [question_options(q) for q in questions]
+        numbers = [output_numbers(q.get("outputs")) for q in questions]
+        expected = OPTION_COUNT[question_type]
+        low, high = CORRECT_COUNT[question_type]
+
+        count = np.array([len(o) for o in options], dtype=np.int64)
+        scores[:, column["options_count"]] = np.where(count == expected, 1, 0)
+        fail(count != expected, "options_count", lambda i: f"вариантов {count[i]}, нужно {expected}")
+
+        longest = np.array([max(map(len, o.values()), default=0) for o in options], dtype=np.int64)
+        fail(longest > MAX_OPTION_CHARS, "options_bravity",
+             lambda i: f"вариант длиннее {MAX_OPTION_CHARS} символов ({longest[i]})")
+
+        repeating = [
+            [k for k, v in sorted(o.items()) if similar(normalize_text(v), t)]
+            for o, t in zip(options, task_norms)
+        ]
+        fail(np.array([bool(r) for r in repeating], dtype=bool), "options_question_duplication",
+             lambda i: "вопрос повторяют варианты " + ", ".join(map(str, repeating[i])))
+
+        duplicates = [duplicate_pairs(o) for o in options]
+        fail(np.array([bool(d) for d in duplicates], dtype=bool), "options_duplication",
+             lambda i: "совпадают варианты " + ", ".join(f"{a} и {b}" for a, b in duplicates[i]))
+
+        unknown = [sorted({x for x in nums if x not in o}) if nums else [] for nums, o in zip(numbers, options)]
+        valid = np.array(
+            [len({x for x in nums if x in o}) if nums else 0 for nums, o in zip(numbers, options)],
+            dtype=np.int64,
+        )
+        listed = np.array([len(set(nums)) if nums else 0 for nums in numbers], dtype=np.int64)
+        # Число правильных ответов — подкритерий c2_options (как в промптах),
+        # c3 — только корректность самого outputs
+        fail((valid < low) | (valid > high), "options_right_count",
+             lambda i: f"правильных ответов {valid[i]}, нужно от {low} до {high}")
+        fail(valid == 0, "outputs_include", lambda i: "outputs не указывает ни на один существующий вариант")
+        if high == 1:
+            fail((listed > 1) & (valid > 0), "outputs_include", lambda i: "outputs содержит больше одного номера")
+        fail(np.array([bool(u) for u in unknown], dtype=bool), "outputs_exclude",
+             lambda i: f"outputs указывает на несуществующие или пустые варианты {unknown[i]}")
+        empty_outputs = np.zeros(n, dtype=bool)
+
+    for i in np.flatnonzero(empty_task):
+        violations[i].append(Violation("empty_task", "c1_question", None, "пустой вопрос"))
+    if question_type == "open":
+        for i in np.flatnonzero(empty_outputs):
+            violations[i].append(Violation("empty_outputs", "c2_outputs", None, "пустой ответ"))
+
+    multipliers = [column[name] for name in column if name in MULTIPLIER_CRITERIA]
+    rejected = (scores[:, multipliers] == 0).any(axis=1) | empty_task | empty_outputs
+    return RuleBatch(
+        question_type=question_type,
+        criteria=list(criteria),
+        scores=scores,
+        rejected=rejected,
+        violations=violations,
+    )
+
+
+def check_question(question_type: str, question: Dict[str, Any]) -> RuleReport:
+    """Правила для одного вопроса."""
+    return check_questions(question_type, [question]).report(0)
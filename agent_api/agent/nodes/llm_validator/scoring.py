@@ -0,0 +1,117 @@
+"""
+Векторный пересчёт итоговых баллов валидатора по сохранённым оценкам.
+
+Оценки вопросов одного типа укладываются в матрицу (вопрос × подкритерий,
+порядок столбцов — criteria_columns). Взвешенная сумма и мультипликаторы
+считаются так же, как LLMValidator._score, но по всей матрице сразу —
+для переоценки датасетов после изменения WEIGHTS / THRESHOLDS без вызовов LLM.
+
+Пустой список блока (блок пропущен early exit или правилами) — блок не
+оценивался: в сумму не входит, его мультипликаторы не учитываются.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rules import UNDECIDED, RuleBatch
+from .validator import BLOCK_ORDER, EXPECTED_COUNTS, MULTIPLIER_INDICES, THRESHOLDS, WEIGHTS
+
+
+@lru_cache(maxsize=None)
+def criteria_columns(qtype: str) -> Tuple[Tuple[str, int], ...]:
+    """Столбцы матрицы оценок: (блок, индекс подкритерия) в порядке BLOCK_ORDER."""
+    return tuple((key, i) for key in BLOCK_ORDER[qtype] for i in range(EXPECTED_COUNTS[qtype][key]))
+
+
+@dataclass
+class ScoreMatrix:
+    """Оценки вопросов одного типа.
+
+    scores[i, j]  — 0/1 по столбцу criteria_columns(qtype)[j]
+    present[i, j] — блок столбца оценён у вопроса i
+    valid[i]      — by_block вопроса разобран (иначе строка не пересчитывается)
+    """
+    qtype: str
+    scores: np.ndarray
+    present: np.ndarray
+    valid: np.ndarray
+
+    def by_block(self, i: int) -> Dict[str, List[int]]:
+        """Строка матрицы обратно в by_block (пропущенные блоки — [])."""
+        result: Dict[str, List[int]] = {key: [] for key in BLOCK_ORDER[self.qtype]}
+        for (key, _), value, present in zip(criteria_columns(self.qtype), self.scores[i], self.present[i]):
+            if present:
+                result[key].append(int(value))
+        return result
+
+
+def build_score_matrix(qtype: str, by_blocks: Sequence[Optional[Dict[str, Any]]]) -> ScoreMatrix:
+    """by_block вопросов → ScoreMatrix. Строка невалидна, если by_block нет,
+    в нём нет ни одного оценённого блока или длина вектора не совпадает с EXPECTED_COUNTS."""
+    columns = criteria_columns(qtype)
+    n = len(by_blocks)
+    scores = np.zeros((n, len(columns)), dtype=np.int8)
+    present = np.zeros((n, len(columns)), dtype=bool)
+    valid = np.zeros(n, dtype=bool)
+
+    offsets = {}
+    for j, (key, i) in enumerate(columns):
+        offsets.setdefault(key, j)
+
+    for row, by_block in enumerate(by_blocks):
+        if not isinstance(by_block, dict):
+            continue
+        ok, any_block = True, False
+        for key in BLOCK_ORDER[qtype]:
+            block = by_block.get(key) or []
+            if not block:
+                continue
+            if not isinstance(block, list) or len(block) != EXPECTED_COUNTS[qtype][key]:
+                ok = False
+                break
+            start = offsets[key]
+            scores[row, start:start + len(block)] = [1 if s in (1, "1", True) else 0 for s in block]
+            present[row, start:start + len(block)] = True
+            any_block = True
+        valid[row] = ok and any_block
+    scores[~valid] = 0
+    present[~valid] = False
+    return ScoreMatrix(qtype=qtype, scores=scores, present=present, valid=valid)
+
+
+def apply_rule_batch(matrix: ScoreMatrix, rules: RuleBatch) -> np.ndarray:
+    """Перекрывает оценки решёнными правилами (только в оценённых блоках).
+    Возвращает маску изменённых оценок той же формы, что scores."""
+    column = {col: j for j, col in enumerate(criteria_columns(matrix.qtype))}
+    changed = np.zeros_like(matrix.present)
+    for j_rule, (key, index, _) in enumerate(rules.criteria):
+        j = column[(key, index)]
+        decided = (rules.scores[:, j_rule] != UNDECIDED) & matrix.present[:, j]
+        new = np.where(decided, rules.scores[:, j_rule], matrix.scores[:, j]).astype(np.int8)
+        changed[:, j] = new != matrix.scores[:, j]
+        matrix.scores[:, j] = new
+    return changed
+
+
+def score_matrix(
+    matrix: ScoreMatrix,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Итоговые баллы и passed для всех строк: (total, passed)."""
+    qtype = matrix.qtype
+    columns = criteria_columns(qtype)
+    weights = np.array([WEIGHTS[qtype][key][i] for key, i in columns], dtype=np.float64)
+    multipliers = np.array(
+        [i in MULTIPLIER_INDICES.get(qtype, {}).get(key, []) for key, i in columns], dtype=bool,
+    )
+
+    evaluated = np.where(matrix.present, matrix.scores, 0).astype(np.float64)
+    weighted_sum = evaluated @ weights
+    # Мультипликатор = 0, только если он оценён и равен 0
+    zeroed = ((matrix.scores == 0) & matrix.present)[:, multipliers].any(axis=1)
+    total = np.where(zeroed, 0.0, weighted_sum)
+    threshold = (thresholds or THRESHOLDS)[qtype]
+    return total, total >= threshold
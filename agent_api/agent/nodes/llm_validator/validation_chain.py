@@ -2,7 +2,7 @@
 Интерфейс для LLM-валидатора, интегрированный в архитектуру agent_api.
 """
 
-from typing import Dict, Any, TypedDict, Optional, Literal
+from typing import Dict, Any, List, TypedDict, Optional, Literal
 from pydantic import BaseModel, Field
 from langchain_core.runnables import Runnable
 from langchain_core.messages import AIMessage
@@ -16,6 +16,10 @@ class ValidationInput(TypedDict):
     question_type: Literal["open", "one", "multi"]
     source_text: Optional[str]
     question: Dict[str, Any]
+    validation_mode: Optional[str]  # per_block | single_call; None — режим валидатора
+    # Версия вопроса до доработки и её отчёт — переоцениваются только затронутые блоки
+    previous_question: Optional[Dict[str, Any]]
+    previous_result: Optional[Dict[str, Any]]
 
 class ValidationOutput(BaseModel):
     type: str = Field(description="Тип вопроса")
@@ -26,6 +30,23 @@ class ValidationOutput(BaseModel):
     max_total: float = Field(description="Максимально возможный балл")
     threshold: float = Field(description="Пороговое значение")
     passed: bool = Field(description="Прошел ли вопрос порог качества")
+    mode: str = Field(default="per_block", description="Режим валидатора: per_block | single_call")
+    skipped_blocks: List[str] = Field(
+        default_factory=list,
+        description="Блоки, не оценённые после обнуления балла мультипликатором (в by_block — [])",
+    )
+    carried_blocks: List[str] = Field(
+        default_factory=list,
+        description="Блоки, оценки которых перенесены из валидации до доработки",
+    )
+    rule_violations: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Нарушения, найденные детерминированными правилами: code, block, index, reason",
+    )
+    rules_rejected: bool = Field(
+        default=False,
+        description="Вопрос отклонён правилами без вызовов LLM",
+    )
 
 def create_validation_chain(
     model_name: str = None,
@@ -58,7 +79,10 @@ def create_validation_chain(
                 result = self.validator.evaluate(
                     qtype=input_data["question_type"],
                     source_text=input_data.get("source_text"),
-                    question=input_data["question"]
+                    question=input_data["question"],
+                    mode=input_data.get("validation_mode"),
+                    previous_question=input_data.get("previous_question"),
+                    previous_result=input_data.get("previous_result"),
                 )
                 
                 logger.info(f"Validation completed: score={result['total']}/{result['max_total']}, passed={result['passed']}")
@@ -2,20 +2,54 @@
 LLM-валидатор вопросов по критериям качества.
 Поддерживает три типа заданий: open, onech, multich.
 Адаптирован для использования с Ollama через LangChain.
+
+Режимы (VALIDATION_MODES):
+  per_block    — отдельный запрос на каждый блок критериев (по умолчанию)
+  single_call  — один запрос со всеми блоками типа и JSON-ответом по схеме
+                 single_call_schema(qtype): исходный текст отправляется один
+                 раз, а не на каждый блок. Блоки, которых нет в ответе,
+                 досчитываются по одному. Согласие режимов — calibrate_validator.py.
+
+Early exit (LLM_VALIDATOR_EARLY_EXIT): блоки с MULTIPLIER_INDICES оцениваются
+первыми; как только мультипликатор обнулил балл, остальные блоки не
+запрашиваются — в by_block у них пустой список, ключи — в skipped_blocks.
+
+Повторная валидация после доработки (previous_question / previous_result):
+заново оцениваются только блоки, чьи поля (BLOCK_FIELDS) изменились, оценки
+остальных переносятся из прошлого результата — ключи в carried_blocks.
+
+Правила (LLM_VALIDATOR_RULES, rules.py): до запросов к LLM механически
+проверяемые подкритерии решаются детерминированно и перекрывают оценки
+модели; вопрос, у которого правило обнулило мультипликатор, отклоняется без
+вызовов LLM (все блоки в skipped_blocks, причины — в rule_violations).
+
+Каждый запрос к LLM — этап телеметрии validation_block с меткой block
+(agent/telemetry.py).
 """
 
 import json
+import logging
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union, Literal
-from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, List, Optional, Set, Tuple, Union, Literal
+from pydantic import BaseModel, Field, create_model
 
+from langchain_core.exceptions import OutputParserException
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable
+
+from agent import telemetry
+from config import LLM_VALIDATOR_EARLY_EXIT, LLM_VALIDATOR_INCREMENTAL, LLM_VALIDATOR_MODE, LLM_VALIDATOR_RULES
 from llm_factory import create_chat_llm
 
+from .rules import RuleReport, check_question
+
+logger = logging.getLogger(__name__)
+
 
 def _read_text_file(path: Path) -> str:
     """Читает текстовый файл с промптом."""
@@ -42,8 +76,19 @@ def _find_prompt_file(
     raise FileNotFoundError(f"Не найден файл промпта: {file_name}")
 
 
+@lru_cache(maxsize=None)
+def _load_criterion_template(qtype: str, key: str) -> str:
+    """Шаблон критерия: читается с диска один раз на процесс."""
+    path = _find_prompt_file(PROMPT_FILES[qtype][key], [Path(__file__).parent])
+    return _read_text_file(path)
+
+
 def _build_prompt(template: str, source_text: str, question_json: str) -> str:
-    """Строит промпт из шаблона и данных."""
+    """Строит промпт из шаблона и данных.
+
+    Шаблон критерия идёт первым и не меняется между запросами — это общий
+    префикс для серверного кэша префиксов; исходный текст и задание — в конце.
+    """
     return (
         template.rstrip()
         + "\n\nИсходный текст: \n\n"
@@ -137,6 +182,37 @@ PROMPT_FILES = {
     },
 }
 
+# Порядок блоков критериев по типам
+BLOCK_ORDER = {
+    "open": ["c1_question", "c2_outputs", "c4_logic", "c5_phrase"],
+    "multi": ["c1_question", "c2_options", "c3_outputs", "c4_logic", "c5_phrase"],
+    "one": ["c1_question", "c2_options", "c3_outputs", "c4_logic", "c5_phrase"],  # "c4_logic_base", "c4_logic_link"
+}
+
+# Поля вопроса, от которых зависит оценка блока ("options" — все option_*).
+# Блок переоценивается после доработки, только если изменилось одно из них.
+BLOCK_FIELDS = {
+    "c1_question": {"task"},
+    "c2_options":  {"task", "options", "outputs"},
+    "c2_outputs":  {"task", "outputs"},
+    "c3_outputs":  {"task", "options", "outputs"},
+    "c4_logic":    {"task", "options", "outputs"},
+    "c5_phrase":   {"task", "options", "outputs"},
+}
+
+VALIDATION_MODE_PER_BLOCK = "per_block"
+VALIDATION_MODE_SINGLE_CALL = "single_call"
+VALIDATION_MODES = (VALIDATION_MODE_PER_BLOCK, VALIDATION_MODE_SINGLE_CALL)
+
+
+def normalize_validation_mode(mode: Optional[str]) -> str:
+    mode = (mode or LLM_VALIDATOR_MODE or VALIDATION_MODE_PER_BLOCK).strip()
+    if mode not in VALIDATION_MODES:
+        valid = ", ".join(VALIDATION_MODES)
+        raise ValueError(f"Invalid validation_mode '{mode}'. Expected one of: {valid}")
+    return mode
+
+
 # Встроенный промпт только для one/c4_logic_link (так как для него нет отдельного файла) - # в текущей версии кода этот промпт НЕ будет никогда использоваться; код удалять не буду
 EXTRA_ONECH_LOGIC_LINK_PROMPT = """Ты — эксперт по оценке качества заданий.
 Твоя задача — ДОПОЛНИТЕЛЬНО проверить ещё один подпункт для блока "Логическая согласованность".
@@ -241,6 +317,215 @@ class BlockResult:
         return sum(self.scores)
 
 
+def _evaluation_order(qtype: str) -> List[str]:
+    """Блоки с мультипликаторами — первыми, внутри групп порядок BLOCK_ORDER."""
+    multipliers = MULTIPLIER_INDICES.get(qtype, {})
+    return sorted(BLOCK_ORDER[qtype], key=lambda key: key not in multipliers)
+
+
+def _zeroed_by_multiplier(qtype: str, blocks) -> bool:
+    """Какой-то из оценённых мультипликаторов = 0 — итоговый балл уже 0."""
+    return any(
+        b.scores[idx] == 0
+        for b in blocks
+        for idx in MULTIPLIER_INDICES.get(qtype, {}).get(b.key, [])
+    )
+
+
+# ----------------------- Повторная валидация -----------------------
+
+# Служебные поля вопроса, не влияющие на оценку
+_NON_QUESTION_FIELDS = {"source_text", "question_type"}
+
+
+def _question_fields(question: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля вопроса для сравнения версий. Варианты — как множество значений,
+    правильные ответы — как значения вариантов: перемешивание вариантов
+    (shuffle_answer_options) изменением не считается."""
+    options = {
+        k: str(v).strip()
+        for k, v in question.items()
+        if k.startswith("option_") and v not in (None, "", "None")
+    }
+    outputs = question.get("outputs")
+    if options:
+        numbers = re.findall(r"\d+", str(outputs))
+        correct = [options.get(f"option_{n}") for n in numbers]
+        outputs = tuple(sorted(c for c in correct if c is not None)) if all(correct) else str(outputs).strip()
+    else:
+        outputs = str(outputs if outputs is not None else "").strip()
+    other = {
+        k: v for k, v in question.items()
+        if k not in _NON_QUESTION_FIELDS and k not in ("task", "outputs") and not k.startswith("option_")
+        and v is not None
+    }
+    return {
+        "task": str(question.get("task") or "").strip(),
+        "options": tuple(sorted(options.values())),
+        "outputs": outputs,
+        "other": other,
+    }
+
+
+def changed_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Set[str]:
+    """Какие из полей task / options / outputs различаются между версиями вопроса.
+    Изменение прочих полей — "*" (затрагивает все блоки)."""
+    before, after = _question_fields(previous), _question_fields(current)
+    changed = {field for field in ("task", "options", "outputs") if before[field] != after[field]}
+    if before["other"] != after["other"]:
+        changed.add("*")
+    return changed
+
+
+def affected_blocks(qtype: str, changed: Set[str]) -> List[str]:
+    """Блоки типа, которые нужно переоценить при изменении полей changed."""
+    return [
+        key for key in BLOCK_ORDER[qtype]
+        if "*" in changed or key not in BLOCK_FIELDS or BLOCK_FIELDS[key] & changed
+    ]
+
+
+def _carried_blocks(
+    qtype: str,
+    question: Dict[str, Any],
+    previous_question: Optional[Dict[str, Any]],
+    previous_result: Optional[Dict[str, Any]],
+) -> Dict[str, BlockResult]:
+    """Оценки блоков из прошлой валидации, которые доработка не затронула.
+    Пропущенные (skipped_blocks) и неполные блоки не переносятся."""
+    if not previous_question or not previous_result or previous_result.get("type", qtype) != qtype:
+        return {}
+    affected = set(affected_blocks(qtype, changed_fields(previous_question, question)))
+    by_block = previous_result.get("by_block") or {}
+    justifications = previous_result.get("justifications") or {}
+    skipped = set(previous_result.get("skipped_blocks") or [])
+
+    carried: Dict[str, BlockResult] = {}
+    for key in BLOCK_ORDER[qtype]:
+        scores = by_block.get(key)
+        if key in affected or key in skipped or not isinstance(scores, list):
+            continue
+        if len(scores) != EXPECTED_COUNTS[qtype][key]:
+            continue
+        justs = list(justifications.get(key) or [])[:len(scores)]
+        justs += [""] * (len(scores) - len(justs))
+        carried[key] = BlockResult(key=key, scores=[_as_binary(s) for s in scores], justifications=justs, raw="")
+    return carried
+
+
+def _apply_rules(block: BlockResult, rules: RuleReport) -> BlockResult:
+    """Оценки подкритериев, решённые правилами, вместо оценок модели."""
+    decided = rules.decided.get(block.key)
+    if not decided:
+        return block
+    reasons = {v.index: v.reason for v in rules.violations if v.block == block.key}
+    scores, justs = list(block.scores), list(block.justifications)
+    for idx, value in decided.items():
+        if idx < len(scores) and scores[idx] != value:
+            scores[idx] = value
+            justs[idx] = reasons.get(idx, "")
+    return BlockResult(key=block.key, scores=scores, justifications=justs, raw=block.raw)
+
+
+# --------------------------- Режим single_call ---------------------------
+
+SINGLE_CALL_SYSTEM_HEADER = """Ты — эксперт по оценке качества заданий.
+
+Оцени задание сразу по всем блокам критериев ниже. Инструкции и примеры каждого
+блока относятся только к этому блоку. Формат ответа внутри блоков не используй:
+верни один JSON-объект без пояснений вокруг него:
+{format}
+В scores — оценки 0/1 строго в порядке критериев блока, в justifications — столько же
+строк: краткое обоснование для оценки 0, для оценки 1 можно пустую строку."""
+
+
+def _criterion_body(template: str) -> str:
+    """Шаблон критерия без хвоста «Входные данные» — данные идут в сообщении пользователя."""
+    return template.rsplit("Входные данные:", 1)[0].rstrip()
+
+
+def single_call_schema(qtype: str, keys: Optional[Tuple[str, ...]] = None) -> type:
+    """Pydantic-модель ответа single_call: по полю на блок, длины векторов — из EXPECTED_COUNTS.
+    keys — подмножество блоков (повторная валидация), по умолчанию все блоки типа."""
+    return _single_call_schema(qtype, keys or tuple(BLOCK_ORDER[qtype]))
+
+
+@lru_cache(maxsize=None)
+def _single_call_schema(qtype: str, keys: Tuple[str, ...]) -> type:
+    fields = {}
+    for key in keys:
+        n = EXPECTED_COUNTS[qtype][key]
+        block = create_model(
+            f"{key}_scores",
+            scores=(Annotated[List[Literal[0, 1]], Field(min_length=n, max_length=n)], ...),
+            justifications=(Annotated[List[str], Field(min_length=n, max_length=n)], ...),
+        )
+        fields[key] = (block, ...)
+    name = f"ValidationScores_{qtype}"
+    if list(keys) != BLOCK_ORDER[qtype]:
+        name += "_" + "_".join(key.split("_")[0] for key in keys)
+    return create_model(name, **fields)
+
+
+def build_single_call_system_prompt(qtype: str, keys: Optional[Tuple[str, ...]] = None) -> str:
+    """Системный промпт single_call — одинаков для всех вопросов типа (префикс для кэша сервера)."""
+    return _build_single_call_system_prompt(qtype, keys or tuple(BLOCK_ORDER[qtype]))
+
+
+@lru_cache(maxsize=None)
+def _build_single_call_system_prompt(qtype: str, keys: Tuple[str, ...]) -> str:
+    response_format = "{\n" + ",\n".join(
+        f'  "{key}": {{"scores": [{EXPECTED_COUNTS[qtype][key]} × 0/1], '
+        f'"justifications": [{EXPECTED_COUNTS[qtype][key]} строк]}}'
+        for key in keys
+    ) + "\n}"
+    parts = [SINGLE_CALL_SYSTEM_HEADER.format(format=response_format)]
+    for key in keys:
+        parts.append(
+            f"###БЛОК {key} ({EXPECTED_COUNTS[qtype][key]} критериев)###\n"
+            f"{_criterion_body(_load_criterion_template(qtype, key))}\n"
+            f"###КОНЕЦ БЛОКА {key}###"
+        )
+    return "\n\n".join(parts)
+
+
+def _as_binary(value) -> int:
+    try:
+        return 1 if int(value) == 1 else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _parse_single_call(text: str, qtype: str, keys: Optional[Tuple[str, ...]] = None) -> Dict[str, BlockResult]:
+    """Блоки из JSON-ответа single_call. Блоки, которых нет в ответе, пропускаются;
+    длина векторов выравнивается как в _extract_scores_and_justifications."""
+    try:
+        data = JsonOutputParser().parse(text)
+    except OutputParserException:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    blocks: Dict[str, BlockResult] = {}
+    for key in keys or BLOCK_ORDER[qtype]:
+        block = data.get(key)
+        if not isinstance(block, dict) or not isinstance(block.get("scores"), list):
+            continue
+        expected = EXPECTED_COUNTS[qtype][key]
+        scores = [_as_binary(v) for v in block["scores"]][:expected]
+        justs = block.get("justifications")
+        justs = [str(j or "") for j in justs][:expected] if isinstance(justs, list) else []
+        scores += [0] * (expected - len(scores))
+        justs += [""] * (expected - len(justs))
+        blocks[key] = BlockResult(
+            key=key,
+            scores=scores,
+            justifications=justs,
+            raw=json.dumps(block, ensure_ascii=False),
+        )
+    return blocks
+
+
 class LLMValidator:
     """Основной класс валидатора."""
 
@@ -251,92 +536,185 @@ class LLMValidator:
         base_url: Optional[str] = None,
         api_key: Optional[str] = None,
         provider: str = "openai",
+        mode: Optional[str] = None,
+        early_exit: Optional[bool] = None,
+        incremental: Optional[bool] = None,
+        rules: Optional[bool] = None,
         **provider_kwargs,
     ) -> None:
         self.thresholds = thresholds or THRESHOLDS.copy()
-        self.llm = create_chat_llm(
+        self.mode = normalize_validation_mode(mode)
+        self.early_exit = LLM_VALIDATOR_EARLY_EXIT if early_exit is None else early_exit
+        self.incremental = LLM_VALIDATOR_INCREMENTAL if incremental is None else incremental
+        self.rules = LLM_VALIDATOR_RULES if rules is None else rules
+        self._llm_kwargs = dict(
             provider=provider,
             model_name=model,
             base_url=base_url,
             api_key=api_key,
             temperature=0.0,
-            max_tokens=512,
             timeout=90,
             **provider_kwargs,
         )
+        self.llm = create_chat_llm(max_tokens=512, **self._llm_kwargs)
+        # LLM для single_call — по набору блоков (своя JSON-схема), создаётся при первом запросе
+        self._single_call_llms: Dict[Tuple[str, Tuple[str, ...]], Runnable] = {}
+
+    def _single_call_llm(self, qtype: str, keys: Tuple[str, ...]) -> Runnable:
+        if (qtype, keys) not in self._single_call_llms:
+            self._single_call_llms[(qtype, keys)] = create_chat_llm(
+                max_tokens=2048,
+                response_schema=single_call_schema(qtype, keys),
+                **{**self._llm_kwargs, "timeout": 180},
+            )
+        return self._single_call_llms[(qtype, keys)]
 
     def evaluate(
         self,
         qtype: str,
         source_text: Optional[str],
         question: Dict,
+        mode: Optional[str] = None,
+        previous_question: Optional[Dict] = None,
+        previous_result: Optional[Dict] = None,
     ) -> Dict:
-        """Проверяет один вопрос и возвращает детальный отчёт + суммарные баллы."""
+        """Проверяет один вопрос и возвращает детальный отчёт + суммарные баллы.
+
+        mode — режим для этого вопроса (per_block | single_call), по умолчанию
+        режим валидатора. previous_question / previous_result — версия вопроса
+        до доработки и её отчёт: блоки, поля которых не менялись, не
+        переоцениваются.
+        """
         qtype = qtype.lower().strip()
         if qtype not in ("open", "one", "multi"):
             raise ValueError("qtype должен быть одним из: 'open', 'one', 'multi'")
+        mode = normalize_validation_mode(mode or self.mode)
+
+        order = BLOCK_ORDER[qtype]
+        rules = check_question(qtype, question) if self.rules else None
+        if rules is not None and rules.rejected:
+            # Балл заведомо 0 — модель не вызываем
+            result = self._score(qtype, [])
+            result["by_block"] = {key: [] for key in order}
+            result["justifications"] = {key: [] for key in order}
+            result["skipped_blocks"] = list(order)
+            result["carried_blocks"] = []
+            result["raw"] = {}
+            result["mode"] = mode
+            result["rule_violations"] = [v.to_dict() for v in rules.violations]
+            result["rules_rejected"] = True
+            return result
 
         question_json = json.dumps(question, ensure_ascii=False, indent=2)
-        blocks: List[BlockResult] = []
         raw: Dict[str, str] = {}
-
-        if qtype == "open":
-            order = ["c1_question", "c2_outputs", "c4_logic", "c5_phrase"]
-        elif qtype == "multi":
-            order = ["c1_question", "c2_options", "c3_outputs", "c4_logic", "c5_phrase"]
-        else:  # one
-            order = [
-                "c1_question",
-                "c2_options",
-                "c3_outputs",
-                "c4_logic",
-                "c5_phrase",
-            ]  # "c4_logic_base", "c4_logic_link"
-
-        # Обрабатываем критерии последовательно для стабильности
-        for key in order:
-            expected = EXPECTED_COUNTS[qtype][key]
-
-            # Получаем промпт
-            if (
-                qtype == "one" and key == "c4_logic_link"
-            ):  # в текущей версии кода это условие НЕ будет никогда выполнено; код удалять не буду
-                # Для one/c4_logic_link используем встроенный промпт
-                prompt_text = EXTRA_ONECH_LOGIC_LINK_PROMPT.format(
-                    source_text=source_text or "",
-                    question_json=question_json,
+        carried: Dict[str, BlockResult] = {}
+        if self.incremental:
+            carried = _carried_blocks(qtype, question, previous_question, previous_result)
+        found: Dict[str, BlockResult] = dict(carried)
+
+        pending = tuple(key for key in order if key not in found)
+        zeroed = self.early_exit and _zeroed_by_multiplier(qtype, found.values())
+        if mode == VALIDATION_MODE_SINGLE_CALL and len(pending) > 1 and not zeroed:
+            with telemetry.stage("validation_block", block=VALIDATION_MODE_SINGLE_CALL):
+                answer_text = self._invoke(
+                    self._single_call_llm(qtype, pending),
+                    build_single_call_system_prompt(qtype, pending),
+                    _build_prompt("Оцени задание по всем блокам критериев.", source_text or "", question_json),
                 )
-            else:
-                # Используем файлы промптов
-                file_key = key
-                fname = PROMPT_FILES[qtype][file_key]
-                path = _find_prompt_file(fname, [Path(__file__).parent])
-                template = _read_text_file(path)
-                prompt_text = _build_prompt(template, source_text or "", question_json)
-
-            # Создаем промпт и вызываем LLM
-            prompt = ChatPromptTemplate.from_messages(
-                [
-                    SystemMessage(content="Ты — эксперт по оценке качества заданий."),
-                    HumanMessage(content=prompt_text),
-                ]
-            )
-
-            chain = prompt | self.llm
-            answer = chain.invoke({})
-
-            # Извлекаем ответ
-            if hasattr(answer, "content"):
-                answer_text = answer.content
-            else:
-                answer_text = str(answer)
-
-            vec, justs = _extract_scores_and_justifications(answer_text, expected)
+            raw[VALIDATION_MODE_SINGLE_CALL] = answer_text
+            found.update(_parse_single_call(answer_text, qtype, pending))
+            missing = [key for key in pending if key not in found]
+            if missing:
+                logger.warning(f"Single-call validation returned no scores for {missing}, evaluating them per block")
+
+        # Обрабатываем критерии последовательно для стабильности; после
+        # обнуления мультипликатором оставшиеся блоки пропускаются
+        evaluated: Dict[str, BlockResult] = dict(found)
+        skipped: List[str] = []
+        for key in _evaluation_order(qtype):
+            if key in evaluated:
+                continue
+            if self.early_exit and _zeroed_by_multiplier(qtype, evaluated.values()):
+                skipped.append(key)
+                continue
+            block = self._evaluate_block(qtype, key, source_text, question_json)
+            raw[key] = block.raw
+            evaluated[key] = block
+
+        if rules is not None:
+            evaluated = {key: _apply_rules(block, rules) for key, block in evaluated.items()}
+
+        result = self._score(qtype, [evaluated[key] for key in order if key in evaluated])
+        result["by_block"] = {key: result["by_block"].get(key, []) for key in order}
+        result["justifications"] = {key: result["justifications"].get(key, []) for key in order}
+        result["skipped_blocks"] = [key for key in order if key in skipped]
+        result["carried_blocks"] = [key for key in order if key in carried]
+        result["raw"] = raw
+        result["mode"] = mode
+        result["rule_violations"] = [v.to_dict() for v in rules.violations] if rules is not None else []
+        result["rules_rejected"] = False
+        return result
+
+    def evaluate_blocks(
+        self,
+        qtype: str,
+        source_text: Optional[str],
+        question: Dict,
+        keys: List[str],
+    ) -> Dict[str, BlockResult]:
+        """Только блоки keys, по запросу на блок — для переоценки сохранённых
+        вопросов. Правила и мультипликаторы не применяются."""
+        question_json = json.dumps(question, ensure_ascii=False, indent=2)
+        return {
+            key: self._evaluate_block(qtype, key, source_text, question_json)
+            for key in keys
+            if key in BLOCK_ORDER[qtype]
+        }
 
-            blocks.append(BlockResult(key=key, scores=vec, justifications=justs, raw=answer_text))
-            raw[key] = answer_text
+    @staticmethod
+    def _invoke(llm: Runnable, system_text: str, prompt_text: str) -> str:
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                SystemMessage(content=system_text),
+                HumanMessage(content=prompt_text),
+            ]
+        )
+        answer = (prompt | llm).invoke({})
+        if hasattr(answer, "content"):
+            return answer.content
+        return str(answer)
 
-        # Взвешенная сумма + критические мультипликаторы
+    def _evaluate_block(
+        self,
+        qtype: str,
+        key: str,
+        source_text: Optional[str],
+        question_json: str,
+    ) -> BlockResult:
+        """Один блок критериев — отдельный запрос (режим per_block)."""
+        expected = EXPECTED_COUNTS[qtype][key]
+
+        # Получаем промпт
+        if (
+            qtype == "one" and key == "c4_logic_link"
+        ):  # в текущей версии кода это условие НЕ будет никогда выполнено; код удалять не буду
+            # Для one/c4_logic_link используем встроенный промпт
+            prompt_text = EXTRA_ONECH_LOGIC_LINK_PROMPT.format(
+                source_text=source_text or "",
+                question_json=question_json,
+            )
+        else:
+            # Используем файлы промптов
+            template = _load_criterion_template(qtype, key)
+            prompt_text = _build_prompt(template, source_text or "", question_json)
+
+        with telemetry.stage("validation_block", block=key):
+            answer_text = self._invoke(self.llm, "Ты — эксперт по оценке качества заданий.", prompt_text)
+        vec, justs = _extract_scores_and_justifications(answer_text, expected)
+        return BlockResult(key=key, scores=vec, justifications=justs, raw=answer_text)
+
+    def _score(self, qtype: str, blocks: List[BlockResult]) -> Dict:
+        """Взвешенная сумма + критические мультипликаторы — одинаково для всех режимов."""
         weighted_sum = 0.0
         multiplier_product = 1
         for b in blocks:
@@ -356,7 +734,6 @@ class LLMValidator:
             "type": qtype,
             "by_block": by_block,
             "justifications": justifications,
-            "raw": raw,
             "total": total,
             "max_total": max_total,
             "threshold": self.thresholds[qtype],
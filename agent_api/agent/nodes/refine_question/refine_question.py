@@ -57,10 +57,16 @@ class StructuredQuestionOutput(BaseModel):
 
 
 def _build_issues_section(validation_result: Dict[str, Any]) -> str:
-    """Формирует текстовый список проблем из by_block + justifications."""
+    """Формирует текстовый список проблем из by_block + justifications
+    и нарушений детерминированных правил (rule_violations)."""
     by_block = validation_result.get("by_block", {})
     justifications = validation_result.get("justifications", {})
     lines: List[str] = []
+    # Правила перекрывают оценки в by_block — без повторов берём только
+    # нарушения блоков, оставшихся без оценок (вопрос отклонён правилами)
+    for violation in validation_result.get("rule_violations", []):
+        if not by_block.get(violation.get("block")):
+            lines.append(f"- [{violation.get('block')}] {violation.get('reason')}")
     for block_key, scores in by_block.items():
         block_justs = justifications.get(block_key, [])
         for i, score in enumerate(scores):
@@ -86,10 +92,13 @@ def create_refine_question_chain(
         temperature=0.0,
         max_tokens=1024,
         timeout=90,
+        response_schema=StructuredQuestionOutput,
         **provider_kwargs,
     )
 
     parser = PydanticOutputParser(pydantic_object=StructuredQuestionOutput)
+    # Формат вывода статичен — в системном промпте, перед данными запроса
+    system_prompt = f"{SYSTEM_PROMPT}\n\n{parser.get_format_instructions()}"
 
     class RefineQuestionRunnable(Runnable[RefineQuestionInput, Dict]):
         def invoke(self, input_data: RefineQuestionInput, config=None) -> Dict:
@@ -101,15 +110,14 @@ def create_refine_question_chain(
             question_json = json.dumps(question, ensure_ascii=False, indent=2)
 
             human_text = (
-                f"### Замечания рецензента\n{issues}\n\n"
                 f"### Исходный текст\n{source_text or '(не указан)'}\n\n"
                 f"### Текущее задание (JSON)\n{question_json}\n\n"
-                f"Исправь задание и верни результат.\n\n"
-                f"{parser.get_format_instructions()}"
+                f"### Замечания рецензента\n{issues}\n\n"
+                f"Исправь задание и верни результат."
             )
 
             prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content=SYSTEM_PROMPT),
+                SystemMessage(content=system_prompt),
                 HumanMessage(content=human_text),
             ])
 
@@ -3,6 +3,7 @@ from typing import Dict, Optional
 
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import Runnable
+from llm_factory import MODEL_EXTRA_KEYS
 from agent.nodes.generate_question.generate_question import GenerateQuestionInput, create_generate_question_chain
 from agent.nodes.assess_sensitivity.estimation import ProvocativenessInput, create_provocativeness_chain
 from agent.nodes.llm_validator.validation_chain import ValidationInput, ValidationOutput, create_validation_chain
@@ -20,14 +21,9 @@ class GENAARunnablesOllama:
     chunk_gate_chain: Runnable[ChunkGateInput, ChunkGateOutput] = None
 
 def _extract_provider_kwargs(model_dict: dict) -> dict:
-    """Извлекает provider-специфичные kwargs из словаря модели."""
+    """Извлекает provider-специфичные kwargs и настройки модели из extra."""
     extra = model_dict.get("extra", {})
-    result = {}
-    if "scope" in extra:
-        result["scope"] = extra["scope"]
-    if "folder_id" in extra:
-        result["folder_id"] = extra["folder_id"]
-    return result
+    return {key: extra[key] for key in MODEL_EXTRA_KEYS if key in extra}
 
 
 def create_GENA_runnables_ollama(
@@ -0,0 +1,213 @@
+"""
+Телеметрия прогона графа: время, токены, повторы и модели по этапам.
+
+Этап — узел графа (GENAAssistant оборачивает узлы в stage()) или блок
+LLM-валидатора внутри узла validation. Запись этапа:
+
+    {"stage": "validation_block", "parent": "validation", "question_type": "one",
+     "block": "c1_question", "wall_s": 1.84, "llm_calls": 1, "prompt_tokens": 1830,
+     "completion_tokens": 96, "retries": 0, "errors": 0, "models": ["qwen-7b"]}
+
+Токены и модели собирает TelemetryCallback — колбэк LangChain, который
+collect() подключает через contextvar (register_configure_hook) ко всем
+вызовам LLM в контексте, без передачи config по цепочкам. HTTP-повторы
+openai SDK (заголовок x-stainless-retry-count) считают хуки общих
+httpx-клиентов llm_factory. Вызов LLM относится к этапу, активному в момент
+запуска, и учитывается во всех объемлющих этапах. Без collect() всё это no-op.
+
+    with collect() as telemetry:
+        graph.invoke(state)
+    telemetry.summary()
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+_COUNTERS = ("llm_calls", "prompt_tokens", "completion_tokens", "retries", "errors")
+
+_current: ContextVar[Optional["Telemetry"]] = ContextVar("gena_telemetry", default=None)
+_current_stage: ContextVar[Optional["_Stage"]] = ContextVar("gena_telemetry_stage", default=None)
+_current_callback: ContextVar[Optional["TelemetryCallback"]] = ContextVar("gena_telemetry_callback", default=None)
+register_configure_hook(_current_callback, inheritable=True)
+
+
+class _Stage:
+    __slots__ = ("name", "labels", "parent", "started", "wall_s", "counters", "models")
+
+    def __init__(self, name: str, labels: Dict[str, Any], parent: Optional["_Stage"]):
+        self.name = name
+        self.labels = labels
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.wall_s: Optional[float] = None
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        self.models: List[str] = []
+
+    def chain(self) -> Iterator["_Stage"]:
+        stage = self
+        while stage is not None:
+            yield stage
+            stage = stage.parent
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"stage": self.name}
+        if self.parent is not None:
+            record["parent"] = self.parent.name
+        record.update(self.labels)
+        record["wall_s"] = round(self.wall_s if self.wall_s is not None else time.perf_counter() - self.started, 4)
+        record.update(self.counters)
+        record["models"] = list(self.models)
+        return record
+
+
+class Telemetry:
+    """Этапы одного прогона. Потокобезопасна: счётчики обновляются под локом."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: List[_Stage] = []
+        self._totals = dict.fromkeys(_COUNTERS, 0)
+        self._lock = threading.Lock()
+        self.callback = TelemetryCallback(self)
+
+    def _add_stage(self, stage: _Stage) -> None:
+        with self._lock:
+            self._stages.append(stage)
+
+    def add(self, stage: Optional["_Stage"], model: Optional[str] = None, **counts: int) -> None:
+        """Счётчики — этапу, его родителям и итогу прогона."""
+        with self._lock:
+            for key, value in counts.items():
+                self._totals[key] += value
+            for s in stage.chain() if stage is not None else ():
+                for key, value in counts.items():
+                    s.counters[key] += value
+                if model and model not in s.models:
+                    s.models.append(model)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_s": round(time.perf_counter() - self.started, 4),
+                **self._totals,
+                "stages": [stage.to_dict() for stage in self._stages],
+            }
+
+
+@contextmanager
+def collect() -> Iterator[Telemetry]:
+    """Активная телеметрия в текущем контексте (и в копиях контекста для потоков)."""
+    telemetry = Telemetry()
+    token = _current.set(telemetry)
+    callback_token = _current_callback.set(telemetry.callback)
+    try:
+        yield telemetry
+    finally:
+        _current_callback.reset(callback_token)
+        _current.reset(token)
+
+
+def current() -> Optional[Telemetry]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str, **labels: Any) -> Iterator[None]:
+    """Этап с замером времени; без активной телеметрии — ничего не делает.
+    Метки со значением None не пишутся."""
+    telemetry = _current.get()
+    if telemetry is None:
+        yield
+        return
+    record = _Stage(name, {k: v for k, v in labels.items() if v is not None}, _current_stage.get())
+    telemetry._add_stage(record)
+    token = _current_stage.set(record)
+    try:
+        yield
+    finally:
+        record.wall_s = time.perf_counter() - record.started
+        _current_stage.reset(token)
+
+
+def record_retry() -> None:
+    """Повтор запроса к LLM в активном этапе (повтор openai SDK или лимитера endpoint-а)."""
+    telemetry = _current.get()
+    if telemetry is not None:
+        telemetry.add(_current_stage.get(), retries=1)
+
+
+def record_http_request(request) -> None:
+    """Хук httpx (request): повтор openai SDK отмечен заголовком x-stainless-retry-count."""
+    if _current.get() is None:
+        return
+    try:
+        retry = int(request.headers.get("x-stainless-retry-count", "0"))
+    except ValueError:
+        return
+    if retry > 0:
+        record_retry()
+
+
+async def arecord_http_request(request) -> None:
+    record_http_request(request)
+
+
+def _token_usage(response: LLMResult) -> Dict[str, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {
+            "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+            "completion_tokens": int(usage.get("completion_tokens") or 0),
+        }
+    # Провайдеры без llm_output (и стриминг) — usage_metadata сообщений
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations[:1]:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += int(metadata.get("input_tokens") or 0)
+            completion_tokens += int(metadata.get("output_tokens") or 0)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+
+def _model_name(metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> Optional[str]:
+    if metadata and metadata.get("ls_model_name"):
+        return metadata["ls_model_name"]
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model") or params.get("model_name")
+
+
+class TelemetryCallback(BaseCallbackHandler):
+    """Вызовы LLM → счётчики этапа, активного при запуске вызова."""
+
+    # В потоке вызова: этап берётся из его contextvars
+    run_inline = True
+
+    def __init__(self, telemetry: Telemetry):
+        self.telemetry = telemetry
+        self._runs: Dict[UUID, tuple] = {}
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        self._runs[run_id] = (_current_stage.get(), _model_name(metadata, kwargs))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, parent_run_id=None, **kwargs):
+        stage_record, model = self._runs.pop(run_id, (_current_stage.get(), None))
+        output_model = (response.llm_output or {}).get("model_name")
+        self.telemetry.add(stage_record, model=model or output_model, llm_calls=1, **_token_usage(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id, parent_run_id=None, **kwargs):
+        stage_record, model = self._runs.pop(run_id, (_current_stage.get(), None))
+        self.telemetry.add(stage_record, model=model, llm_calls=1, errors=1)
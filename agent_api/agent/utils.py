@@ -1,11 +1,16 @@
 import json
+from functools import lru_cache
 from typing import Annotated, Dict, List, Optional
 
-from huggingface_hub import HfApi
-
 from agent.config import jsonl_filename, repo_id, token
 
-api = HfApi()
+
+@lru_cache(maxsize=1)
+def _hf_api():
+    """Клиент Hugging Face создаётся при первом обращении: huggingface_hub не нужен сервису на старте."""
+    from huggingface_hub import HfApi
+
+    return HfApi()
 
 
 def get_jsonl_files(repo_id: str = repo_id, token: str = token) -> List[str]:
@@ -19,7 +24,7 @@ def get_jsonl_files(repo_id: str = repo_id, token: str = token) -> List[str]:
     Returns:
         List[str]: Список файлов .jsonl в репозитории.
     """
-    files = api.list_repo_files(repo_id=repo_id, token=token, repo_type="dataset")
+    files = _hf_api().list_repo_files(repo_id=repo_id, token=token, repo_type="dataset")
     jsonl_files = [file.split(".")[0] for file in files if file.endswith(".jsonl")]
     return jsonl_files
 
@@ -52,7 +57,7 @@ def upload_to_huggingface(
     Returns:
         str: Ссылка на загруженный репозиторий.
     """
-    api.upload_file(
+    _hf_api().upload_file(
         path_or_fileobj=filename, path_in_repo=f"{topic}.jsonl", repo_id=repo_id, repo_type="dataset", token=token
     )
     return f"https://huggingface.co/datasets/{repo_id}"
@@ -1,12 +1,15 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from contextlib import asynccontextmanager
-from agent.runnables import create_GENA_runnables_ollama
-from agent.handler import GENAHandler, GENAOptions
 from agent.pipeline_modes import normalize_pipeline_mode
 from config import MONGO_DB_PATH
-from models_registry import registry
+from models_registry import get_registry
+from endpoint_limiter import limiter_snapshots
+import metrics
+import json
 import logging
 import traceback
 
@@ -27,6 +30,15 @@ class PromptRequest(BaseModel):
     validation_model_id: Optional[str] = None
     chunk_pre_validated: bool = False
     pipeline_mode: str = "full"
+    # Несколько типов вопросов по чанку за один вызов генератора;
+    # ответ — {"outputs": [...]} в порядке типов
+    question_types: Optional[List[str]] = None
+    # Режим валидатора: per_block | single_call (все блоки критериев одним вызовом)
+    validation_mode: Optional[str] = None
+    # Кандидатов генерации (n-сэмплов); лучший по дешёвым проверкам идёт на валидацию
+    candidates: Optional[int] = None
+    # Язык документа (ru | be | tg), определённый chunker'ом; без него — по тексту чанка
+    language: Optional[str] = None
 
 class RephraseQuestionsRequest(BaseModel):
     dataset_name: str
@@ -50,7 +62,14 @@ class ModelInfo(BaseModel):
 
 # ──────────────────── App lifecycle ────────────────────
 
+handler = None
+
+
 def get_academic_handler():
+    # Граф, цепочки и LLM-клиенты импортируются здесь, а не при импорте модуля:
+    # ``import agent_api`` остаётся лёгким (см. bench_startup.py)
+    from agent.handler import GENAHandler, GENAOptions
+
     try:
         options = GENAOptions(mongodb_uri=MONGO_DB_PATH)
         return GENAHandler(options)
@@ -64,19 +83,25 @@ async def lifespan(app: FastAPI):
     try:
         handler = get_academic_handler()
         logger.info("GENA handler initialized successfully")
+        registry = get_registry()
+        await registry.start_probing()
         yield
+        await registry.stop_probing()
+        from llm_factory import aclose_http_clients
+        await aclose_http_clients()
     except Exception as e:
         logger.error(f"Failed to initialize GENA handler: {str(e)}")
         raise
 
 app = FastAPI(title="GENA Academic Handler API", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 # ──────────────────── Endpoints ────────────────────
 
 @app.get("/models/", response_model=List[ModelInfo])
 async def list_models():
-    """Возвращает список зарегистрированных моделей (без проверки доступности)."""
+    """Возвращает список зарегистрированных моделей и групп моделей (без проверки доступности)."""
     return [
         ModelInfo(
             id=m.id,
@@ -85,7 +110,17 @@ async def list_models():
             model_name=m.model_name,
             provider=m.provider,
         )
-        for m in registry.list_models()
+        for m in get_registry().list_models()
+    ] + [
+        ModelInfo(
+            id=group_id,
+            name=f"{group_id} ({len(replicas)} replicas)",
+            base_url="",
+            model_name=replicas[0].model_name,
+            provider=replicas[0].provider,
+        )
+        for group_id, replicas in get_registry().list_groups().items()
+        if replicas
     ]
 
 
@@ -93,6 +128,9 @@ class ModelHealth(BaseModel):
     id: str
     name: str
     available: bool
+    group: Optional[str] = None
+    circuit: Optional[str] = None
+    outstanding: Optional[int] = None
 
 class ChunkGateRequest(BaseModel):
     chunk: str
@@ -102,14 +140,20 @@ class ChunkGateRequest(BaseModel):
 
 @app.get("/models/health/", response_model=List[ModelHealth])
 async def models_health():
-    """Возвращает health-статус моделей из последнего фонового probe (быстрый)."""
-    return [ModelHealth(**h) for h in registry.get_health()]
+    """Возвращает health-статус моделей из последнего фонового probe и состояние circuit breaker-ов (быстрый)."""
+    return [ModelHealth(**h) for h in get_registry().get_health()]
+
+
+@app.get("/models/limits/")
+async def models_limits():
+    """Состояние адаптивных лимитеров по endpoint-ам: окно, очередь, допущенный rate, троттлинг."""
+    return limiter_snapshots()
 
 
 @app.get("/models/discover/", response_model=List[ModelInfo])
 async def discover_models():
     """Опрашивает все endpoints и проверяет доступность моделей."""
-    discovered = await registry.discover_models()
+    discovered = await get_registry().discover_models()
     return [ModelInfo(**m) for m in discovered]
 
 
@@ -134,7 +178,10 @@ async def process_prompt(request: PromptRequest):
         pipeline_mode = normalize_pipeline_mode(request.pipeline_mode)
 
         try:
-            result = handler.ahandle_prompt(
+            # Граф синхронный: прогон в пуле потоков, чтобы event loop продолжал
+            # отвечать на probe, /metrics и восстановление circuit breaker-ов
+            result = await run_in_threadpool(
+                handler.ahandle_prompt,
                 prompt=prompt_text,
                 question_type=request.question_type,
                 source=request.source,
@@ -144,6 +191,10 @@ async def process_prompt(request: PromptRequest):
                 validation_model_id=request.validation_model_id,
                 chunk_pre_validated=request.chunk_pre_validated,
                 pipeline_mode=pipeline_mode,
+                question_types=request.question_types,
+                validation_mode=request.validation_mode,
+                candidates=request.candidates,
+                language=request.language,
             )
         except ValueError as ve:
             if "too many values to unpack" in str(ve):
@@ -168,7 +219,9 @@ async def rephrase_questions(request: RephraseQuestionsRequest):
     try:
         logger.info("Processing rephrase questions")
 
-        rephrased_questions = handler.ahandle_rephrase_questions(
+        # Запросы к модели идут параллельно в пуле потоков — event loop не блокируется
+        rephrased_questions = await run_in_threadpool(
+            handler.ahandle_rephrase_questions,
             questions=request.questions,
             model_id=request.model_id,
         )
@@ -180,6 +233,23 @@ async def rephrase_questions(request: RephraseQuestionsRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/rephrase_questions/stream/")
+async def rephrase_questions_stream(request: RephraseQuestionsRequest):
+    """NDJSON по мере готовности: {"index": i, "question": {...}} на строку,
+    при ошибке — {"error": "..."} последней строкой. Для больших датасетов."""
+    logger.info(f"Streaming rephrase of {len(request.questions)} questions")
+
+    def lines():
+        try:
+            for index, question in handler.iter_rephrase_questions(request.questions, request.model_id):
+                yield json.dumps({"index": index, "question": question}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming rephrase: {str(e)}")
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.post("/chunk_gate/", response_model=ResponseModel)
 async def chunk_gate(request: ChunkGateRequest):
     """Standalone chunk gate — validate a chunk without full generation pipeline."""
@@ -205,6 +275,13 @@ async def chunk_gate(request: ChunkGateRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Метрики Prometheus: запросы, прогоны графа, этапы, запросы к LLM по endpoint-ам, кэши (см. metrics.py)."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health/")
 async def health_check():
     return {"status": "healthy"}
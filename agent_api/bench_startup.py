@@ -0,0 +1,169 @@
+"""
+Бенчмарк холодного старта agent_api: время ``import agent_api`` под
+``python -X importtime`` и время до готовности (импорт + lifespan: handler,
+цепочки, реестр моделей).
+
+Каждый замер — в отдельном процессе интерпретатора, чтобы не было кэша
+импортов; из нескольких прогонов берётся медиана.
+
+Что проверяется (бюджеты в bench_startup_thresholds.json):
+  import_s   — ``import agent_api`` (по importtime, без старта интерпретатора)
+  ready_s    — от старта процесса до входа в lifespan
+  forbidden  — модули, которых не должно быть в sys.modules после ``import agent_api``
+               (LLM-клиенты, граф, pymongo, опциональные провайдеры)
+
+Запуск:
+    cd agent_api && python bench_startup.py
+    python bench_startup.py -n 5 --top 15 --report out/startup.json
+    python bench_startup.py --baseline out/startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_HERE = Path(__file__).resolve().parent
+
+DEFAULT_THRESHOLDS = _HERE / "bench_startup_thresholds.json"
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+_IMPORT_SNIPPET = """
+import json, sys
+import agent_api
+print(json.dumps(sorted(sys.modules)))
+"""
+
+_READY_SNIPPET = """
+import asyncio, time
+import agent_api
+
+async def main():
+    async with agent_api.app.router.lifespan_context(agent_api.app):
+        print(time.time())
+
+asyncio.run(main())
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # ChatOpenAI требует ключ при создании цепочек; запросов к LLM бенчмарк не делает
+    env.setdefault("LLM_API_KEY", "bench")
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Строки ``-X importtime`` → [(модуль, self_us, cumulative_us, глубина)]."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def measure_import() -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _IMPORT_SNIPPET],
+        cwd=_HERE, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(proc.stderr)
+    total_us = next(cum for name, _, cum, depth in rows if name == "agent_api" and depth == 0)
+    direct = [(name, cum) for name, _, cum, depth in rows if depth == 1]
+    return {
+        "import_s": total_us / 1e6,
+        "direct_imports": sorted(direct, key=lambda x: -x[1]),
+        "modules": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def measure_ready() -> float:
+    started = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-c", _READY_SNIPPET],
+        cwd=_HERE, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return float(proc.stdout.strip().splitlines()[-1]) - started
+
+
+def load_thresholds(path: Optional[Path]) -> Dict[str, Any]:
+    if not path or not Path(path).exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_thresholds(
+    report: Dict[str, Any],
+    thresholds: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    violations = []
+    for key in ("import_s", "ready_s"):
+        limit = thresholds.get(f"max_{key}")
+        if limit is not None and report[key] > limit:
+            violations.append(f"{key}: {report[key]:.3f} s > бюджета {limit} s")
+    loaded = sorted(set(thresholds.get("forbidden_on_import", [])) & set(report["modules"]))
+    if loaded:
+        violations.append(f"import agent_api загружает {', '.join(loaded)}")
+    if baseline:
+        max_regression = thresholds.get("max_regression", 0.25)
+        for key in ("import_s", "ready_s"):
+            before = baseline.get(key)
+            if before and report[key] > before * (1 + max_regression):
+                violations.append(
+                    f"{key}: {report[key]:.3f} s против {before:.3f} s в baseline (+{report[key] / before - 1:.0%})"
+                )
+    return violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", "--runs", type=int, default=3, help="Прогонов на замер (берётся медиана)")
+    ap.add_argument("--top", type=int, default=10, help="Сколько прямых импортов agent_api показать")
+    ap.add_argument("--report", default=None, help="Куда сохранить JSON-отчёт")
+    ap.add_argument("--thresholds", default=str(DEFAULT_THRESHOLDS), help="JSON с бюджетами")
+    ap.add_argument("--baseline", default=None, help="Предыдущий отчёт для сравнения")
+    args = ap.parse_args(argv)
+
+    imports = [measure_import() for _ in range(args.runs)]
+    ready = [measure_ready() for _ in range(args.runs)]
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_s": statistics.median(r["import_s"] for r in imports),
+        "ready_s": statistics.median(ready),
+        "direct_imports": imports[-1]["direct_imports"][:args.top],
+        "modules": imports[-1]["modules"],
+    }
+
+    print(f"import agent_api: {report['import_s']:.3f} s   готовность (импорт + lifespan): {report['ready_s']:.3f} s")
+    print("Самые дорогие прямые импорты:")
+    for name, cum_us in report["direct_imports"]:
+        print(f"  {cum_us / 1000:8.1f} ms  {name}")
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    violations = check_thresholds(report, load_thresholds(Path(args.thresholds)), baseline)
+    for v in violations:
+        print(f"FAIL {v}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
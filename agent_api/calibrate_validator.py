@@ -0,0 +1,171 @@
+"""
+Калибровка режима single_call LLM-валидатора против per_block.
+
+Каждый вопрос выборки оценивается обоими режимами на одной модели; отчёт
+показывает, насколько single_call (все блоки критериев одним запросом)
+согласуется с эталонным per_block:
+
+  pass_agreement     — доля вопросов с одинаковым решением passed
+  pass_kappa         — каппа Коэна по passed (согласие сверх случайного)
+  criteria_agreement — доля совпавших оценок подкритериев, всего и по блокам
+  multiplier_agreement — доля вопросов, где совпало обнуление мультипликаторами
+  total_mae          — средняя абсолютная разница итоговых баллов
+  elapsed_s          — время прогона каждого режима
+
+Выборка — JSONL, строка на вопрос:
+    {"question_type": "one", "source_text": "...", "question": {"task": ..., "option_1": ..., "outputs": 1}}
+Вместо ``question`` поля вопроса можно положить на верхний уровень строки
+(как в выгрузке датасета: task, option_*, outputs).
+
+Запуск:
+    cd agent_api && python calibrate_validator.py sample.jsonl
+    python calibrate_validator.py sample.jsonl --model-id qwen-7b --limit 50 --report out/calibration.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_QUESTION_META = {"question_type", "source_text", "chunk_text", "question", "_id", "id"}
+
+
+def load_sample(path: Path, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Строки выборки → [{"question_type", "source_text", "question"}]."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            question = row.get("question")
+            if question is None:
+                question = {k: v for k, v in row.items() if k not in _QUESTION_META and v is not None}
+            items.append({
+                "question_type": row["question_type"],
+                "source_text": row.get("source_text") or row.get("chunk_text") or "",
+                "question": question,
+            })
+            if limit and len(items) >= limit:
+                break
+    return items
+
+
+def _kappa(a: List[bool], b: List[bool]) -> Optional[float]:
+    n = len(a)
+    if not n:
+        return None
+    observed = sum(x == y for x, y in zip(a, b)) / n
+    pa, pb = sum(a) / n, sum(b) / n
+    expected = pa * pb + (1 - pa) * (1 - pb)
+    if expected == 1:
+        return 1.0 if observed == 1 else None
+    return (observed - expected) / (1 - expected)
+
+
+def compare(per_block: List[Dict[str, Any]], single_call: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Метрики согласия по парам отчётов LLMValidator.evaluate для одних и тех же вопросов."""
+    pairs = list(zip(per_block, single_call))
+    matched: Dict[str, List[int]] = {}
+    for ref, other in pairs:
+        for key, scores in ref["by_block"].items():
+            other_scores = other["by_block"].get(key, [])
+            hits = matched.setdefault(key, [0, 0])
+            hits[0] += sum(x == y for x, y in zip(scores, other_scores))
+            hits[1] += len(scores)
+
+    n = len(pairs)
+    ref_passed = [ref["passed"] for ref, _ in pairs]
+    other_passed = [other["passed"] for _, other in pairs]
+    total_hits = sum(h for h, _ in matched.values())
+    total_count = sum(c for _, c in matched.values())
+    return {
+        "n": n,
+        "pass_rate": {"per_block": sum(ref_passed) / n if n else None,
+                      "single_call": sum(other_passed) / n if n else None},
+        "pass_agreement": sum(x == y for x, y in zip(ref_passed, other_passed)) / n if n else None,
+        "pass_kappa": _kappa(ref_passed, other_passed),
+        "criteria_agreement": total_hits / total_count if total_count else None,
+        "criteria_agreement_by_block": {key: h / c for key, (h, c) in matched.items() if c},
+        "multiplier_agreement": (
+            sum((ref["total"] == 0) == (other["total"] == 0) for ref, other in pairs) / n if n else None
+        ),
+        "total_mae": sum(abs(ref["total"] - other["total"]) for ref, other in pairs) / n if n else None,
+    }
+
+
+def run_mode(validator, items: List[Dict[str, Any]], mode: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    reports = [
+        validator.evaluate(item["question_type"], item["source_text"], item["question"], mode=mode)
+        for item in items
+    ]
+    return {"reports": reports, "elapsed_s": time.perf_counter() - started}
+
+
+def _create_validator(model_id: Optional[str]):
+    # Тяжёлые импорты (LangChain, реестр моделей) — только при реальном прогоне
+    from agent.nodes.llm_validator.validator import LLMValidator
+    from agent.runnables import _extract_provider_kwargs
+
+    # Без early exit: для сравнения нужны оценки всех блоков в обоих режимах
+    if not model_id:
+        return LLMValidator(early_exit=False)
+    from models_registry import registry
+    cfg = registry.get_model(model_id)
+    if cfg is None:
+        raise SystemExit(f"Модель '{model_id}' не найдена в реестре")
+    return LLMValidator(
+        model=cfg.model_name,
+        base_url=cfg.base_url,
+        api_key=cfg.api_key,
+        provider=cfg.provider,
+        early_exit=False,
+        **_extract_provider_kwargs({"extra": cfg.extra or {}}),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("sample", help="JSONL с вопросами")
+    ap.add_argument("--model-id", default=None, help="Модель валидатора из реестра (по умолчанию — LLM_*)")
+    ap.add_argument("--limit", type=int, default=None, help="Сколько вопросов взять из выборки")
+    ap.add_argument("--report", default=None, help="Куда сохранить JSON-отчёт (с оценками по вопросам)")
+    args = ap.parse_args(argv)
+
+    items = load_sample(Path(args.sample), args.limit)
+    validator = _create_validator(args.model_id)
+    per_block = run_mode(validator, items, "per_block")
+    single_call = run_mode(validator, items, "single_call")
+
+    summary = compare(per_block["reports"], single_call["reports"])
+    summary["elapsed_s"] = {"per_block": per_block["elapsed_s"], "single_call": single_call["elapsed_s"]}
+
+    print(f"Вопросов: {summary['n']}")
+    if summary["n"]:
+        kappa = summary["pass_kappa"]
+        print(f"passed совпадает: {summary['pass_agreement']:.1%}   каппа: {'—' if kappa is None else f'{kappa:.3f}'}")
+        print(f"Подкритерии совпадают: {summary['criteria_agreement']:.1%}")
+        for key, value in summary["criteria_agreement_by_block"].items():
+            print(f"  {key:<12} {value:.1%}")
+        print(f"Обнуление мультипликаторами совпадает: {summary['multiplier_agreement']:.1%}")
+        print(f"Средняя разница итогового балла: {summary['total_mae']:.2f}")
+    print(f"Время: per_block {per_block['elapsed_s']:.1f} s, single_call {single_call['elapsed_s']:.1f} s")
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({
+                "summary": summary,
+                "items": [
+                    {**item, "per_block": ref, "single_call": other}
+                    for item, ref, other in zip(items, per_block["reports"], single_call["reports"])
+                ],
+            }, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,3 +65,45 @@ YANDEX_CLOUD_FOLDER = os.getenv("YANDEX_CLOUD_FOLDER", "")
 YANDEX_CLOUD_MODEL = _env_llm("YANDEX_CLOUD_MODEL", "yandexgpt-5-lite/latest")
 
 MAX_LEN_USER_PROMPT = os.getenv("MAX_LEN_USER_PROMPT")
+
+# Общий HTTP-пул клиентов LLM (llm_factory): один httpx-клиент на (base_url, api_key)
+LLM_HTTP_MAX_CONNECTIONS = int(_env_llm("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(_env_llm("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(_env_llm("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = _env_llm("LLM_HTTP2", "false").lower().strip() in ("1", "true", "yes", "on")
+
+# Адаптивный лимитер нагрузки на LLM endpoint (endpoint_limiter.py), на каждый base_url
+LLM_LIMIT_ENABLED = _env_llm("LLM_LIMIT_ENABLED", "true").lower().strip() in ("1", "true", "yes", "on")
+LLM_LIMIT_RPS = float(_env_llm("LLM_LIMIT_RPS", "0"))  # 0 — без ограничения частоты
+LLM_LIMIT_BURST = float(_env_llm("LLM_LIMIT_BURST", "0"))  # 0 — равен RPS
+LLM_LIMIT_INITIAL_CONCURRENCY = int(_env_llm("LLM_LIMIT_INITIAL_CONCURRENCY", "8"))
+LLM_LIMIT_MIN_CONCURRENCY = int(_env_llm("LLM_LIMIT_MIN_CONCURRENCY", "1"))
+LLM_LIMIT_MAX_CONCURRENCY = int(_env_llm("LLM_LIMIT_MAX_CONCURRENCY", "64"))
+LLM_LIMIT_DECREASE_FACTOR = float(_env_llm("LLM_LIMIT_DECREASE_FACTOR", "0.5"))
+LLM_LIMIT_LATENCY_TOLERANCE = float(_env_llm("LLM_LIMIT_LATENCY_TOLERANCE", "2.0"))
+LLM_LIMIT_MAX_RETRIES = int(_env_llm("LLM_LIMIT_MAX_RETRIES", "4"))
+LLM_LIMIT_MAX_RETRY_AFTER_S = float(_env_llm("LLM_LIMIT_MAX_RETRY_AFTER_S", "60"))
+LLM_LIMIT_QUEUE_TIMEOUT_S = float(_env_llm("LLM_LIMIT_QUEUE_TIMEOUT_S", "300"))
+
+# Guided decoding по JSON-схеме ответа (llm_factory): off | json_schema | guided_json
+LLM_GUIDED_DECODING = _env_llm("LLM_GUIDED_DECODING", "off").lower().strip()
+
+# Кандидатов генерации на задачу (1 — без отбора); лучший по дешёвым проверкам
+# уходит на LLM-валидацию. Температура сэмплирования кандидатов.
+LLM_GENERATION_CANDIDATES = int(_env_llm("LLM_GENERATION_CANDIDATES", "1"))
+LLM_CANDIDATES_TEMPERATURE = float(_env_llm("LLM_CANDIDATES_TEMPERATURE", "0.7"))
+
+# Одновременных запросов к LLM при перефразировании датасета (/rephrase_questions/)
+LLM_REPHRASE_CONCURRENCY = int(_env_llm("LLM_REPHRASE_CONCURRENCY", "8"))
+
+# Режим LLM-валидатора по умолчанию: per_block | single_call (запрос может переопределить)
+LLM_VALIDATOR_MODE = _env_llm("LLM_VALIDATOR_MODE", "per_block").strip()
+# Не оценивать оставшиеся блоки, если мультипликатор уже обнулил балл
+LLM_VALIDATOR_EARLY_EXIT = _env_llm("LLM_VALIDATOR_EARLY_EXIT", "true").lower().strip() in ("1", "true", "yes", "on")
+# После доработки переоценивать только блоки, чьи поля вопроса изменились
+LLM_VALIDATOR_INCREMENTAL = _env_llm("LLM_VALIDATOR_INCREMENTAL", "true").lower().strip() in ("1", "true", "yes", "on")
+# Детерминированные правила перед LLM-валидатором (дубли вариантов, outputs, длины)
+LLM_VALIDATOR_RULES = _env_llm("LLM_VALIDATOR_RULES", "true").lower().strip() in ("1", "true", "yes", "on")
+
+# Телеметрия этапов графа в ответе /process_prompt/ (время, токены, повторы, модели)
+LLM_TELEMETRY = _env_llm("LLM_TELEMETRY", "true").lower().strip() in ("1", "true", "yes", "on")
@@ -0,0 +1,560 @@
+"""
+Адаптивное клиентское ограничение нагрузки на LLM endpoint-ы.
+
+На каждый base_url — свой EndpointLimiter:
+  - token bucket (LLM_LIMIT_RPS / LLM_LIMIT_BURST) — потолок частоты запросов;
+  - AIMD-окно параллельности: окно растёт на 1 за «окно» успешных ответов и
+    умножается на LLM_LIMIT_DECREASE_FACTOR при 429/503, таймауте или росте
+    задержки (короткая EWMA > базовая EWMA × LLM_LIMIT_LATENCY_TOLERANCE);
+  - пауза endpoint-а по Retry-After и повтор запроса с экспоненциальным backoff
+    (429/503, а также 500/502/504, таймауты и ошибки соединения — например,
+    разорванное keep-alive соединение пула);
+  - метрики: очередь, запросы в полёте, окно, допущенный rate, троттлинг;
+  - исход каждой попытки — подписчикам add_outcome_listener (circuit breaker
+    реестра моделей).
+
+Лимитер встроен в транспорт общих HTTP-клиентов llm_factory (httpx или
+httpx2 — та же библиотека, что у openai SDK, см. llm_http.py), поэтому через
+него проходит каждая попытка. Повторы openai SDK при включённом лимитере
+отключены (llm_factory): повторяет только лимитер.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from config import (
+    LLM_LIMIT_RPS,
+    LLM_LIMIT_BURST,
+    LLM_LIMIT_INITIAL_CONCURRENCY,
+    LLM_LIMIT_MIN_CONCURRENCY,
+    LLM_LIMIT_MAX_CONCURRENCY,
+    LLM_LIMIT_DECREASE_FACTOR,
+    LLM_LIMIT_LATENCY_TOLERANCE,
+    LLM_LIMIT_MAX_RETRIES,
+    LLM_LIMIT_MAX_RETRY_AFTER_S,
+    LLM_LIMIT_QUEUE_TIMEOUT_S,
+)
+from llm_http import httpx
+
+logger = logging.getLogger(__name__)
+
+# Коды «backend перегружен»: уменьшаем окно, ставим паузу, повторяем запрос
+OVERLOAD_STATUS_CODES = frozenset({429, 503})
+# Временные сбои backend-а: окно не трогаем, повторяем запрос с backoff
+RETRY_STATUS_CODES = OVERLOAD_STATUS_CODES | {500, 502, 504}
+
+# Отмена запроса вызывающим (таймаут этапа, закрытый генератор) — не сбой endpoint-а
+_CANCELLED = (asyncio.CancelledError, GeneratorExit)
+
+# Окно, по которому считается admitted_rate
+RATE_WINDOW_S = 60.0
+# Сглаживание латентности: короткая EWMA реагирует на очередь, базовая — «норма» endpoint-а
+_LATENCY_SHORT_ALPHA = 0.3
+_LATENCY_BASE_ALPHA = 0.02
+# Сколько ответов нужно, прежде чем латентность начнёт влиять на окно
+_LATENCY_WARMUP_SAMPLES = 10
+
+
+@dataclass(frozen=True)
+class LimiterSettings:
+    rps: float = LLM_LIMIT_RPS
+    burst: float = LLM_LIMIT_BURST
+    initial_concurrency: int = LLM_LIMIT_INITIAL_CONCURRENCY
+    min_concurrency: int = LLM_LIMIT_MIN_CONCURRENCY
+    max_concurrency: int = LLM_LIMIT_MAX_CONCURRENCY
+    decrease_factor: float = LLM_LIMIT_DECREASE_FACTOR
+    latency_tolerance: float = LLM_LIMIT_LATENCY_TOLERANCE
+    max_retries: int = LLM_LIMIT_MAX_RETRIES
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 30.0
+    max_retry_after_s: float = LLM_LIMIT_MAX_RETRY_AFTER_S
+    queue_timeout_s: float = LLM_LIMIT_QUEUE_TIMEOUT_S
+
+
+class LimiterQueueTimeout(httpx.PoolTimeout):
+    """Запрос не дождался места в окне параллельности за queue_timeout_s."""
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата; None, если заголовка нет или он некорректен."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class TokenBucket:
+    """Token bucket с резервированием: reserve() сразу занимает токен и говорит, сколько ждать."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class _Waiter:
+    __slots__ = ("granted", "_event", "_loop", "_future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.granted = False
+        self._loop = loop
+        if loop is None:
+            self._event = threading.Event()
+            self._future = None
+        else:
+            self._event = None
+            self._future = loop.create_future()
+
+    def notify(self) -> None:
+        if self._event is not None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class EndpointLimiter:
+    """Token bucket + AIMD-окно параллельности + пауза по Retry-After для одного endpoint-а."""
+
+    def __init__(self, name: str, settings: LimiterSettings = None, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.settings = settings or LimiterSettings()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(self.settings.rps, self.settings.burst or self.settings.rps, clock)
+        self._limit = float(max(self.settings.min_concurrency,
+                                min(self.settings.initial_concurrency, self.settings.max_concurrency)))
+        self._in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._latency_short: Optional[float] = None
+        self._latency_base: Optional[float] = None
+        self._latency_samples = 0
+        self._admitted_times: Deque[float] = deque()
+        self.admitted_total = 0
+        self.throttled_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.queue_timeouts_total = 0
+        self.decreases_total = 0
+
+    # ── Окно параллельности ──
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _grant_waiters_locked(self) -> None:
+        while self._waiters and self._in_flight < int(self._limit):
+            waiter = self._waiters.popleft()
+            self._in_flight += 1
+            waiter.granted = True
+            waiter.notify()
+
+    def _try_enter_locked(self) -> bool:
+        if not self._waiters and self._in_flight < int(self._limit):
+            self._in_flight += 1
+            return True
+        return False
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """Снимает ожидающего из очереди; True, если слот ему уже успели выдать."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            return False
+
+    def _return_slot(self) -> None:
+        """Возвращает слот без учёта в метриках и окне (запрос так и не был отправлен)."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._grant_waiters_locked()
+
+    def _on_admitted(self) -> None:
+        now = self._clock()
+        with self._lock:
+            self.admitted_total += 1
+            self._admitted_times.append(now)
+            self._trim_rate_window_locked(now)
+
+    def _trim_rate_window_locked(self, now: float) -> None:
+        while self._admitted_times and self._admitted_times[0] < now - RATE_WINDOW_S:
+            self._admitted_times.popleft()
+
+    def _pause_remaining(self) -> float:
+        return max(0.0, self._paused_until - self._clock())
+
+    def _timeout_error(self) -> LimiterQueueTimeout:
+        with self._lock:
+            self.queue_timeouts_total += 1
+        return LimiterQueueTimeout(
+            f"{self.name}: нет места в окне параллельности за {self.settings.queue_timeout_s:.0f} с"
+        )
+
+    def acquire(self) -> None:
+        """Блокирующий вход: пауза Retry-After → слот в окне → токен bucket-а."""
+        deadline = self._clock() + self.settings.queue_timeout_s
+        pause = self._pause_remaining()
+        if pause:
+            time.sleep(pause)
+        with self._lock:
+            entered = self._try_enter_locked()
+            if not entered:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+        if not entered and not waiter._event.wait(max(0.0, deadline - self._clock())):
+            if not self._withdraw(waiter):
+                raise self._timeout_error()
+        delay = self._bucket.reserve()
+        if delay:
+            time.sleep(delay)
+        self._on_admitted()
+
+    async def acquire_async(self) -> None:
+        """То же, что acquire, без блокировки event loop."""
+        deadline = self._clock() + self.settings.queue_timeout_s
+        pause = self._pause_remaining()
+        if pause:
+            await asyncio.sleep(pause)
+        with self._lock:
+            entered = self._try_enter_locked()
+            if not entered:
+                waiter = _Waiter(asyncio.get_running_loop())
+                self._waiters.append(waiter)
+        if not entered:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter._future), max(0.0, deadline - self._clock()))
+            except asyncio.TimeoutError:
+                if not self._withdraw(waiter):
+                    raise self._timeout_error()
+            except asyncio.CancelledError:
+                if self._withdraw(waiter):
+                    self._return_slot()
+                raise
+        try:
+            delay = self._bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self._return_slot()
+            raise
+        self._on_admitted()
+
+    def release(self, status_code: Optional[int], latency_s: float, overloaded: bool = False) -> None:
+        """
+        Освобождает слот и подстраивает окно.
+
+        Args:
+            status_code: HTTP-код ответа (None — ответа нет)
+            latency_s: Время от отправки запроса до ответа
+            overloaded: Признак перегрузки без кода (таймаут соединения/чтения)
+        """
+        now = self._clock()
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if overloaded or status_code in OVERLOAD_STATUS_CODES:
+                if status_code in OVERLOAD_STATUS_CODES:
+                    self.throttled_total += 1
+                self._decrease_locked(now)
+            elif status_code is None or status_code >= 500:
+                self.errors_total += 1
+            else:
+                self._observe_latency_locked(latency_s, now)
+            self._grant_waiters_locked()
+        _notify_outcome(self.name, status_code)
+
+    def cancel(self) -> None:
+        """Освобождает слот отменённой попытки: без подстройки окна и без исхода для подписчиков."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._grant_waiters_locked()
+
+    def _decrease_locked(self, now: float) -> None:
+        # Не чаще раза за «время ответа»: пачка 429 от одного окна — одно событие перегрузки
+        cooldown = max(self._latency_short or 0.0, 1.0)
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        limit = max(float(self.settings.min_concurrency), self._limit * self.settings.decrease_factor)
+        if limit < self._limit:
+            self._limit = limit
+            self.decreases_total += 1
+            logger.info(f"[limiter] {self.name}: окно уменьшено до {self.limit}")
+
+    def _observe_latency_locked(self, latency_s: float, now: float) -> None:
+        if self._latency_short is None:
+            self._latency_short = self._latency_base = latency_s
+        else:
+            self._latency_short += _LATENCY_SHORT_ALPHA * (latency_s - self._latency_short)
+            self._latency_base += _LATENCY_BASE_ALPHA * (latency_s - self._latency_base)
+        self._latency_samples += 1
+
+        if (self._latency_samples >= _LATENCY_WARMUP_SAMPLES
+                and self._latency_short > self._latency_base * self.settings.latency_tolerance):
+            self._decrease_locked(now)
+            return
+        # Additive increase: +1 за окно ответов, и только если окно действительно упиралось в предел
+        if self._in_flight + 1 >= int(self._limit):
+            self._limit = min(float(self.settings.max_concurrency), self._limit + 1.0 / self._limit)
+
+    # ── Backoff ──
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Задержка перед повтором (429/503, 5xx, ошибка соединения). Retry-After ставит на паузу весь
+        endpoint (следующие acquire ждут её окончания), иначе — экспоненциальный
+        backoff с джиттером только для этого запроса.
+
+        Returns:
+            Сколько ждать вызывающему перед повторной попыткой
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            delay = min(delay, self.settings.max_retry_after_s)
+            with self._lock:
+                self._paused_until = max(self._paused_until, self._clock() + delay)
+                self.retries_total += 1
+            return 0.0
+        with self._lock:
+            self.retries_total += 1
+        ceiling = min(self.settings.backoff_max_s, self.settings.backoff_base_s * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    # ── Метрики ──
+
+    def snapshot(self) -> Dict[str, object]:
+        now = self._clock()
+        with self._lock:
+            self._trim_rate_window_locked(now)
+            return {
+                "endpoint": self.name,
+                "concurrency_limit": self.limit,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "admitted_total": self.admitted_total,
+                "admitted_rate": round(len(self._admitted_times) / RATE_WINDOW_S, 3),
+                "throttled_total": self.throttled_total,
+                "retries_total": self.retries_total,
+                "errors_total": self.errors_total,
+                "queue_timeouts_total": self.queue_timeouts_total,
+                "decreases_total": self.decreases_total,
+                "latency_ewma_s": round(self._latency_short, 3) if self._latency_short is not None else None,
+                "latency_baseline_s": round(self._latency_base, 3) if self._latency_base is not None else None,
+                "paused_for_s": round(max(0.0, self._paused_until - now), 3),
+                "rps_limit": self.settings.rps or None,
+            }
+
+
+# ──────────────────── Транспорт httpx ────────────────────
+
+def _prepare_retry(
+    limiter: EndpointLimiter,
+    on_retry: Optional[Callable[[], None]],
+    attempt: int,
+    reason: str,
+    retry_after: Optional[str] = None,
+) -> float:
+    """Задержка перед повтором попытки ``attempt`` + лог и счётчик повторов телеметрии."""
+    delay = limiter.backoff(attempt, retry_after)
+    logger.warning(f"[limiter] {limiter.name}: {reason}, повтор {attempt + 1}")
+    if on_retry is not None:
+        on_retry()
+    return delay
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """Синхронный транспорт: каждая попытка проходит через EndpointLimiter."""
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        limiter: EndpointLimiter,
+        on_retry: Optional[Callable[[], None]] = None,
+    ):
+        self._transport = transport
+        self._limiter = limiter
+        self._on_retry = on_retry
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self._transport.handle_request(request)
+            except _CANCELLED:
+                self._limiter.cancel()
+                raise
+            except httpx.TransportError as e:
+                self._limiter.release(
+                    None, time.monotonic() - started, overloaded=isinstance(e, httpx.TimeoutException)
+                )
+                if attempt >= self._limiter.settings.max_retries:
+                    raise
+                delay = _prepare_retry(self._limiter, self._on_retry, attempt, type(e).__name__)
+            except BaseException:
+                self._limiter.release(None, time.monotonic() - started)
+                raise
+            else:
+                self._limiter.release(response.status_code, time.monotonic() - started)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self._limiter.settings.max_retries:
+                    return response
+                response.close()
+                delay = _prepare_retry(
+                    self._limiter, self._on_retry, attempt,
+                    f"HTTP {response.status_code}", response.headers.get("retry-after"),
+                )
+            attempt += 1
+            if delay:
+                time.sleep(delay)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Асинхронный транспорт: каждая попытка проходит через EndpointLimiter."""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        limiter: EndpointLimiter,
+        on_retry: Optional[Callable[[], None]] = None,
+    ):
+        self._transport = transport
+        self._limiter = limiter
+        self._on_retry = on_retry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            await self._limiter.acquire_async()
+            started = time.monotonic()
+            try:
+                response = await self._transport.handle_async_request(request)
+            except _CANCELLED:
+                self._limiter.cancel()
+                raise
+            except httpx.TransportError as e:
+                self._limiter.release(
+                    None, time.monotonic() - started, overloaded=isinstance(e, httpx.TimeoutException)
+                )
+                if attempt >= self._limiter.settings.max_retries:
+                    raise
+                delay = _prepare_retry(self._limiter, self._on_retry, attempt, type(e).__name__)
+            except BaseException:
+                self._limiter.release(None, time.monotonic() - started)
+                raise
+            else:
+                self._limiter.release(response.status_code, time.monotonic() - started)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self._limiter.settings.max_retries:
+                    return response
+                await response.aclose()
+                delay = _prepare_retry(
+                    self._limiter, self._on_retry, attempt,
+                    f"HTTP {response.status_code}", response.headers.get("retry-after"),
+                )
+            attempt += 1
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# ──────────────────── Исходы запросов ────────────────────
+
+# Подписчики на исход каждой попытки: (endpoint, status_code | None).
+# Через них circuit breaker реестра моделей видит живые ошибки, а не только probe.
+_outcome_listeners: List[Callable[[str, Optional[int]], None]] = []
+
+
+def add_outcome_listener(listener: Callable[[str, Optional[int]], None]) -> None:
+    if listener not in _outcome_listeners:
+        _outcome_listeners.append(listener)
+
+
+def _notify_outcome(endpoint: str, status_code: Optional[int]) -> None:
+    for listener in list(_outcome_listeners):
+        try:
+            listener(endpoint, status_code)
+        except Exception as e:
+            logger.warning(f"[limiter] outcome listener error: {e}")
+
+
+# ──────────────────── Реестр лимитеров ────────────────────
+
+_limiters: Dict[str, EndpointLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_endpoint_limiter(base_url: str) -> EndpointLimiter:
+    """Лимитер endpoint-а: один на base_url (ёмкость — свойство backend-а, а не ключа)."""
+    key = (base_url or "").rstrip("/")
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = EndpointLimiter(key)
+            _limiters[key] = limiter
+        return limiter
+
+
+def configure_endpoint_limiter(base_url: str, **overrides) -> EndpointLimiter:
+    """
+    Переопределяет настройки лимитера endpoint-а (например, из extra модели
+    в MODEL_ENDPOINTS: max_concurrency, rate_limit_rps). Текущее окно
+    и счётчики сохраняются.
+    """
+    limiter = get_endpoint_limiter(base_url)
+    settings = replace(limiter.settings, **overrides)
+    if settings != limiter.settings:
+        with limiter._lock:
+            limiter.settings = settings
+            limiter._bucket = TokenBucket(settings.rps, settings.burst or settings.rps, limiter._clock)
+            limiter._limit = max(float(settings.min_concurrency), min(limiter._limit, float(settings.max_concurrency)))
+            limiter._grant_waiters_locked()
+    return limiter
+
+
+def limiter_snapshots() -> list:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.snapshot() for limiter in limiters]
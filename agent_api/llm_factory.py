@@ -5,13 +5,34 @@
   - "openai"   — ChatOpenAI (vLLM, llama.cpp, OpenAI-compatible)
   - "gigachat" — GigaChat через langchain-gigachat (OAuth автообновление)
   - "yandex"   — YandexGPT через ChatOpenAI + совместимый endpoint Yandex AI
+
+HTTP-соединения общие для всех цепочек (генерация, оценки, валидация,
+refine, gate): один Client / AsyncClient на (base_url, api_key) с
+настраиваемым пулом, keep-alive и HTTP/2 (LLM_HTTP_* в config.py).
+Для GigaChat общим становится SDK-клиент — вместе с его пулом и OAuth-токеном.
+
+Транспорт общих клиентов проходит через адаптивный лимитер endpoint-а
+(endpoint_limiter.py, LLM_LIMIT_* в config.py). Для модели лимиты можно
+переопределить в extra: {"max_concurrency": 4, "rate_limit_rps": 2}.
+
+Несколько вариантов ответа на один промпт — sample_completions(): у
+OpenAI-совместимых серверов одним запросом с n= (vLLM считает prefill один раз).
+
+Guided decoding: с response_schema (Pydantic-модель ответа цепочки) сервер
+генерирует только JSON по её схеме — LLM_GUIDED_DECODING в config.py или
+extra модели {"guided_decoding": "json_schema" | "guided_json" | "off"}.
 """
 
 import logging
-from typing import Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type
 
+import openai
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableBinding
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
 
 from config import (
     LLM_MODEL_NAME,
@@ -23,13 +44,148 @@ from config import (
     YANDEX_CLOUD_API_KEY,
     YANDEX_CLOUD_FOLDER,
     YANDEX_CLOUD_MODEL,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_EXPIRY,
+    LLM_HTTP2,
+    LLM_LIMIT_ENABLED,
+    LLM_GUIDED_DECODING,
+)
+from llm_http import httpx
+from agent.telemetry import arecord_http_request, record_http_request, record_retry
+from endpoint_limiter import (
+    AsyncLimitedTransport,
+    LimitedTransport,
+    configure_endpoint_limiter,
+    get_endpoint_limiter,
 )
+from metrics import AsyncMetricsTransport, MetricsTransport
 
 logger = logging.getLogger(__name__)
 
 YANDEX_BASE_URL = "https://ai.api.cloud.yandex.net/v1"
 
 
+# ──────────────────── Общие HTTP-клиенты ────────────────────
+
+_http_clients: Dict[Tuple[str, str], httpx.Client] = {}
+_async_http_clients: Dict[Tuple[str, str], httpx.AsyncClient] = {}
+_gigachat_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _http2_enabled() -> bool:
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("LLM_HTTP2 включён, но пакет h2 не установлен (pip install 'httpx[http2]') — используется HTTP/1.1")
+        return False
+    return True
+
+
+def get_http_client(base_url: str, api_key: str = "") -> httpx.Client:
+    """Общий синхронный httpx-клиент для (base_url, api_key)."""
+    key = (base_url or "", api_key or "")
+    with _clients_lock:
+        client = _http_clients.get(key)
+        if client is None or client.is_closed:
+            # Метрики — ближе к сети: время попытки без ожидания слота в лимитере
+            transport = MetricsTransport(httpx.HTTPTransport(limits=_http_limits(), http2=_http2_enabled()), base_url)
+            if LLM_LIMIT_ENABLED:
+                transport = LimitedTransport(transport, get_endpoint_limiter(base_url), on_retry=record_retry)
+            # DefaultHttpxClient сохраняет умолчания openai SDK (редиректы, таймауты);
+            # хук и on_retry считают повторы SDK и лимитера в телеметрии прогона
+            client = openai.DefaultHttpxClient(transport=transport, event_hooks={"request": [record_http_request]})
+            _http_clients[key] = client
+        return client
+
+
+def get_async_http_client(base_url: str, api_key: str = "") -> httpx.AsyncClient:
+    """Общий асинхронный httpx-клиент для (base_url, api_key)."""
+    key = (base_url or "", api_key or "")
+    with _clients_lock:
+        client = _async_http_clients.get(key)
+        if client is None or client.is_closed:
+            transport = AsyncMetricsTransport(
+                httpx.AsyncHTTPTransport(limits=_http_limits(), http2=_http2_enabled()), base_url
+            )
+            if LLM_LIMIT_ENABLED:
+                transport = AsyncLimitedTransport(transport, get_endpoint_limiter(base_url), on_retry=record_retry)
+            client = openai.DefaultAsyncHttpxClient(transport=transport, event_hooks={"request": [arecord_http_request]})
+            _async_http_clients[key] = client
+        return client
+
+
+def _sdk_max_retries() -> int:
+    """
+    Повторы openai SDK. С лимитером повторяет только он (429/503 с паузой по
+    Retry-After, 500/502/504, таймауты и ошибки соединения — до
+    LLM_LIMIT_MAX_RETRIES раз): повторы SDK поверх повторов транспорта
+    умножили бы число запросов на один вызов.
+    """
+    return 0 if LLM_LIMIT_ENABLED else 3
+
+
+def _shared_gigachat_client(init_kwargs: Dict[str, Any]):
+    """SDK-клиент GigaChat на набор параметров подключения: пул и OAuth-токен общие."""
+    import gigachat
+
+    key = tuple(sorted(init_kwargs.items()))
+    with _clients_lock:
+        client = _gigachat_clients.get(key)
+        if client is None:
+            client = gigachat.GigaChat(**init_kwargs)
+            _gigachat_clients[key] = client
+        return client
+
+
+async def aclose_http_clients() -> None:
+    """Закрывает общие клиенты (при остановке сервиса)."""
+    with _clients_lock:
+        clients = list(_http_clients.values())
+        async_clients = list(_async_http_clients.values())
+        gigachat_clients = list(_gigachat_clients.values())
+        _http_clients.clear()
+        _async_http_clients.clear()
+        _gigachat_clients.clear()
+    for client in clients:
+        client.close()
+    for client in async_clients:
+        await client.aclose()
+    for client in gigachat_clients:
+        await client.aclose()
+        client.close()
+
+
+def _pooled_gigachat_class():
+    """GigaChat, который берёт SDK-клиент из общего реестра вместо создания своего."""
+    global _PooledGigaChat
+    if _PooledGigaChat is None:
+        from functools import cached_property
+        from langchain_gigachat import GigaChat
+
+        class PooledGigaChat(GigaChat):
+            @cached_property
+            def _client(self):
+                return _shared_gigachat_client(self._get_client_init_kwargs())
+
+        _PooledGigaChat = PooledGigaChat
+    return _PooledGigaChat
+
+
+_PooledGigaChat = None
+
+
 def create_chat_llm(
     provider: str = "openai",
     model_name: Optional[str] = None,
@@ -38,6 +194,7 @@ def create_chat_llm(
     temperature: float = 0.0,
     max_tokens: int = 1024,
     timeout: int = 90,
+    response_schema: Optional[Type[BaseModel]] = None,
     **extra,
 ) -> BaseChatModel:
     """
@@ -49,9 +206,14 @@ def create_chat_llm(
         base_url: базовый URL endpoint-а
         api_key: ключ / credentials
         temperature, max_tokens, timeout: параметры генерации
-        **extra: доп. параметры провайдера (scope, folder_id, …)
+        response_schema: Pydantic-модель ответа — включает guided decoding,
+            если он разрешён для провайдера и модели (тогда возвращается
+            llm.bind(...) с JSON-схемой в теле запроса)
+        **extra: доп. параметры провайдера (scope, folder_id, guided_decoding, …)
     """
     provider = (provider or "openai").lower().strip()
+    _configure_limiter_from_extra(provider, base_url, extra)
+    guided = guided_decoding_mode(provider, extra.get("guided_decoding"))
 
     if provider == "gigachat":
         return _create_gigachat(
@@ -64,7 +226,7 @@ def create_chat_llm(
         )
 
     if provider == "yandex":
-        return _create_yandex(
+        llm = _create_yandex(
             model_name=model_name,
             base_url=base_url,
             api_key=api_key,
@@ -73,15 +235,107 @@ def create_chat_llm(
             timeout=timeout,
             folder_id=extra.get("folder_id"),
         )
+    else:
+        llm = _create_openai_compatible(
+            model_name=model_name,
+            base_url=base_url,
+            api_key=api_key,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+        )
+    return _with_guided_decoding(llm, guided, response_schema)
 
-    return _create_openai_compatible(
-        model_name=model_name,
-        base_url=base_url,
-        api_key=api_key,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        timeout=timeout,
-    )
+
+# ──────────────────── Guided decoding ────────────────────
+
+GUIDED_DECODING_MODES = ("off", "json_schema", "guided_json")
+
+_GUIDED_DECODING_ALIASES = {"": "off", "false": "off", "no": "off", "0": "off", "none": "off", "true": "json_schema"}
+
+
+def guided_decoding_mode(provider: str, override: Any = None) -> str:
+    """
+    Режим guided decoding для провайдера: extra модели или LLM_GUIDED_DECODING.
+    У GigaChat SDK нет JSON-схемы ответа — для него всегда "off".
+    """
+    mode = LLM_GUIDED_DECODING if override is None else override
+    mode = str(mode).lower().strip()
+    mode = _GUIDED_DECODING_ALIASES.get(mode, mode)
+    if mode not in GUIDED_DECODING_MODES:
+        logger.warning(f"Unknown guided decoding mode '{mode}', using 'off'")
+        return "off"
+    if provider == "gigachat":
+        return "off"
+    return mode
+
+
+def _with_guided_decoding(llm: ChatOpenAI, mode: str, schema: Optional[Type[BaseModel]]):
+    if schema is None or mode == "off":
+        return llm
+    json_schema = schema.model_json_schema()
+    # extra_body в bind целиком заменяет extra_body модели (chat_template_kwargs) —
+    # сохраняем его; langchain-openai переносит его из model_kwargs в поле extra_body
+    extra_body = dict(getattr(llm, "extra_body", None) or llm.model_kwargs.get("extra_body") or {})
+    if mode == "guided_json":
+        extra_body["guided_json"] = json_schema
+    else:
+        # Через extra_body, а не параметром response_format: иначе langchain-openai
+        # переключается на beta parse API со своей строгой валидацией ответа
+        extra_body["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": schema.__name__, "schema": json_schema},
+        }
+    return llm.bind(extra_body=extra_body)
+
+
+# ──────────────────── Несколько вариантов ответа ────────────────────
+
+def sample_completions(
+    llm: Runnable,
+    messages: List[BaseMessage],
+    n: int,
+    provider: str = "openai",
+) -> List[BaseMessage]:
+    """
+    n вариантов ответа модели на одни и те же сообщения.
+
+    Для OpenAI-совместимого endpoint-а — один запрос с n=: сервер делит
+    prefill промпта между сэмплами. У YandexGPT и GigaChat параметра n нет —
+    n отдельных запросов (llm.batch), общий префикс там может взять кэш сервера.
+    """
+    if n <= 1:
+        return [llm.invoke(messages)]
+    model, kwargs = llm, {}
+    if isinstance(llm, RunnableBinding):
+        # guided decoding: параметры запроса привязаны через bind(extra_body=...)
+        model, kwargs = llm.bound, dict(llm.kwargs)
+    if (provider or "openai").lower().strip() == "openai" and isinstance(model, ChatOpenAI):
+        result = model.generate([messages], n=n, **kwargs)
+        return [generation.message for generation in result.generations[0]]
+    return llm.batch([messages] * n)
+
+
+# Ключи extra модели → поля LimiterSettings
+_LIMITER_EXTRA_KEYS = {
+    "max_concurrency": "max_concurrency",
+    "initial_concurrency": "initial_concurrency",
+    "rate_limit_rps": "rps",
+    "rate_limit_burst": "burst",
+}
+
+
+# Ключи extra модели из реестра, которые передаются в create_chat_llm
+MODEL_EXTRA_KEYS = ("scope", "folder_id", "guided_decoding", *_LIMITER_EXTRA_KEYS)
+
+
+def _configure_limiter_from_extra(provider: str, base_url: Optional[str], extra: Dict[str, Any]) -> None:
+    overrides = {field: extra[key] for key, field in _LIMITER_EXTRA_KEYS.items() if extra.get(key) is not None}
+    if not overrides or provider == "gigachat":
+        return
+    if provider == "yandex":
+        base_url = base_url or YANDEX_BASE_URL
+    configure_endpoint_limiter(base_url or LLM_URL_MODEL, **overrides)
 
 
 def _create_openai_compatible(
@@ -92,12 +346,16 @@ def _create_openai_compatible(
     max_tokens: int,
     timeout: int,
 ) -> ChatOpenAI:
+    base_url = base_url or LLM_URL_MODEL
+    api_key = api_key or LLM_API_KEY
     return ChatOpenAI(
         model=model_name or LLM_MODEL_NAME,
-        openai_api_base=base_url or LLM_URL_MODEL,
-        openai_api_key=api_key or LLM_API_KEY,
+        openai_api_base=base_url,
+        openai_api_key=api_key,
+        http_client=get_http_client(base_url, api_key),
+        http_async_client=get_async_http_client(base_url, api_key),
         temperature=temperature,
-        max_retries=3,
+        max_retries=_sdk_max_retries(),
         streaming=False,
         timeout=timeout,
         max_tokens=max_tokens,
@@ -115,8 +373,6 @@ def _create_gigachat(
     timeout: int,
     scope: Optional[str] = None,
 ) -> BaseChatModel:
-    from langchain_gigachat import GigaChat
-
     credentials = api_key or GIGACHAT_CREDENTIALS
     if not credentials:
         raise ValueError(
@@ -124,7 +380,7 @@ def _create_gigachat(
             "Set GIGACHAT_CREDENTIALS env or pass api_key."
         )
 
-    return GigaChat(
+    return _pooled_gigachat_class()(
         credentials=credentials,
         scope=scope or GIGACHAT_SCOPE,
         model=model_name or GIGACHAT_MODEL,
@@ -132,6 +388,7 @@ def _create_gigachat(
         max_tokens=max_tokens,
         timeout=timeout,
         verify_ssl_certs=False,
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
     )
 
 
@@ -155,13 +412,16 @@ def _create_yandex(
         )
 
     full_model = model if model.startswith("gpt://") else f"gpt://{folder}/{model}"
+    base_url = base_url or YANDEX_BASE_URL
 
     return ChatOpenAI(
         model=full_model,
-        openai_api_base=base_url or YANDEX_BASE_URL,
+        openai_api_base=base_url,
         openai_api_key=key,
+        http_client=get_http_client(base_url, key),
+        http_async_client=get_async_http_client(base_url, key),
         temperature=temperature,
-        max_retries=3,
+        max_retries=_sdk_max_retries(),
         streaming=False,
         timeout=timeout,
         max_tokens=max_tokens,
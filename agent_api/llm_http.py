@@ -0,0 +1,33 @@
+"""
+HTTP-библиотека, на которой построен установленный openai SDK.
+
+openai<3 работает на httpx, openai>=3 — на httpx2 (API тот же, классы разные).
+Клиенты и транспорты, которые уходят в ChatOpenAI (пул llm_factory, лимитер
+endpoint_limiter, метрики metrics), должны быть из той же библиотеки, что и
+DefaultHttpxClient: транспорт httpx внутри клиента httpx2 падает на первом
+же запросе.
+
+Библиотека берётся из зависимостей пакета openai, без импорта самого SDK:
+metrics импортируется при старте agent_api, а openai — только вместе с графом.
+
+    from llm_http import httpx
+"""
+
+import importlib
+import importlib.metadata
+import re
+
+
+def _openai_http_module() -> str:
+    try:
+        requirements = importlib.metadata.requires("openai") or []
+    except importlib.metadata.PackageNotFoundError:
+        return "httpx"
+    if any(re.match(r"httpx2\b", requirement) for requirement in requirements):
+        return "httpx2"
+    return "httpx"
+
+
+httpx = importlib.import_module(_openai_http_module())
+
+__all__ = ["httpx"]
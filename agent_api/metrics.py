@@ -0,0 +1,232 @@
+"""
+Метрики Prometheus agent_api (GET /metrics).
+
+  gena_http_request_duration_seconds{method,route,status}  запросы к API
+  gena_pipelines_in_flight                                 прогоны графа в работе
+  gena_pipeline_duration_seconds{pipeline_mode,outcome}    прогон ahandle_prompt целиком
+  gena_stage_duration_seconds{stage}                       этапы из телеметрии (agent/telemetry.py)
+  gena_llm_tokens_total{stage,kind}                        токены верхних этапов: prompt | completion
+  gena_llm_request_duration_seconds{endpoint,status}       попытка HTTP-запроса к LLM
+  gena_llm_requests_in_flight{endpoint}                    запросы к LLM в работе
+  gena_cache_hits / gena_cache_misses / gena_cache_size{cache}  lru_cache промптов, языка, критериев
+
+Кардинальность меток ограничена: route — шаблон маршрута FastAPI, а не путь;
+status — класс кода (2xx, 4xx, 5xx, 429 отдельно, error без ответа);
+endpoint — base_url из конфигурации моделей; stage — имена узлов графа.
+
+uvicorn с --workers N: при заданном PROMETHEUS_MULTIPROC_DIR значения пишутся
+в файлы каталога и /metrics суммирует все процессы (каталог очищается при
+старте контейнера, см. Dockerfile).
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from llm_http import httpx
+
+# Ответ agent_api — минуты генерации и валидации, а не миллисекунды
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
+HTTP_REQUEST_DURATION = Histogram(
+    "gena_http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route", "status"], buckets=_SLOW_BUCKETS,
+)
+PIPELINES_IN_FLIGHT = Gauge(
+    "gena_pipelines_in_flight", "Прогоны графа в работе", multiprocess_mode="livesum",
+)
+PIPELINE_DURATION = Histogram(
+    "gena_pipeline_duration_seconds", "Время прогона графа по чанку",
+    ["pipeline_mode", "outcome"], buckets=_SLOW_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "gena_stage_duration_seconds", "Время этапа прогона (узел графа, блок валидатора)",
+    ["stage"], buckets=_SLOW_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "gena_llm_tokens_total", "Токены LLM по этапам", ["stage", "kind"],
+)
+LLM_REQUEST_DURATION = Histogram(
+    "gena_llm_request_duration_seconds", "Время попытки HTTP-запроса к LLM",
+    ["endpoint", "status"], buckets=_LLM_BUCKETS,
+)
+LLM_REQUESTS_IN_FLIGHT = Gauge(
+    "gena_llm_requests_in_flight", "Запросы к LLM в работе", ["endpoint"], multiprocess_mode="livesum",
+)
+CACHE_HITS = Gauge("gena_cache_hits", "Попадания lru_cache", ["cache"], multiprocess_mode="livesum")
+CACHE_MISSES = Gauge("gena_cache_misses", "Промахи lru_cache", ["cache"], multiprocess_mode="livesum")
+CACHE_SIZE = Gauge("gena_cache_size", "Записей в lru_cache", ["cache"], multiprocess_mode="livesum")
+
+# Кэши → (модуль, функция). Модули не импортируются: ещё не загруженный
+# модуль (граф строится в lifespan) просто пропускается.
+_CACHES: Dict[str, Tuple[str, str]] = {
+    "instruction_prompt": ("agent.nodes.generate_question.generate_question", "_instruction_prompt"),
+    "system_prompt": ("agent.nodes.generate_question.generate_question", "build_system_prompt"),
+    "multi_type_system_prompt": ("agent.nodes.generate_question.generate_question", "build_multi_type_system_prompt"),
+    "language": ("agent.nodes.generate_question.language", "detect_language"),
+    "criterion_template": ("agent.nodes.llm_validator.validator", "_load_criterion_template"),
+    "single_call_schema": ("agent.nodes.llm_validator.validator", "_single_call_schema"),
+    "single_call_prompt": ("agent.nodes.llm_validator.validator", "_build_single_call_system_prompt"),
+    "criteria_columns": ("agent.nodes.llm_validator.scoring", "criteria_columns"),
+}
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """Код ответа → метка: 2xx, 4xx, 5xx; 429 — отдельно (перегрузка); error — ответа нет."""
+    if status_code is None:
+        return "error"
+    if status_code == 429:
+        return "429"
+    return f"{status_code // 100}xx"
+
+
+# ──────────────────── HTTP API ────────────────────
+
+class MetricsMiddleware:
+    """ASGI-middleware: время запроса до конца ответа (и для StreamingResponse)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [None]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Шаблон маршрута (/tasks/{task_id}), а не путь: метка не растёт с числом id
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if route != "/metrics":
+                method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+                HTTP_REQUEST_DURATION.labels(method, route, status_class(status[0] or 500)).observe(
+                    time.perf_counter() - started
+                )
+
+
+def render() -> Tuple[bytes, str]:
+    """Тело и Content-Type ответа /metrics."""
+    refresh_caches()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# ──────────────────── Прогоны графа ────────────────────
+
+@contextmanager
+def track_pipeline(pipeline_mode: str) -> Iterator[None]:
+    """Прогон графа: в работе, время и исход (ok | error)."""
+    started = time.perf_counter()
+    outcome = "error"
+    PIPELINES_IN_FLIGHT.inc()
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        PIPELINES_IN_FLIGHT.dec()
+        PIPELINE_DURATION.labels(pipeline_mode, outcome).observe(time.perf_counter() - started)
+        refresh_caches()
+
+
+def observe_telemetry(summary: Dict[str, Any]) -> None:
+    """Этапы из telemetry.summary(): время всех этапов, токены — только верхних
+    (вложенные уже учтены в родителе)."""
+    for record in summary.get("stages") or ():
+        stage = record["stage"]
+        STAGE_DURATION.labels(stage).observe(record.get("wall_s") or 0.0)
+        if record.get("parent") is not None:
+            continue
+        if record.get("prompt_tokens"):
+            LLM_TOKENS.labels(stage, "prompt").inc(record["prompt_tokens"])
+        if record.get("completion_tokens"):
+            LLM_TOKENS.labels(stage, "completion").inc(record["completion_tokens"])
+
+
+def refresh_caches() -> None:
+    """cache_info() зарегистрированных lru_cache → gauges процесса."""
+    for name, (module_name, attr) in _CACHES.items():
+        func = getattr(sys.modules.get(module_name), attr, None)
+        cache_info = getattr(func, "cache_info", None)
+        if cache_info is None:
+            continue
+        info = cache_info()
+        CACHE_HITS.labels(name).set(info.hits)
+        CACHE_MISSES.labels(name).set(info.misses)
+        CACHE_SIZE.labels(name).set(info.currsize)
+
+
+# ──────────────────── Запросы к LLM ────────────────────
+
+class _LLMRequestTimer:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        LLM_REQUESTS_IN_FLIGHT.labels(self.endpoint).inc()
+        return self
+
+    def done(self, status_code: Optional[int]) -> None:
+        LLM_REQUEST_DURATION.labels(self.endpoint, status_class(status_code)).observe(
+            time.perf_counter() - self.started
+        )
+
+    def __exit__(self, exc_type, exc, tb):
+        LLM_REQUESTS_IN_FLIGHT.labels(self.endpoint).dec()
+        if exc_type is not None:
+            self.done(None)
+        return False
+
+
+class MetricsTransport(httpx.BaseTransport):
+    """Синхронный транспорт: время каждой попытки запроса к endpoint-у (без ожидания в лимитере)."""
+
+    def __init__(self, transport: httpx.BaseTransport, endpoint: str):
+        self._transport = transport
+        self._endpoint = (endpoint or "").rstrip("/")
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with _LLMRequestTimer(self._endpoint) as timer:
+            response = self._transport.handle_request(request)
+            timer.done(response.status_code)
+            return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncMetricsTransport(httpx.AsyncBaseTransport):
+    """Асинхронный транспорт: время каждой попытки запроса к endpoint-у."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, endpoint: str):
+        self._transport = transport
+        self._endpoint = (endpoint or "").rstrip("/")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with _LLMRequestTimer(self._endpoint) as timer:
+            response = await self._transport.handle_async_request(request)
+            timer.done(response.status_code)
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -3,15 +3,27 @@
 Загружает дефолтную модель из env и автоматически обнаруживает
 модели через ArgoCD + Traefik probe.
 Если ArgoCD недоступен — работает по KNOWN_SERVICES.
+
+Probe асинхронный: все сервисы опрашиваются одновременно через общий
+httpx.AsyncClient, цикл запускается из lifespan FastAPI (start_probing),
+а не при импорте модуля.
+
+Группы моделей: логический id (group в MODEL_ENDPOINTS или MODEL_GROUPS)
+указывает на несколько реплик. Запрос уходит на реплику с наименьшим
+числом незавершённых запросов, а circuit breaker исключает реплики,
+которые падают на probe или на живых запросах (исходы HTTP-попыток
+приходят из endpoint_limiter).
 """
 
+import asyncio
 import os
 import json
 import time
 import logging
+import random
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Optional, Dict, Tuple
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Optional, Dict
 from dataclasses import dataclass, field
 
 import httpx
@@ -21,13 +33,26 @@ from config import (
     GIGACHAT_CREDENTIALS, GIGACHAT_SCOPE, GIGACHAT_MODEL,
     YANDEX_CLOUD_API_KEY, YANDEX_CLOUD_FOLDER, YANDEX_CLOUD_MODEL,
 )
+from endpoint_limiter import OVERLOAD_STATUS_CODES, add_outcome_listener
 
 logger = logging.getLogger(__name__)
 
 TRAEFIK_HOST = os.getenv("TRAEFIK_HOST", "")
 TRAEFIK_PORT = int(os.getenv("TRAEFIK_PORT", "27373"))
-PROBE_INTERVAL = 60
+# Probe: интервал растёт от PROBE_INTERVAL до PROBE_MAX_INTERVAL, пока ничего
+# не меняется; короткий connect-таймаут отсекает мёртвые pod-ы за секунды
+PROBE_INTERVAL = float(os.getenv("MODEL_PROBE_INTERVAL", "60"))
+PROBE_MAX_INTERVAL = float(os.getenv("MODEL_PROBE_MAX_INTERVAL", "300"))
+PROBE_JITTER = 0.2
 PROBE_TIMEOUT = 45.0
+PROBE_CONNECT_TIMEOUT = float(os.getenv("MODEL_PROBE_CONNECT_TIMEOUT", "3"))
+PROBE_MAX_CONNECTIONS = 50
+
+# Circuit breaker реплик: столько подряд ошибок открывает цепь на cooldown,
+# после него пропускается один пробный запрос (half-open)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("MODEL_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_S = float(os.getenv("MODEL_BREAKER_COOLDOWN_S", "30"))
+BREAKER_MAX_COOLDOWN_S = float(os.getenv("MODEL_BREAKER_MAX_COOLDOWN_S", "300"))
 
 ARGOCD_URL = os.getenv("ARGOCD_URL", "")
 ARGOCD_USERNAME = os.getenv("ARGOCD_USERNAME", "")
@@ -51,6 +76,96 @@ class LLMModelConfig:
     api_key: str = "none"
     provider: str = "openai"
     extra: dict = field(default_factory=dict)
+    group: Optional[str] = None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker одной реплики: closed → open (после BREAKER_FAILURE_THRESHOLD
+    ошибок подряд или неудачного probe) → half_open (по истечении cooldown,
+    пропускает один пробный запрос) → closed при успехе или снова open с удвоенным
+    cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        cooldown_s: float = BREAKER_COOLDOWN_S,
+        max_cooldown_s: float = BREAKER_MAX_COOLDOWN_S,
+        clock=time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._cooldown_s = cooldown_s
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self._cooldown_s:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allows_request(self) -> bool:
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._trial_in_flight)
+
+    def on_dispatch(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = True
+
+    def on_lease_end(self) -> None:
+        # Пробный запрос завершился без HTTP-исхода — даём шанс следующему
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self._state != self.CLOSED:
+            self._state = self.CLOSED
+            self._cooldown_s = self.base_cooldown_s
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Учитывает ошибку; True, если цепь только что открылась."""
+        self._failures += 1
+        state = self.state
+        if state == self.HALF_OPEN:
+            self._open(min(self.max_cooldown_s, self._cooldown_s * 2))
+            return True
+        if state == self.CLOSED and self._failures >= self.failure_threshold:
+            self._open(self._cooldown_s)
+            return True
+        return False
+
+    def force_open(self) -> None:
+        if self.state == self.CLOSED:
+            self._open(self._cooldown_s)
+
+    def _open(self, cooldown_s: float) -> None:
+        self._state = self.OPEN
+        self._cooldown_s = cooldown_s
+        self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        state = self.state
+        return {
+            "circuit": state,
+            "consecutive_failures": self._failures,
+            "retry_in_s": (
+                round(max(0.0, self._opened_at + self._cooldown_s - self._clock()), 1)
+                if state == self.OPEN else 0.0
+            ),
+        }
 
 
 class ModelsRegistry:
@@ -58,10 +173,16 @@ class ModelsRegistry:
         self._static_models: Dict[str, LLMModelConfig] = {}
         self._probed_models: Dict[str, LLMModelConfig] = {}
         self._health: Dict[str, bool] = {}
+        self._groups: Dict[str, List[str]] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._outstanding: Dict[str, int] = {}
         self._last_probe_ts: float = 0.0
         self._lock = threading.Lock()
         self._load_from_env()
-        self._start_probe_poller()
+        self._probe_task: Optional[asyncio.Task] = None
+        self._probe_client: Optional[httpx.AsyncClient] = None
+        self._probe_interval: float = PROBE_INTERVAL
+        add_outcome_listener(self.record_outcome)
 
     def _load_from_env(self):
         endpoints_json = os.getenv("MODEL_ENDPOINTS", "")
@@ -75,6 +196,23 @@ class ModelsRegistry:
             except Exception as e:
                 logger.error(f"Failed to parse MODEL_ENDPOINTS: {e}")
 
+        for model in self._static_models.values():
+            if model.group:
+                self._groups.setdefault(model.group, []).append(model.id)
+
+        # MODEL_GROUPS='{"qwen3-1.7b": ["vllm-qwen3-1-7b-v2", "vllm-qwen3-1-7b-v3"]}' —
+        # группы из обнаруженных probe сервисов
+        groups_json = os.getenv("MODEL_GROUPS", "")
+        if groups_json:
+            try:
+                for group_id, members in json.loads(groups_json).items():
+                    group = self._groups.setdefault(group_id, [])
+                    group.extend(m for m in members if m not in group)
+            except Exception as e:
+                logger.error(f"Failed to parse MODEL_GROUPS: {e}")
+        for group_id, members in self._groups.items():
+            logger.info(f"Model group {group_id}: {members}")
+
         if GIGACHAT_CREDENTIALS:
             self._static_models["gigachat"] = LLMModelConfig(
                 id="gigachat",
@@ -107,9 +245,93 @@ class ModelsRegistry:
         return list(merged.values())
 
     def get_model(self, model_id: str) -> Optional[LLMModelConfig]:
+        """Модель по id; для группы — реплика, выбранная как для нового запроса."""
         with self._lock:
+            if model_id in self._groups:
+                return self._select_replica_locked(model_id)
             return self._static_models.get(model_id) or self._probed_models.get(model_id)
 
+    def list_groups(self) -> Dict[str, List[LLMModelConfig]]:
+        """Группы с известными (статическими или обнаруженными) репликами."""
+        with self._lock:
+            merged = {**self._static_models, **self._probed_models}
+            return {
+                group_id: [merged[m] for m in members if m in merged]
+                for group_id, members in self._groups.items()
+            }
+
+    @contextmanager
+    def lease(self, model_id: Optional[str]) -> Iterator[Optional[LLMModelConfig]]:
+        """
+        Занимает модель на время запроса: для группы выбирает реплику
+        (least outstanding среди реплик с закрытой цепью) и учитывает
+        запрос в её счётчике незавершённых.
+
+        Yields:
+            LLMModelConfig или None, если model_id не задан или неизвестен
+        """
+        with self._lock:
+            if not model_id:
+                model = None
+            elif model_id in self._groups:
+                model = self._select_replica_locked(model_id)
+            else:
+                model = self._static_models.get(model_id) or self._probed_models.get(model_id)
+            if model is not None:
+                self._outstanding[model.id] = self._outstanding.get(model.id, 0) + 1
+                self._breaker_locked(model.id).on_dispatch()
+        try:
+            yield model
+        finally:
+            if model is not None:
+                with self._lock:
+                    self._outstanding[model.id] = max(0, self._outstanding.get(model.id, 0) - 1)
+                    self._breaker_locked(model.id).on_lease_end()
+
+    def record_outcome(self, endpoint: str, status_code: Optional[int]) -> None:
+        """
+        Исход HTTP-попытки к endpoint-у: нет ответа или 5xx — ошибка для
+        circuit breaker всех моделей на этом base_url, остальное — успех.
+        429 и 503 — перегрузка, её разбирает лимитер, breaker их не считает.
+        """
+        if status_code in OVERLOAD_STATUS_CODES:
+            return
+        failed = status_code is None or status_code >= 500
+        with self._lock:
+            merged = {**self._static_models, **self._probed_models}
+            for model in merged.values():
+                if not model.base_url or model.base_url.rstrip("/") != endpoint:
+                    continue
+                breaker = self._breaker_locked(model.id)
+                if not failed:
+                    breaker.record_success()
+                elif breaker.record_failure():
+                    logger.warning(f"Circuit opened for {model.id} ({endpoint}): live errors")
+
+    def _breaker_locked(self, model_id: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model_id)
+        if breaker is None:
+            breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_S, BREAKER_MAX_COOLDOWN_S)
+            self._breakers[model_id] = breaker
+        return breaker
+
+    def _select_replica_locked(self, group_id: str) -> Optional[LLMModelConfig]:
+        merged = {**self._static_models, **self._probed_models}
+        replicas = [merged[m] for m in self._groups.get(group_id, []) if m in merged]
+        if not replicas:
+            logger.warning(f"Model group '{group_id}' has no known replicas")
+            return None
+        candidates = [
+            m for m in replicas
+            if self._health.get(m.id, True) and self._breaker_locked(m.id).allows_request()
+        ]
+        if not candidates:
+            # Все реплики исключены — лучше попытаться, чем отказать сразу
+            logger.warning(f"Model group '{group_id}': all replicas are unhealthy, routing anyway")
+            candidates = replicas
+        least = min(self._outstanding.get(m.id, 0) for m in candidates)
+        return random.choice([m for m in candidates if self._outstanding.get(m.id, 0) == least])
+
     def get_default(self) -> Optional[LLMModelConfig]:
         """Возвращает первую доступную модель как дефолтную."""
         models = self.list_models()
@@ -120,12 +342,27 @@ class ModelsRegistry:
         with self._lock:
             merged = {**self._static_models, **self._probed_models}
             health_copy = dict(self._health)
+            breakers = {mid: b.snapshot() for mid, b in self._breakers.items()}
+            outstanding = dict(self._outstanding)
+            groups = {g: list(members) for g, members in self._groups.items()}
         result = []
         for mid, model in merged.items():
+            breaker = breakers.get(mid, {"circuit": CircuitBreaker.CLOSED})
             result.append({
                 "id": model.id,
                 "name": model.name,
-                "available": health_copy.get(mid, True),
+                "available": health_copy.get(mid, True) and breaker["circuit"] != CircuitBreaker.OPEN,
+                "group": model.group or next((g for g, m in groups.items() if mid in m), None),
+                "circuit": breaker["circuit"],
+                "outstanding": outstanding.get(mid, 0),
+            })
+        for group_id, members in groups.items():
+            replicas = [r for r in result if r["id"] in members]
+            result.append({
+                "id": group_id,
+                "name": f"{group_id} ({len(replicas)} replicas)",
+                "available": any(r["available"] for r in replicas),
+                "outstanding": sum(r["outstanding"] for r in replicas),
             })
         for mid, available in health_copy.items():
             if mid not in merged and not available:
@@ -138,22 +375,58 @@ class ModelsRegistry:
 
     # ── Auto-discovery ──
 
-    def _start_probe_poller(self):
-        t = threading.Thread(target=self._probe_loop, daemon=True)
-        t.start()
-        logger.info(f"Model probe started, interval={PROBE_INTERVAL}s")
+    async def start_probing(self) -> None:
+        """Запускает фоновый probe в текущем event loop (из lifespan FastAPI)."""
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        self._probe_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(PROBE_TIMEOUT, connect=PROBE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=PROBE_MAX_CONNECTIONS),
+        )
+        self._probe_task = asyncio.create_task(self._probe_loop())
+        logger.info(f"Model probe started, interval={PROBE_INTERVAL}-{PROBE_MAX_INTERVAL}s")
 
-    def _probe_loop(self):
-        self._do_probe()
+    async def stop_probing(self) -> None:
+        task, self._probe_task = self._probe_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        client, self._probe_client = self._probe_client, None
+        if client is not None:
+            await client.aclose()
+
+    async def _probe_loop(self):
         while True:
-            time.sleep(PROBE_INTERVAL)
             try:
-                self._do_probe()
+                changed = await self._do_probe()
             except Exception as e:
                 logger.error(f"Probe error: {e}")
-
-    def _do_probe(self):
-        services = self._discover_services_from_argocd()
+                changed = True
+            await asyncio.sleep(self._next_probe_delay(changed))
+
+    def _next_probe_delay(self, changed: bool) -> float:
+        """
+        Адаптивный интервал: после изменений — снова PROBE_INTERVAL, пока
+        всё стабильно — растёт до PROBE_MAX_INTERVAL. Джиттер разводит
+        probe нескольких реплик agent_api во времени.
+        """
+        if changed:
+            self._probe_interval = PROBE_INTERVAL
+        else:
+            self._probe_interval = min(PROBE_MAX_INTERVAL, self._probe_interval * 1.5)
+        return self._probe_interval * random.uniform(1 - PROBE_JITTER, 1 + PROBE_JITTER)
+
+    async def _do_probe(self) -> bool:
+        """
+        Один проход probe по всем сервисам параллельно.
+
+        Returns:
+            True, если набор моделей или их доступность изменились
+        """
+        services = await self._discover_services_from_argocd()
         if not services:
             services = {prefix: engine for prefix, engine in KNOWN_SERVICES}
             logger.debug("ArgoCD unavailable, using KNOWN_SERVICES fallback")
@@ -161,34 +434,26 @@ class ModelsRegistry:
         discovered: Dict[str, LLMModelConfig] = {}
         health: Dict[str, bool] = {}
 
-        def probe_one(svc_prefix: str, engine: str) -> Tuple[str, str, str, Optional[str]]:
+        async def probe_one(svc_prefix: str, engine: str) -> None:
             base_url = f"http://{TRAEFIK_HOST}:{TRAEFIK_PORT}/{svc_prefix}/v1"
-            model_name = self._probe_model(base_url)
-            return svc_prefix, engine, base_url, model_name
+            try:
+                model_name = await self._probe_model(base_url)
+            except Exception as e:
+                logger.warning(f"Probe error for {svc_prefix}: {e}")
+                model_name = None
+            if model_name:
+                discovered[svc_prefix] = LLMModelConfig(
+                    id=svc_prefix,
+                    name=f"{model_name} ({engine})",
+                    base_url=base_url,
+                    model_name=model_name,
+                    api_key="none",
+                )
+                health[svc_prefix] = True
+            else:
+                health[svc_prefix] = False
 
-        with ThreadPoolExecutor(max_workers=len(services)) as pool:
-            futures = {
-                pool.submit(probe_one, prefix, engine): prefix
-                for prefix, engine in services.items()
-            }
-            for future in as_completed(futures):
-                try:
-                    svc_prefix, engine, base_url, model_name = future.result()
-                    if model_name:
-                        discovered[svc_prefix] = LLMModelConfig(
-                            id=svc_prefix,
-                            name=f"{model_name} ({engine})",
-                            base_url=base_url,
-                            model_name=model_name,
-                            api_key="none",
-                        )
-                        health[svc_prefix] = True
-                    else:
-                        health[svc_prefix] = False
-                except Exception as e:
-                    logger.warning(f"Probe future error: {e}")
-                    prefix = futures[future]
-                    health[prefix] = False
+        await asyncio.gather(*(probe_one(prefix, engine) for prefix, engine in services.items()))
 
         for mid in self._static_models:
             if mid not in health:
@@ -197,19 +462,34 @@ class ModelsRegistry:
         with self._lock:
             added = set(discovered) - set(self._probed_models)
             removed = set(self._probed_models) - set(discovered)
+            changed = bool(added or removed) or health != self._health
             self._probed_models = discovered
             self._health = health
             self._last_probe_ts = time.time()
+            for mid, available in health.items():
+                if not available:
+                    self._breaker_locked(mid).force_open()
 
         if added:
             logger.info(f"Probe discovered models: {added}")
         if removed:
             logger.info(f"Probe lost models: {removed}")
-
-    def _probe_model(self, base_url: str) -> Optional[str]:
+        return changed
+
+    @asynccontextmanager
+    async def _client(self, **kwargs) -> AsyncIterator[httpx.AsyncClient]:
+        """Общий probe-клиент; до start_probing (скрипты, тесты) — временный."""
+        if self._probe_client is not None and not kwargs:
+            yield self._probe_client
+            return
+        kwargs.setdefault("timeout", httpx.Timeout(PROBE_TIMEOUT, connect=PROBE_CONNECT_TIMEOUT))
+        async with httpx.AsyncClient(**kwargs) as client:
+            yield client
+
+    async def _probe_model(self, base_url: str) -> Optional[str]:
         try:
-            with httpx.Client(timeout=PROBE_TIMEOUT) as client:
-                resp = client.get(f"{base_url}/models")
+            async with self._client() as client:
+                resp = await client.get(f"{base_url}/models")
             if resp.status_code != 200:
                 return None
             data = resp.json()
@@ -223,16 +503,16 @@ class ModelsRegistry:
 
     # ── ArgoCD discovery ──
 
-    def _discover_services_from_argocd(self) -> Dict[str, str]:
+    async def _discover_services_from_argocd(self) -> Dict[str, str]:
         if not ARGOCD_URL or not ARGOCD_PASSWORD:
             return {}
         try:
-            with httpx.Client(timeout=10.0, verify=False) as client:
-                token = self._argocd_auth(client)
+            async with self._client(timeout=10.0, verify=False) as client:
+                token = await self._argocd_auth(client)
                 if not token:
                     return {}
 
-                resp = client.get(
+                resp = await client.get(
                     f"{ARGOCD_URL.rstrip('/')}/api/v1/applications",
                     headers={"Authorization": f"Bearer {token}"},
                 )
@@ -263,8 +543,8 @@ class ModelsRegistry:
             logger.debug(f"ArgoCD unavailable: {e}")
             return {}
 
-    def _argocd_auth(self, client: httpx.Client) -> Optional[str]:
-        resp = client.post(
+    async def _argocd_auth(self, client: httpx.AsyncClient) -> Optional[str]:
+        resp = await client.post(
             f"{ARGOCD_URL.rstrip('/')}/api/v1/session",
             json={"username": ARGOCD_USERNAME, "password": ARGOCD_PASSWORD},
         )
@@ -275,49 +555,58 @@ class ModelsRegistry:
     # ── Discover (async, on-demand) ──
 
     async def discover_models(self) -> List[dict]:
-        all_models = self.list_models()
-        results = []
-        async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
-            for model in all_models:
-                if model.provider in ("gigachat", "yandex"):
-                    results.append({
-                        "id": model.id, "name": model.name,
-                        "base_url": model.base_url, "model_name": model.model_name,
-                        "provider": model.provider,
-                        "available": True, "served_models": [model.model_name],
-                    })
-                    continue
+        """Опрашивает все модели параллельно: задержка — как у самого медленного endpoint-а."""
+        async with self._client() as client:
+            return list(await asyncio.gather(*(
+                self._discover_one(client, model) for model in self.list_models()
+            )))
+
+    async def _discover_one(self, client: httpx.AsyncClient, model: LLMModelConfig) -> dict:
+        result = {
+            "id": model.id, "name": model.name,
+            "base_url": model.base_url, "model_name": model.model_name,
+            "provider": model.provider,
+        }
+        if model.provider in ("gigachat", "yandex"):
+            return {**result, "available": True, "served_models": [model.model_name]}
+
+        base = model.base_url.rstrip("/")
+        url = f"{base}/models" if base.endswith("/v1") else f"{base}/v1/models"
+        try:
+            headers = {}
+            if model.api_key and model.api_key != "none":
+                headers["Authorization"] = f"Bearer {model.api_key}"
+            resp = await client.get(url, headers=headers)
+            available = resp.status_code == 200
+            served_models = []
+            if available:
+                data = resp.json()
+                if "data" in data:
+                    served_models = [m.get("id", "") for m in data["data"]]
+                elif "models" in data:
+                    served_models = [m.get("name", "") for m in data["models"]]
+            return {**result, "available": available, "served_models": served_models}
+        except Exception as e:
+            logger.warning(f"Cannot reach {model.id}: {e}")
+            return {**result, "available": False, "served_models": []}
+
+
+_registry: Optional[ModelsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelsRegistry:
+    """Реестр создаётся при первом обращении (в lifespan agent_api), а не при импорте."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelsRegistry()
+    return _registry
+
 
-                base = model.base_url.rstrip("/")
-                url = f"{base}/models" if base.endswith("/v1") else f"{base}/v1/models"
-                try:
-                    headers = {}
-                    if model.api_key and model.api_key != "none":
-                        headers["Authorization"] = f"Bearer {model.api_key}"
-                    resp = await client.get(url, headers=headers)
-                    available = resp.status_code == 200
-                    served_models = []
-                    if available:
-                        data = resp.json()
-                        if "data" in data:
-                            served_models = [m.get("id", "") for m in data["data"]]
-                        elif "models" in data:
-                            served_models = [m.get("name", "") for m in data["models"]]
-                    results.append({
-                        "id": model.id, "name": model.name,
-                        "base_url": model.base_url, "model_name": model.model_name,
-                        "provider": model.provider,
-                        "available": available, "served_models": served_models,
-                    })
-                except Exception as e:
-                    logger.warning(f"Cannot reach {model.id}: {e}")
-                    results.append({
-                        "id": model.id, "name": model.name,
-                        "base_url": model.base_url, "model_name": model.model_name,
-                        "provider": model.provider,
-                        "available": False, "served_models": [],
-                    })
-        return results
-
-
-registry = ModelsRegistry()
+def __getattr__(name: str):
+    # Совместимость с ``from models_registry import registry``
+    if name == "registry":
+        return get_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
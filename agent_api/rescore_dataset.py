@@ -0,0 +1,255 @@
+"""
+Переоценка сохранённого датасета текущим валидатором.
+
+По умолчанию без LLM: итоговые баллы и passed пересчитываются из
+validation_details по текущим WEIGHTS / MULTIPLIER_INDICES / THRESHOLDS —
+матрицей NumPy по всем вопросам типа (agent/nodes/llm_validator/scoring.py).
+  --rules        — перекрыть сохранённые оценки детерминированными правилами (rules.py)
+  --blocks a,b   — заново оценить эти блоки LLM-валидатором (не больше
+                   --concurrency запросов одновременно); остальные блоки —
+                   из сохранённых оценок
+
+Вопросы без разборчивых validation_details (генерация без валидации,
+отклонённые правилами, старый формат критериев) не меняются.
+
+Результат — новая версия датасета (PUT /datasets/{id}) с отчётом в metadata.rescored;
+--dry-run — только отчёт.
+
+Запуск:
+    cd agent_api && python rescore_dataset.py <dataset_id>
+    python rescore_dataset.py <dataset_id> --blocks c4_logic,c5_phrase --model-id qwen-7b --concurrency 8
+    python rescore_dataset.py --input dataset.json --output rescored.json --rules
+"""
+
+import argparse
+import ast
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_DATASET_API_URL = os.getenv("DATASET_API_URL", "http://localhost:8789")
+
+
+def parse_stored(raw: Any) -> Optional[Dict[str, Any]]:
+    """validation_details / validation_justifications из датасета (str(dict)) → dict."""
+    if isinstance(raw, dict):
+        return raw
+    if not isinstance(raw, str) or not raw.strip():
+        return None
+    try:
+        parsed = ast.literal_eval(raw.strip())
+    except (ValueError, SyntaxError):
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def question_for_validator(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Вопрос датасета → вход валидатора (task, option_*, outputs)."""
+    options = row.get("options") or {}
+    if isinstance(options, str):
+        options = parse_stored(options) or {}
+    question = {"task": row.get("task", "")}
+    question.update({k: v for k, v in options.items() if v not in (None, "", "None")})
+    question["outputs"] = row.get("correct_answer", "")
+    return question
+
+
+def _passed(value: Any) -> bool:
+    return str(value).strip().lower() == "true"
+
+
+def rerun_blocks(
+    validator,
+    rows: Sequence[Dict[str, Any]],
+    indices: Sequence[int],
+    keys: Sequence[str],
+    concurrency: int,
+) -> Dict[int, Dict[str, Any]]:
+    """Блоки keys заново для вопросов indices: {индекс: {блок: BlockResult}}.
+    Запрос на (вопрос, блок), одновременно — не больше concurrency."""
+    from agent.nodes.llm_validator.validator import BLOCK_ORDER
+
+    jobs = [(i, key) for i in indices for key in keys if key in BLOCK_ORDER[rows[i]["question_type"]]]
+
+    def run(job: Tuple[int, str]):
+        i, key = job
+        row = rows[i]
+        return i, validator.evaluate_blocks(
+            row["question_type"], row.get("source_chunk") or "", question_for_validator(row), [key],
+        )
+
+    results: Dict[int, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for i, blocks in pool.map(run, jobs):
+            results.setdefault(i, {}).update(blocks)
+    return results
+
+
+def rescore_questions(
+    rows: List[Dict[str, Any]],
+    thresholds: Optional[Dict[str, float]] = None,
+    rules: bool = False,
+    blocks: Sequence[str] = (),
+    validator=None,
+    concurrency: int = 4,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Пересчитанные вопросы и отчёт по типам. rows не изменяются."""
+    from agent.nodes.llm_validator.rules import check_questions
+    from agent.nodes.llm_validator.scoring import apply_rule_batch, build_score_matrix, criteria_columns, score_matrix
+    from agent.nodes.llm_validator.validator import MAX_POINTS, THRESHOLDS
+
+    thresholds = thresholds or THRESHOLDS
+    out = [dict(row) for row in rows]
+    details = [parse_stored(row.get("validation_details")) for row in rows]
+    justifications = [parse_stored(row.get("validation_justifications")) or {} for row in rows]
+
+    by_type: Dict[str, List[int]] = {}
+    for i, row in enumerate(rows):
+        if row.get("question_type") in MAX_POINTS:
+            by_type.setdefault(row["question_type"], []).append(i)
+
+    reruns: Dict[int, Dict[str, Any]] = {}
+    if blocks:
+        rescorable = [i for idx in by_type.values() for i in idx if details[i] and any(details[i].values())]
+        reruns = rerun_blocks(validator, rows, rescorable, blocks, concurrency)
+
+    summary: Dict[str, Any] = {}
+    for qtype, idx in by_type.items():
+        by_blocks, justs = [], []
+        for i in idx:
+            by_block = dict(details[i] or {})
+            block_justs = dict(justifications[i])
+            for key, block in reruns.get(i, {}).items():
+                by_block[key] = block.scores
+                block_justs[key] = block.justifications
+            by_blocks.append(by_block)
+            justs.append(block_justs)
+
+        matrix = build_score_matrix(qtype, by_blocks)
+        if rules:
+            rule_batch = check_questions(qtype, [question_for_validator(rows[i]) for i in idx])
+            changed = apply_rule_batch(matrix, rule_batch)
+            columns = criteria_columns(qtype)
+            # Обоснование изменённой оценки — причина из правила (для 1 — пустое)
+            for r, j in zip(*changed.nonzero()):
+                key, index = columns[j]
+                reasons = {(v.block, v.index): v.reason for v in rule_batch.violations[r]}
+                block_justs = list(justs[r].get(key) or [])
+                block_justs += [""] * (len(by_blocks[r][key]) - len(block_justs))
+                block_justs[index] = reasons.get((key, index), "")
+                justs[r][key] = block_justs
+        total, passed = score_matrix(matrix, thresholds)
+
+        before = [_passed(rows[i].get("validation_passed")) for i in idx]
+        stats = {"questions": len(idx), "rescored": int(matrix.valid.sum()), "passed_before": 0, "passed_after": 0,
+                 "changed": 0}
+        for r, i in enumerate(idx):
+            if not matrix.valid[r]:
+                continue
+            new_passed = bool(passed[r])
+            stats["passed_before"] += before[r]
+            stats["passed_after"] += new_passed
+            stats["changed"] += before[r] != new_passed
+            out[i].update({
+                "validation_passed": str(new_passed),
+                "validation_score": f"{float(total[r])}/{MAX_POINTS[qtype]}",
+                "validation_threshold": str(thresholds[qtype]),
+                "validation_details": str(matrix.by_block(r)),
+                "validation_justifications": str(justs[r]),
+            })
+        summary[qtype] = stats
+    return out, summary
+
+
+def _create_validator(model_id: Optional[str]):
+    from agent.nodes.llm_validator.validator import LLMValidator
+    from agent.runnables import _extract_provider_kwargs
+
+    if not model_id:
+        return LLMValidator()
+    from models_registry import registry
+    cfg = registry.get_model(model_id)
+    if cfg is None:
+        raise SystemExit(f"Модель '{model_id}' не найдена в реестре")
+    return LLMValidator(
+        model=cfg.model_name,
+        base_url=cfg.base_url,
+        api_key=cfg.api_key,
+        provider=cfg.provider,
+        **_extract_provider_kwargs({"extra": cfg.extra or {}}),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("dataset_id", nargs="?", help="ID датасета в dataset_api")
+    ap.add_argument("--api-url", default=DEFAULT_DATASET_API_URL, help="Адрес dataset_api")
+    ap.add_argument("--version", type=int, default=None, help="Версия датасета (по умолчанию текущая)")
+    ap.add_argument("--input", default=None, help="JSON датасета (ответ GET /datasets/{id} или список вопросов)")
+    ap.add_argument("--output", default=None, help="Куда сохранить результат вместо новой версии")
+    ap.add_argument("--rules", action="store_true", help="Перекрыть оценки детерминированными правилами")
+    ap.add_argument("--blocks", default="", help="Блоки для повторной LLM-оценки через запятую")
+    ap.add_argument("--model-id", default=None, help="Модель валидатора из реестра (по умолчанию — LLM_*)")
+    ap.add_argument("--concurrency", type=int, default=4, help="Одновременных запросов к LLM")
+    ap.add_argument("--dry-run", action="store_true", help="Только отчёт, без записи")
+    args = ap.parse_args(argv)
+    if not args.dataset_id and not args.input:
+        ap.error("нужен dataset_id или --input")
+    if args.input and not args.output and not args.dry_run:
+        ap.error("с --input нужен --output")
+
+    import httpx
+
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            dataset = json.load(f)
+        if isinstance(dataset, list):
+            dataset = {"questions": dataset}
+    else:
+        params = {"version": args.version} if args.version else None
+        response = httpx.get(f"{args.api_url}/datasets/{args.dataset_id}", params=params, timeout=60)
+        response.raise_for_status()
+        dataset = response.json()
+
+    blocks = [b.strip() for b in args.blocks.split(",") if b.strip()]
+    validator = _create_validator(args.model_id) if blocks else None
+    questions, summary = rescore_questions(
+        dataset["questions"], rules=args.rules, blocks=blocks, validator=validator, concurrency=args.concurrency,
+    )
+
+    for qtype, stats in summary.items():
+        print(
+            f"{qtype:<6} вопросов {stats['questions']}, пересчитано {stats['rescored']}, "
+            f"passed {stats['passed_before']} → {stats['passed_after']} (изменилось {stats['changed']})"
+        )
+    if args.dry_run:
+        return 0
+
+    report = {
+        "from_version": dataset.get("requested_version"),
+        "rules": args.rules,
+        "blocks": blocks,
+        "summary": summary,
+    }
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({**dataset, "questions": questions, "rescored": report}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    metadata = {**(dataset.get("metadata") or {}), "rescored": report}
+    response = httpx.put(
+        f"{args.api_url}/datasets/{args.dataset_id}",
+        json={"questions": questions, "metadata": metadata},
+        timeout=120,
+    )
+    response.raise_for_status()
+    print(f"Новая версия: {response.json().get('new_version')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""
+Бенчмарк чанкера: время по стадиям process_document_to_chunks, пиковый RSS
+и скорость выдачи чанков на синтетических документах в стилях Гарант,
+КонсультантПлюс и ГОСТ (DOCX и PDF).
+
+Каждый кейс запускается в отдельном процессе, чтобы пиковый RSS относился
+к одному документу, а не к накопленному состоянию предыдущих прогонов.
+
+Стадии:
+  convert    — документ → markdown (один раз)
+  select     — выбор обработчика (can_process всех обработчиков по очереди)
+  outline    — processor.process на готовом markdown (дерево + пост-обработка + очистка)
+  titles     — extract_document_type_titles
+  doc_type   — определение типа документа (по умолчанию только правила; --with-llm — identify_document_type с LLM)
+  chunks     — create_llm_chunks
+  serialize  — потоковая сериализация ответа /chunk/
+
+Пороги регрессий задаются в bench_thresholds.json (абсолютные лимиты на кейс)
+и/или сравнением с предыдущим отчётом (--baseline, допуск max_regression).
+
+Запуск:
+    cd chunker && python bench_chunker.py                       # все кейсы, размер medium
+    python bench_chunker.py --size small --styles garant gost --formats docx
+    python bench_chunker.py --report out/bench.json --baseline out/bench_prev.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+_HERE = Path(__file__).resolve().parent
+
+STYLES = ("garant", "consultant", "gost")
+FORMATS = ("docx", "pdf")
+STAGES = ("convert", "select", "outline", "titles", "doc_type", "chunks", "serialize")
+
+# Число статей (для ГОСТ — подразделов) в синтетическом документе
+SIZES = {"small": 20, "medium": 200, "large": 1000}
+
+DEFAULT_THRESHOLDS = _HERE / "bench_thresholds.json"
+REFERENCE_PDF_CANDIDATES = [
+    _HERE.parent / "tests" / "data" / "Конституция РФ index.pdf",
+    _HERE / "tests" / "data" / "Конституция РФ index.pdf",
+    Path("/app/tests/data/Конституция РФ index.pdf"),
+]
+PDF_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+_ITEM_TEXT = (
+    "лицо, совершившее деяние, подлежит ответственности в порядке, установленном "
+    "настоящим Кодексом и иными федеральными законами, с учетом обстоятельств дела"
+)
+
+
+# ---------- Синтетические документы ----------
+
+def _garant_lines(n_articles: int) -> List[Tuple[str, str]]:
+    lines = [("Уголовный кодекс Российской Федерации от 13 июня 1996 г. N 63-ФЗ", "bold")]
+    article = 0
+    chapter = 0
+    while article < n_articles:
+        chapter += 1
+        lines.append((f"Глава {chapter}. Положения главы номер {chapter}", "bold"))
+        for _ in range(10):
+            if article >= n_articles:
+                break
+            article += 1
+            lines.append((f"Статья {article}. Понятие и признаки по статье {article}", "bold"))
+            lines.append(("ГАРАНТ:", "para"))
+            lines.append((f"См. комментарии к статье {article} Уголовного кодекса РФ", "para"))
+            for item in range(1, 5):
+                lines.append((f"{item}. Согласно части {item} статьи {article} {_ITEM_TEXT}.", "para"))
+            lines.append(("Информация об изменениях:", "para"))
+            lines.append((
+                f"Федеральным законом от 8 декабря 2003 г. N 162-ФЗ в часть 2 статьи {article} внесены изменения",
+                "para",
+            ))
+    return lines
+
+
+def _consultant_lines(n_articles: int) -> List[Tuple[str, str]]:
+    lines = [
+        ("Документ предоставлен КонсультантПлюс", "para"),
+        ("Гражданский кодекс Российской Федерации", "bold"),
+    ]
+    article = 0
+    section = 0
+    while article < n_articles:
+        section += 1
+        lines.append((f"Раздел {section}. Общие положения раздела {section}", "bold"))
+        for chapter in range(1, 4):
+            lines.append((f"Глава {section}.{chapter}. Основные начала", "bold"))
+            for _ in range(5):
+                if article >= n_articles:
+                    break
+                article += 1
+                lines.append((f"Статья {article}. Правила статьи {article}", "bold"))
+                lines.append((f"1. Гражданское законодательство по статье {article} {_ITEM_TEXT}:", "para"))
+                for sub in range(1, 4):
+                    lines.append((f"{sub}) {_ITEM_TEXT} в случае {sub};", "para"))
+                lines.append((f"2. Иные положения статьи {article} применяются, если {_ITEM_TEXT}.", "para"))
+            if article >= n_articles:
+                break
+        lines.append(("www.consultant.ru", "para"))
+        lines.append((f"Страница {section} из {n_articles}", "para"))
+    return lines
+
+
+def _gost_lines(n_articles: int) -> List[Tuple[str, str]]:
+    lines = [
+        ("ГОСТ 34.602-2020", "bold"),
+        ("МЕЖГОСУДАРСТВЕННЫЙ СТАНДАРТ", "bold"),
+        ("ИНФОРМАЦИОННЫЕ ТЕХНОЛОГИИ", "para"),
+    ]
+    sub = 0
+    section = 0
+    while sub < n_articles:
+        section += 1
+        lines.append((f"{section}. ОБЩИЕ ПОЛОЖЕНИЯ РАЗДЕЛА", "para"))
+        for k in range(1, 11):
+            if sub >= n_articles:
+                break
+            sub += 1
+            lines.append((f"{section}.{k}. Требования подраздела {section}.{k} к системе", "para"))
+            lines.append((f"{section}.{k}.1. Система должна обеспечивать, чтобы {_ITEM_TEXT}.", "para"))
+            for item in range(1, 4):
+                lines.append((f"{item}) {_ITEM_TEXT} для пункта {item}", "para"))
+            lines.append((f"а) дополнительное требование к подразделу {section}.{k}", "para"))
+            lines.append((f"б) уточнение требования к подразделу {section}.{k}", "para"))
+    return lines
+
+
+_LINE_BUILDERS = {"garant": _garant_lines, "consultant": _consultant_lines, "gost": _gost_lines}
+
+
+def synthetic_lines(style: str, n_articles: int) -> List[Tuple[str, str]]:
+    """Строки документа заданного стиля: [(текст, 'bold' | 'para'), ...]"""
+    return _LINE_BUILDERS[style](n_articles)
+
+
+def write_docx(lines: List[Tuple[str, str]], path: Path) -> Path:
+    from docx import Document
+
+    doc = Document()
+    for text, kind in lines:
+        p = doc.add_paragraph()
+        run = p.add_run(text)
+        run.bold = kind == "bold"
+    doc.save(str(path))
+    return path
+
+
+def find_pdf_font() -> Optional[str]:
+    font = os.getenv("BENCH_PDF_FONT")
+    if font and Path(font).is_file():
+        return font
+    return next((f for f in PDF_FONT_CANDIDATES if Path(f).is_file()), None)
+
+
+def can_write_pdf() -> bool:
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        return False
+    return find_pdf_font() is not None
+
+
+def write_pdf(lines: List[Tuple[str, str]], path: Path) -> Path:
+    """PDF через reportlab (опционально) с TTF-шрифтом, поддерживающим кириллицу."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    pdfmetrics.registerFont(TTFont("BenchFont", find_pdf_font()))
+    para = ParagraphStyle("para", fontName="BenchFont", fontSize=10, leading=13, spaceAfter=6)
+    bold = ParagraphStyle("bold", parent=para, fontSize=12, leading=15)
+    story = [Paragraph(text, bold if kind == "bold" else para) for text, kind in lines]
+    SimpleDocTemplate(str(path), pagesize=A4).build(story)
+    return path
+
+
+def build_case_file(style: str, fmt: str, size: str, out_dir: Path) -> Optional[Path]:
+    """Создаёт синтетический документ; None, если формат здесь не сгенерировать."""
+    lines = synthetic_lines(style, SIZES[size])
+    path = out_dir / f"{style}_{size}.{fmt}"
+    if fmt == "docx":
+        return write_docx(lines, path)
+    if fmt == "pdf" and can_write_pdf():
+        return write_pdf(lines, path)
+    return None
+
+
+# ---------- Прогон одного кейса ----------
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: КБ, macOS: байты
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(path: str, with_llm: bool = False) -> Dict[str, Any]:
+    """Прогоняет документ через все стадии process_document_to_chunks с замером каждой."""
+    if str(_HERE) not in sys.path:
+        sys.path.insert(0, str(_HERE))
+    import logging
+    logging.disable(logging.INFO)
+
+    import main as M
+    from docx2json_outline import DocumentProcessorManager, UniversalProcessor
+
+    stages: Dict[str, float] = {}
+
+    def timed(stage, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        stages[stage] = time.perf_counter() - t0
+        return result
+
+    manager = DocumentProcessorManager()
+    md = timed("convert", UniversalProcessor().convert_to_markdown, path)
+    processor = timed("select", lambda: next(p for p in manager.processors if p.can_process(path)))
+    with patch.object(processor, "convert_to_markdown", return_value=md):
+        tree = timed("outline", processor.process, path)
+    titles = timed("titles", M.extract_document_type_titles, tree)
+    identify = M.identify_document_type if with_llm else M.classify_document_type_by_rules
+    document_type_info = timed("doc_type", identify, titles)
+    chunks = timed("chunks", lambda: M.create_llm_chunks(
+        tree, document_name=Path(path).stem, document_type_info=document_type_info
+    ))
+    response_bytes = timed("serialize", lambda: sum(len(part) for part in M.iter_chunk_response_json(
+        {"filename": Path(path).name}, lambda: iter(chunks)
+    )))
+
+    total = sum(stages.values())
+    return {
+        "processor": processor.__class__.__name__,
+        "file_bytes": os.path.getsize(path),
+        "markdown_chars": len(md),
+        "titles": len(titles),
+        "chunks": len(chunks),
+        "response_bytes": response_bytes,
+        "stages": {k: round(v, 4) for k, v in stages.items()},
+        "total_s": round(total, 4),
+        "chunks_per_s": round(len(chunks) / stages["chunks"], 1) if stages["chunks"] > 0 else None,
+        "end_to_end_chunks_per_s": round(len(chunks) / total, 1) if total > 0 else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _run_case_isolated(path: str, with_llm: bool) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run_case, (path, with_llm))
+
+
+# ---------- Пороги ----------
+
+def load_thresholds(path: Optional[Path]) -> Dict[str, Any]:
+    if path is None or not Path(path).is_file():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_thresholds(
+    cases: List[Dict[str, Any]],
+    thresholds: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """Возвращает список нарушений: абсолютные лимиты и регрессии относительно baseline."""
+    violations = []
+    defaults = thresholds.get("defaults", {})
+    limits = thresholds.get("cases", {})
+    max_regression = defaults.get("max_regression", 0.25)
+    # Стадии быстрее этого порога не сравниваем — там один шум
+    min_stage_s = defaults.get("min_stage_s", 0.05)
+    baseline_cases = {c["name"]: c for c in (baseline or {}).get("cases", [])}
+
+    for case in cases:
+        name = case["name"]
+        if "error" in case:
+            violations.append(f"{name}: ошибка прогона: {case['error']}")
+            continue
+        limit = {**defaults, **limits.get(name, {})}
+        if "max_total_s" in limit and case["total_s"] > limit["max_total_s"]:
+            violations.append(f"{name}: total_s {case['total_s']} > {limit['max_total_s']}")
+        if "max_peak_rss_mb" in limit and case["peak_rss_mb"] > limit["max_peak_rss_mb"]:
+            violations.append(f"{name}: peak_rss_mb {case['peak_rss_mb']} > {limit['max_peak_rss_mb']}")
+        if "min_chunks_per_s" in limit and (case["chunks_per_s"] or 0) < limit["min_chunks_per_s"]:
+            violations.append(f"{name}: chunks_per_s {case['chunks_per_s']} < {limit['min_chunks_per_s']}")
+        if "min_chunks" in limit and case["chunks"] < limit["min_chunks"]:
+            violations.append(f"{name}: chunks {case['chunks']} < {limit['min_chunks']}")
+        for stage, max_s in limit.get("max_stage_s", {}).items():
+            if case["stages"].get(stage, 0) > max_s:
+                violations.append(f"{name}: стадия {stage} {case['stages'][stage]} > {max_s}")
+
+        prev = baseline_cases.get(name)
+        if not prev or "error" in prev:
+            continue
+        for stage, value in case["stages"].items():
+            old = prev.get("stages", {}).get(stage)
+            if old is None or max(old, value) < min_stage_s:
+                continue
+            if value > old * (1 + max_regression):
+                violations.append(
+                    f"{name}: стадия {stage} {value}s vs baseline {old}s (+{(value / old - 1) * 100:.0f}%)"
+                )
+        if prev.get("peak_rss_mb") and case["peak_rss_mb"] > prev["peak_rss_mb"] * (1 + max_regression):
+            violations.append(f"{name}: peak_rss_mb {case['peak_rss_mb']} vs baseline {prev['peak_rss_mb']}")
+    return violations
+
+
+# ---------- CLI ----------
+
+def _reference_pdf() -> Optional[Path]:
+    return next((p for p in REFERENCE_PDF_CANDIDATES if p.is_file()), None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--styles", nargs="+", choices=STYLES, default=list(STYLES))
+    ap.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    ap.add_argument("--size", choices=sorted(SIZES), default="medium")
+    ap.add_argument("--documents", nargs="*", default=[], help="Дополнительные реальные документы")
+    ap.add_argument("--report", default=None, help="Куда сохранить JSON-отчёт")
+    ap.add_argument("--thresholds", default=str(DEFAULT_THRESHOLDS), help="JSON с порогами регрессий")
+    ap.add_argument("--baseline", default=None, help="Предыдущий отчёт для сравнения")
+    ap.add_argument("--with-llm", action="store_true", help="identify_document_type с LLM вместо одних правил")
+    ap.add_argument("--keep-files", action="store_true", help="Не удалять сгенерированные документы")
+    args = ap.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="gena_bench_"))
+    inputs: List[Tuple[str, Path]] = []
+    for style in args.styles:
+        for fmt in args.formats:
+            path = build_case_file(style, fmt, args.size, work_dir)
+            if path is not None:
+                inputs.append((f"{style}-{fmt}-{args.size}", path))
+            else:
+                print(f"[skip] {style}-{fmt}: нет reportlab или TTF-шрифта с кириллицей (BENCH_PDF_FONT)")
+    if "pdf" in args.formats and not can_write_pdf() and _reference_pdf():
+        inputs.append(("reference-pdf", _reference_pdf()))
+    inputs.extend((f"doc-{Path(d).stem}", Path(d)) for d in args.documents)
+
+    cases = []
+    for name, path in inputs:
+        print(f"[run] {name} ({path.stat().st_size // 1024} КБ)", flush=True)
+        try:
+            result = _run_case_isolated(str(path), args.with_llm)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        cases.append({"name": name, **result})
+        if "error" in result:
+            print(f"  [error] {result['error']}")
+        else:
+            stages = " ".join(f"{k}={v:.3f}" for k, v in result["stages"].items())
+            print(f"  {result['processor']}: {result['chunks']} чанков, total={result['total_s']:.3f}s, "
+                  f"{result['chunks_per_s']} чанков/с, RSS={result['peak_rss_mb']} МБ\n  {stages}")
+
+    baseline = load_thresholds(Path(args.baseline)) if args.baseline else None
+    violations = check_thresholds(cases, load_thresholds(Path(args.thresholds)), baseline)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "size": args.size,
+        "cases": cases,
+        "violations": violations,
+    }
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[ok] отчёт: {args.report}")
+
+    if not args.keep_files:
+        for _, path in inputs:
+            if path.parent == work_dir:
+                path.unlink(missing_ok=True)
+        work_dir.rmdir()
+
+    for v in violations:
+        print(f"[FAIL] {v}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
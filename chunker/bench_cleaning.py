@@ -0,0 +1,109 @@
+"""
+Микро-бенчмарк пост-обработки дерева в docx2json_outline.
+
+Сравнивает прежнюю схему очистки (чтение JSON с паттернами на каждый вызов,
+re.compile каждого паттерна на каждый узел, N проходов по тексту) с текущей
+(кэш паттернов, один проход общей альтернацией), а также классификаторы
+заголовков на всех title эталонного кодекса.
+
+Запуск:
+    cd chunker && python bench_cleaning.py [путь_к_документу] [-n 20]
+"""
+
+import argparse
+import copy
+import json
+import re
+import time
+from pathlib import Path
+
+import docx2json_outline as outline
+
+_HERE = Path(__file__).resolve().parent
+
+# Эталонный кодекс: тот же файл, что и в test_garant_bold_articles.py
+_CANDIDATE_PATHS = [
+    _HERE.parent / "tests" / "data" / "УК РФ part1.docx",
+    _HERE / "tests" / "data" / "УК РФ part1.docx",
+    Path("/app/tests/data/УК РФ part1.docx"),
+]
+
+
+def _legacy_clean_tree(node):
+    """Очистка в том виде, в котором она была до реестра паттернов."""
+    with open(_HERE / outline._DEFAULT_CLEANING_PATTERNS_FILE, "r", encoding="utf-8") as f:
+        patterns = json.load(f).get("patterns", [])
+    _legacy_clean_node(node, patterns)
+
+
+def _legacy_clean_node(node, patterns):
+    if node.get("content"):
+        text = node["content"]
+        for p in patterns:
+            text = re.compile(p["regex"]).sub("", text)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        node["content"] = text
+    for child in node.get("children", []):
+        _legacy_clean_node(child, patterns)
+
+
+def _walk(node):
+    yield node
+    for ch in node.get("children", []):
+        yield from _walk(ch)
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("document", nargs="?", help="DOCX/PDF документ (по умолчанию УК РФ part1.docx)")
+    ap.add_argument("-n", "--repeat", type=int, default=20, help="Число повторов (берётся лучшее время)")
+    args = ap.parse_args()
+
+    doc = Path(args.document) if args.document else next((p for p in _CANDIDATE_PATHS if p.is_file()), None)
+    if doc is None or not doc.is_file():
+        raise SystemExit(f"Документ не найден: {args.document or _CANDIDATE_PATHS}")
+
+    md = outline.UniversalProcessor().convert_to_markdown(str(doc))
+    tree = outline.parse_markdown_to_tree(md)
+    nodes = list(_walk(tree))
+    titles = [n.get("title", "") for n in nodes]
+    print(f"Документ: {doc.name}; узлов: {len(nodes)}; символов markdown: {len(md)}")
+
+    legacy_tree, new_tree = copy.deepcopy(tree), copy.deepcopy(tree)
+    _legacy_clean_tree(legacy_tree)
+    outline.clean_tree_with_patterns(new_tree)
+    assert legacy_tree == new_tree, "результат очистки разошёлся с прежней реализацией"
+
+    t_legacy = _timeit(lambda: _legacy_clean_tree(copy.deepcopy(tree)), args.repeat)
+    t_new = _timeit(lambda: outline.clean_tree_with_patterns(copy.deepcopy(tree)), args.repeat)
+    t_copy = _timeit(lambda: copy.deepcopy(tree), args.repeat)
+    t_legacy, t_new = max(t_legacy - t_copy, 1e-9), max(t_new - t_copy, 1e-9)
+    print(f"clean_tree_with_patterns: было {t_legacy * 1000:.2f} мс, стало {t_new * 1000:.2f} мс "
+          f"(x{t_legacy / t_new:.1f})")
+
+    def classify():
+        for t in titles:
+            outline._is_real_heading(t)
+            outline._is_article_heading(t)
+            outline._is_numbered_item(t)
+            outline._is_sub_item(t)
+            outline._is_main_item(t)
+
+    t_cls = _timeit(classify, args.repeat)
+    print(f"классификация заголовков: {t_cls * 1000:.2f} мс на {len(titles)} title")
+
+    t_parse = _timeit(lambda: outline.parse_markdown_to_tree(md), max(1, args.repeat // 4))
+    print(f"parse_markdown_to_tree: {t_parse * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple, Callable
 from pathlib import Path
-import json, re, statistics, logging
+import json, os, re, statistics, logging
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,84 @@ _link_pattern = re.compile(r'\[([^\]]+)\]\(([^\)]+)\)')
 # их нужно игнорировать в начале/конце строки.
 _MD_EMPH_LEAD = r'[*_]{1,3}'
 _MD_EMPH_TAIL = r'[*_]{1,3}'
+_md_emph_wrapped = re.compile(r'^(\*{1,3}|_{1,3})(.+?)\1(.*)$')
+
+# ---------- 0) Реестр предкомпилированных паттернов ----------
+# Регулярки горячих путей (пост-обработка дерева, процессоры Garant/Consultant/GOST)
+# компилируются один раз при импорте модуля, а не на каждый узел/строку документа.
+
+# Классификация заголовков/пунктов (вызываются на каждый узел дерева)
+_roman_numeral_re = re.compile(r'^[IVXLCDM]+$')
+_real_heading_re = re.compile(
+    r'^(?:'
+    r'(?:РАЗДЕЛ|ГЛАВА|ЧАСТЬ|СТАТЬЯ|ПАРАГРАФ)\s+'
+    r'|КОНСТИТУЦИЯ'
+    r'|ПРЕАМБУЛА'
+    r'|[IVXLCDM]+\.'  # Римские цифры с точкой: I., II., III., IV., V.
+    r')'
+)
+_numbered_item_re = re.compile(r'^(?:\d+[\.\)]\s+|\d+\.\d+[\.\)]\s+|[а-яА-Я]\.\s+)')
+_sub_item_re = re.compile(r'^(?:\d+\)\s+|[а-яА-Я]\)\s+)')
+_letter_sub_item_re = re.compile(r'^[а-яА-Я]\)\s+')
+_main_item_re = re.compile(r'^(?:\d+\.\s+|[а-яА-Я]\.\s+)')
+_article_heading_re = re.compile(
+    r'^(?:'
+    r'(?:СТАТЬЯ|ARTICLE|РАЗДЕЛ|SECTION|ГЛАВА|CHAPTER|ЧАСТЬ|PART|ПАРАГРАФ|PARAGRAPH)\s*\d+'
+    r'|[IVXLCDM]+\.'
+    r')'
+)
+
+# Извлечение пунктов/подпунктов из content
+_inline_sub_item_re = re.compile(r'(\d+\)\s+[^;]*?)(?=\s*;\s*\d+\)|;?\s*$)', re.MULTILINE | re.DOTALL)
+_inline_sub_item_strict_re = re.compile(r'(\d+\)\s+[^;]+?)(?=\s*;\s*\d+\)|;?\s*$)', re.MULTILINE | re.DOTALL)
+_next_sub_item_re = re.compile(r';\s*\d+\)')
+_letter_sub_item_start_re = re.compile(r'(?:^|\n\n|\n)([а-яА-Я]\)\s+)', re.MULTILINE)
+_numbered_start_re = re.compile(r'(?:^|\n\n|\n|;\s*|\.\s+)(\d+\))\s+', re.MULTILINE)
+_next_numbered_item_re = re.compile(r';\s*(\d+\))\s+')
+_paren_item_re = re.compile(r'\d+\)\s+')
+_paren_item_split_re = re.compile(r'(\d+\))\s+([^;]+?)(?=;\s*\d+\)|;?\s*$)')
+_article_in_content_re = re.compile(r'(?:^|\n\n|\n)(Статья\s+\d+)\s*(?:\n\n|\n|$)', re.MULTILINE | re.IGNORECASE)
+_numbered_para_re = re.compile(r'\n\n\d+[\.\)]\s+')
+_numbered_prefix_re = re.compile(r'^\d+[\.\)]\s+')
+_item_number_re = re.compile(r'^(\d+)[\.\)]')
+_semicolon_re = re.compile(r'\s*;\s*')
+_whitespace_re = re.compile(r'\s+')
+_extra_blank_lines_re = re.compile(r'\n{3,}')
+
+# GarantProcessor
+_garant_structure_re = re.compile(r'Глава\s+\d+|Статья\s+\d+')
+_garant_marker_line_re = re.compile(r'^\s*ГАРАНТ\s*:?\s*$', re.IGNORECASE)
+# "См. комментарии к статье X" (с возможными вариантами окончания)
+_garant_comment_line_re = re.compile(r'^\s*См\.\s+комментарии\s+к\s+статье\s+\d+.*?$', re.IGNORECASE)
+_garant_chapter_re = re.compile(r'^(Глава\s+\d+[\.:]?\s*.+?)$', re.IGNORECASE)
+_garant_article_re = re.compile(r'^(Статья\s+\d+[\.:]?\s*.+?)$', re.IGNORECASE)
+
+# ConsultantProcessor
+_consultant_structure_re = re.compile(r'Раздел\s+\d+|Подраздел\s+\d+|Глава\s+\d+|Статья\s+\d+', re.IGNORECASE)
+_consultant_section_re = re.compile(r'^(Раздел\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
+_consultant_subsection_re = re.compile(r'^(Подраздел\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
+# Глава с номером: "Глава 1", "Глава 2" и т.д. (может быть с точкой или без)
+_consultant_chapter_re = re.compile(r'^(Глава\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
+# Статья с номером: "Статья 1", "Статья 2" и т.д. (может быть с точкой или без)
+_consultant_article_re = re.compile(r'^(Статья\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
+# Римские цифры с точкой: I., II., III., IV., V.
+_consultant_roman_section_re = re.compile(r'^([IVXLCDM]+)\.\s+(.+)$', re.IGNORECASE)
+# Подзаголовки (начинаются с заглавной буквы, короткие, без точки в конце)
+_consultant_subtitle_re = re.compile(r'^([А-ЯЁ][А-Яа-яё\s]{5,80})$')
+
+# GOSTProcessor
+_gost_header_re = re.compile(r'^ГОСТ\s+\d+', re.MULTILINE)
+_gost_structure_re = re.compile(r'^\d+\.\s+[А-ЯЁ\s]+$', re.MULTILINE)
+# Разделы: "1. ОБЩИЕ ПОЛОЖЕНИЯ", "2. СОСТАВ И СОДЕРЖАНИЕ"
+_gost_section_re = re.compile(r'^(\d+)\.\s+([А-ЯЁ\s]+)$')
+# Подразделы: "2.4.1. Текст" и "1.1. Текст"
+_gost_subsection_l3_re = re.compile(r'^\d+\.\d+\.\d+\.')
+_gost_subsection_l2_re = re.compile(r'^\d+\.\d+\.')
+# Пункты: "1) текст", "2) текст"
+_gost_item_re = re.compile(r'^(\d+)\)\s+(.+)$')
+_gost_inline_items_re = re.compile(r'(\d+\)\s+[^;]+(?:;|$))')
+# Подпункты: "а) текст", "б) текст"
+_gost_subitem_re = re.compile(r'^([а-яА-Я])\)\s+(.+)$')
 
 def _strip_md_emphasis(s: str) -> str:
     """Снимает парные markdown-обёртки **/__/*/_ вокруг строки.
@@ -41,7 +120,7 @@ def _strip_md_emphasis(s: str) -> str:
             break
     # Иногда жирной приходит только начальная часть: "**Статья 14.** Заголовок"
     # — снимем ведущую парную обёртку, не требуя такой же на хвосте.
-    m = re.match(r'^(\*{1,3}|_{1,3})(.+?)\1(.*)$', s2)
+    m = _md_emph_wrapped.match(s2)
     if m:
         s2 = (m.group(2).strip() + ' ' + m.group(3).strip()).strip()
     return s2
@@ -117,8 +196,7 @@ def _is_roman_numeral(text: str) -> bool:
         return False
     text_upper = text.upper().strip()
     # Римские цифры: I, II, III, IV, V, VI, VII, VIII, IX, X, и т.д.
-    roman_pattern = r'^[IVXLCDM]+$'
-    return bool(re.match(roman_pattern, text_upper))
+    return bool(_roman_numeral_re.match(text_upper))
 
 def _is_real_heading(title: str) -> bool:
     """Определяет, является ли title настоящим заголовком (РАЗДЕЛ, ГЛАВА, СТАТЬЯ и т.д.)"""
@@ -126,19 +204,9 @@ def _is_real_heading(title: str) -> bool:
         return False
     
     title_upper = title.upper().strip()
-    # Паттерны для настоящих заголовков
-    heading_patterns = [
-        r'^(РАЗДЕЛ|ГЛАВА|ЧАСТЬ|СТАТЬЯ|ПАРАГРАФ)\s+',
-        r'^ГЛАВА\s+\d+',
-        r'^РАЗДЕЛ\s+(ПЕРВЫЙ|ВТОРОЙ|ТРЕТИЙ|ЧЕТВЕРТЫЙ|ПЯТЫЙ|ШЕСТОЙ|СЕДЬМОЙ|ВОСЬМОЙ|ДЕВЯТЫЙ|ДЕСЯТЫЙ)',
-        r'^КОНСТИТУЦИЯ',
-        r'^ПРЕАМБУЛА',
-        r'^[IVXLCDM]+\.',  # Римские цифры с точкой: I., II., III., IV., V.
-    ]
-    
-    for pattern in heading_patterns:
-        if re.match(pattern, title_upper):
-            return True
+    # РАЗДЕЛ/ГЛАВА/ЧАСТЬ/СТАТЬЯ/ПАРАГРАФ, КОНСТИТУЦИЯ, ПРЕАМБУЛА, "I.", "II." ...
+    if _real_heading_re.match(title_upper):
+        return True
     
     # Проверяем, начинается ли с римской цифры и точки
     parts = title_upper.split('.', 1)
@@ -281,18 +349,8 @@ def _is_numbered_item(title: str) -> bool:
     
     title_stripped = title.strip()
     # Паттерн: начинается с цифры(ов), затем точка, затем пробел и текст
-    # Примеры: "1. Текст", "1.1. Текст", "1) Текст"
-    numbered_patterns = [
-        r'^\d+[\.\)]\s+',  # "1. " или "1) "
-        r'^\d+\.\d+[\.\)]\s+',  # "1.1. " или "1.1) "
-        r'^[а-яА-Я]\.\s+',  # "а. " (буквенная нумерация)
-    ]
-    
-    for pattern in numbered_patterns:
-        if re.match(pattern, title_stripped):
-            return True
-    
-    return False
+    # Примеры: "1. Текст", "1.1. Текст", "1) Текст", "а. Текст"
+    return bool(_numbered_item_re.match(title_stripped))
 
 def _is_sub_item(title: str) -> bool:
     """Определяет, является ли title подпунктом (начинается с цифры и скобки, например "1)")"""
@@ -301,16 +359,7 @@ def _is_sub_item(title: str) -> bool:
     
     title_stripped = title.strip()
     # Подпункты обычно имеют формат "1)", "2)", "а)", "б)" и т.д.
-    sub_item_patterns = [
-        r'^\d+\)\s+',  # "1) "
-        r'^[а-яА-Я]\)\s+',  # "а) " (буквенная нумерация)
-    ]
-    
-    for pattern in sub_item_patterns:
-        if re.match(pattern, title_stripped):
-            return True
-    
-    return False
+    return bool(_sub_item_re.match(title_stripped))
 
 def _extract_sub_items_from_content(content: str) -> List[Dict[str,Any]]:
     """Извлекает подпункты вида "1)", "2)", "3)" из content, если они идут в одну строку через точку с запятой"""
@@ -323,9 +372,7 @@ def _extract_sub_items_from_content(content: str) -> List[Dict[str,Any]]:
     # Паттерн: цифра + скобка + пробел + текст до следующего подпункта или конца строки
     # Учитываем, что текст может содержать точки с запятой внутри (но не перед следующим подпунктом)
     # Более точный паттерн: ищем "цифра) текст" до следующего "цифра)" или конца строки
-    sub_item_pattern = re.compile(r'(\d+\)\s+[^;]*?)(?=\s*;\s*\d+\)|;?\s*$)', re.MULTILINE | re.DOTALL)
-    
-    matches = list(sub_item_pattern.finditer(content))
+    matches = list(_inline_sub_item_re.finditer(content))
     
     # Если нашли несколько подпунктов
     if len(matches) > 1:
@@ -356,10 +403,10 @@ def _extract_sub_items_from_content(content: str) -> List[Dict[str,Any]]:
         first_match = matches[0]
         text_after = content[first_match.end():].strip()
         # Ищем другие подпункты после первого
-        if text_after and re.search(r';\s*\d+\)', text_after):
+        if text_after and _next_sub_item_re.search(text_after):
             # Есть другие подпункты, извлекаем все через более простой метод
             # Разбиваем по паттерну "цифра) текст;"
-            all_matches = re.finditer(r'(\d+\)\s+[^;]+?)(?=\s*;\s*\d+\)|;?\s*$)', content, re.MULTILINE | re.DOTALL)
+            all_matches = _inline_sub_item_strict_re.finditer(content)
             for match in all_matches:
                 sub_item_text = match.group(1).strip()
                 if sub_item_text.endswith(';'):
@@ -381,8 +428,7 @@ def _is_letter_sub_item(title: str) -> bool:
     
     title_stripped = title.strip()
     # Буквенные подпункты: "а)", "б)", "в)" и т.д.
-    letter_pattern = re.compile(r'^[а-яА-Я]\)\s+')
-    return bool(letter_pattern.match(title_stripped))
+    return bool(_letter_sub_item_re.match(title_stripped))
 
 def _extract_letter_sub_items_from_content(content: str) -> List[Dict[str,Any]]:
     """Извлекает буквенные подпункты (а), б), в)) из content текста"""
@@ -393,11 +439,9 @@ def _extract_letter_sub_items_from_content(content: str) -> List[Dict[str,Any]]:
     
     # Находим все позиции, где начинается новый буквенный подпункт
     # Паттерн: начало строки, \n\n, или \n, затем буква, скобка, пробел
-    letter_sub_item_pattern = re.compile(r'(?:^|\n\n|\n)([а-яА-Я]\)\s+)', re.MULTILINE)
-    
     # Находим все начала подпунктов
     start_positions = []
-    for match in letter_sub_item_pattern.finditer(content):
+    for match in _letter_sub_item_start_re.finditer(content):
         pos = match.start()
         match_text = match.group(0)
         # Пропускаем разделители (\n\n или \n)
@@ -443,16 +487,7 @@ def _is_main_item(title: str) -> bool:
     
     title_stripped = title.strip()
     # Основные пункты обычно имеют формат "1.", "2.", "а." и т.д.
-    main_item_patterns = [
-        r'^\d+\.\s+',  # "1. "
-        r'^[а-яА-Я]\.\s+',  # "а. " (буквенная нумерация)
-    ]
-    
-    for pattern in main_item_patterns:
-        if re.match(pattern, title_stripped):
-            return True
-    
-    return False
+    return bool(_main_item_re.match(title_stripped))
 
 def _is_article_heading(title: str) -> bool:
     """Определяет, является ли title заголовком статьи/раздела/главы, под которым могут быть пункты"""
@@ -462,23 +497,10 @@ def _is_article_heading(title: str) -> bool:
     title_stripped = title.strip()
     title_upper = title_stripped.upper()
     
-    # Паттерны для заголовков, под которыми обычно идут пункты
-    # Учитываем варианты с пробелом и без, с точкой и без
-    article_patterns = [
-        r'^(СТАТЬЯ|ARTICLE)\s*\d+',  # "Статья 1" или "Статья1"
-        r'^(РАЗДЕЛ|SECTION)\s*\d+',
-        r'^(ГЛАВА|CHAPTER)\s*\d+',
-        r'^(ЧАСТЬ|PART)\s*\d+',
-        r'^(ПАРАГРАФ|PARAGRAPH)\s*\d+',
-        r'^СТАТЬЯ\s*\d+',
-        r'^ГЛАВА\s*\d+',
-        r'^РАЗДЕЛ\s*\d+',
-        r'^[IVXLCDM]+\.',  # Римские цифры с точкой: "I.", "II.", "III.", "IV.", "V."
-    ]
-    
-    for pattern in article_patterns:
-        if re.match(pattern, title_upper):
-            return True
+    # Заголовки, под которыми обычно идут пункты: "Статья 1"/"Статья1", раздел,
+    # глава, часть, параграф (RU/EN) и римские цифры с точкой "I.", "II."
+    if _article_heading_re.match(title_upper):
+        return True
     
     # Проверяем, начинается ли с римской цифры и точки
     parts = title_upper.split('.', 1)
@@ -503,11 +525,9 @@ def _extract_numbered_items_from_content_with_positions(content: str) -> Tuple[L
     # Находим все позиции, где начинается новый пронумерованный пункт
     # Паттерн: начало строки, \n\n, \n, пробел, или точка с запятой + пробел, затем цифра, скобка, пробел
     # Также учитываем случаи, когда пункты идут подряд через точку с запятой: "1) текст; 2) текст;"
-    numbered_start_pattern = re.compile(r'(?:^|\n\n|\n|;\s*|\.\s+)(\d+\))\s+', re.MULTILINE)
-    
     # Находим все начала пунктов
     start_positions = []
-    for match in numbered_start_pattern.finditer(content):
+    for match in _numbered_start_re.finditer(content):
         # Позиция начала пункта (после разделителя)
         pos = match.start()
         match_text = match.group(0)
@@ -546,7 +566,7 @@ def _extract_numbered_items_from_content_with_positions(content: str) -> Tuple[L
             item_end_pos = len(item_text)
             
             # Ищем следующий пункт в тексте (паттерн: пробел или точка с запятой + пробел + цифра + скобка)
-            next_item_match = re.search(r';\s*(\d+\))\s+', item_text)
+            next_item_match = _next_numbered_item_re.search(item_text)
             if next_item_match:
                 # Найден следующий пункт, текущий заканчивается перед ним
                 item_end_pos = next_item_match.start()
@@ -608,11 +628,9 @@ def _extract_numbered_items_from_content(content: str) -> List[Dict[str,Any]]:
     # Находим все позиции, где начинается новый пронумерованный пункт
     # Паттерн: начало строки, \n\n, \n, пробел, или точка с запятой + пробел, затем цифра, скобка, пробел
     # Также учитываем случаи, когда пункты идут подряд через точку с запятой: "1) текст; 2) текст;"
-    numbered_start_pattern = re.compile(r'(?:^|\n\n|\n|;\s*|\.\s+)(\d+\))\s+', re.MULTILINE)
-    
     # Находим все начала пунктов
     start_positions = []
-    for match in numbered_start_pattern.finditer(content):
+    for match in _numbered_start_re.finditer(content):
         # Позиция начала пункта (после разделителя)
         pos = match.start()
         match_text = match.group(0)
@@ -649,7 +667,7 @@ def _extract_numbered_items_from_content(content: str) -> List[Dict[str,Any]]:
             item_end_pos = len(item_text)
             
             # Ищем следующий пункт в тексте (паттерн: пробел или точка с запятой + пробел + цифра + скобка)
-            next_item_match = re.search(r';\s*(\d+\))\s+', item_text)
+            next_item_match = _next_numbered_item_re.search(item_text)
             if next_item_match:
                 # Найден следующий пункт, текущий заканчивается перед ним
                 item_end_pos = next_item_match.start()
@@ -685,9 +703,9 @@ def _extract_numbered_items_from_content(content: str) -> List[Dict[str,Any]]:
     else:
         # Если не нашли через паттерн, пробуем разделить по точкам с запятой
         # (для случаев, когда пункты в одной строке: "1) текст; 2) текст;")
-        if ';' in content and re.search(r'\d+\)\s+', content):
+        if ';' in content and _paren_item_re.search(content):
             # Ищем все пункты в формате "цифра) текст;"
-            item_matches = list(re.finditer(r'(\d+\))\s+([^;]+?)(?=;\s*\d+\)|;?\s*$)', content))
+            item_matches = list(_paren_item_split_re.finditer(content))
             
             if item_matches:
                 for match in item_matches:
@@ -752,10 +770,7 @@ def _split_content_into_articles(node: Dict[str,Any]) -> Dict[str,Any]:
     # Ищем паттерны "Статья X" в content
     # Паттерн: начало строки или два переноса строки, затем "Статья" + пробел + цифра, затем один или два переноса строки
     # Учитываем разные варианты: "\n\nСтатья 1\n\n", "\nСтатья 1\n", "^Статья 1\n" (в начале)
-    article_pattern = re.compile(r'(?:^|\n\n|\n)(Статья\s+\d+)\s*(?:\n\n|\n|$)', re.MULTILINE | re.IGNORECASE)
-    
-    # Находим все совпадения
-    matches = list(article_pattern.finditer(content))
+    matches = list(_article_in_content_re.finditer(content))
     
     if not matches:
         # Если не нашли статьи в content, рекурсивно обрабатываем дочерние элементы
@@ -855,8 +870,8 @@ def _split_sub_items_in_content(node: Dict[str,Any]) -> Dict[str,Any]:
                 cleaned_content = re.sub(pattern, '', cleaned_content, count=1)
             
             # Очищаем множественные пробелы, точки с запятой и переносы строк
-            cleaned_content = re.sub(r'\s*;\s*', ' ', cleaned_content)
-            cleaned_content = re.sub(r'\s+', ' ', cleaned_content).strip()
+            cleaned_content = _semicolon_re.sub(' ', cleaned_content)
+            cleaned_content = _whitespace_re.sub(' ', cleaned_content).strip()
             
             # Удаляем точки с запятой в начале и конце
             cleaned_content = cleaned_content.strip(';').strip()
@@ -898,7 +913,7 @@ def _split_sub_items_in_content(node: Dict[str,Any]) -> Dict[str,Any]:
             pattern = re.escape(sub_item_text) + r'\s*;?\s*'
             cleaned_content = re.sub(pattern, '', cleaned_content, count=1)
         
-        cleaned_content = re.sub(r'\s+', ' ', cleaned_content).strip()
+        cleaned_content = _whitespace_re.sub(' ', cleaned_content).strip()
         if not cleaned_content or cleaned_content.isspace():
             node["content"] = ""
         else:
@@ -967,8 +982,8 @@ def _attach_items_to_headings(node: Dict[str,Any]) -> Dict[str,Any]:
             if current_content:
                 # Проверяем, есть ли в content пронумерованные пункты (не только в первой строке)
                 # Ищем паттерн пронумерованного пункта в content
-                has_numbered_items = bool(re.search(r'\n\n\d+[\.\)]\s+', current_content) or 
-                                         re.match(r'^\d+[\.\)]\s+', current_content))
+                has_numbered_items = bool(_numbered_para_re.search(current_content) or 
+                                         _numbered_prefix_re.match(current_content))
                 
                 if has_numbered_items:
                     # Извлекаем пункты из content заголовка
@@ -1002,8 +1017,8 @@ def _attach_items_to_headings(node: Dict[str,Any]) -> Dict[str,Any]:
                                 cleaned_content = ""
                         
                         # Очищаем множественные пробелы и пустые строки
-                        cleaned_content = re.sub(r'\s+', ' ', cleaned_content)
-                        cleaned_content = re.sub(r'\n{3,}', '\n\n', cleaned_content)
+                        cleaned_content = _whitespace_re.sub(' ', cleaned_content)
+                        cleaned_content = _extra_blank_lines_re.sub('\n\n', cleaned_content)
                         cleaned_content = cleaned_content.strip()
                         
                         current["content"] = cleaned_content
@@ -1027,7 +1042,7 @@ def _attach_items_to_headings(node: Dict[str,Any]) -> Dict[str,Any]:
                                     end_pos += 1
                                 cleaned_content = cleaned_content[:item_pos].rstrip() + " " + cleaned_content[end_pos:].lstrip()
                         
-                        cleaned_content = re.sub(r'\s+', ' ', cleaned_content).strip()
+                        cleaned_content = _whitespace_re.sub(' ', cleaned_content).strip()
                         current["content"] = cleaned_content
                         
                         for item in extracted_items:
@@ -1065,7 +1080,7 @@ def _attach_items_to_headings(node: Dict[str,Any]) -> Dict[str,Any]:
                     
                     if next_level >= current_level and next_level <= current_level + 1:
                         # Извлекаем номер пункта для отслеживания
-                        num_match = re.match(r'^(\d+)[\.\)]', next_title)
+                        num_match = _item_number_re.match(next_title)
                         if num_match:
                             item_num = int(num_match.group(1))
                             # Если пункт начинается с "1." и мы уже собрали пункты, это новая статья
@@ -1100,7 +1115,7 @@ def _attach_items_to_headings(node: Dict[str,Any]) -> Dict[str,Any]:
                                 item["level"] = current_level + 1
                                 items_to_attach.append(item)
                                 # Обновляем last_item_number
-                                num_match = re.match(r'^(\d+)[\.\)]', item.get("title", ""))
+                                num_match = _item_number_re.match(item.get("title", ""))
                                 if num_match:
                                     last_item_number = int(num_match.group(1))
                             j += 1
@@ -1253,70 +1268,155 @@ def _attach_items_to_headings(node: Dict[str,Any]) -> Dict[str,Any]:
 
 # ---------- 2) Система очистки текста ----------
 
-def load_cleaning_patterns(pattern_file: str = "возможные_паттерны_для_очистки.json") -> List[Dict[str, str]]:
-    """Загружает паттерны для очистки из JSON файла"""
-    import os
-    import json
-    
-    # Пытаемся найти файл в текущей директории или рядом со скриптом
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    pattern_path = os.path.join(script_dir, pattern_file)
-    
+_DEFAULT_CLEANING_PATTERNS_FILE = "возможные_паттерны_для_очистки.json"
+# Ведущие глобальные флаги паттерна, например "(?mi)" в "(?mi)^\s*ГАРАНТ:?..."
+_leading_inline_flags_re = re.compile(r'^\(\?([aiLmsux]+)\)')
+# Обратные ссылки (\1, (?P=name)) ломаются при склейке в альтернацию — такие
+# паттерны применяем отдельным проходом.
+_backreference_re = re.compile(r'\\[1-9]|\(\?P=')
+
+@lru_cache(maxsize=None)
+def _read_cleaning_patterns(pattern_path: str) -> Tuple[Tuple[Tuple[str, str], ...], ...]:
+    """Читает файл паттернов один раз на процесс (неизменяемый результат для кэша)"""
     if not os.path.exists(pattern_path):
         # Если файл не найден, возвращаем пустой список
         print(f"[WARNING] Файл с паттернами очистки не найден: {pattern_path}")
-        return []
+        return ()
     
     try:
         with open(pattern_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            return data.get("patterns", [])
+        return tuple(tuple(p.items()) for p in data.get("patterns", []))
     except Exception as e:
         print(f"[WARNING] Ошибка при загрузке паттернов очистки: {e}")
-        return []
+        return ()
 
-def clean_text_with_patterns(text: str, patterns: List[Dict[str, str]] = None) -> str:
-    """Очищает текст используя паттерны из JSON файла"""
-    if patterns is None:
-        patterns = load_cleaning_patterns()
-    
-    if not patterns:
-        return text
-    
-    cleaned_text = text
-    for pattern_info in patterns:
+def load_cleaning_patterns(pattern_file: str = _DEFAULT_CLEANING_PATTERNS_FILE) -> List[Dict[str, str]]:
+    """Загружает паттерны для очистки из JSON файла (файл читается с диска один раз)"""
+    # Пытаемся найти файл в текущей директории или рядом со скриптом
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    pattern_path = os.path.join(script_dir, pattern_file)
+    return [dict(p) for p in _read_cleaning_patterns(pattern_path)]
+
+def _split_inline_flags(regex: str) -> Tuple[str, str]:
+    """'(?mi)^X' → ('mi', '^X'): глобальные флаги допустимы только в начале выражения,
+    поэтому внутри общей альтернации их нужно переносить в локальную группу."""
+    m = _leading_inline_flags_re.match(regex)
+    if m:
+        return m.group(1), regex[m.end():]
+    return "", regex
+
+def _has_top_level_alternation(body: str) -> bool:
+    """Есть ли в выражении '|' вне скобок и классов символов ('^a|b' нельзя вынести за '^')"""
+    depth, in_class, i = 0, False, 0
+    while i < len(body):
+        ch = body[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            return True
+        i += 1
+    return False
+
+@lru_cache(maxsize=32)
+def _compile_cleaning_passes(regexes: Tuple[Tuple[str, str], ...]) -> Tuple[re.Pattern, ...]:
+    """Компилирует паттерны очистки в минимальное число проходов.
+    
+    Совместимые паттерны склеиваются в одну альтернацию, и текст узла сканируется
+    один раз вместо N раз. Паттерны вида '(?m)^...' (а это почти весь JSON)
+    дополнительно объединяются под общим якорем '^(?:A|B|...)': движок пробует
+    альтернативы только в начале строк, а не на каждой позиции текста.
+    Некорректные паттерны пропускаются с предупреждением, паттерны с обратными
+    ссылками идут отдельными проходами.
+    """
+    line_anchored: Dict[str, List[str]] = {}
+    alternatives: List[str] = []
+    standalone: List[re.Pattern] = []
+    for name, regex in regexes:
         try:
-            regex_pattern = pattern_info.get("regex", "")
-            if regex_pattern:
-                # Компилируем паттерн
-                compiled_pattern = re.compile(regex_pattern)
-                # Удаляем совпадения
-                cleaned_text = compiled_pattern.sub("", cleaned_text)
-        except Exception as e:
+            compiled = re.compile(regex)
+        except re.error as e:
             # Если паттерн некорректный, пропускаем его
-            print(f"[WARNING] Ошибка при применении паттерна '{pattern_info.get('name', 'unknown')}': {e}")
+            print(f"[WARNING] Ошибка при применении паттерна '{name}': {e}")
             continue
+        if _backreference_re.search(regex):
+            standalone.append(compiled)
+            continue
+        flags, body = _split_inline_flags(regex)
+        if "m" in flags and body.startswith("^") and not _has_top_level_alternation(body):
+            line_anchored.setdefault(flags, []).append(body[1:])
+        else:
+            alternatives.append(f"(?{flags}:{body})" if flags else f"(?:{body})")
+    
+    for flags, bodies in line_anchored.items():
+        alternatives.insert(0, f"(?{flags}:^(?:{'|'.join(bodies)}))")
     
+    passes: List[re.Pattern] = []
+    if alternatives:
+        try:
+            passes.append(re.compile("|".join(alternatives)))
+        except re.error:
+            # Не склеилось (например, конфликт флагов) — по проходу на паттерн
+            passes.extend(re.compile(r) for r in alternatives)
+    passes.extend(standalone)
+    return tuple(passes)
+
+def _cleaning_passes(patterns: List[Dict[str, str]]) -> Tuple[re.Pattern, ...]:
+    key = tuple(
+        (p.get("name", "unknown"), p.get("regex", ""))
+        for p in patterns
+        if p.get("regex", "")
+    )
+    return _compile_cleaning_passes(key)
+
+def _apply_cleaning_passes(text: str, passes: Tuple[re.Pattern, ...]) -> str:
+    cleaned_text = text
+    for compiled_pattern in passes:
+        # Удаляем совпадения
+        cleaned_text = compiled_pattern.sub("", cleaned_text)
     # Удаляем множественные пустые строки (более 2 подряд)
-    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
+    cleaned_text = _extra_blank_lines_re.sub('\n\n', cleaned_text)
     # Удаляем пробелы в начале и конце
-    cleaned_text = cleaned_text.strip()
+    return cleaned_text.strip()
+
+def clean_text_with_patterns(text: str, patterns: List[Dict[str, str]] = None) -> str:
+    """Очищает текст используя паттерны из JSON файла (один проход общей регуляркой)"""
+    if patterns is None:
+        patterns = load_cleaning_patterns()
     
-    return cleaned_text
+    if not patterns:
+        return text
+    
+    return _apply_cleaning_passes(text, _cleaning_passes(patterns))
 
 def clean_tree_with_patterns(node: Dict[str, Any], patterns: List[Dict[str, str]] = None):
     """Рекурсивно очищает content всех узлов дерева используя паттерны"""
     if patterns is None:
         patterns = load_cleaning_patterns()
     
+    if not patterns:
+        return
+    
+    _clean_tree_with_passes(node, _cleaning_passes(patterns))
+
+def _clean_tree_with_passes(node: Dict[str, Any], passes: Tuple[re.Pattern, ...]):
     # Очищаем content текущего узла
     if "content" in node and node["content"]:
-        node["content"] = clean_text_with_patterns(node["content"], patterns)
+        node["content"] = _apply_cleaning_passes(node["content"], passes)
     
     # Рекурсивно обрабатываем children
     if "children" in node and node["children"]:
         for child in node["children"]:
-            clean_tree_with_patterns(child, patterns)
+            _clean_tree_with_passes(child, passes)
 
 # ---------- 3) Система обработчиков документов ----------
 
@@ -1514,7 +1614,7 @@ class GarantProcessor(DocumentProcessor):
             # - структура "Глава X", "Статья X"
             has_garant_marker = "ГАРАНТ:" in md or "ГАРАНТ" in md
             has_garant_links = "ivo.garant.ru" in md or "garant.ru" in md
-            has_legal_structure = bool(re.search(r'Глава\s+\d+|Статья\s+\d+', md))
+            has_legal_structure = bool(_garant_structure_re.search(md))
             return has_garant_marker or (has_garant_links and has_legal_structure)
         except:
             return False
@@ -1524,22 +1624,17 @@ class GarantProcessor(DocumentProcessor):
         lines = text.splitlines()
         cleaned_lines = []
         
-        # Паттерны для удаления
-        garant_pattern = re.compile(r'^\s*ГАРАНТ\s*:?\s*$', re.IGNORECASE)
-        # Паттерн для "См. комментарии к статье X" (с возможными вариантами окончания)
-        comment_pattern = re.compile(r'^\s*См\.\s+комментарии\s+к\s+статье\s+\d+.*?$', re.IGNORECASE)
-        
         i = 0
         while i < len(lines):
             line = lines[i]
             # Пропускаем строки "ГАРАНТ:" или "ГАРАНТ"
-            if garant_pattern.match(line):
+            if _garant_marker_line_re.match(line):
                 i += 1
                 # Пропускаем пустые строки после "ГАРАНТ:"
                 while i < len(lines) and not lines[i].strip():
                     i += 1
                 # Пропускаем строку "См. комментарии ..." если она идет после "ГАРАНТ:"
-                if i < len(lines) and comment_pattern.match(lines[i]):
+                if i < len(lines) and _garant_comment_line_re.match(lines[i]):
                     i += 1
                     # Пропускаем пустые строки после комментария
                     while i < len(lines) and not lines[i].strip():
@@ -1547,7 +1642,7 @@ class GarantProcessor(DocumentProcessor):
                 continue
             
             # Пропускаем строки "См. комментарии ..." отдельно
-            if comment_pattern.match(line):
+            if _garant_comment_line_re.match(line):
                 i += 1
                 # Пропускаем пустые строки после комментария
                 while i < len(lines) and not lines[i].strip():
@@ -1577,12 +1672,10 @@ class GarantProcessor(DocumentProcessor):
         # - Улучшаем распознавание заголовков глав и статей
         # - Сохраняем ссылки в формате [текст](url)
         
-        # Паттерны для глав и статей.
+        # Главы и статьи.
         # Учитываем, что mammoth может прислать заголовок жирным
         # (например, "**Статья 14.** Понятие преступления") — поэтому проверяем
         # после _strip_md_emphasis(), а в выходной заголовок пишем уже очищенную строку.
-        chapter_pattern = re.compile(r'^(Глава\s+\d+[\.:]?\s*.+?)$', re.IGNORECASE)
-        article_pattern = re.compile(r'^(Статья\s+\d+[\.:]?\s*.+?)$', re.IGNORECASE)
 
         # Преобразуем в заголовки markdown
         lines = md.splitlines()
@@ -1592,12 +1685,12 @@ class GarantProcessor(DocumentProcessor):
             line = lines[i]
             stripped = _strip_md_emphasis(line.strip())
             # Проверяем на главу
-            if chapter_pattern.match(stripped):
+            if _garant_chapter_re.match(stripped):
                 processed_lines.append(f"# {stripped}")
                 i += 1
                 continue
             # Проверяем на статью
-            if article_pattern.match(stripped):
+            if _garant_article_re.match(stripped):
                 processed_lines.append(f"## {stripped}")
                 i += 1
                 continue
@@ -1629,7 +1722,7 @@ class ConsultantProcessor(DocumentProcessor):
             # - наличие "КонсультантПлюс" в тексте
             # - структура с разделами, главами, статьями и подразделами
             has_consultant_links = "consultant.ru" in md or "КонсультантПлюс" in md or "Консультант" in md
-            has_sections = bool(re.search(r'Раздел\s+\d+|Подраздел\s+\d+|Глава\s+\d+|Статья\s+\d+', md, re.IGNORECASE))
+            has_sections = bool(_consultant_structure_re.search(md))
             return has_consultant_links or has_sections
         except:
             return False
@@ -1647,18 +1740,6 @@ class ConsultantProcessor(DocumentProcessor):
         processed_lines = []
         i = 0
         
-        # Паттерны для распознавания заголовков
-        section_pattern = re.compile(r'^(Раздел\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
-        subsection_pattern = re.compile(r'^(Подраздел\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
-        # Глава с номером: "Глава 1", "Глава 2" и т.д. (может быть с точкой или без)
-        chapter_pattern = re.compile(r'^(Глава\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
-        # Статья с номером: "Статья 1", "Статья 2" и т.д. (может быть с точкой или без)
-        article_pattern = re.compile(r'^(Статья\s+\d+[\.:]?\s*.+)$', re.IGNORECASE)
-        # Римские цифры с точкой: I., II., III., IV., V.
-        roman_section_pattern = re.compile(r'^([IVXLCDM]+)\.\s+(.+)$', re.IGNORECASE)
-        # Подзаголовки (начинаются с заглавной буквы, короткие, без точки в конце)
-        subtitle_pattern = re.compile(r'^([А-ЯЁ][А-Яа-яё\s]{5,80})$')
-        
         while i < len(lines):
             raw_line = lines[i].strip()
             # mammoth/markdownify часто оборачивают заголовки статей/разделов в **bold** —
@@ -1680,24 +1761,24 @@ class ConsultantProcessor(DocumentProcessor):
                 continue
             
             # Проверяем на раздел с римской цифрой
-            roman_match = roman_section_pattern.match(line)
+            roman_match = _consultant_roman_section_re.match(line)
             if roman_match:
                 processed_lines.append(f"# {line}")
                 i += 1
                 continue
             
             # Проверяем на Главу (может быть на нескольких строках)
-            if chapter_pattern.match(line):
+            if _consultant_chapter_re.match(line):
                 chapter_text = line
                 # Собираем следующие строки, если они являются продолжением заголовка главы
                 j = i + 1
                 while j < len(lines):
                     next_line = _strip_md_emphasis(lines[j].strip())
                     # Если следующая строка пустая или начинается с "Статья" или "Глава" - прекращаем
-                    if not next_line or article_pattern.match(next_line) or chapter_pattern.match(next_line):
+                    if not next_line or _consultant_article_re.match(next_line) or _consultant_chapter_re.match(next_line):
                         break
                     # Если следующая строка - таблица или другой заголовок - прекращаем
-                    if next_line.startswith('|') or section_pattern.match(next_line) or subsection_pattern.match(next_line):
+                    if next_line.startswith('|') or _consultant_section_re.match(next_line) or _consultant_subsection_re.match(next_line):
                         break
                     # Если следующая строка начинается с заглавной буквы и короткая - возможно продолжение
                     if len(next_line) < 100 and next_line.isupper():
@@ -1710,26 +1791,26 @@ class ConsultantProcessor(DocumentProcessor):
                 continue
             
             # Проверяем на Статью
-            if article_pattern.match(line):
+            if _consultant_article_re.match(line):
                 processed_lines.append(f"## {line}")
                 i += 1
                 continue
             
             # Проверяем на обычный раздел
-            if section_pattern.match(line):
+            if _consultant_section_re.match(line):
                 processed_lines.append(f"# {line}")
                 i += 1
                 continue
             
             # Проверяем на подраздел
-            if subsection_pattern.match(line):
+            if _consultant_subsection_re.match(line):
                 processed_lines.append(f"## {line}")
                 i += 1
                 continue
             
             # Проверяем на подзаголовок (короткая строка, начинается с заглавной, без точки)
             # Но не пронумерованный пункт
-            if (subtitle_pattern.match(line) and 
+            if (_consultant_subtitle_re.match(line) and 
                 not _is_numbered_item(line) and 
                 len(line) < 100 and
                 not line.endswith('.') and
@@ -1738,11 +1819,11 @@ class ConsultantProcessor(DocumentProcessor):
                 lines[i + 1].strip()):  # Следующая строка не пустая
                 # Проверяем, что следующая строка не является заголовком
                 next_line = _strip_md_emphasis(lines[i + 1].strip())
-                if not (roman_section_pattern.match(next_line) or 
-                       section_pattern.match(next_line) or
-                       subsection_pattern.match(next_line) or
-                       chapter_pattern.match(next_line) or
-                       article_pattern.match(next_line)):
+                if not (_consultant_roman_section_re.match(next_line) or 
+                       _consultant_section_re.match(next_line) or
+                       _consultant_subsection_re.match(next_line) or
+                       _consultant_chapter_re.match(next_line) or
+                       _consultant_article_re.match(next_line)):
                     processed_lines.append(f"## {line}")
                     i += 1
                     continue
@@ -1968,9 +2049,9 @@ class GOSTProcessor(DocumentProcessor):
             # - наличие "ГОСТ" в начале документа
             # - наличие "МЕЖГОСУДАРСТВЕННЫЙ СТАНДАРТ" или "ГОСУДАРСТВЕННЫЙ СТАНДАРТ"
             # - структура с разделами типа "1. ОБЩИЕ ПОЛОЖЕНИЯ", "2. СОСТАВ И СОДЕРЖАНИЕ"
-            has_gost = bool(re.search(r'^ГОСТ\s+\d+', md, re.MULTILINE))
+            has_gost = bool(_gost_header_re.search(md))
             has_standard = "МЕЖГОСУДАРСТВЕННЫЙ СТАНДАРТ" in md or "ГОСУДАРСТВЕННЫЙ СТАНДАРТ" in md
-            has_gost_structure = bool(re.search(r'^\d+\.\s+[А-ЯЁ\s]+$', md, re.MULTILINE))
+            has_gost_structure = bool(_gost_structure_re.search(md))
             return has_gost or (has_standard and has_gost_structure)
         except:
             return False
@@ -1983,16 +2064,6 @@ class GOSTProcessor(DocumentProcessor):
         processed_lines = []
         i = 0
         
-        # Паттерны для распознавания структуры ГОСТа
-        # Разделы: "1. ОБЩИЕ ПОЛОЖЕНИЯ", "2. СОСТАВ И СОДЕРЖАНИЕ"
-        section_pattern = re.compile(r'^(\d+)\.\s+([А-ЯЁ\s]+)$')
-        # Подразделы: "1.1. Текст", "2.3. Текст", "2.4.1. Текст" (многоуровневые)
-        subsection_pattern = re.compile(r'^(\d+)(?:\.(\d+))+(?:\.\s+(.+))?$')
-        # Пункты: "1) текст", "2) текст"
-        item_pattern = re.compile(r'^(\d+)\)\s+(.+)$')
-        # Подпункты: "а) текст", "б) текст"
-        subitem_pattern = re.compile(r'^([а-яА-Я])\)\s+(.+)$')
-        
         while i < len(lines):
             line = lines[i].strip()
             
@@ -2009,7 +2080,7 @@ class GOSTProcessor(DocumentProcessor):
                 continue
             
             # Проверяем на раздел (например, "1. ОБЩИЕ ПОЛОЖЕНИЯ")
-            section_match = section_pattern.match(line)
+            section_match = _gost_section_re.match(line)
             if section_match:
                 processed_lines.append(f"# {line}")
                 i += 1
@@ -2017,12 +2088,12 @@ class GOSTProcessor(DocumentProcessor):
             
             # Проверяем на подраздел (например, "1.1. Текст", "2.4.1. Текст")
             # Сначала проверяем многоуровневые подразделы (2.4.1., 2.4.2. и т.д.)
-            if re.match(r'^\d+\.\d+\.\d+\.', line):
+            if _gost_subsection_l3_re.match(line):
                 # Подраздел третьего уровня
                 processed_lines.append(f"### {line}")
                 i += 1
                 continue
-            elif re.match(r'^\d+\.\d+\.', line):
+            elif _gost_subsection_l2_re.match(line):
                 # Подраздел второго уровня
                 processed_lines.append(f"## {line}")
                 i += 1
@@ -2030,10 +2101,10 @@ class GOSTProcessor(DocumentProcessor):
             
             # Проверяем на пункт (например, "1) текст")
             # Но сначала проверяем, нет ли в строке нескольких пунктов через точку с запятой
-            if ';' in line and re.search(r'\d+\)\s+', line):
+            if ';' in line and _paren_item_re.search(line):
                 # Если в строке несколько пунктов, разделяем их
                 # Ищем все пункты в строке
-                items_in_line = re.findall(r'(\d+\)\s+[^;]+(?:;|$))', line)
+                items_in_line = _gost_inline_items_re.findall(line)
                 if len(items_in_line) > 1:
                     # Разделяем на отдельные пункты
                     for item in items_in_line:
@@ -2043,14 +2114,14 @@ class GOSTProcessor(DocumentProcessor):
                     i += 1
                     continue
             
-            item_match = item_pattern.match(line)
+            item_match = _gost_item_re.match(line)
             if item_match:
                 processed_lines.append(f"#### {line}")
                 i += 1
                 continue
             
             # Проверяем на подпункт (например, "а) текст")
-            subitem_match = subitem_pattern.match(line)
+            subitem_match = _gost_subitem_re.match(line)
             if subitem_match:
                 processed_lines.append(f"##### {line}")
                 i += 1
@@ -2135,22 +2206,41 @@ def extract_outline_from_document(path: str) -> Dict[str,Any]:
 
 # ---------- 11) CLI-пример ----------
 
+def _outline_to_json_file(path: str, out_dir: str) -> str:
+    """Обработка одного входа CLI (в отдельном процессе при --jobs > 1)."""
+    tree = DocumentProcessorManager().process_document(path)
+    out_path = Path(out_dir) / (Path(path).stem + ".json")
+    save_tree_json(tree, out_path, pretty=True)
+    return str(out_path)
+
+
 if __name__ == "__main__":
     import argparse
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
     ap = argparse.ArgumentParser(description="Convert documents to JSON outline (sections hierarchy).")
     ap.add_argument("inputs", nargs="+", help="Paths to documents (DOCX, PDF, etc.)")
     ap.add_argument("-o","--out", default="out", help="Output folder (default: ./out)")
+    ap.add_argument("-j", "--jobs", type=int, default=0,
+                    help="Parallel worker processes (default: number of CPUs; 1 = serial)")
     args = ap.parse_args()
 
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    manager = DocumentProcessorManager()
-    
-    for p in args.inputs:
-        try:
-            tree = manager.process_document(p)
-            save_tree_json(tree, out_dir / (Path(p).stem + ".json"), pretty=True)
-            print(f"[ok] {p} → {out_dir / (Path(p).stem + '.json')}")
-        except Exception as e:
-            print(f"[error] {p}: {e}")
+    jobs = min(args.jobs or os.cpu_count() or 1, len(args.inputs))
+    if jobs <= 1:
+        for p in args.inputs:
+            try:
+                print(f"[ok] {p} → {_outline_to_json_file(p, str(out_dir))}")
+            except Exception as e:
+                print(f"[error] {p}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_outline_to_json_file, p, str(out_dir)): p for p in args.inputs}
+            for future in as_completed(futures):
+                p = futures[future]
+                try:
+                    print(f"[ok] {p} → {future.result()}")
+                except Exception as e:
+                    print(f"[error] {p}: {e}")
@@ -7,20 +7,37 @@ FastAPI сервис для создания чанков из документ
 
 Endpoints:
 - POST /chunk/ - обработка загруженного документа
+- POST /chunk/batch - пакетная обработка нескольких документов или архива (NDJSON-поток)
 - POST /chunk-docx/ - legacy endpoint для DOCX файлов
 - GET /health - проверка состояния сервиса
 - GET / - информация о сервисе
 """
 
 import os
+import re
 import sys
+import copy
 import json
+import time
+import shutil
+import asyncio
+import hashlib
 import logging
+import tarfile
+import zipfile
 import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Union, Tuple
+from typing import List, Dict, Any, Union, Tuple, Iterator, Iterable, Callable, AsyncIterator
 from fastapi import FastAPI, File, UploadFile, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -60,7 +77,68 @@ except ImportError:
             "Убедитесь, что файл находится в той же директории, что и main.py"
         )
 
-app = FastAPI(title="GenA Chunker Service", version="2.0.0")
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    shutdown_batch_executor()
+
+
+# ---------- Метрики Prometheus ----------
+#
+# GET /metrics: время запросов по шаблонам маршрутов, попадания в кэш типа
+# документа, время определения типа через LLM, документы пакетной обработки.
+# Метки ограничены: route — шаблон маршрута, остальные — фиксированные наборы.
+
+_METRICS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_METRICS_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
+HTTP_REQUEST_DURATION = Histogram(
+    "gena_http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route", "status"], buckets=_METRICS_BUCKETS,
+)
+DOCUMENT_TYPE_CACHE = Counter(
+    "gena_chunker_document_type_cache_total", "Обращения к кэшу типа документа", ["result"],
+)
+DOCUMENT_TYPE_LLM_DURATION = Histogram(
+    "gena_chunker_document_type_llm_seconds", "Время определения типа документа через LLM",
+    ["outcome"], buckets=_METRICS_BUCKETS,
+)
+BATCH_DOCUMENTS = Counter(
+    "gena_chunker_batch_documents_total", "Документы пакетной обработки", ["status"],
+)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: время запроса до конца ответа (и для потоковых ответов)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if route != "/metrics":
+                method = scope["method"] if scope["method"] in _METRICS_METHODS else "OTHER"
+                HTTP_REQUEST_DURATION.labels(method, route, f"{status[0] // 100}xx").observe(
+                    time.perf_counter() - started
+                )
+
+
+app = FastAPI(title="GenA Chunker Service", version="2.0.0", lifespan=_lifespan)
+app.add_middleware(MetricsMiddleware)
 
 
 def _bootstrap_env() -> None:
@@ -80,6 +158,22 @@ def _bootstrap_env() -> None:
 _bootstrap_env()
 
 
+# Регулярки split_content_into_items компилируются один раз, а не на каждый листовой узел.
+# «Жирный» маркер статьи внутри content ("**Статья 15.** Категории преступлений").
+_ARTICLE_MARKER_RE = re.compile(
+    r'(?:^|\n)\s*[*_]{0,3}Статья\s+\d+[\w\u00b9\u00b2\u00b3\u2070-\u2079]*\.?[*_]{0,3}\s*[^\n]*',
+    re.IGNORECASE,
+)
+# Нумерованный пункт: начало строки или после переноса, затем цифра + точка/скобка + пробел
+# + текст до следующего пункта или конца. Пункт может содержать несколько абзацев.
+# Примеры: "1. текст", "2. текст\n\nеще текст", "1) текст"
+_NUMBERED_ITEM_RE = re.compile(
+    r'(?:^|\n\n|\n)(\d+[\.\)]\s+(?:[^\n]+(?:\n(?!\d+[\.\)])[^\n]*)*))',
+    re.MULTILINE
+)
+_NUMBERED_PREFIX_RE = re.compile(r'^\d+[\.\)]\s+')
+
+
 def extract_all_titles(node: Dict[str, Any], titles: List[str] = None) -> List[str]:
     """
     Извлекает все заголовки (title) из дерева документа.
@@ -105,9 +199,159 @@ def extract_all_titles(node: Dict[str, Any], titles: List[str] = None) -> List[s
     return titles
 
 
+# Строки преамбулы (content корня до первого заголовка), которые добавляются к
+# заголовкам при определении типа: название документа часто стоит именно там
+_PREAMBLE_LINES = 5
+_MD_EMPHASIS_RE = re.compile(r'^[*_#\s]+|[*_\s]+$')
+
+
+def extract_document_type_titles(tree: Dict[str, Any]) -> List[str]:
+    """
+    Заголовки для определения типа документа: первые строки преамбулы
+    (без markdown-выделения) и все заголовки дерева.
+    
+    Args:
+        tree: Дерево документа
+    
+    Returns:
+        Список строк для identify_document_type
+    """
+    preamble = []
+    for line in (tree.get("content") or "").splitlines():
+        line = _MD_EMPHASIS_RE.sub("", line)
+        if line:
+            preamble.append(line)
+            if len(preamble) >= _PREAMBLE_LINES:
+                break
+    return preamble + extract_all_titles(tree)
+
+
+# ---------- Определение типа документа ----------
+#
+# identify_document_type: кэш по хэшу списка заголовков → правила по известным
+# шаблонам названий → LLM, только если уверенность правил ниже порога.
+# Вызов LLM запускается в пуле потоков (submit_document_type_identification)
+# параллельно с созданием чанков.
+
+# Минимальная уверенность правил, при которой LLM не вызывается
+DOC_TYPE_MIN_CONFIDENCE = float(os.getenv("CHUNKER_DOC_TYPE_MIN_CONFIDENCE", "0.8"))
+# CHUNKER_DOC_TYPE_LLM=false — обходиться только правилами
+DOC_TYPE_LLM_ENABLED = os.getenv("CHUNKER_DOC_TYPE_LLM", "true").lower().strip() not in ("0", "false", "no", "off")
+DOC_TYPE_CACHE_SIZE = int(os.getenv("CHUNKER_DOC_TYPE_CACHE_SIZE", "256"))
+
+# Заголовки, в которых правила ищут название документа: первые — «уверенно»,
+# остальные до DOC_TYPE_RULES_SCAN_TITLES — с пониженной уверенностью.
+_DOC_TYPE_HEAD_TITLES = 3
+_DOC_TYPE_RULES_SCAN_TITLES = 20
+_DOC_TYPE_HEAD_CONFIDENCE = 0.95
+_DOC_TYPE_TAIL_CONFIDENCE = 0.7
+
+# (тип документа, паттерн; группа "name" — название документа, иначе весь матч)
+_DOC_TYPE_RULES = [
+    ("Конституция", re.compile(r'^\s*(?P<name>Конституция\s+Российской\s+Федерации)\b', re.IGNORECASE)),
+    ("Кодекс", re.compile(
+        r'^\s*(?P<name>(?:[А-ЯЁ][а-яё-]+\s+){1,3}кодекс\s+Российской\s+Федерации\b'
+        r'|Кодекс\s+Российской\s+Федерации\s+об?\s+[^.\n(]+?(?=\s+от\s|\s*$|\s*[.(,]))',
+        re.IGNORECASE,
+    )),
+    ("ГОСТ", re.compile(r'^\s*(?P<name>ГОСТ(?:\s+Р)?(?:\s+ИСО(?:/МЭК)?)?\s+\d[\d.]*(?:[-–—]\d{2,4})?)', re.IGNORECASE)),
+    ("Федеральный закон", re.compile(
+        r'^\s*(?P<name>Федеральный\s+(?:конституционный\s+)?закон\b[^\n]*?[N№]\s*\d+-Ф?К?З(?:\s*["«][^"»\n]+["»])?)',
+        re.IGNORECASE,
+    )),
+]
+
+_doc_type_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_doc_type_cache_lock = threading.Lock()
+_doc_type_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CHUNKER_DOC_TYPE_WORKERS", "4")),
+    thread_name_prefix="doc-type",
+)
+
+
+def _unknown_document_type(titles: List[str], description: str) -> Dict[str, Any]:
+    return {
+        "document_type": "unknown",
+        "document_name": "Название не определено",
+        "confidence": 0.0,
+        "description": description,
+        "titles_count": len(titles),
+        "key_indicators": []
+    }
+
+
+def classify_document_type_by_rules(titles: List[str]) -> Dict[str, Any]:
+    """
+    Быстро определяет тип документа по известным шаблонам названий
+    (Конституция, кодексы, ГОСТ, федеральные законы) без обращения к LLM.
+    
+    Args:
+        titles: Список заголовков документа
+    
+    Returns:
+        Словарь того же вида, что и identify_document_type; confidence 0.0,
+        если ни одно правило не сработало
+    """
+    for index, title in enumerate(titles[:_DOC_TYPE_RULES_SCAN_TITLES]):
+        for document_type, pattern in _DOC_TYPE_RULES:
+            match = pattern.search(title)
+            if not match:
+                continue
+            name = " ".join(match.group("name").split())
+            # «уголовный кодекс ...» → «Уголовный кодекс ...»
+            name = name[:1].upper() + name[1:]
+            return {
+                "document_type": document_type,
+                "document_name": name,
+                "confidence": _DOC_TYPE_HEAD_CONFIDENCE if index < _DOC_TYPE_HEAD_TITLES else _DOC_TYPE_TAIL_CONFIDENCE,
+                "description": f"{document_type}: определено по заголовку «{title}»",
+                "titles_count": len(titles),
+                "key_indicators": [match.group(0).strip()],
+                "method": "rules"
+            }
+    return _unknown_document_type(titles, "Тип документа не определен правилами")
+
+
+def _titles_cache_key(titles: List[str]) -> str:
+    digest = hashlib.sha256()
+    for title in titles:
+        digest.update(title.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _document_type_cache_get(key: str) -> Union[Dict[str, Any], None]:
+    with _doc_type_cache_lock:
+        result = _doc_type_cache.get(key)
+        if result is None:
+            return None
+        _doc_type_cache.move_to_end(key)
+    return copy.deepcopy(result)
+
+
+def _document_type_cache_put(key: str, result: Dict[str, Any]) -> None:
+    if DOC_TYPE_CACHE_SIZE <= 0:
+        return
+    with _doc_type_cache_lock:
+        _doc_type_cache[key] = copy.deepcopy(result)
+        _doc_type_cache.move_to_end(key)
+        while len(_doc_type_cache) > DOC_TYPE_CACHE_SIZE:
+            _doc_type_cache.popitem(last=False)
+
+
+def clear_document_type_cache() -> None:
+    with _doc_type_cache_lock:
+        _doc_type_cache.clear()
+
+
 def identify_document_type(titles: List[str]) -> Dict[str, Any]:
     """
-    Определяет тип документа на основе заголовков через LLM.
+    Определяет тип документа на основе заголовков.
+
+    Порядок: кэш (ключ — хэш списка заголовков) → правила
+    classify_document_type_by_rules → LLM, если уверенность правил ниже
+    DOC_TYPE_MIN_CONFIDENCE и LLM не отключён (CHUNKER_DOC_TYPE_LLM=false).
+    Ответы с ошибкой LLM не кэшируются.
     
     Args:
         titles: Список заголовков документа
@@ -115,28 +359,132 @@ def identify_document_type(titles: List[str]) -> Dict[str, Any]:
     Returns:
         Словарь с информацией о типе документа
     """
-    try:
-        from langchain_openai import ChatOpenAI
-        from langchain_core.messages import SystemMessage, HumanMessage
+    key = _titles_cache_key(titles)
+    cached = _document_type_cache_get(key)
+    DOCUMENT_TYPE_CACHE.labels("miss" if cached is None else "hit").inc()
+    if cached is not None:
+        logger.info(f"Тип документа взят из кэша: {cached.get('document_type', 'unknown')}")
+        return cached
+
+    result = classify_document_type_by_rules(titles)
+    if result["confidence"] >= DOC_TYPE_MIN_CONFIDENCE:
+        logger.info(f"Тип документа определен правилами: {result['document_type']} ({result['document_name']})")
+    elif DOC_TYPE_LLM_ENABLED:
+        llm_started = time.perf_counter()
+        llm_result = _identify_document_type_llm(titles)
+        DOCUMENT_TYPE_LLM_DURATION.labels("error" if "error" in llm_result else "ok").observe(
+            time.perf_counter() - llm_started
+        )
+        # Правило с низкой уверенностью всё же лучше, чем пустой ответ LLM
+        if float(llm_result.get("confidence") or 0.0) >= result["confidence"]:
+            result = llm_result
+
+    if "error" not in result:
+        _document_type_cache_put(key, result)
+    return result
+
+
+def submit_document_type_identification(titles: List[str]) -> "Future[Dict[str, Any]]":
+    """
+    Запускает identify_document_type в фоновом потоке, чтобы ожидание LLM
+    шло параллельно с созданием чанков.
+    
+    Args:
+        titles: Список заголовков документа
+    
+    Returns:
+        Future с информацией о типе документа
+    """
+    return _doc_type_executor.submit(identify_document_type, list(titles))
+
+
+def _document_type_llm_config() -> Union[Tuple[str, ...], None]:
+    """Параметры клиента LLM из окружения; None, если ни один провайдер не настроен."""
+    llm_provider = os.getenv("LLM_PROVIDER", "openai").lower().strip()
+    llm_model_name = os.getenv("LLM_MODEL_NAME", "")
+    llm_url = os.getenv("LLM_URL_MODEL", "")
+    llm_api_key = os.getenv("LLM_API_KEY", "")
 
-        llm_provider = os.getenv("LLM_PROVIDER", "openai").lower().strip()
-        llm_model_name = os.getenv("LLM_MODEL_NAME", "")
-        llm_url = os.getenv("LLM_URL_MODEL", "")
-        llm_api_key = os.getenv("LLM_API_KEY", "")
+    gigachat_credentials = os.getenv("GIGACHAT_CREDENTIALS", "")
+    gigachat_scope = os.getenv("GIGACHAT_SCOPE", "GIGACHAT_API_PERS")
+    gigachat_model = os.getenv("GIGACHAT_MODEL", "GigaChat-2")
 
-        gigachat_credentials = os.getenv("GIGACHAT_CREDENTIALS", "")
-        gigachat_scope = os.getenv("GIGACHAT_SCOPE", "GIGACHAT_API_PERS")
-        gigachat_model = os.getenv("GIGACHAT_MODEL", "GigaChat-2")
+    yandex_api_key = os.getenv("YANDEX_CLOUD_API_KEY", "")
+    yandex_folder = os.getenv("YANDEX_CLOUD_FOLDER", "")
+    yandex_model = os.getenv("YANDEX_CLOUD_MODEL", "yandexgpt-5-lite/latest")
 
-        yandex_api_key = os.getenv("YANDEX_CLOUD_API_KEY", "")
-        yandex_folder = os.getenv("YANDEX_CLOUD_FOLDER", "")
-        yandex_model = os.getenv("YANDEX_CLOUD_MODEL", "yandexgpt-5-lite/latest")
+    has_openai = llm_model_name and llm_url
+    has_gigachat = gigachat_credentials
+    has_yandex = yandex_api_key and yandex_folder
 
-        has_openai = llm_model_name and llm_url
-        has_gigachat = gigachat_credentials
-        has_yandex = yandex_api_key and yandex_folder
+    if not has_openai and not has_gigachat and not has_yandex:
+        return None
+    if llm_provider == "gigachat" and has_gigachat:
+        return ("gigachat", gigachat_credentials, gigachat_scope, gigachat_model)
+    if llm_provider == "yandex" and has_yandex:
+        return ("yandex", yandex_api_key, yandex_folder, yandex_model)
+    return ("openai", llm_model_name, llm_url, llm_api_key)
+
+
+@lru_cache(maxsize=4)
+def _make_document_type_llm(config: Tuple[str, ...]):
+    """Клиент LLM создаётся один раз на набор параметров, а не на каждый документ."""
+    provider = config[0]
+    if provider == "gigachat":
+        from langchain_gigachat import GigaChat
+        _, credentials, scope, model = config
+        return GigaChat(
+            credentials=credentials,
+            scope=scope,
+            model=model,
+            temperature=0.0,
+            max_tokens=256,
+            timeout=15,
+            verify_ssl_certs=False,
+        )
+
+    from langchain_openai import ChatOpenAI
+    if provider == "yandex":
+        _, api_key, folder, model = config
+        full_model = model if model.startswith("gpt://") else f"gpt://{folder}/{model}"
+        return ChatOpenAI(
+            model=full_model,
+            openai_api_base="https://ai.api.cloud.yandex.net/v1",
+            openai_api_key=api_key,
+            temperature=0.0,
+            max_retries=2,
+            timeout=15,
+            max_tokens=256,
+            default_headers={"x-folder-id": folder},
+        )
+    _, model, url, api_key = config
+    return ChatOpenAI(
+        model=model,
+        temperature=0.0,
+        openai_api_base=url,
+        openai_api_key=api_key,
+        max_retries=2,
+        timeout=15,
+        max_tokens=256,
+    )
 
-        if not has_openai and not has_gigachat and not has_yandex:
+
+def _identify_document_type_llm(titles: List[str]) -> Dict[str, Any]:
+    """
+    Определяет тип документа на основе заголовков через LLM.
+    
+    Args:
+        titles: Список заголовков документа
+    
+    Returns:
+        Словарь с информацией о типе документа
+    """
+    try:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        config = _document_type_llm_config()
+
+        if config is None:
             logger.warning("LLM не настроен, пропускаем определение типа документа")
             return {
                 "document_type": "unknown",
@@ -187,39 +535,7 @@ def identify_document_type(titles: List[str]) -> Dict[str, Any]:
 
 Определи тип и полное официальное название этого документа."""
 
-        if llm_provider == "gigachat" and has_gigachat:
-            from langchain_gigachat import GigaChat
-            llm = GigaChat(
-                credentials=gigachat_credentials,
-                scope=gigachat_scope,
-                model=gigachat_model,
-                temperature=0.0,
-                max_tokens=256,
-                timeout=15,
-                verify_ssl_certs=False,
-            )
-        elif llm_provider == "yandex" and has_yandex:
-            full_model = yandex_model if yandex_model.startswith("gpt://") else f"gpt://{yandex_folder}/{yandex_model}"
-            llm = ChatOpenAI(
-                model=full_model,
-                openai_api_base="https://ai.api.cloud.yandex.net/v1",
-                openai_api_key=yandex_api_key,
-                temperature=0.0,
-                max_retries=2,
-                timeout=15,
-                max_tokens=256,
-                default_headers={"x-folder-id": yandex_folder},
-            )
-        else:
-            llm = ChatOpenAI(
-                model=llm_model_name,
-                temperature=0.0,
-                openai_api_base=llm_url,
-                openai_api_key=llm_api_key,
-                max_retries=2,
-                timeout=15,
-                max_tokens=256,
-            )
+        llm = _make_document_type_llm(config)
         
         # Отправляем запрос с использованием парсера
         try:
@@ -369,23 +685,108 @@ def identify_document_type(titles: List[str]) -> Dict[str, Any]:
         }
 
 
-def create_llm_chunks(
-    data_source: Union[str, Dict[str, Any]], 
-    min_size: int = 50,
-    document_name: str = None,
-    document_type_info: Dict[str, Any] = None
-) -> List[Dict[str, Any]]:
+def split_content_into_items(content: str) -> List[str]:
     """
-    Создаёт чанки в формате, готовом для передачи в LLM.
+    Разбивает content на отдельные нумерованные пункты.
+    Возвращает список пунктов, где каждый пункт начинается с цифры и точки/скобки.
+    Формат: "1. текст", "2. текст", "1) текст", "2) текст"
+
+    Дополнительно:
+    Если внутри content затесался маркер новой статьи (например,
+    "**Статья 15.** Категории преступлений"), не приклеиваем его как
+    продолжение предыдущего пункта — режем по этим маркерам отдельно
+    и выкидываем их сами (название статьи уйдёт в title чанка через дерево;
+    здесь же мы спасаем границы между пунктами разных статей).
+    """
+    if not content or not content.strip():
+        return []
     
-    Args:
-        data_source: Путь к JSON файлу (str) или словарь с данными дерева (Dict)
-        min_size: Минимальный размер текста для создания чанка (по умолчанию 50)
-        document_name: Имя документа для генерации fragment_id
-        document_type_info: Информация о типе документа (для добавления source)
+    # 1) Сначала вырезаем из content любые «жирные» маркеры статей,
+    # чтобы они не приклеивались к предыдущему нумерованному пункту.
+    # Случай возникает, когда GarantProcessor/ConsultantProcessor по какой-то
+    # причине не отделили статью в отдельный узел дерева (например, заголовок
+    # пришёл не в том формате, который мы умеем превращать в "## ...").
+    content = _ARTICLE_MARKER_RE.sub('\n', content)
+
+    matches = list(_NUMBERED_ITEM_RE.finditer(content))
+    
+    if not matches:
+        # Если не найдены нумерованные пункты, проверяем есть ли нумерация в начале content
+        # Если content начинается с цифры и точки/скобки - это один пункт
+        if _NUMBERED_PREFIX_RE.match(content.strip()):
+            return [content.strip()]
+        # Иначе возвращаем весь content как один пункт (если >= min_size будет проверено позже)
+        return [content.strip()] if content.strip() else []
     
+    items = []
+    # Извлекаем каждый пункт (только текст пункта, без лишних символов)
+    for match in matches:
+        item_text = match.group(1).strip()
+        if item_text:
+            items.append(item_text)
+    
+    # Если не нашли пункты через паттерн, но content не пустой, возвращаем весь content
+    if not items and content.strip():
+        items = [content.strip()]
+    
+    return items
+
+
+class _Breadcrumb:
+    """
+    Звено breadcrumb: заголовок предка + ссылка на родительское звено.
+
+    Дети одного узла разделяют звенья предков, поэтому спуск по дереву не
+    копирует списки заголовков. breadcrumb_path/breadcrumb_text строятся
+    лениво — только для узлов, которые реально дают чанки, — один раз на
+    звено, и переиспользуются всеми потомками.
+    """
+
+    __slots__ = ("title", "level", "parent", "_path", "_text")
+
+    def __init__(self, title: str, level: int, parent: "_Breadcrumb" = None):
+        self.title = title
+        self.level = level
+        self.parent = parent
+        self._path = None
+        self._text = None
+
+    def _materialize(self) -> None:
+        # Поднимаемся до ближайшего уже посчитанного звена без рекурсии
+        pending = []
+        crumb = self
+        while crumb is not None and crumb._path is None:
+            pending.append(crumb)
+            crumb = crumb.parent
+        path = crumb._path if crumb is not None else []
+        text = crumb._text if crumb is not None else ""
+        for crumb in reversed(pending):
+            path = path + [{"level": crumb.level, "title": crumb.title, "position": len(path)}]
+            text = f"{text} > {crumb.title}" if text else crumb.title
+            crumb._path, crumb._text = path, text
+
+    @property
+    def path(self) -> List[Dict[str, Any]]:
+        if self._path is None:
+            self._materialize()
+        return self._path
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._materialize()
+        return self._text
+
+
+def _load_chunk_source(
+    data_source: Union[str, Dict[str, Any]],
+    document_name: str = None
+) -> Tuple[Any, str, Union[List[Dict[str, Any]], None]]:
+    """
+    Загружает дерево для чанкинга.
+
     Returns:
-        Список чанков в формате для LLM
+        Кортеж: (данные, имя документа, готовые чанки или None)
     """
     # Загружаем данные: либо из файла, либо используем переданный словарь
     if isinstance(data_source, str):
@@ -406,7 +807,7 @@ def create_llm_chunks(
             chunks_list = data["chunks"]
             if isinstance(chunks_list, list):
                 logger.info(f"Обнаружен файл с готовыми чанками, возвращаем {len(chunks_list)} чанков")
-                return chunks_list
+                return data, document_name, chunks_list
     else:
         # Это уже словарь с данными
         data = data_source
@@ -418,196 +819,146 @@ def create_llm_chunks(
             chunks_list = data["chunks"]
             if isinstance(chunks_list, list):
                 logger.info(f"Обнаружены готовые чанки, возвращаем {len(chunks_list)} чанков")
-                return chunks_list
+                return data, document_name, chunks_list
     
-    chunks = []
-    chunk_counter = 0
+    return data, document_name, None
+
+
+def iter_llm_chunks(
+    data_source: Union[str, Dict[str, Any]], 
+    min_size: int = 50,
+    document_name: str = None,
+    document_type_info: Dict[str, Any] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Лениво отдаёт чанки в формате, готовом для передачи в LLM.
+
+    Обход дерева итеративный (явный стек), поэтому глубина иерархии не
+    ограничена recursion limit, а время и память растут линейно от числа
+    узлов. Порядок и содержимое чанков совпадают с create_llm_chunks.
     
-    def split_content_into_items(content: str) -> List[str]:
-        """
-        Разбивает content на отдельные нумерованные пункты.
-        Возвращает список пунктов, где каждый пункт начинается с цифры и точки/скобки.
-        Формат: "1. текст", "2. текст", "1) текст", "2) текст"
-
-        Дополнительно:
-        Если внутри content затесался маркер новой статьи (например,
-        "**Статья 15.** Категории преступлений"), не приклеиваем его как
-        продолжение предыдущего пункта — режем по этим маркерам отдельно
-        и выкидываем их сами (название статьи уйдёт в title чанка через дерево;
-        здесь же мы спасаем границы между пунктами разных статей).
-        """
-        if not content or not content.strip():
-            return []
-        
-        import re
-        # 1) Сначала вырезаем из content любые «жирные» маркеры статей,
-        # чтобы они не приклеивались к предыдущему нумерованному пункту.
-        # Случай возникает, когда GarantProcessor/ConsultantProcessor по какой-то
-        # причине не отделили статью в отдельный узел дерева (например, заголовок
-        # пришёл не в том формате, который мы умеем превращать в "## ...").
-        article_marker_re = re.compile(
-            r'(?:^|\n)\s*[*_]{0,3}Статья\s+\d+[\w\u00b9\u00b2\u00b3\u2070-\u2079]*\.?[*_]{0,3}\s*[^\n]*',
-            re.IGNORECASE,
-        )
-        content = article_marker_re.sub('\n', content)
-
-        # Паттерн для нумерованных пунктов:
-        # Начинается с начала строки или после двойного переноса строки
-        # Затем цифра + точка/скобка + пробел + текст до следующего пункта или конца
-        # Примеры: "1. текст", "2. текст\n\nеще текст", "1) текст"
-        # Учитываем, что пункт может содержать несколько абзацев до следующего пункта
-        item_pattern = re.compile(
-            r'(?:^|\n\n|\n)(\d+[\.\)]\s+(?:[^\n]+(?:\n(?!\d+[\.\)])[^\n]*)*))',
-            re.MULTILINE
-        )
-        
-        matches = list(item_pattern.finditer(content))
-        
-        if not matches:
-            # Если не найдены нумерованные пункты, проверяем есть ли нумерация в начале content
-            # Если content начинается с цифры и точки/скобки - это один пункт
-            if re.match(r'^\d+[\.\)]\s+', content.strip()):
-                return [content.strip()]
-            # Иначе возвращаем весь content как один пункт (если >= min_size будет проверено позже)
-            return [content.strip()] if content.strip() else []
-        
-        items = []
-        # Извлекаем каждый пункт (только текст пункта, без лишних символов)
-        for match in matches:
-            item_text = match.group(1).strip()
-            if item_text:
-                items.append(item_text)
-        
-        # Если не нашли пункты через паттерн, но content не пустой, возвращаем весь content
-        if not items and content.strip():
-            items = [content.strip()]
-        
-        return items
+    Args:
+        data_source: Путь к JSON файлу (str) или словарь с данными дерева (Dict)
+        min_size: Минимальный размер текста для создания чанка (по умолчанию 50)
+        document_name: Имя документа для генерации fragment_id
+        document_type_info: Информация о типе документа (для добавления source)
     
-    def create_chunk(breadcrumb_text: str, title: str, item_content: str, breadcrumb_path: list, level: int, depth: int) -> Dict[str, Any]:
-        """
-        Создает один чанк из breadcrumb, title и content одного пункта.
-        """
-        nonlocal chunk_counter
-        
-        # Формируем combined_text: breadcrumb > title\n\nitem_content
-        if breadcrumb_text and title:
-            combined_text = f"{breadcrumb_text} > {title}"
-            if item_content:
-                combined_text += f"\n\n{item_content}"
-        elif title:
-            combined_text = title
-            if item_content:
-                combined_text += f"\n\n{item_content}"
-        elif breadcrumb_text:
-            combined_text = breadcrumb_text
-            if item_content:
-                combined_text += f"\n\n{item_content}"
-        else:
-            combined_text = item_content
-        
-        # Проверяем минимальный размер чанка (min_size символов)
-        if len(combined_text.strip()) < min_size:
-            return None
-        
-        chunk_counter += 1
-        
-        return {
-            "fragment_id": f"{document_name}_chunk_{chunk_counter}",
-            "hierarchy_context": {
-                "breadcrumb_path": breadcrumb_path,
-                "breadcrumb_text": breadcrumb_text,
-                "current_level": level,
-                "depth": depth
-            },
-            "fragment_data": {
-                "title": title,
-                "content": item_content,  # Только один пункт
-                "combined_text": combined_text,
-                "is_leaf_node": True,
-                "has_children": False,
-                "text_length": len(combined_text),
-                "source": document_type_info.get("document_name", "") if document_type_info else ""
-            }
-        }
+    Yields:
+        Чанки в формате для LLM
+    """
+    data, document_name, ready_chunks = _load_chunk_source(data_source, document_name)
+    if ready_chunks is not None:
+        yield from ready_chunks
+        return
+    
+    source = document_type_info.get("document_name", "") if document_type_info else ""
+    chunk_counter = 0
     
-    def process_node(node, breadcrumb_titles=[], breadcrumb_levels=[], depth=0):
-        nonlocal chunk_counter
+    # Стек: (узел, breadcrumb родителей, глубина). Дети кладутся в обратном
+    # порядке, чтобы обход совпадал с прежним рекурсивным (pre-order).
+    stack = [(data, None, 0)]
+    while stack:
+        node, breadcrumb, depth = stack.pop()
         
         title = node.get("title", "").strip()
-        content = node.get("content", "").strip()
-        level = node.get("level", 0)
         children = node.get("children", [])
-        
-        # Обновляем breadcrumb для текущего узла (включая его title)
-        # Это будет использоваться для детей этого узла
-        current_breadcrumb_titles = breadcrumb_titles + [title] if title else breadcrumb_titles
-        current_breadcrumb_levels = breadcrumb_levels + [level] if title else breadcrumb_levels
-        
-        # Формируем breadcrumb path для текущего узла
-        breadcrumb_path = []
-        # Защита от неправильной распаковки: убеждаемся, что списки имеют одинаковую длину
-        min_len = min(len(breadcrumb_titles), len(breadcrumb_levels))
-        for i in range(min_len):
-            bc_title = breadcrumb_titles[i]
-            bc_level = breadcrumb_levels[i]
-            breadcrumb_path.append({
-                "level": bc_level,
-                "title": bc_title,
-                "position": i
-            })
-        
-        # Breadcrumb text - только родительские заголовки
-        breadcrumb_text = " > ".join(breadcrumb_titles) if breadcrumb_titles else ""
+        level = node.get("level", 0)
         
         # Создаём чанки ТОЛЬКО для листовых узлов (без детей)
         # Узлы с детьми НЕ создают чанки для себя - только для своих детей
-        is_leaf = len(children) == 0
-        
-        if is_leaf:
-            # Листовой узел - разбиваем content на отдельные пункты и создаем чанк для каждого
+        if not children:
+            content = node.get("content", "").strip()
             if content:
                 # Разбиваем content на отдельные нумерованные пункты
-                items = split_content_into_items(content)
-                
-                if items:
-                    # Создаем отдельный чанк для каждого пункта
-                    for item in items:
-                        chunk = create_chunk(breadcrumb_text, title, item, breadcrumb_path, level, depth)
-                        if chunk:  # Проверка на минимальный размер
-                            chunks.append(chunk)
-                else:
-                    # Если не удалось разбить на пункты, создаем чанк из всего content
-                    chunk = create_chunk(breadcrumb_text, title, content, breadcrumb_path, level, depth)
-                    if chunk:  # Проверка на минимальный размер
-                        chunks.append(chunk)
+                # (если не удалось разбить на пункты — чанк из всего content)
+                items = split_content_into_items(content) or [content]
             elif title:
                 # Есть только title, без content - создаем чанк если достаточно длинный
-                chunk = create_chunk(breadcrumb_text, title, "", breadcrumb_path, level, depth)
-                if chunk:  # Проверка на минимальный размер
-                    chunks.append(chunk)
+                items = [""]
+            else:
+                items = []
+            
+            # Breadcrumb text - только родительские заголовки
+            breadcrumb_text = breadcrumb.text if breadcrumb is not None else ""
+            for item_content in items:
+                # Формируем combined_text: breadcrumb > title\n\nitem_content
+                if breadcrumb_text and title:
+                    combined_text = f"{breadcrumb_text} > {title}"
+                elif title:
+                    combined_text = title
+                elif breadcrumb_text:
+                    combined_text = breadcrumb_text
+                else:
+                    combined_text = ""
+                if item_content:
+                    combined_text = f"{combined_text}\n\n{item_content}" if combined_text else item_content
+                
+                # Проверяем минимальный размер чанка (min_size символов)
+                if len(combined_text.strip()) < min_size:
+                    continue
+                
+                chunk_counter += 1
+                yield {
+                    "fragment_id": f"{document_name}_chunk_{chunk_counter}",
+                    "hierarchy_context": {
+                        "breadcrumb_path": breadcrumb.path if breadcrumb is not None else [],
+                        "breadcrumb_text": breadcrumb_text,
+                        "current_level": level,
+                        "depth": depth
+                    },
+                    "fragment_data": {
+                        "title": title,
+                        "content": item_content,  # Только один пункт
+                        "combined_text": combined_text,
+                        "is_leaf_node": True,
+                        "has_children": False,
+                        "text_length": len(combined_text),
+                        "source": source
+                    }
+                }
+            continue
         
-        # Рекурсия в детей - передаем обновленный breadcrumb (включая текущий title)
-        for child in children:
-            process_node(child, current_breadcrumb_titles, current_breadcrumb_levels, depth + 1)
+        # Спуск в детей - передаем обновленный breadcrumb (включая текущий title)
+        child_breadcrumb = _Breadcrumb(title, level, breadcrumb) if title else breadcrumb
+        for child in reversed(children):
+            stack.append((child, child_breadcrumb, depth + 1))
+
+
+def create_llm_chunks(
+    data_source: Union[str, Dict[str, Any]], 
+    min_size: int = 50,
+    document_name: str = None,
+    document_type_info: Dict[str, Any] = None
+) -> List[Dict[str, Any]]:
+    """
+    Создаёт чанки в формате, готовом для передачи в LLM.
     
-    process_node(data)
-    return chunks
+    Args:
+        data_source: Путь к JSON файлу (str) или словарь с данными дерева (Dict)
+        min_size: Минимальный размер текста для создания чанка (по умолчанию 50)
+        document_name: Имя документа для генерации fragment_id
+        document_type_info: Информация о типе документа (для добавления source)
+    
+    Returns:
+        Список чанков в формате для LLM
+    """
+    return list(iter_llm_chunks(
+        data_source,
+        min_size=min_size,
+        document_name=document_name,
+        document_type_info=document_type_info
+    ))
 
 
-def process_document_to_chunks(
-    document_path: str,
-    min_size: int = 50
-) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+def extract_document_tree(document_path: str) -> Tuple[Dict[str, Any], str]:
     """
-    Полный цикл обработки документа: документ → docx2json_outline → определение типа → chunker → чанки для LLM.
+    Шаг 1 обработки: документ → docx2json_outline → дерево структуры.
     
     Args:
         document_path: Путь к исходному документу (DOCX, PDF и т.д.)
-        min_size: Минимальный размер текста для создания чанка
     
     Returns:
-        Кортеж: (список чанков в формате для LLM, информация о типе документа)
+        Кортеж: (дерево документа, имя документа)
     """
     # Нормализуем путь к документу
     doc_path = Path(document_path).resolve()
@@ -633,27 +984,464 @@ def process_document_to_chunks(
         tree = result
     logger.info("✓ Структура извлечена")
     
-    # Шаг 2: Определение типа документа
-    logger.info("[Шаг 2] Определение типа документа...")
-    titles = extract_all_titles(tree)
-    document_type_info = identify_document_type(titles)
+    return tree, doc_path.stem
+
+
+def _log_document_type(document_type_info: Dict[str, Any]) -> None:
     logger.info(f"✓ Тип документа: {document_type_info.get('document_type', 'unknown')}")
     logger.info(f"✓ Название документа: {document_type_info.get('document_name', 'Название не определено')}")
+
+
+def prepare_document(document_path: str) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+    """
+    Шаги 1-2 обработки: документ → docx2json_outline → определение типа.
+    
+    Args:
+        document_path: Путь к исходному документу (DOCX, PDF и т.д.)
+    
+    Returns:
+        Кортеж: (дерево документа, информация о типе документа, имя документа)
+    """
+    tree, document_name = extract_document_tree(document_path)
+    
+    # Шаг 2: Определение типа документа
+    logger.info("[Шаг 2] Определение типа документа...")
+    document_type_info = identify_document_type(extract_document_type_titles(tree))
+    _log_document_type(document_type_info)
+    
+    return tree, document_type_info, document_name
+
+
+def apply_document_source(chunks: Iterable[Dict[str, Any]], document_type_info: Dict[str, Any]) -> None:
+    """Проставляет fragment_data.source в чанках, созданных до определения типа документа."""
+    source = document_type_info.get("document_name", "") if document_type_info else ""
+    for chunk in chunks:
+        chunk["fragment_data"]["source"] = source
+
+
+def process_document_to_chunks(
+    document_path: str,
+    min_size: int = 50
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Полный цикл обработки документа: документ → docx2json_outline → определение типа → chunker → чанки для LLM.
+
+    Определение типа (возможно, с вызовом LLM) идёт в фоне параллельно с
+    созданием чанков; source проставляется в чанки после его завершения.
+    
+    Args:
+        document_path: Путь к исходному документу (DOCX, PDF и т.д.)
+        min_size: Минимальный размер текста для создания чанка
+    
+    Returns:
+        Кортеж: (список чанков в формате для LLM, информация о типе документа)
+    """
+    tree, document_name = extract_document_tree(document_path)
+    
+    # Шаг 2: Определение типа документа — в фоне
+    logger.info("[Шаг 2] Определение типа документа (в фоне)...")
+    document_type_future = submit_document_type_identification(extract_document_type_titles(tree))
     
     # Шаг 3: Создание чанков
     logger.info("[Шаг 3] Создание чанков для LLM...")
-    document_name = doc_path.stem
     chunks = create_llm_chunks(
         tree, 
         min_size=min_size, 
-        document_name=document_name,
-        document_type_info=document_type_info
+        document_name=document_name
     )
     logger.info(f"✓ Создано {len(chunks)} чанков")
     
+    document_type_info = document_type_future.result()
+    _log_document_type(document_type_info)
+    apply_document_source(chunks, document_type_info)
+    
     return chunks, document_type_info
 
 
+# ---------- Язык документа ----------
+#
+# Язык определяется один раз на документ (по первым DOCUMENT_LANGUAGE_SAMPLE_CHARS
+# символам чанков) и уходит в задачи генерации полем "language" — agent_api
+# не определяет его заново для каждого чанка. Только классы символов
+# кириллицы; для текста без кириллицы язык не указывается (None) и
+# определяется в agent_api.
+
+DOCUMENT_LANGUAGE_SAMPLE_CHARS = int(os.getenv("CHUNKER_LANGUAGE_SAMPLE_CHARS", "20000"))
+
+_TAJIK_LETTERS = re.compile(r"[ҷҳқғӯӣҶҲҚҒӮӢ]")
+_BELARUSIAN_LETTERS = re.compile(r"[ўЎ]")
+_BELARUSIAN_I = re.compile(r"[іІ]")
+_RUSSIAN_I = re.compile(r"[иИ]")
+_CYRILLIC = re.compile(r"[Ѐ-ӿ]")
+_LETTERS = re.compile(r"[^\W\d_]")
+
+
+def detect_document_language(texts: Iterable[str], sample_chars: int = None) -> Union[str, None]:
+    """
+    Язык документа по текстам его чанков.
+
+    Args:
+        texts: Тексты чанков по порядку
+        sample_chars: Сколько символов учитывать (по умолчанию DOCUMENT_LANGUAGE_SAMPLE_CHARS)
+
+    Returns:
+        'ru', 'be', 'tg' или None, если кириллицы в тексте меньше половины букв
+    """
+    limit = sample_chars or DOCUMENT_LANGUAGE_SAMPLE_CHARS
+    parts, size = [], 0
+    for text in texts:
+        parts.append(text[:limit - size])
+        size += len(parts[-1])
+        if size >= limit:
+            break
+    sample = "\n".join(parts)
+
+    letters = len(_LETTERS.findall(sample))
+    if not letters or len(_CYRILLIC.findall(sample)) * 2 < letters:
+        return None
+    # Буквы одного языка — не реже 1 на 200 (единичная цитата язык не меняет);
+    # в белорусском нет «и»
+    if len(_TAJIK_LETTERS.findall(sample)) * 200 >= letters:
+        return "tg"
+    if len(_BELARUSIAN_LETTERS.findall(sample)) * 200 >= letters:
+        return "be"
+    if len(_BELARUSIAN_I.findall(sample)) > len(_RUSSIAN_I.findall(sample)):
+        return "be"
+    return "ru"
+
+
+def iter_chunk_response_json(
+    response_fields: Dict[str, Any],
+    make_chunks: Callable[[], Iterable[Dict[str, Any]]],
+    batch_size: int = 256,
+    make_detailed_chunks: Callable[[], Iterable[Dict[str, Any]]] = None,
+    deferred_fields: Callable[[], Dict[str, Any]] = None,
+    chunk_texts: List[str] = None
+) -> Iterator[bytes]:
+    """
+    Потоково сериализует ответ /chunk/ без сборки всего ответа в памяти.
+
+    Чанки генерируются дважды (для "chunks" и "chunks_detailed") — обход дерева
+    детерминирован и дешевле, чем держать и кодировать весь список целиком.
+    "num_chunks" пишется в конце объекта, когда количество уже известно.
+
+    Статус 200 к этому моменту уже отправлен, поэтому ошибка при генерации
+    не обрывает ответ: открытый массив закрывается, в объект пишется поле
+    "error" — JSON остаётся валидным, а клиент видит, что ответ неполный.
+    
+    Args:
+        response_fields: Скалярные поля ответа (filename, file_type, min_size, ...)
+        make_chunks: Фабрика, каждый вызов которой заново отдаёт чанки
+        batch_size: Сколько чанков кодировать в один кусок ответа
+        make_detailed_chunks: Фабрика чанков для "chunks_detailed" (по умолчанию make_chunks);
+            вызывается после отправки "chunks", поэтому может дождаться фоновых результатов
+        deferred_fields: Поля, которые пишутся после "chunks_detailed" (например, тип
+            документа, определяемый параллельно с отправкой чанков)
+        chunk_texts: Готовые тексты для "chunks" (первый проход выполнен заранее);
+            make_chunks тогда вызывается только для "chunks_detailed"
+    
+    Yields:
+        Части JSON-документа в UTF-8
+    """
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    def array(values: Iterable[Any]) -> Iterator[str]:
+        batch = []
+        first = True
+        for value in values:
+            batch.append(dumps(value))
+            if len(batch) >= batch_size:
+                yield ("" if first else ",") + ",".join(batch)
+                first, batch = False, []
+        if batch:
+            yield ("" if first else ",") + ",".join(batch)
+
+    num_chunks = 0
+
+    def counted(chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal num_chunks
+        for chunk in chunks:
+            num_chunks += 1
+            yield chunk
+
+    head = ",".join(f"{dumps(key)}:{dumps(value)}" for key, value in response_fields.items())
+    yield ("{" + head + ("," if head else "") + '"chunks":[').encode("utf-8")
+    try:
+        # Простой список текстов для обратной совместимости
+        if chunk_texts is None:
+            texts = (chunk["fragment_data"]["combined_text"] for chunk in counted(make_chunks()))
+        else:
+            texts, num_chunks = chunk_texts, len(chunk_texts)
+        for part in array(texts):
+            yield part.encode("utf-8")
+        # Полная информация о чанках с иерархией
+        yield '],"chunks_detailed":['.encode("utf-8")
+        for part in array((make_detailed_chunks or make_chunks)()):
+            yield part.encode("utf-8")
+        tail = "".join(f",{dumps(key)}:{dumps(value)}" for key, value in (deferred_fields() if deferred_fields else {}).items())
+    except Exception as e:
+        logger.error(f"Ошибка при потоковой отправке чанков: {str(e)}", exc_info=True)
+        tail = f',"error":{dumps(f"Ошибка при обработке файла: {str(e)}")}'
+    yield f']{tail},"num_chunks":{num_chunks}}}'.encode("utf-8")
+
+
+# ---------- Пакетная обработка ----------
+#
+# /chunk/batch: документы разбираются в пуле процессов (конвертация и разбор
+# структуры упираются в CPU и GIL), тип документа определяется в основном
+# процессе (общий кэш и фоновые потоки), результаты отдаются NDJSON-потоком
+# по мере готовности каждого документа.
+
+BATCH_WORKERS = int(os.getenv("CHUNKER_BATCH_WORKERS", "0")) or (os.cpu_count() or 1)
+BATCH_MAX_FILES = int(os.getenv("CHUNKER_BATCH_MAX_FILES", "500"))
+
+# Расширения документов, которые берутся из архивов; остальные файлы пропускаются
+BATCH_DOCUMENT_EXTENSIONS = {".docx", ".doc", ".pdf", ".rtf", ".odt", ".txt", ".md", ".html", ".htm"}
+_ZIP_EXTENSIONS = (".zip",)
+_TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+_batch_executor: Union[ProcessPoolExecutor, None] = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ProcessPoolExecutor:
+    """Пул процессов создаётся при первом пакетном запросе и переиспользуется."""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            # spawn: основной процесс держит потоки (uvicorn, пул определения типа),
+            # fork из такого процесса небезопасен
+            _batch_executor = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Запущен пул пакетной обработки: {BATCH_WORKERS} процессов")
+        return _batch_executor
+
+
+def _reset_batch_executor(executor: ProcessPoolExecutor) -> None:
+    """Сбрасывает сломанный пул (упавший процесс), следующий запрос создаст новый."""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is executor:
+            _batch_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_batch_executor() -> None:
+    global _batch_executor
+    with _batch_executor_lock:
+        executor, _batch_executor = _batch_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def chunk_document_file(document_path: str, min_size: int = 50) -> Dict[str, Any]:
+    """
+    Разбор одного документа в процессе пула: структура → чанки (без типа документа).
+    
+    Args:
+        document_path: Путь к документу
+        min_size: Минимальный размер текста для создания чанка
+    
+    Returns:
+        Словарь: chunks (source не проставлен), titles, language, elapsed_s
+    """
+    started = time.perf_counter()
+    tree, document_name = extract_document_tree(document_path)
+    chunks = create_llm_chunks(tree, min_size=min_size, document_name=document_name)
+    return {
+        "chunks": chunks,
+        "titles": extract_document_type_titles(tree),
+        "language": detect_document_language(chunk["fragment_data"]["combined_text"] for chunk in chunks),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def _is_archive(filename: str) -> bool:
+    name = filename.lower()
+    return name.endswith(_ZIP_EXTENSIONS) or name.endswith(_TAR_EXTENSIONS)
+
+
+def _file_extension(filename: str) -> str:
+    return filename.lower().split('.')[-1] if '.' in filename else ''
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    # Без флага UTF-8 zipfile декодирует имя как cp437; архивы из Windows
+    # с русскими именами на деле в cp866
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp866")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _save_batch_file(work_dir: Path, index: int, filename: str, data: bytes) -> Path:
+    """Каждый файл — в своей поддиректории: имена из разных архивов могут совпадать."""
+    target_dir = work_dir / f"{index:05d}"
+    target_dir.mkdir(parents=True, exist_ok=True)
+    # Только базовое имя: защита от путей вида ../../etc в архивах
+    path = target_dir / (Path(filename).name or f"document_{index}")
+    path.write_bytes(data)
+    return path
+
+
+def _iter_archive_members(archive_path: Path) -> Iterator[Tuple[str, bytes]]:
+    """Отдаёт (имя, содержимое) документов из zip/tar-архива."""
+    name = archive_path.name.lower()
+    if name.endswith(_ZIP_EXTENSIONS):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    yield _zip_member_name(info), zf.read(info)
+    else:
+        with tarfile.open(archive_path) as tf:
+            for member in tf:
+                if member.isfile():
+                    yield member.name, tf.extractfile(member).read()
+
+
+def expand_batch_uploads(
+    uploads: Iterable[Tuple[str, bytes]],
+    work_dir: Path
+) -> Tuple[List[Tuple[str, Path]], List[str]]:
+    """
+    Сохраняет загруженные файлы во временную директорию, распаковывая архивы.
+    
+    Args:
+        uploads: Пары (имя файла, содержимое)
+        work_dir: Временная директория пакета
+    
+    Returns:
+        Кортеж: (список (имя документа, путь), список пропущенных файлов)
+    """
+    documents: List[Tuple[str, Path]] = []
+    skipped: List[str] = []
+    for upload_index, (filename, data) in enumerate(uploads):
+        if not _is_archive(filename):
+            documents.append((filename, _save_batch_file(work_dir, len(documents), filename, data)))
+            continue
+        archive_path = _save_batch_file(work_dir / "archives", upload_index, filename, data)
+        try:
+            members = list(_iter_archive_members(archive_path))
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            raise ValueError(f"Не удалось распаковать архив {filename}: {e}")
+        for member_name, member_data in members:
+            base_name = Path(member_name).name
+            if base_name.startswith(".") or "__MACOSX" in member_name \
+                    or Path(base_name).suffix.lower() not in BATCH_DOCUMENT_EXTENSIONS:
+                skipped.append(f"{filename}/{member_name}")
+                continue
+            display_name = f"{filename}/{member_name}"
+            documents.append((display_name, _save_batch_file(work_dir, len(documents), base_name, member_data)))
+    if len(documents) > BATCH_MAX_FILES:
+        raise ValueError(f"Слишком много документов в пакете: {len(documents)} > {BATCH_MAX_FILES}")
+    return documents, skipped
+
+
+def _ndjson(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def iter_batch_results(
+    documents: List[Tuple[str, Path]],
+    min_size: int,
+    skipped: List[str] = None,
+    work_dir: Path = None
+) -> AsyncIterator[bytes]:
+    """
+    Обрабатывает документы в пуле процессов и отдаёт NDJSON-строки по мере готовности.
+
+    Строки:
+      {"event": "started", "total": N, "workers": W, "skipped": [...]}
+      {"event": "document", "index": i, "filename": ..., "status": "ok", "completed": k, "total": N,
+       "elapsed_s": ..., "num_chunks": ..., "chunks": [...], "chunks_detailed": [...], "document_type": {...},
+       "language": "ru" | "be" | "tg" | null, ...}
+      {"event": "document", "index": i, "filename": ..., "status": "error", "error": "...", "completed": k, "total": N}
+      {"event": "done", "total": N, "succeeded": ..., "failed": ..., "elapsed_s": ...}
+    
+    Args:
+        documents: Список (имя документа, путь к файлу)
+        min_size: Минимальный размер текста для создания чанка
+        skipped: Файлы из архивов, которые не являются документами
+        work_dir: Временная директория пакета (удаляется по завершении)
+    """
+    started = time.perf_counter()
+    executor = _get_batch_executor()
+    total = len(documents)
+    completed = succeeded = 0
+    # Задача → (этап, индекс документа, результат разбора)
+    pending: Dict["asyncio.Future", Tuple[str, int, Dict[str, Any]]] = {}
+    try:
+        yield _ndjson({"event": "started", "total": total, "workers": BATCH_WORKERS, "skipped": skipped or []})
+
+        for index, (_, path) in enumerate(documents):
+            future = asyncio.wrap_future(executor.submit(chunk_document_file, str(path), min_size))
+            pending[future] = ("chunk", index, None)
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                stage, index, parsed = pending.pop(future)
+                filename = documents[index][0]
+                error = future.exception()
+
+                if stage == "chunk" and error is None:
+                    # Разбор готов — определяем тип, не задерживая остальные документы
+                    parsed = future.result()
+                    type_future = asyncio.wrap_future(submit_document_type_identification(parsed["titles"]))
+                    pending[type_future] = ("type", index, parsed)
+                    continue
+
+                completed += 1
+                BATCH_DOCUMENTS.labels("ok" if error is None else "error").inc()
+                if error is not None:
+                    if isinstance(error, BrokenProcessPool):
+                        _reset_batch_executor(executor)
+                    logger.error(f"Ошибка при обработке {filename}: {error}")
+                    yield _ndjson({
+                        "event": "document", "index": index, "filename": filename, "status": "error",
+                        "error": f"{type(error).__name__}: {error}", "completed": completed, "total": total,
+                    })
+                    continue
+
+                document_type_info = future.result()
+                chunks = parsed["chunks"]
+                apply_document_source(chunks, document_type_info)
+                succeeded += 1
+                yield _ndjson({
+                    "event": "document",
+                    "index": index,
+                    "filename": filename,
+                    "status": "ok",
+                    "completed": completed,
+                    "total": total,
+                    "elapsed_s": parsed["elapsed_s"],
+                    "file_type": _file_extension(filename),
+                    "chunking_method": "hierarchical_outline",
+                    "min_size": min_size,
+                    "document_type": document_type_info,
+                    "language": parsed["language"],
+                    "num_chunks": len(chunks),
+                    "chunks": [chunk["fragment_data"]["combined_text"] for chunk in chunks],
+                    "chunks_detailed": chunks,
+                })
+
+        yield _ndjson({
+            "event": "done", "total": total, "succeeded": succeeded, "failed": total - succeeded,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        })
+    finally:
+        # Клиент отключился — не тратим пул на ненужные документы
+        for future in pending:
+            future.cancel()
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
 @app.get("/")
 async def root():
     return {
@@ -662,8 +1450,10 @@ async def root():
         "description": "Сервис для создания чанков из документов с использованием docx2json_outline",
         "endpoints": {
             "/chunk/": "POST - обработка загруженного документа",
+            "/chunk/batch": "POST - пакетная обработка нескольких документов или архива",
             "/chunk-docx/": "POST - legacy endpoint для DOCX файлов",
-            "/health": "GET - проверка состояния сервиса"
+            "/health": "GET - проверка состояния сервиса",
+            "/metrics": "GET - метрики Prometheus"
         }
     }
 
@@ -673,6 +1463,11 @@ async def health_check():
     return {"status": "healthy", "service": "chunker", "version": "2.0.0"}
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/chunk/")
 async def chunk_file(
     file: UploadFile = File(...),
@@ -698,30 +1493,55 @@ async def chunk_file(
             tmp_path = tmp.name
             logger.info(f"Создан временный файл: {tmp_path}")
         
-        # Обрабатываем документ через docx2json_outline и создаем чанки
-        result = process_document_to_chunks(tmp_path, min_size=min_size)
-        # Защита от неправильной распаковки: убеждаемся, что возвращается ровно 2 значения
-        if isinstance(result, tuple) and len(result) == 2:
-            chunks, document_type_info = result
-        else:
-            raise ValueError(f"process_document_to_chunks вернул неожиданное количество значений: {len(result) if isinstance(result, tuple) else 'не кортеж'}")
-        
-        logger.info(f"Успешно обработан файл, создано {len(chunks)} чанков")
-        
-        # Преобразуем чанки в формат для ответа
-        # Извлекаем только текстовые данные для обратной совместимости
-        chunks_text = [chunk["fragment_data"]["combined_text"] for chunk in chunks]
+        # Обрабатываем документ через docx2json_outline; тип документа
+        # определяется в фоне. Первый обход (тексты для "chunks") выполняется
+        # до ответа, чтобы ошибка разбиения вернула 500, а не оборванный JSON;
+        # "chunks_detailed" создаются лениво во время отправки, уже с типом документа
+        tree, document_name = extract_document_tree(tmp_path)
+        document_type_future = submit_document_type_identification(extract_document_type_titles(tree))
+
+        def make_chunks(document_type_info: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+            return iter_llm_chunks(
+                tree,
+                min_size=min_size,
+                document_name=document_name,
+                document_type_info=document_type_info
+            )
+
+        # Выборка текста для языка набирается при первом обходе
+        language_sample: List[str] = []
+
+        def make_sampled_chunks() -> Iterator[Dict[str, Any]]:
+            size = 0
+            for chunk in make_chunks():
+                if size < DOCUMENT_LANGUAGE_SAMPLE_CHARS:
+                    language_sample.append(chunk["fragment_data"]["combined_text"])
+                    size += len(language_sample[-1])
+                yield chunk
+
+        chunk_texts = [chunk["fragment_data"]["combined_text"] for chunk in make_sampled_chunks()]
+
+        logger.info("Успешно обработан файл, отправляем чанки потоком")
         
-        return {
-            "filename": file.filename,
-            "file_type": file_extension,
-            "num_chunks": len(chunks),
-            "chunks": chunks_text,  # Простой список текстов для обратной совместимости
-            "chunks_detailed": chunks,  # Полная информация о чанках с иерархией
-            "chunking_method": "hierarchical_outline",
-            "min_size": min_size,
-            "document_type": document_type_info  # Информация о типе документа
-        }
+        return StreamingResponse(
+            iter_chunk_response_json(
+                {
+                    "filename": file.filename,
+                    "file_type": file_extension,
+                    "chunking_method": "hierarchical_outline",
+                    "min_size": min_size
+                },
+                make_chunks,
+                make_detailed_chunks=lambda: make_chunks(document_type_future.result()),
+                # Информация о типе и язык документа
+                deferred_fields=lambda: {
+                    "document_type": document_type_future.result(),
+                    "language": detect_document_language(language_sample),
+                },
+                chunk_texts=chunk_texts,
+            ),
+            media_type="application/json"
+        )
         
     except Exception as e:
         logger.error(f"Ошибка при обработке файла: {str(e)}", exc_info=True)
@@ -736,6 +1556,36 @@ async def chunk_file(
             logger.info(f"Удален временный файл: {tmp_path}")
 
 
+@app.post("/chunk/batch")
+async def chunk_batch(
+    files: List[UploadFile] = File(...),
+    min_size: int = Query(50, description="Минимальный размер текста для создания чанка")
+):
+    """
+    Пакетная обработка: несколько документов и/или zip/tar-архивов с документами.
+    Документы разбираются параллельно в пуле процессов, результат по каждому
+    отдаётся строкой NDJSON сразу по готовности (см. iter_batch_results).
+    """
+    logger.info(f"Получен пакетный запрос: {len(files)} файлов")
+    work_dir = Path(tempfile.mkdtemp(prefix="gena_chunk_batch_"))
+    try:
+        uploads = [(file.filename or f"document_{i}", await file.read()) for i, file in enumerate(files)]
+        documents, skipped = expand_batch_uploads(uploads, work_dir)
+    except ValueError as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.error(f"Ошибка при приёме пакета: {str(e)}", exc_info=True)
+        return JSONResponse(status_code=500, content={"error": f"Ошибка при приёме пакета: {str(e)}"})
+
+    logger.info(f"В пакете {len(documents)} документов, пропущено {len(skipped)} файлов")
+    return StreamingResponse(
+        iter_batch_results(documents, min_size, skipped=skipped, work_dir=work_dir),
+        media_type="application/x-ndjson"
+    )
+
+
 @app.post("/chunk-docx/")
 async def chunk_docx(file: UploadFile = File(...), min_size: int = 50):
     """
@@ -0,0 +1,145 @@
+"""
+Тесты на пакетную обработку POST /chunk/batch.
+
+Поведение, которое фиксируется:
+  - принимаются несколько файлов и zip/tar-архивы, файлы-не-документы пропускаются;
+  - результат по каждому документу — отдельная строка NDJSON со счётчиком прогресса,
+    ошибка одного документа не мешает остальным;
+  - имена из архивов не выходят за временную директорию пакета.
+
+Пул процессов в тестах подменяется пулом потоков, чтобы действовали patch'и.
+
+Запуск:
+    cd chunker && pytest test_batch_chunking.py -v
+"""
+
+import io
+import json
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as M
+
+
+def _tree(name):
+    return {"level": 0, "title": "", "content": "", "children": [
+        {"level": 1, "title": f"Статья 1. Положения документа {name}",
+         "content": "1. Первый пункт статьи достаточной длины.\n2. Второй пункт статьи достаточной длины.",
+         "children": []},
+    ]}
+
+
+def _fake_outline(path):
+    if Path(path).name.startswith("broken"):
+        raise ValueError("не удалось разобрать документ")
+    return _tree(Path(path).stem)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(M, "_get_batch_executor", lambda: executor)
+    fake_dt = {"document_type": "Кодекс", "document_name": "Тестовый кодекс", "confidence": 0.95}
+    with patch.object(M, "extract_outline_from_document", side_effect=_fake_outline), \
+            patch.object(M, "identify_document_type", return_value=fake_dt):
+        yield TestClient(M.app)
+    executor.shutdown()
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _lines(resp):
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_batch_streams_one_line_per_document(client):
+    resp = client.post("/chunk/batch?min_size=20", files=[
+        ("files", ("a.docx", b"a")),
+        ("files", ("b.pdf", b"b")),
+    ])
+    lines = _lines(resp)
+
+    assert lines[0] == {"event": "started", "total": 2, "workers": M.BATCH_WORKERS, "skipped": []}
+    assert lines[-1]["event"] == "done"
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (2, 0)
+
+    documents = lines[1:-1]
+    assert sorted(d["filename"] for d in documents) == ["a.docx", "b.pdf"]
+    assert sorted(d["completed"] for d in documents) == [1, 2]
+    for d in documents:
+        assert d["status"] == "ok"
+        assert d["num_chunks"] == 2 == len(d["chunks"]) == len(d["chunks_detailed"])
+        assert d["document_type"]["document_name"] == "Тестовый кодекс"
+        assert d["language"] == "ru"
+        assert all(c["fragment_data"]["source"] == "Тестовый кодекс" for c in d["chunks_detailed"])
+
+
+def test_batch_reports_per_file_errors(client):
+    lines = _lines(client.post("/chunk/batch", files=[
+        ("files", ("broken.docx", b"x")),
+        ("files", ("ok.docx", b"y")),
+    ]))
+
+    by_name = {d["filename"]: d for d in lines if d["event"] == "document"}
+    assert by_name["broken.docx"]["status"] == "error"
+    assert "не удалось разобрать документ" in by_name["broken.docx"]["error"]
+    assert by_name["ok.docx"]["status"] == "ok"
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (1, 1)
+
+
+def test_batch_expands_archives(client):
+    tar_buf = io.BytesIO()
+    with tarfile.open(fileobj=tar_buf, mode="w:gz") as tf:
+        info = tarfile.TarInfo("acts/c.docx")
+        info.size = 1
+        tf.addfile(info, io.BytesIO(b"c"))
+
+    lines = _lines(client.post("/chunk/batch", files=[
+        ("files", ("corpus.zip", _zip({"acts/a.docx": b"a", "acts/b.pdf": b"b", "acts/scan.png": b"p",
+                                       "__MACOSX/acts/._a.docx": b"m"}))),
+        ("files", ("more.tar.gz", tar_buf.getvalue())),
+    ]))
+
+    assert lines[0]["total"] == 3
+    assert sorted(lines[0]["skipped"]) == ["corpus.zip/__MACOSX/acts/._a.docx", "corpus.zip/acts/scan.png"]
+    assert sorted(d["filename"] for d in lines if d["event"] == "document") == [
+        "corpus.zip/acts/a.docx", "corpus.zip/acts/b.pdf", "more.tar.gz/acts/c.docx",
+    ]
+
+
+def test_broken_archive_is_rejected(client):
+    resp = client.post("/chunk/batch", files=[("files", ("corpus.zip", b"not a zip"))])
+    assert resp.status_code == 400
+
+
+def test_archive_paths_stay_inside_work_dir(tmp_path):
+    documents, skipped = M.expand_batch_uploads(
+        [("evil.zip", _zip({"../../outside.docx": b"x", "same.docx": b"1", "dir/same.docx": b"2"}))],
+        tmp_path,
+    )
+
+    assert skipped == []
+    assert len(documents) == 3
+    for _, path in documents:
+        assert tmp_path in path.resolve().parents
+    assert sorted(path.read_bytes() for _, path in documents) == [b"1", b"2", b"x"]
+
+
+def test_batch_file_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(M, "BATCH_MAX_FILES", 1)
+    with pytest.raises(ValueError):
+        M.expand_batch_uploads([("a.docx", b"a"), ("b.docx", b"b")], tmp_path)
@@ -0,0 +1,84 @@
+"""
+Тесты на бенчмарк чанкера (bench_chunker.py): синтетические документы
+распознаются «своими» обработчиками, стадии замеряются, пороги срабатывают.
+
+Запуск:
+    cd chunker && pytest test_bench_chunker.py -v
+"""
+
+import pytest
+
+import bench_chunker as B
+from docx2json_outline import DocumentProcessorManager
+
+
+@pytest.mark.parametrize(
+    "style, expected_processor",
+    [
+        ("garant", "GarantProcessor"),
+        ("consultant", "ConsultantProcessor"),
+        ("gost", "GOSTProcessor"),
+    ],
+)
+def test_synthetic_docx_is_routed_to_style_processor(tmp_path, style, expected_processor):
+    path = B.build_case_file(style, "docx", "small", tmp_path)
+
+    manager = DocumentProcessorManager()
+    processor = next(p for p in manager.processors if p.can_process(str(path)))
+
+    assert processor.__class__.__name__ == expected_processor
+
+
+def test_run_case_times_every_stage(tmp_path):
+    path = B.build_case_file("garant", "docx", "small", tmp_path)
+
+    result = B.run_case(str(path))
+
+    assert set(result["stages"]) == set(B.STAGES)
+    assert result["processor"] == "GarantProcessor"
+    assert result["chunks"] > 0
+    assert result["peak_rss_mb"] > 0
+    assert result["total_s"] == pytest.approx(sum(result["stages"].values()), abs=1e-2)
+
+
+def _case(name="garant-docx-large", total=1.0, outline=0.5, rss=300.0, chunks_per_s=1000.0):
+    return {
+        "name": name,
+        "chunks": 100,
+        "stages": {"convert": total - outline, "outline": outline},
+        "total_s": total,
+        "peak_rss_mb": rss,
+        "chunks_per_s": chunks_per_s,
+    }
+
+
+def test_absolute_thresholds():
+    thresholds = {
+        "cases": {
+            "garant-docx-large": {
+                "max_total_s": 2.0,
+                "max_peak_rss_mb": 500,
+                "min_chunks_per_s": 500,
+                "max_stage_s": {"outline": 1.0},
+            }
+        }
+    }
+
+    assert B.check_thresholds([_case()], thresholds) == []
+
+    violations = B.check_thresholds([_case(total=3.0, outline=1.5, rss=800, chunks_per_s=10)], thresholds)
+    assert len(violations) == 4
+
+
+def test_baseline_regression():
+    baseline = {"cases": [_case()]}
+    thresholds = {"defaults": {"max_regression": 0.2, "min_stage_s": 0.05}}
+
+    assert B.check_thresholds([_case(total=1.1, outline=0.55)], thresholds, baseline) == []
+
+    violations = B.check_thresholds([_case(total=1.5, outline=1.0)], thresholds, baseline)
+    assert any("outline" in v for v in violations)
+
+
+def test_failed_case_is_a_violation():
+    assert B.check_thresholds([{"name": "x", "error": "boom"}], {}) == ["x: ошибка прогона: boom"]
@@ -0,0 +1,116 @@
+"""
+Тесты на реестр паттернов очистки в docx2json_outline.
+
+Поведение, которое фиксируется:
+  - паттерны из JSON читаются с диска один раз на процесс;
+  - все паттерны применяются за один проход общей альтернацией, а результат
+    совпадает с прежней схемой "re.compile + sub для каждого паттерна по очереди";
+  - некорректные паттерны пропускаются, паттерны с обратными ссылками и без
+    якоря '^' продолжают работать.
+
+Запуск:
+    cd chunker && pytest test_cleaning_patterns.py -v
+"""
+
+import re
+
+import pytest
+
+import docx2json_outline as outline
+from docx2json_outline import clean_text_with_patterns, load_cleaning_patterns
+
+
+SAMPLE = """Статья 14. Понятие преступления
+
+ГАРАНТ: См. комментарии к статье 14 Уголовного кодекса РФ
+
+1. Преступлением признается виновно совершенное общественно опасное деяние.
+
+
+Информация об изменениях:
+Федеральным законом от 8 декабря 2003 г. N 162-ФЗ в часть 2 статьи 14 внесены изменения
+
+См. текст части в предыдущей редакции
+
+2. Не является преступлением действие (бездействие), хотя формально и содержащее признаки.
+Страница 3 из 120
+Документ предоставлен КонсультантПлюс
+www.consultant.ru
+"""
+
+
+def _sequential_clean(text, patterns):
+    """Прежняя реализация: каждый паттерн отдельным проходом."""
+    for p in patterns:
+        text = re.compile(p["regex"]).sub("", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def test_combined_pass_matches_sequential_cleaning():
+    patterns = load_cleaning_patterns()
+    assert patterns, "файл с паттернами очистки должен лежать рядом с модулем"
+
+    cleaned = clean_text_with_patterns(SAMPLE, patterns)
+
+    assert cleaned == _sequential_clean(SAMPLE, patterns)
+    assert "ГАРАНТ" not in cleaned
+    assert "Информация об изменениях" not in cleaned
+    assert "Страница 3 из 120" not in cleaned
+    assert "КонсультантПлюс" not in cleaned
+    assert "1. Преступлением признается" in cleaned
+    assert "2. Не является преступлением" in cleaned
+
+
+def test_line_anchored_patterns_share_single_pass():
+    passes = outline._cleaning_passes(load_cleaning_patterns())
+    assert len(passes) == 1
+
+
+def test_patterns_file_read_once(monkeypatch):
+    outline._read_cleaning_patterns.cache_clear()
+    calls = []
+    real_open = open
+
+    def counting_open(*args, **kwargs):
+        calls.append(args[0])
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    for _ in range(5):
+        load_cleaning_patterns()
+        outline.clean_tree_with_patterns({"level": 0, "title": "", "content": SAMPLE, "children": []})
+
+    assert len(calls) == 1
+
+
+def test_loaded_patterns_are_isolated_from_cache():
+    patterns = load_cleaning_patterns()
+    patterns.clear()
+    assert load_cleaning_patterns(), "изменение возвращённого списка не должно портить кэш"
+
+
+def test_invalid_pattern_is_skipped():
+    patterns = [
+        {"name": "сломанный", "regex": "(?mi)^(незакрытая"},
+        {"name": "страницы", "regex": r"(?mi)^\s*Страница\s+\d+\s+из\s+\d+"},
+    ]
+    assert clean_text_with_patterns("текст\nСтраница 1 из 2", patterns) == "текст"
+
+
+@pytest.mark.parametrize(
+    "regex, text, expected",
+    [
+        # Без якоря и без флагов — обычная альтернатива.
+        (r"\[\d+\]", "текст[1] статьи[23]", "текст статьи"),
+        # Альтернатива на верхнем уровне: '^' нельзя выносить за скобки.
+        (r"(?m)^Дата|подпись", "Дата: 01.01\nЛичная подпись", ": 01.01\nЛичная"),
+        # Обратная ссылка — отдельный проход.
+        (r"(\*\*)(.+?)\1", "**жирный** текст", "текст"),
+    ],
+)
+def test_non_anchored_and_backreference_patterns(regex, text, expected):
+    patterns = [
+        {"name": "тестовый", "regex": regex},
+        {"name": "страницы", "regex": r"(?mi)^\s*Страница\s+\d+\s+из\s+\d+"},
+    ]
+    assert clean_text_with_patterns(text, patterns) == _sequential_clean(text, patterns) == expected
@@ -0,0 +1,63 @@
+"""
+Тесты на определение языка документа в main.py.
+
+Поведение, которое фиксируется:
+  - язык определяется по классам символов кириллицы: таджикские буквы — tg,
+    ў или «і» чаще «и» — be, иначе ru; единичная цитата язык не меняет;
+  - для текста без кириллицы язык не указывается (определит agent_api);
+  - учитываются только первые sample_chars символов документа;
+  - /chunk/ отдаёт поле "language" один раз на документ.
+
+Запуск:
+    cd chunker && pytest test_document_language.py -v
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as M
+
+
+RU = "Статья 1. Граждане Российской Федерации имеют право на труд и на отдых."
+BE = "Артыкул 1. Рэспубліка Беларусь — унітарная дэмакратычная сацыяльная прававая дзяржава."
+BE_WITHOUT_U = "Мінск — сталіца Рэспублікі Беларусь, горад абласнога падпарадкавання."
+TG = "Моддаи 1. Ҷумҳурии Тоҷикистон давлати соҳибихтиёр, демократӣ ва ҳуқуқбунёд мебошад."
+
+
+@pytest.mark.parametrize("texts, expected", [
+    ([RU, RU], "ru"),
+    ([BE], "be"),
+    ([BE_WITHOUT_U], "be"),
+    ([TG, RU], "tg"),
+    ([RU * 20 + " Душанбе (Ҳисор)"], "ru"),
+    (["The Constitution of the Republic"], None),
+    (["", "123. 456"], None),
+])
+def test_detect_document_language(texts, expected):
+    assert M.detect_document_language(texts) == expected
+
+
+def test_only_sample_is_read():
+    def texts():
+        yield RU * 10
+        raise AssertionError("выборка уже набрана")
+
+    assert M.detect_document_language(texts(), sample_chars=100) == "ru"
+    assert M.detect_document_language([RU * 10, TG * 10], sample_chars=len(RU) * 10) == "ru"
+
+
+def test_chunk_endpoint_reports_language():
+    tree = {"level": 0, "title": "", "content": "", "children": [
+        {"level": 1, "title": f"Артыкул {i}", "content": BE, "children": []} for i in range(1, 4)
+    ]}
+    fake_dt = {"document_type": "Канстытуцыя", "document_name": "Канстытуцыя", "confidence": 0.95}
+    with patch.object(M, "extract_outline_from_document", return_value=tree), \
+            patch.object(M, "identify_document_type", return_value=fake_dt):
+        resp = TestClient(M.app).post("/chunk/?min_size=10", files={"file": ("doc.docx", b"x")})
+
+    data = json.loads(resp.text)
+    assert data["num_chunks"] == 3
+    assert data["language"] == "be"
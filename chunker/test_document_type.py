@@ -0,0 +1,155 @@
+"""
+Тесты на определение типа документа в main.py.
+
+Поведение, которое фиксируется:
+  - правила распознают известные названия (Конституция, кодексы, ГОСТ, федеральные законы)
+    без обращения к LLM;
+  - результат кэшируется по списку заголовков, ошибки LLM не кэшируются;
+  - LLM вызывается только при уверенности правил ниже порога и может быть отключён;
+  - в process_document_to_chunks определение типа идёт параллельно с созданием чанков.
+
+Запуск:
+    cd chunker && pytest test_document_type.py -v
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import main as M
+
+
+LLM_RESULT = {
+    "document_type": "Постановление",
+    "document_name": "Постановление Правительства РФ",
+    "confidence": 0.9,
+    "description": "",
+    "titles_count": 2,
+    "key_indicators": [],
+}
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    M.clear_document_type_cache()
+    yield
+    M.clear_document_type_cache()
+
+
+@pytest.mark.parametrize(
+    "title, document_type, document_name",
+    [
+        ("Уголовный кодекс Российской Федерации от 13 июня 1996 г. N 63-ФЗ", "Кодекс",
+         "Уголовный кодекс Российской Федерации"),
+        ("Кодекс Российской Федерации об административных правонарушениях от 30.12.2001 N 195-ФЗ", "Кодекс",
+         "Кодекс Российской Федерации об административных правонарушениях"),
+        ("Конституция Российской Федерации", "Конституция", "Конституция Российской Федерации"),
+        ("ГОСТ Р 57580.1-2017", "ГОСТ", "ГОСТ Р 57580.1-2017"),
+        ('Федеральный закон от 27.07.2006 N 152-ФЗ "О персональных данных"', "Федеральный закон",
+         'Федеральный закон от 27.07.2006 N 152-ФЗ "О персональных данных"'),
+    ],
+)
+def test_rules_recognize_known_titles(title, document_type, document_name):
+    result = M.classify_document_type_by_rules([title, "Статья 1. Общие положения"])
+
+    assert result["document_type"] == document_type
+    assert result["document_name"] == document_name
+    assert result["confidence"] >= M.DOC_TYPE_MIN_CONFIDENCE
+
+
+def test_rules_do_not_match_references_to_documents():
+    titles = [
+        "Российской Федерации о поправке к Конституции Российской Федерации",
+        "Статья 2. Задачи Уголовного кодекса Российской Федерации",
+    ]
+    assert M.classify_document_type_by_rules(titles)["confidence"] == 0.0
+
+
+def test_confident_rule_skips_llm():
+    with patch.object(M, "_identify_document_type_llm") as llm:
+        result = M.identify_document_type(["ГОСТ 34.602-2020", "1. Общие положения"])
+
+    llm.assert_not_called()
+    assert result["document_type"] == "ГОСТ"
+
+
+def test_deep_title_match_falls_back_to_llm():
+    titles = ["Раздел"] * M._DOC_TYPE_HEAD_TITLES + ["Семейный кодекс Российской Федерации"]
+    with patch.object(M, "_identify_document_type_llm", return_value=dict(LLM_RESULT)) as llm:
+        assert M.identify_document_type(titles)["document_type"] == "Постановление"
+    llm.assert_called_once()
+
+    # Пустой ответ LLM не перекрывает менее уверенное правило
+    M.clear_document_type_cache()
+    empty = {**LLM_RESULT, "document_type": "unknown", "confidence": 0.0}
+    with patch.object(M, "_identify_document_type_llm", return_value=empty):
+        assert M.identify_document_type(titles)["document_type"] == "Кодекс"
+
+
+def test_result_is_cached_by_titles():
+    titles = ["Постановление", "Пункт 1"]
+    with patch.object(M, "_identify_document_type_llm", return_value=dict(LLM_RESULT)) as llm:
+        first = M.identify_document_type(titles)
+        first["document_type"] = "испорчено вызывающим кодом"
+        second = M.identify_document_type(list(titles))
+        M.identify_document_type(titles + ["Пункт 2"])
+
+    assert llm.call_count == 2
+    assert second["document_type"] == "Постановление"
+
+
+def test_llm_errors_are_not_cached():
+    error = {**LLM_RESULT, "document_type": "unknown", "confidence": 0.0, "error": "timeout"}
+    with patch.object(M, "_identify_document_type_llm", return_value=error) as llm:
+        M.identify_document_type(["Постановление"])
+        M.identify_document_type(["Постановление"])
+
+    assert llm.call_count == 2
+
+
+def test_llm_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(M, "DOC_TYPE_LLM_ENABLED", False)
+    with patch.object(M, "_identify_document_type_llm") as llm:
+        result = M.identify_document_type(["Постановление"])
+
+    llm.assert_not_called()
+    assert result["document_type"] == "unknown"
+
+
+def test_document_type_runs_concurrently_with_chunking():
+    tree = {"level": 0, "title": "", "content": "", "children": [
+        {"level": 1, "title": "Статья 1. Общие положения", "content": "1. Текст первого пункта статьи.",
+         "children": []},
+    ]}
+    chunking_started = threading.Event()
+
+    def slow_identify(titles):
+        # Если определение типа блокирует чанкинг, событие не наступит
+        assert chunking_started.wait(timeout=5), "чанки не создавались, пока шло определение типа"
+        return dict(LLM_RESULT)
+
+    real_create = M.create_llm_chunks
+
+    def create_llm_chunks(*args, **kwargs):
+        chunking_started.set()
+        return real_create(*args, **kwargs)
+
+    with patch.object(M, "extract_outline_from_document", return_value=tree), \
+            patch.object(M, "identify_document_type", side_effect=slow_identify), \
+            patch.object(M, "create_llm_chunks", side_effect=create_llm_chunks):
+        chunks, document_type_info = M.process_document_to_chunks(__file__, min_size=10)
+
+    assert document_type_info["document_type"] == "Постановление"
+    assert chunks and all(c["fragment_data"]["source"] == LLM_RESULT["document_name"] for c in chunks)
+
+
+def test_preamble_lines_are_used_for_detection():
+    tree = {"level": 0, "title": "", "content": "**ГОСТ 34.602-2020**\n\n**МЕЖГОСУДАРСТВЕННЫЙ СТАНДАРТ**", "children": [
+        {"level": 1, "title": "1. Общие положения", "content": "Текст", "children": []},
+    ]}
+
+    titles = M.extract_document_type_titles(tree)
+
+    assert titles == ["ГОСТ 34.602-2020", "МЕЖГОСУДАРСТВЕННЫЙ СТАНДАРТ", "1. Общие положения"]
+    assert M.classify_document_type_by_rules(titles)["document_name"] == "ГОСТ 34.602-2020"
@@ -0,0 +1,181 @@
+"""
+Тесты на итеративный обход дерева в create_llm_chunks / iter_llm_chunks
+и потоковую сериализацию ответа /chunk/.
+
+Поведение, которое фиксируется:
+  - breadcrumb_path / breadcrumb_text / depth / fragment_id совпадают с прежним форматом;
+  - обход не упирается в recursion limit на очень глубоких деревьях;
+  - чанки отдаются лениво (генератор);
+  - потоковый JSON ответа эквивалентен обычной сериализации;
+  - ошибка разбиения до ответа даёт 500, ошибка во время отправки — валидный
+    JSON с полем "error".
+
+Запуск:
+    cd chunker && pytest test_llm_chunks.py -v
+"""
+
+import json
+import sys
+import types
+from unittest.mock import patch
+
+import main as M
+
+
+def _node(level, title, content="", children=None):
+    return {"level": level, "title": title, "content": content, "children": children or []}
+
+
+TREE = _node(0, "", children=[
+    _node(1, "Раздел I. Общие положения", children=[
+        _node(2, "Глава 1. Основы", children=[
+            _node(3, "Статья 1. Принципы", "1. Первый пункт статьи про принципы.\n2. Второй пункт статьи про принципы."),
+            _node(3, "Статья 2. Сфера применения", "Текст статьи без нумерации пунктов."),
+        ]),
+        _node(2, "", children=[
+            _node(3, "Статья 3. Без главы", "Короткий текст."),
+        ]),
+    ]),
+    _node(1, "Заключительные положения достаточно длинные для чанка"),
+])
+
+
+def test_chunks_keep_hierarchy_context():
+    chunks = M.create_llm_chunks(TREE, min_size=20, document_name="doc",
+                                 document_type_info={"document_name": "Кодекс"})
+
+    assert [c["fragment_id"] for c in chunks] == [f"doc_chunk_{i}" for i in range(1, 6)]
+
+    first = chunks[0]
+    assert first["hierarchy_context"] == {
+        "breadcrumb_path": [
+            {"level": 1, "title": "Раздел I. Общие положения", "position": 0},
+            {"level": 2, "title": "Глава 1. Основы", "position": 1},
+        ],
+        "breadcrumb_text": "Раздел I. Общие положения > Глава 1. Основы",
+        "current_level": 3,
+        "depth": 3,
+    }
+    assert first["fragment_data"]["content"] == "1. Первый пункт статьи про принципы."
+    assert first["fragment_data"]["combined_text"] == (
+        "Раздел I. Общие положения > Глава 1. Основы > Статья 1. Принципы\n\n"
+        "1. Первый пункт статьи про принципы."
+    )
+    assert first["fragment_data"]["source"] == "Кодекс"
+
+    # Узел без title не попадает в breadcrumb, но увеличивает depth
+    no_chapter = chunks[3]
+    assert no_chapter["hierarchy_context"]["breadcrumb_text"] == "Раздел I. Общие положения"
+    assert no_chapter["hierarchy_context"]["depth"] == 3
+
+    # Лист только с title
+    last = chunks[4]
+    assert last["fragment_data"]["content"] == ""
+    assert last["hierarchy_context"]["breadcrumb_path"] == []
+
+
+def test_min_size_filters_chunks():
+    chunks = M.create_llm_chunks(TREE, min_size=200, document_name="doc")
+    assert chunks == []
+
+
+def test_iter_llm_chunks_is_lazy():
+    gen = M.iter_llm_chunks(TREE, min_size=20)
+    assert isinstance(gen, types.GeneratorType)
+    assert next(gen)["fragment_id"] == "document_chunk_1"
+
+
+def test_ready_chunks_are_returned_as_is():
+    ready = {"chunks": [{"fragment_id": "x"}]}
+    assert M.create_llm_chunks(ready) == [{"fragment_id": "x"}]
+
+
+def test_deep_tree_does_not_hit_recursion_limit():
+    depth = sys.getrecursionlimit() * 3
+    root = _node(0, "")
+    cur = root
+    for i in range(depth):
+        child = _node(i + 1, f"Уровень {i}")
+        cur["children"].append(child)
+        cur = child
+    cur["content"] = "Содержимое самого глубокого узла."
+
+    chunks = M.create_llm_chunks(root, min_size=10)
+
+    assert len(chunks) == 1
+    ctx = chunks[0]["hierarchy_context"]
+    assert ctx["depth"] == depth
+    assert len(ctx["breadcrumb_path"]) == depth - 1
+    assert ctx["breadcrumb_path"][-1]["position"] == depth - 2
+
+
+def test_streamed_response_equals_plain_json():
+    fields = {"filename": "doc.docx", "file_type": "docx", "min_size": 20, "document_type": {"document_type": "Кодекс"}}
+    chunks = M.create_llm_chunks(TREE, min_size=20)
+
+    body = b"".join(M.iter_chunk_response_json(
+        fields, lambda: M.iter_llm_chunks(TREE, min_size=20), batch_size=2,
+    ))
+
+    assert json.loads(body.decode("utf-8")) == {
+        **fields,
+        "num_chunks": len(chunks),
+        "chunks": [c["fragment_data"]["combined_text"] for c in chunks],
+        "chunks_detailed": chunks,
+    }
+
+
+def test_streamed_response_without_chunks():
+    body = b"".join(M.iter_chunk_response_json({"filename": "a"}, lambda: iter(())))
+    assert json.loads(body) == {"filename": "a", "chunks": [], "chunks_detailed": [], "num_chunks": 0}
+
+
+def test_chunk_endpoint_streams_json(tmp_path):
+    from fastapi.testclient import TestClient
+
+    fake_dt = {"document_type": "unknown", "document_name": "doc", "confidence": 0.0}
+    with patch.object(M, "extract_outline_from_document", return_value=TREE), \
+            patch.object(M, "identify_document_type", return_value=fake_dt):
+        resp = TestClient(M.app).post(
+            "/chunk/?min_size=20",
+            files={"file": ("doc.docx", b"fake", "application/octet-stream")},
+        )
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["filename"] == "doc.docx"
+    assert data["num_chunks"] == 5 == len(data["chunks"]) == len(data["chunks_detailed"])
+    assert data["document_type"] == fake_dt
+    assert data["chunking_method"] == "hierarchical_outline"
+
+
+def test_streamed_response_reports_late_error():
+    def broken_detailed():
+        yield from M.iter_llm_chunks(TREE, min_size=20)
+        raise RuntimeError("boom")
+
+    body = b"".join(M.iter_chunk_response_json(
+        {"filename": "a"}, lambda: M.iter_llm_chunks(TREE, min_size=20),
+        batch_size=2, make_detailed_chunks=broken_detailed,
+    ))
+
+    data = json.loads(body.decode("utf-8"))
+    assert "boom" in data["error"]
+    assert data["num_chunks"] == 5 == len(data["chunks"])
+    assert len(data["chunks_detailed"]) < 5
+
+
+def test_chunk_endpoint_returns_500_on_chunking_error():
+    from fastapi.testclient import TestClient
+
+    fake_dt = {"document_type": "unknown", "document_name": "doc", "confidence": 0.0}
+    with patch.object(M, "extract_outline_from_document", return_value=TREE), \
+            patch.object(M, "identify_document_type", return_value=fake_dt), \
+            patch.object(M, "split_content_into_items", side_effect=RuntimeError("boom")):
+        resp = TestClient(M.app).post(
+            "/chunk/?min_size=20",
+            files={"file": ("doc.docx", b"fake", "application/octet-stream")},
+        )
+
+    assert resp.status_code == 500
+    assert "boom" in resp.json()["error"]
@@ -0,0 +1,67 @@
+"""
+Тесты на метрики Prometheus чанкера (GET /metrics).
+
+Поведение, которое фиксируется:
+  - /metrics отдаёт формат Prometheus, время запросов пишется по шаблону маршрута;
+  - обращения к кэшу типа документа считаются как hit / miss;
+  - время определения типа через LLM пишется с исходом ok / error.
+
+Запуск:
+    cd chunker && pytest test_metrics.py -v
+"""
+
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import main as M
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    M.clear_document_type_cache()
+    yield
+    M.clear_document_type_cache()
+
+
+def test_metrics_endpoint_records_route_templates():
+    client = TestClient(M.app)
+    before = _value("gena_http_request_duration_seconds_count", method="GET", route="/health", status="2xx")
+
+    client.get("/health")
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "gena_chunker_document_type_cache_total" in resp.text
+    assert _value("gena_http_request_duration_seconds_count", method="GET", route="/health", status="2xx") == before + 1
+
+
+def test_document_type_cache_hits_and_misses():
+    titles = ["Конституция Российской Федерации", "Глава 1. Основы конституционного строя"]
+    hits = _value("gena_chunker_document_type_cache_total", result="hit")
+    misses = _value("gena_chunker_document_type_cache_total", result="miss")
+
+    M.identify_document_type(titles)
+    M.identify_document_type(titles)
+
+    assert _value("gena_chunker_document_type_cache_total", result="miss") == misses + 1
+    assert _value("gena_chunker_document_type_cache_total", result="hit") == hits + 1
+
+
+def test_document_type_llm_duration_by_outcome():
+    titles = ["Приложение к приказу", "Раздел 1"]
+    failed = {"document_type": "unknown", "confidence": 0.0, "error": "timeout"}
+    before = _value("gena_chunker_document_type_llm_seconds_count", outcome="error")
+
+    with patch.object(M, "DOC_TYPE_LLM_ENABLED", True), \
+            patch.object(M, "_identify_document_type_llm", return_value=failed):
+        M.identify_document_type(titles)
+
+    assert _value("gena_chunker_document_type_llm_seconds_count", outcome="error") == before + 1
@@ -14,6 +14,15 @@ MONGO_PORT = os.getenv("MONGO_PORT", "")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "gena_db_test")
 MONGO_DB_PATH = f"mongodb://{MONGO_USERNAME}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/"
 
+# GET /tasks/pending order: fair (priority classes, aging, weighted fairness
+# across queue/dataset flows — see scheduling.py) or priority (priority desc,
+# created_at asc)
+TASK_SCHEDULER = os.getenv("TASK_SCHEDULER", "fair").strip().lower()
+# A waiting flow gains one priority class per this many seconds (0 = no aging)
+TASK_SCHEDULER_AGING_S = float(os.getenv("TASK_SCHEDULER_AGING_S", "600"))
+# Tasks taken by workers within this window count as a flow's recent service
+TASK_SCHEDULER_WINDOW_S = float(os.getenv("TASK_SCHEDULER_WINDOW_S", "300"))
+
 
 import os
 from pathlib import Path
@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
@@ -6,10 +7,13 @@ import pymongo
 from bson import ObjectId
 import json
 from config import MONGO_DB_PATH, MONGO_HOST, MONGO_PORT, MONGO_USERNAME, MONGO_PASSWORD, MONGO_DB_NAME
+from config import TASK_SCHEDULER, TASK_SCHEDULER_AGING_S, TASK_SCHEDULER_WINDOW_S
 
 from fastapi import Depends
 from auth_router import router as auth_router
 from auth_utils import get_current_user, require_role, seed_users_locked
+import metrics
+import scheduling
 
 from contextlib import asynccontextmanager
 
@@ -23,6 +27,7 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(title="GenA Dataset API", version="1.0.0", lifespan=lifespan)
 app.include_router(auth_router, tags=["auth"])
+app.add_middleware(metrics.MetricsMiddleware)
 
 # MongoDB connection
 def get_mongo_client():
@@ -79,15 +84,27 @@ class TaskData(BaseModel):
     dataset_name: str
     dataset_id: Optional[str] = None
     dataset_description: Optional[str] = None
+    # Strict priority class in /tasks/pending: higher classes are served first
     priority: Optional[int] = 1
     generation_model_id: Optional[str] = None
     validation_model_id: Optional[str] = None
     chunk_pre_validated: Optional[bool] = None
     pipeline_mode: Optional[str] = "full"
+    # Several question types for one chunk in a single task: the agent
+    # generates them in one LLM call.  ``question_type`` is the first of them.
+    question_types: Optional[List[str]] = None
+    # Validator mode for the agent: per_block | single_call (None = agent default)
+    validation_mode: Optional[str] = None
+    # Generation candidates per task; the agent validates the best one
+    candidates: Optional[int] = None
+    # Document language detected once by the chunker (ru | be | tg)
+    language: Optional[str] = None
 
 class QueueCreate(BaseModel):
     name: str
     description: Optional[str] = None
+    # Fair-share weight of the queue's datasets within a priority class:
+    # a queue with priority 3 gets three slots for every one of a priority-1 queue
     priority: Optional[int] = 1
 
 class TaskStatusUpdate(BaseModel):
@@ -397,6 +414,10 @@ async def add_tasks_to_queue(
                 "validation_model_id": task_data.validation_model_id,
                 "chunk_pre_validated": task_data.chunk_pre_validated or False,
                 "pipeline_mode": task_data.pipeline_mode or "full",
+                "question_types": task_data.question_types,
+                "validation_mode": task_data.validation_mode,
+                "candidates": task_data.candidates,
+                "language": task_data.language,
                 "status": "pending",
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
@@ -406,6 +427,8 @@ async def add_tasks_to_queue(
             result = tasks_collection.insert_one(task_doc)
             inserted_tasks.append(str(result.inserted_id))
 
+        metrics.TASKS_ENQUEUED.inc(len(inserted_tasks))
+
         return {
             "queue_name": queue_name,
             "tasks_added": len(inserted_tasks),
@@ -531,6 +554,48 @@ async def reconcile_dataset_status(limit: int = 1000):
         raise HTTPException(status_code=500, detail=f"Error reconciling dataset status: {str(e)}")
 
 
+_scheduler_indexes_ready = False
+
+
+def _ensure_scheduler_indexes(tasks_collection):
+    global _scheduler_indexes_ready
+    if not _scheduler_indexes_ready:
+        tasks_collection.create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+        tasks_collection.create_index([("status", 1), ("updated_at", 1)])
+        _scheduler_indexes_ready = True
+
+
+def _fair_pending_tasks(db, filter_query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """Pending tasks picked by scheduling.schedule: priority classes with
+    aging, weighted fairness across (queue, dataset) flows."""
+    tasks_collection = db.tasks
+    _ensure_scheduler_indexes(tasks_collection)
+    now = datetime.utcnow()
+
+    candidates = list(tasks_collection.aggregate(
+        scheduling.candidates_pipeline(filter_query, limit), allowDiskUse=True
+    ))
+    if not candidates:
+        return []
+    queue_ids = sorted({row["_id"].get("queue_id") for row in candidates if row["_id"].get("queue_id")})
+    service = list(tasks_collection.aggregate(
+        scheduling.service_pipeline(queue_ids, now, TASK_SCHEDULER_WINDOW_S)
+    ))
+    weights = {
+        str(queue["_id"]): scheduling.queue_weight(queue.get("priority"))
+        for queue in db.queues.find(
+            {"_id": {"$in": [ObjectId(q) for q in queue_ids if ObjectId.is_valid(q)]}}, {"priority": 1}
+        )
+    }
+
+    flows = scheduling.build_flows(candidates, service, weights)
+    picked = [task["_id"] for task in scheduling.schedule(flows, limit, now, TASK_SCHEDULER_AGING_S)]
+    # Full documents only for the picked tasks, in dispatch order; a task
+    # taken by another worker meanwhile is skipped
+    by_id = {task["_id"]: task for task in tasks_collection.find({"_id": {"$in": picked}, "status": "pending"})}
+    return [by_id[task_id] for task_id in picked if task_id in by_id]
+
+
 @app.get("/tasks/pending", response_model=List[Dict[str, Any]])
 async def get_pending_tasks(queue_name: Optional[str] = None, limit: Optional[int] = 10):
     try:
@@ -540,9 +605,12 @@ async def get_pending_tasks(queue_name: Optional[str] = None, limit: Optional[in
         if queue_name:
             filter_query["queue_name"] = queue_name
 
-        tasks = list(tasks_collection.find(filter_query).sort([
-            ("priority", -1), ("created_at", 1)
-        ]).limit(limit))
+        if TASK_SCHEDULER == "fair":
+            tasks = _fair_pending_tasks(db, filter_query, limit)
+        else:
+            tasks = list(tasks_collection.find(filter_query).sort([
+                ("priority", -1), ("created_at", 1)
+            ]).limit(limit))
 
         for task in tasks:
             task["_id"] = str(task["_id"])
@@ -551,6 +619,15 @@ async def get_pending_tasks(queue_name: Optional[str] = None, limit: Optional[in
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting pending tasks: {str(e)}")
 
+_queue_depth = metrics.QueueDepthCollector(get_db)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus metrics: request latency, task throughput and queue depth by status."""
+    body, content_type = metrics.render(_queue_depth)
+    return Response(content=body, media_type=content_type)
+
 @app.get("/datasets/{dataset_id}/tasks", response_model=List[Dict[str, Any]])
 async def get_dataset_tasks(
     dataset_id: str,
@@ -606,6 +683,9 @@ async def update_task_status(task_id: str, status_update: TaskStatusUpdate):
             update_data["attempts"] = status_update.attempts
 
         tasks_collection.update_one({"_id": ObjectId(task_id)}, {"$set": update_data})
+        # Heartbeats re-send ``processing``; only real transitions are counted
+        if task.get("status") != status_update.status:
+            metrics.TASK_STATUS_UPDATES.labels(metrics.task_status_label(status_update.status)).inc()
         return {"task_id": task_id, "status": status_update.status, "message": "Task status updated successfully"}
     except HTTPException:
         raise
@@ -0,0 +1,138 @@
+"""Prometheus metrics of the dataset API (GET /metrics).
+
+  gena_http_request_duration_seconds{method,route,status}  API requests
+  gena_tasks_enqueued_total                                tasks added to queues
+  gena_task_status_updates_total{status}                   status transitions (rate = tasks/s)
+  gena_queue_tasks{status}                                 queue depth, read from Mongo at scrape
+  gena_queue_oldest_pending_seconds                        age of the oldest pending task
+
+Labels stay bounded: ``route`` is the FastAPI route template rather than the
+path, ``status`` is either a known task status or ``other``.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+TASK_STATUSES = ("pending", "processing", "completed", "failed")
+
+_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
+HTTP_REQUEST_DURATION = Histogram(
+    "gena_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+)
+TASKS_ENQUEUED = Counter("gena_tasks_enqueued_total", "Tasks added to queues")
+TASK_STATUS_UPDATES = Counter(
+    "gena_task_status_updates_total", "Task status transitions reported by workers", ["status"],
+)
+
+
+def task_status_label(status: Optional[str]) -> str:
+    return status if status in TASK_STATUSES else "other"
+
+
+def status_class(status_code: int) -> str:
+    return "429" if status_code == 429 else f"{status_code // 100}xx"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request until its response is fully sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route template (/tasks/{task_id}), not the path: one series per endpoint
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if route != "/metrics":
+                method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+                HTTP_REQUEST_DURATION.labels(method, route, status_class(status[0])).observe(
+                    time.perf_counter() - started
+                )
+
+
+class QueueDepthCollector:
+    """Task counts by status from one Mongo aggregation.
+
+    The result is cached for ``ttl_s`` so several scrapers (or a dashboard
+    refreshing aggressively) cost one query per interval.
+    """
+
+    def __init__(self, get_db: Callable, ttl_s: float = 5.0):
+        self._get_db = get_db
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._cached_at = float("-inf")
+        self._cached: Optional[Tuple[dict, Optional[float]]] = None
+
+    def _query(self) -> Tuple[dict, Optional[float]]:
+        db = self._get_db()
+        counts = dict.fromkeys(TASK_STATUSES + ("other",), 0)
+        for row in db.tasks.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[task_status_label(row["_id"])] += row["count"]
+        oldest = db.tasks.find_one({"status": "pending"}, {"created_at": 1}, sort=[("created_at", 1)])
+        oldest_age = None
+        if oldest and isinstance(oldest.get("created_at"), datetime):
+            oldest_age = max(0.0, (datetime.utcnow() - oldest["created_at"]).total_seconds())
+        return counts, oldest_age
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        with self._lock:
+            if time.monotonic() - self._cached_at >= self._ttl_s:
+                try:
+                    self._cached = self._query()
+                except Exception as e:
+                    logger.warning(f"Queue depth metrics unavailable: {e}")
+                    self._cached = None
+                self._cached_at = time.monotonic()
+            cached = self._cached
+        if cached is None:
+            return
+        counts, oldest_age = cached
+        depth = GaugeMetricFamily("gena_queue_tasks", "Tasks by status", labels=["status"])
+        for status, count in counts.items():
+            depth.add_metric([status], count)
+        yield depth
+        if oldest_age is not None:
+            yield GaugeMetricFamily(
+                "gena_queue_oldest_pending_seconds", "Age of the oldest pending task", value=oldest_age,
+            )
+
+
+def render(*collectors) -> Tuple[bytes, str]:
+    """Body and content type of the /metrics response."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    # Scrape-time collectors read shared state (Mongo), so they are never
+    # summed across processes: render them from a registry of their own
+    scraped = CollectorRegistry(auto_describe=False)
+    for collector in collectors:
+        scraped.register(collector)
+    return generate_latest(registry) + generate_latest(scraped), CONTENT_TYPE_LATEST
@@ -0,0 +1,154 @@
+"""Which pending tasks a worker gets from GET /tasks/pending.
+
+Tasks are grouped into flows — one per (queue_id, dataset_id), i.e. one per
+document a user sent for generation — and handed out in this order:
+
+  strict priority   the flow whose head task has the highest class wins;
+                    class = task ``priority`` (TaskData.priority, default 1)
+  aging             a flow gains one class per ``aging_s`` it has waited
+                    since its last service (or since its head was created),
+                    so low-priority work cannot starve behind a busy class
+  weighted fairness within a class, each slot goes to the flow with the
+                    smallest (served + 1) / weight, where served counts its
+                    tasks started in the last ``window_s`` and weight is the
+                    queue's ``priority`` (QueueCreate.priority, default 1)
+
+A 20-task experiment next to a 10,000-task batch in the same class therefore
+gets every other slot instead of waiting for the batch to drain. Inside a
+flow tasks keep (priority desc, created_at asc) order. Ties go to the older
+head, which is FIFO when there is a single flow.
+
+The scheduler holds no state: service is read back from task ``updated_at``
+(set when a worker takes a task and on every heartbeat), so several API
+replicas agree and a restart loses nothing.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+SCHEDULERS = ("fair", "priority")
+
+
+@dataclass
+class Flow:
+    key: Hashable
+    weight: float
+    # Pending tasks, best first: each needs ``priority`` and ``created_at``
+    tasks: Sequence[Dict[str, Any]]
+    # Tasks of the flow taken by workers within the service window
+    served: int = 0
+    last_served_at: Optional[datetime] = None
+    _next: int = field(default=0, repr=False)
+
+    @property
+    def head(self) -> Optional[Dict[str, Any]]:
+        return self.tasks[self._next] if self._next < len(self.tasks) else None
+
+
+def task_priority(task: Dict[str, Any]) -> int:
+    try:
+        return int(task.get("priority") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def queue_weight(priority: Any) -> float:
+    """Queue priority as a WFQ weight; missing or non-positive → 1."""
+    try:
+        weight = float(priority)
+    except (TypeError, ValueError):
+        return 1.0
+    return weight if weight > 0 else 1.0
+
+
+def effective_class(flow: Flow, now: datetime, aging_s: float) -> int:
+    """Priority class of the flow's head task, raised by aging."""
+    head = flow.head
+    waiting_since = head.get("created_at")
+    if flow.last_served_at is not None and (waiting_since is None or flow.last_served_at > waiting_since):
+        waiting_since = flow.last_served_at
+    boost = 0
+    if aging_s > 0 and isinstance(waiting_since, datetime):
+        boost = max(0, int((now - waiting_since).total_seconds() // aging_s))
+    return task_priority(head) + boost
+
+
+def schedule(flows: Sequence[Flow], limit: int, now: datetime, aging_s: float) -> List[Dict[str, Any]]:
+    """Up to ``limit`` tasks in dispatch order."""
+    picked: List[Dict[str, Any]] = []
+    active = [flow for flow in flows if flow.head is not None]
+    while active and len(picked) < limit:
+        best = max(active, key=lambda flow: (
+            effective_class(flow, now, aging_s),
+            -(flow.served + 1) / flow.weight,
+            -(flow.head.get("created_at") or now).timestamp(),
+        ))
+        picked.append(best.head)
+        best._next += 1
+        best.served += 1
+        best.last_served_at = now
+        if best.head is None:
+            active.remove(best)
+    return picked
+
+
+def flow_key(task: Dict[str, Any]) -> tuple:
+    return task.get("queue_id"), task.get("dataset_id")
+
+
+def candidates_pipeline(match: Dict[str, Any], per_flow: int) -> List[Dict[str, Any]]:
+    """Mongo aggregation: the first ``per_flow`` pending tasks of every flow
+    (only _id, priority and created_at; full documents are read for the
+    picked ones). ``$topN`` keeps at most ``per_flow`` entries per group
+    while grouping, so memory does not grow with the backlog (MongoDB 5.2+)."""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"queue_id": "$queue_id", "dataset_id": "$dataset_id"},
+            "tasks": {"$topN": {
+                "n": per_flow,
+                "sortBy": {"priority": -1, "created_at": 1},
+                "output": {"_id": "$_id", "priority": "$priority", "created_at": "$created_at"},
+            }},
+        }},
+    ]
+
+
+def service_pipeline(queue_ids: List[str], now: datetime, window_s: float) -> List[Dict[str, Any]]:
+    """Mongo aggregation: tasks per flow taken by workers within the window
+    and the latest of those times."""
+    return [
+        {"$match": {
+            "queue_id": {"$in": queue_ids},
+            "status": {"$in": ["processing", "completed", "failed"]},
+            "updated_at": {"$gte": now - timedelta(seconds=window_s)},
+        }},
+        {"$group": {
+            "_id": {"queue_id": "$queue_id", "dataset_id": "$dataset_id"},
+            "served": {"$sum": 1},
+            "last_served_at": {"$max": "$updated_at"},
+        }},
+    ]
+
+
+def build_flows(
+    candidates: Sequence[Dict[str, Any]],
+    service: Sequence[Dict[str, Any]],
+    weights: Dict[Optional[str], float],
+) -> List[Flow]:
+    """Flows from the results of candidates_pipeline and service_pipeline;
+    ``weights`` maps queue_id → queue_weight(queue priority)."""
+    served = {(row["_id"].get("queue_id"), row["_id"].get("dataset_id")): row for row in service}
+    flows = []
+    for row in candidates:
+        key = (row["_id"].get("queue_id"), row["_id"].get("dataset_id"))
+        history = served.get(key, {})
+        flows.append(Flow(
+            key=key,
+            weight=weights.get(key[0], 1.0),
+            tasks=row["tasks"],
+            served=history.get("served", 0),
+            last_served_at=history.get("last_served_at"),
+        ))
+    return flows
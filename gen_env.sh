@@ -106,6 +106,7 @@ LLM_PROVIDER=$(get_var LLM_PROVIDER)
 
 # Models
 MODEL_ENDPOINTS=$(get_var MODEL_ENDPOINTS)
+MODEL_GROUPS=$(get_var MODEL_GROUPS)
 
 # Web — только *_DEV/_MAIN, иначе env-specific дефолт
 WEB_PORT=$(get_isolated_var WEB_PORT "$WEB_PORT_DEFAULT")
@@ -85,18 +85,36 @@ def shuffle_questions(questions):
     return questions_copy
 
 
-def rephrase_questions(dataset_name, questions):
-    
+def rephrase_questions(dataset_name, questions, on_progress=None):
+    """
+    Перефразирует вопросы через потоковый /rephrase_questions/stream/:
+    вопросы приходят по мере готовности, таймаут — на каждую строку ответа,
+    а не на весь датасет. on_progress(готово, всего) — после каждого вопроса.
+    """
     payload = {
         'dataset_name': dataset_name,
         'questions': questions
     }
 
-    agent_api_endpoint = AGENT_API_URL+'/rephrase_questions/'
+    agent_api_endpoint = AGENT_API_URL+'/rephrase_questions/stream/'
 
-    tasks_response = requests.post(agent_api_endpoint, headers=_headers(), json=payload, timeout=300).json()
-
-    return tasks_response
+    result = copy.deepcopy(questions)
+    done = 0
+    with requests.post(agent_api_endpoint, headers=_headers(), json=payload, stream=True, timeout=300) as response:
+        if response.status_code != 200:
+            return {'status': 'error', 'result': [], 'error': response.text}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            item = json.loads(line)
+            if 'error' in item:
+                return {'status': 'error', 'result': [], 'error': item['error']}
+            result[item['index']] = item['question']
+            done += 1
+            if on_progress:
+                on_progress(done, len(questions))
+
+    return {'status': 'success', 'result': result}
 
 def _norm_options(opt):
     """Преобразует options (dict или str) в читаемый многострочный текст."""
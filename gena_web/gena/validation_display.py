@@ -77,6 +77,10 @@ def format_validation_breakdown_md(
         if not isinstance(scores, list):
             lines.append(f"- **{label}**: {scores}")
             continue
+        if not scores:
+            # Валидатор пропустил блок: балл уже обнулён критичным подкритерием
+            lines.append(f"- **{label}**: не проверялся")
+            continue
         try:
             total = sum(int(x) for x in scores)
         except (TypeError, ValueError):
@@ -463,6 +463,16 @@ if _has_data:
             "and run each pipeline mode to compare validator pass/fail rates."
         ),
     )
+    batch_question_types = st.checkbox(
+        "One generation call per chunk",
+        value=False,
+        disabled=processing_mode != "Queue Mode (Recommended)" or len(question_types) < 2,
+        help=(
+            "Queue one task per chunk: the generator writes every selected question "
+            "type from a single prompt, so the chunk text is sent once instead of "
+            "once per type. Scoring and validation still run per type."
+        ),
+    )
     if ablation_testing:
         st.info(
             "Ablation run: new datasets will be tagged with the selected "
@@ -720,11 +730,15 @@ if _has_data:
                 # ── 4. Create tasks from valid chunks ──
                 tasks = []
                 for vc in valid_chunks:
-                    for qt in vc["types_ok"]:
+                    if batch_question_types and len(vc["types_ok"]) > 1:
+                        type_groups = [list(vc["types_ok"])]
+                    else:
+                        type_groups = [[qt] for qt in vc["types_ok"]]
+                    for group in type_groups:
                         td = {
                             "chunk_id": vc["idx"],
                             "chunk_text": vc["text"],
-                            "question_type": qt,
+                            "question_type": group[0],
                             "source_document": document_name,
                             "dataset_name": dataset_run_name,
                             "dataset_id": ds_id,
@@ -733,10 +747,15 @@ if _has_data:
                             "chunk_pre_validated": True,
                             "pipeline_mode": pipeline_mode,
                         }
+                        if len(group) > 1:
+                            td["question_types"] = group
                         if generation_model_id:
                             td["generation_model_id"] = generation_model_id
                         if validation_model_id:
                             td["validation_model_id"] = validation_model_id
+                        if data.get("language"):
+                            # Detected once per document by the chunker
+                            td["language"] = data["language"]
                         tasks.append(td)
 
                 tasks_response = post(f"/queues/{queue_name}/tasks/", json=tasks)
@@ -801,6 +820,8 @@ if _has_data:
                         payload["validation_model_id"] = validation_model_id
                     if _chunks_pre_validated:
                         payload["chunk_pre_validated"] = True
+                    if data.get("language"):
+                        payload["language"] = data["language"]
 
                     try:
                         res = requests.post(generate_url, json=payload)
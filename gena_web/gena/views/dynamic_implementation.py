@@ -105,7 +105,12 @@ if st.button("Go"):
     questions = dataset.get("questions", []).copy()
 
     if rephrase_mode:
-        questions_info = rephrase_questions(selected_dataset_name, questions)
+        progress = st.progress(0.0, text="Rephrasing questions...")
+        questions_info = rephrase_questions(
+            selected_dataset_name, questions,
+            on_progress=lambda done, total: progress.progress(done / total, text=f"Rephrased {done}/{total}"),
+        )
+        progress.empty()
         if questions_info['status'] != 'success':
             st.info('Sorry! Questions rephrased badly!')
             st.stop()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Load test — N documents through chunker → queue → task_worker → dataset_api.
+
+Each document is chunked, gets a dataset with its chunks and one task per
+chunk (up to --tasks-per-doc) in a queue shared by the run; the driver then
+polls the queue until nothing is pending or processing and reports:
+
+  throughput   tasks/s and documents/min over the run
+  chunk_s      chunker response time per document
+  task_e2e_s   created_at → updated_at of each finished task (queue wait + work)
+  worker_s     worker time per task (result.result.telemetry.worker.total_s)
+  document_s   chunking + first task created → last task finished, per document
+
+Latencies are p50 / p90 / p99 / max. Point the services at
+scripts/mock_llm_server.py to measure the pipeline without a GPU; with
+--mock-url the mock's request counts are added to the report.
+
+Usage:
+    python scripts/load_test.py gena_web/docs/Family_code_Russian_Federation_1-4.docx \\
+        --num-documents 20 --concurrency 4 --tasks-per-doc 10 --report load.json
+Exit 0 when every task finished, 1 otherwise.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import cycle, islice
+from typing import Any, Dict, List, Optional, Sequence
+
+import requests
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_MIME = "application/pdf"
+
+
+def _print(*args, **kwargs):
+    kwargs.setdefault("flush", True)
+    print(*args, **kwargs)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Linear interpolation between closest ranks; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _worker_seconds(task: Dict[str, Any]) -> Optional[float]:
+    agent_result = (task.get("result") or {}).get("result")
+    telemetry = agent_result.get("telemetry") if isinstance(agent_result, dict) else None
+    worker = telemetry.get("worker") if isinstance(telemetry, dict) else None
+    return worker.get("total_s") if isinstance(worker, dict) else None
+
+
+def task_report(tasks: List[Dict[str, Any]], documents: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles from the queue's tasks and the
+    per-document timings collected while enqueueing."""
+    by_status: Dict[str, int] = {}
+    e2e, worker = [], []
+    finished_by_dataset: Dict[str, List[datetime]] = {}
+    created_by_dataset: Dict[str, List[datetime]] = {}
+    for task in tasks:
+        status = task.get("status") or "unknown"
+        by_status[status] = by_status.get(status, 0) + 1
+        created, updated = _parse_time(task.get("created_at")), _parse_time(task.get("updated_at"))
+        if created is not None:
+            created_by_dataset.setdefault(task.get("dataset_id"), []).append(created)
+        if status not in ("completed", "failed") or created is None or updated is None:
+            continue
+        e2e.append((updated - created).total_seconds())
+        finished_by_dataset.setdefault(task.get("dataset_id"), []).append(updated)
+        if status == "completed" and _worker_seconds(task) is not None:
+            worker.append(_worker_seconds(task))
+
+    document_s = []
+    for doc in documents:
+        finished = finished_by_dataset.get(doc.get("dataset_id"))
+        created = created_by_dataset.get(doc.get("dataset_id"))
+        if finished and created and len(finished) == doc["tasks"]:
+            document_s.append(doc["chunk_s"] + (max(finished) - min(created)).total_seconds())
+
+    finished_tasks = by_status.get("completed", 0) + by_status.get("failed", 0)
+    return {
+        "wall_s": round(wall_s, 3),
+        "documents": len(documents),
+        "tasks": len(tasks),
+        "tasks_by_status": by_status,
+        "throughput": {
+            "tasks_per_s": finished_tasks / wall_s if wall_s > 0 else None,
+            "documents_per_min": 60 * len(document_s) / wall_s if wall_s > 0 else None,
+        },
+        "chunk_s": summarize([doc["chunk_s"] for doc in documents]),
+        "task_e2e_s": summarize(e2e),
+        "worker_s": summarize(worker),
+        "document_s": summarize(document_s),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    _print(f"\n{'='*60}\n  LOAD TEST REPORT\n{'='*60}")
+    _print(f"  wall time      {report['wall_s']:.1f}s")
+    _print(f"  documents      {report['documents']}")
+    _print(f"  tasks          {report['tasks']}  {report['tasks_by_status']}")
+    throughput = report["throughput"]
+    if throughput["tasks_per_s"] is not None:
+        _print(f"  throughput     {throughput['tasks_per_s']:.2f} tasks/s, "
+               f"{throughput['documents_per_min']:.2f} documents/min")
+    _print(f"\n  {'latency, s':<14}{'count':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name in ("chunk_s", "task_e2e_s", "worker_s", "document_s"):
+        row = report[name]
+        cells = "".join(f"{row[k]:>10.2f}" if row[k] is not None else f"{'—':>10}" for k in ("p50", "p90", "p99", "max"))
+        _print(f"  {name:<14}{row['count']:>7}{cells}")
+    if report.get("mock"):
+        _print(f"\n  mock LLM       {json.dumps(report['mock'], ensure_ascii=False)}")
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_id = f"load_test_{ts}"
+        self.queue_name = f"{self.run_id}_queue"
+        self.documents: List[Dict[str, Any]] = []
+
+    # ── Document → tasks ─────────────────────────────────────────────
+
+    def _chunk(self, path: str) -> Dict[str, Any]:
+        mime = PDF_MIME if path.lower().endswith(".pdf") else DOCX_MIME
+        with open(path, "rb") as f:
+            resp = requests.post(
+                f"{self.args.chunker_url}/chunk/",
+                files={"file": (os.path.basename(path), f, mime)},
+                timeout=self.args.request_timeout,
+            )
+        resp.raise_for_status()
+        return resp.json()
+
+    def _gate(self, text: str) -> bool:
+        question_type = self.args.question_types[0]
+        resp = requests.post(
+            f"{self.args.agent_api_url}/chunk_gate/",
+            json={"chunk": text, "question_type": question_type},
+            timeout=self.args.request_timeout,
+        )
+        resp.raise_for_status()
+        return bool(resp.json().get("result", {}).get("passed"))
+
+    def enqueue_document(self, index: int, path: str) -> Dict[str, Any]:
+        source = os.path.basename(path)
+        dataset_name = f"{self.run_id}_{index:04d}"
+        started = time.perf_counter()
+        chunked = self._chunk(path)
+        chunk_s = time.perf_counter() - started
+
+        chunks = []
+        for i, chunk in enumerate(chunked.get("chunks_detailed") or []):
+            text = (chunk.get("fragment_data") or {}).get("combined_text") or ""
+            if text.strip():
+                chunks.append({"chunk_index": i, "chunk_text": text, "fragment_data": chunk.get("fragment_data")})
+        chunks = chunks[:self.args.tasks_per_doc]
+        if self.args.gate:
+            chunks = [c for c in chunks if self._gate(c["chunk_text"])]
+
+        resp = requests.post(
+            f"{self.args.dataset_api_url}/datasets/",
+            json={
+                "name": dataset_name,
+                "description": "Load test dataset",
+                "source_document": source,
+                "questions": [],
+                "metadata": {
+                    "queue_name": self.queue_name,
+                    "question_types": self.args.question_types,
+                    "total_chunks": chunked.get("num_chunks", 0),
+                    "status": "processing",
+                    "created_at": datetime.now().isoformat(),
+                },
+            },
+            timeout=30,
+        )
+        resp.raise_for_status()
+        dataset_id = resp.json()["dataset_id"]
+
+        requests.post(
+            f"{self.args.dataset_api_url}/datasets/{dataset_id}/chunks",
+            json=[{**c, "gate_passed": True, "question_types_valid": self.args.question_types} for c in chunks],
+            timeout=30,
+        ).raise_for_status()
+
+        question_types = self.args.question_types
+        tasks = [{
+            "chunk_id": c["chunk_index"],
+            "chunk_text": c["chunk_text"],
+            "question_type": question_types[0],
+            "question_types": question_types if len(question_types) > 1 else None,
+            "source_document": source,
+            "dataset_name": dataset_name,
+            "dataset_id": dataset_id,
+            "dataset_description": "Load test dataset",
+            "chunk_pre_validated": self.args.gate,
+            "pipeline_mode": self.args.pipeline_mode,
+            "validation_mode": self.args.validation_mode,
+            "language": chunked.get("language"),
+        } for c in chunks]
+        if tasks:
+            requests.post(
+                f"{self.args.dataset_api_url}/queues/{self.queue_name}/tasks/",
+                json=tasks,
+                timeout=30,
+            ).raise_for_status()
+
+        _print(f"  [{index + 1}] {source}: {chunked.get('num_chunks', 0)} chunks in {chunk_s:.2f}s, "
+               f"{len(tasks)} tasks")
+        return {"path": path, "dataset_id": dataset_id, "chunk_s": chunk_s, "tasks": len(tasks)}
+
+    # ── Run ──────────────────────────────────────────────────────────
+
+    def _queue_tasks(self, limit: int) -> List[Dict[str, Any]]:
+        resp = requests.get(
+            f"{self.args.dataset_api_url}/queues/{self.queue_name}/tasks/",
+            params={"limit": limit},
+            timeout=60,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def _wait(self, expected: int, deadline: float) -> List[Dict[str, Any]]:
+        tasks: List[Dict[str, Any]] = []
+        while True:
+            tasks = self._queue_tasks(max(expected, 1))
+            active = sum(1 for t in tasks if t.get("status") in ("pending", "processing"))
+            done = len(tasks) - active
+            _print(f"  {done}/{len(tasks)} finished, {active} pending or processing")
+            if active == 0 or time.time() >= deadline:
+                return tasks
+            time.sleep(self.args.poll_interval)
+
+    def _mock_stats(self) -> Optional[Dict[str, Any]]:
+        if not self.args.mock_url:
+            return None
+        try:
+            return requests.get(f"{self.args.mock_url}/mock/stats", timeout=10).json()
+        except Exception as e:
+            _print(f"  Mock stats unavailable: {e}")
+            return None
+
+    def cleanup(self):
+        _print("\n--- Cleanup ---")
+        for doc in self.documents:
+            try:
+                requests.delete(f"{self.args.dataset_api_url}/datasets/{doc['dataset_id']}", timeout=10)
+                requests.delete(f"{self.args.dataset_api_url}/datasets/{doc['dataset_id']}/chunks", timeout=10)
+            except Exception as e:
+                _print(f"  Cleanup dataset error: {e}")
+        try:
+            requests.delete(f"{self.args.dataset_api_url}/queues/{self.queue_name}", timeout=10)
+            _print(f"  Deleted queue {self.queue_name} and {len(self.documents)} datasets")
+        except Exception as e:
+            _print(f"  Cleanup queue error: {e}")
+
+    def run(self) -> Dict[str, Any]:
+        args = self.args
+        paths = list(islice(cycle(args.documents), args.num_documents or len(args.documents)))
+        requests.post(
+            f"{args.dataset_api_url}/queues/",
+            json={"name": self.queue_name, "description": "Load test", "priority": 1},
+            timeout=30,
+        ).raise_for_status()
+
+        _print(f"Run {self.run_id}: {len(paths)} documents, {args.concurrency} at a time")
+        started = time.perf_counter()
+        deadline = time.time() + args.timeout
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(self.enqueue_document, i, path) for i, path in enumerate(paths)]
+            for future in futures:
+                try:
+                    self.documents.append(future.result())
+                except Exception as e:
+                    _print(f"  Document failed: {e}", file=sys.stderr)
+
+        expected = sum(doc["tasks"] for doc in self.documents)
+        _print(f"\nWaiting for {expected} tasks (timeout {args.timeout}s)")
+        tasks = self._wait(expected, deadline)
+        report = task_report(tasks, self.documents, time.perf_counter() - started)
+        report["failed_documents"] = len(paths) - len(self.documents)
+        report["mock"] = self._mock_stats()
+        return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GenA end-to-end load test")
+    parser.add_argument("documents", nargs="+", help=".docx / .pdf files, cycled up to --num-documents")
+    parser.add_argument("--num-documents", type=int, default=0, help="documents to push (default: one per file)")
+    parser.add_argument("--concurrency", type=int, default=4, help="documents chunked and enqueued at once")
+    parser.add_argument("--tasks-per-doc", type=int, default=10, help="chunks per document turned into tasks")
+    parser.add_argument("--question-types", default="one",
+                        help="comma-separated; several types go into one task (one generator call)")
+    parser.add_argument("--pipeline-mode", default="full")
+    parser.add_argument("--validation-mode", default=None, help="per_block | single_call (agent default)")
+    parser.add_argument("--gate", action="store_true",
+                        help="run /chunk_gate/ from the driver and enqueue pre-validated chunks only")
+    parser.add_argument("--chunker-url", default=os.getenv("CHUNKER_URL", "http://localhost:8517"))
+    parser.add_argument("--agent-api-url", default=os.getenv("AGENT_API_URL", "http://localhost:8790"))
+    parser.add_argument("--dataset-api-url", default=os.getenv("DATASET_API_URL", "http://localhost:8789"))
+    parser.add_argument("--mock-url", default=None, help="mock LLM server, e.g. http://localhost:8000")
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--poll-interval", type=float, default=5)
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds for the whole run")
+    parser.add_argument("--report", default=None, help="write the report as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="keep the queue and datasets after the run")
+    args = parser.parse_args(argv)
+    args.question_types = [t.strip() for t in args.question_types.split(",") if t.strip()]
+    return args
+
+
+def main():
+    args = parse_args()
+    missing = [p for p in args.documents if not os.path.isfile(p)]
+    if missing:
+        _print(f"File not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    test = LoadTest(args)
+    try:
+        report = test.run()
+    finally:
+        if not args.keep:
+            test.cleanup()
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        _print(f"\n  Report written to {args.report}")
+    finished = report["tasks_by_status"].get("completed", 0) + report["tasks_by_status"].get("failed", 0)
+    sys.exit(0 if finished == report["tasks"] and not report["failed_documents"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible LLM server for load tests.
+
+Speaks the two endpoints GenA uses:
+  GET  /v1/models            — model discovery (ModelsRegistry._probe_model)
+  POST /v1/chat/completions  — every chain built by llm_factory.create_chat_llm
+
+Prompts are recognised by their markers (chunk gate, generator — single and
+multi-type, refine, per-block and single-call validator, provocativeness,
+difficulty, rephrase, chunker document type) and answered with canned
+responses that parse and pass the deterministic rules, so the full pipeline
+runs end to end without a GPU. Anything else gets an object synthesised from
+the request's JSON schema (guided decoding) or plain "ok".
+
+Latency = service time from --latency-dist plus completion tokens at
+--tokens-per-s, held inside --max-concurrency slots (the GPU's batch).
+--failure-rate / --rate-limit-rate / --hang-rate inject 503, 429 and hung
+requests. GET /mock/stats returns request counts by prompt kind and outcome.
+
+Usage:
+    python scripts/mock_llm_server.py --port 8000 --latency-dist lognormal --latency-s 1.5
+    # agent_api / chunker:
+    MODEL_ENDPOINTS='[{"id": "mock", "name": "mock", "base_url": "http://localhost:8000/v1",
+                       "model_name": "mock-llm", "api_key": "none"}]'
+    LLM_URL_MODEL=http://localhost:8000/v1  LLM_MODEL_NAME=mock-llm  LLM_API_KEY=none
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+@dataclass
+class MockConfig:
+    models: tuple = ("mock-llm",)
+    # Service time per request, seconds: the value itself (fixed), the mean
+    # (uniform on [0, 2x], exponential) or the median (lognormal)
+    latency_dist: str = "fixed"
+    latency_s: float = 0.0
+    latency_sigma: float = 0.5
+    # Decode speed; 0 disables the per-token part of the latency
+    tokens_per_s: float = 0.0
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_s: float = 600.0
+    # Requests served at once; the rest wait as on a saturated GPU. 0 = unlimited
+    max_concurrency: int = 0
+    gate_pass_rate: float = 1.0
+    validator_pass_rate: float = 1.0
+    seed: Optional[int] = None
+
+
+# ──────────────────── Canned answers ────────────────────
+
+QUESTION_ONE = {
+    "task": "Какой орган регистрирует заключение брака согласно исходному тексту?",
+    "option_1": "Орган записи актов гражданского состояния",
+    "option_2": "Нотариальная контора по месту жительства",
+    "option_3": "Районный суд общей юрисдикции",
+    "option_4": "Орган опеки и попечительства",
+    "outputs": "1",
+}
+QUESTION_MULTI = {
+    "task": "Какие из перечисленных условий необходимы для заключения брака?",
+    "option_1": "Взаимное добровольное согласие мужчины и женщины",
+    "option_2": "Достижение ими брачного возраста",
+    "option_3": "Наличие общего жилого помещения",
+    "option_4": "Согласие родителей обоих супругов",
+    "option_5": "Заключение брачного договора",
+    "option_6": "Подтверждение дохода у нотариуса",
+    "outputs": "1,2",
+}
+QUESTION_OPEN = {
+    "task": "С какого момента возникают права и обязанности супругов?",
+    "outputs": "Со дня государственной регистрации заключения брака в органах записи актов гражданского состояния.",
+}
+QUESTIONS = {"one": QUESTION_ONE, "multi": QUESTION_MULTI, "open": QUESTION_OPEN}
+
+DOCUMENT_TYPE = {
+    "document_type": "Кодекс",
+    "document_name": "Семейный кодекс Российской Федерации",
+    "confidence": 0.95,
+    "description": "Кодифицированный акт, регулирующий семейные отношения.",
+    "key_indicators": ["Кодекс", "Глава"],
+}
+
+_SINGLE_CALL_BLOCK = re.compile(r"###БЛОК (\w+) \((\d+) критериев\)###")
+_QUESTION_TYPES = re.compile(r"\*\*Типы вопросов\*\*:\s*([^\n]+)")
+_REFINE_QUESTION = re.compile(r"### Текущее задание \(JSON\)\n(.*?)\n\n### ", re.DOTALL)
+_REPHRASE_QUESTION = re.compile(r"Вопрос:\s*(.+)")
+_PER_BLOCK_CRITERIA = 12  # more lines than any block has; the parser stops at the expected count
+
+
+def _text(messages: List[Dict[str, Any]], role: str) -> str:
+    return "\n".join(m["content"] for m in messages if m.get("role") == role and isinstance(m.get("content"), str))
+
+
+def classify(messages: List[Dict[str, Any]]) -> str:
+    """Prompt kind from the markers of GenA's prompts."""
+    system, human = _text(messages, "system"), _text(messages, "user")
+    if "c1_chunk_informative" in system or human.startswith("Текстовый чанк для оценки"):
+        return "gate"
+    if "ВЫ СОСТАВЛЯЕТЕ НЕСКОЛЬКО ВОПРОСОВ" in system:
+        return "generate_multi_type"
+    if "### Текущее задание (JSON)" in human:
+        return "refine"
+    if _SINGLE_CALL_BLOCK.search(system):
+        return "validate_single_call"
+    if "эксперт по оценке качества заданий" in system and "Задание:" in human:
+        return "validate_block"
+    if "Выполни оценку провокационности" in human:
+        return "provocativeness"
+    if "Выполни оценку сложности" in human:
+        return "difficulty"
+    if "Переформулируй следующий вопрос" in human:
+        return "rephrase"
+    if "Проанализируй заголовки документа" in system:
+        return "document_type"
+    if "**Исходный текст**" in human and "**JSON**" in human:
+        if 'Строки "task", "option_1"-"option_6"' in system:
+            return "generate_multi"
+        if 'Строки "task", "option_1"-"option_4"' in system:
+            return "generate_one"
+        return "generate_open"
+    return "other"
+
+
+def _numbered(question: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """n > 1 (candidates): distinct wording per choice, same structure."""
+    if index == 0:
+        return dict(question)
+    return {**question, "task": f"{question['task'][:-1]} (вариант {index + 1})?"}
+
+
+def _schema_instance(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Smallest value valid for a JSON schema (guided decoding requests of unknown prompts)."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return _schema_instance(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if schema.get(key):
+            return _schema_instance(schema[key][0], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {name: _schema_instance(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_schema_instance(schema.get("items", {}), defs) for _ in range(schema.get("minItems", 1))]
+    if kind in ("integer", "number"):
+        return schema.get("minimum", 1)
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return "ok"
+
+
+def _request_schema(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    response_format = body.get("response_format") or {}
+    if isinstance(response_format, dict) and response_format.get("type") == "json_schema":
+        return (response_format.get("json_schema") or {}).get("schema")
+    return body.get("guided_json")
+
+
+def respond(kind: str, body: Dict[str, Any], rng: random.Random, config: MockConfig, index: int = 0) -> str:
+    """Completion text for one choice."""
+    messages = body.get("messages") or []
+    system, human = _text(messages, "system"), _text(messages, "user")
+
+    if kind == "gate":
+        passed = rng.random() < config.gate_pass_rate
+        verdict = {}
+        for key in ("c1_chunk_informative", "c2_chunk_reference_clarity", "c3_chunk_multi_suitability"):
+            prefix = key.split("_", 1)[0]
+            verdict[key] = [1 if passed else 0]
+            verdict[f"{prefix}_reasoning"] = "Фрагмент содержит самостоятельные нормы." if passed else "Фрагмент неинформативен."
+            verdict[f"{prefix}_confidence"] = 0.9
+        return json.dumps(verdict, ensure_ascii=False)
+    if kind in ("generate_one", "generate_multi", "generate_open"):
+        return json.dumps(_numbered(QUESTIONS[kind.rsplit("_", 1)[1]], index), ensure_ascii=False)
+    if kind == "generate_multi_type":
+        match = _QUESTION_TYPES.search(human)
+        types = [t.strip() for t in match.group(1).split(",")] if match else ["one"]
+        questions = [
+            {**_numbered(QUESTIONS.get(t, QUESTION_ONE), index), "question_type": t if t in QUESTIONS else "one"}
+            for t in types
+        ]
+        return json.dumps({"questions": questions}, ensure_ascii=False)
+    if kind == "refine":
+        match = _REFINE_QUESTION.search(human)
+        try:
+            question = json.loads(match.group(1)) if match else dict(QUESTION_ONE)
+        except json.JSONDecodeError:
+            question = dict(QUESTION_ONE)
+        return json.dumps({k: v for k, v in question.items() if v is not None}, ensure_ascii=False)
+    if kind == "validate_single_call":
+        score = 1 if rng.random() < config.validator_pass_rate else 0
+        return json.dumps({
+            key: {"scores": [score] * int(count), "justifications": [""] * int(count)}
+            for key, count in _SINGLE_CALL_BLOCK.findall(system)
+        }, ensure_ascii=False)
+    if kind == "validate_block":
+        score = 1 if rng.random() < config.validator_pass_rate else 0
+        reason = "соответствует" if score else "не соответствует"
+        return "\n".join(f"Критерий {i + 1}: {score} — {reason}" for i in range(_PER_BLOCK_CRITERIA))
+    if kind == "provocativeness":
+        return json.dumps({"provocativeness_score": 1, "explanation": "Нейтральная формулировка."}, ensure_ascii=False)
+    if kind == "difficulty":
+        return json.dumps({"difficulty": 2, "explanation": "Требует знания нормы."}, ensure_ascii=False)
+    if kind == "rephrase":
+        match = _REPHRASE_QUESTION.search(human)
+        question = match.group(1).strip() if match else ""
+        return json.dumps(
+            {"rephrased_question": f"{question} (в иной формулировке)", "original_question": question},
+            ensure_ascii=False,
+        )
+    if kind == "document_type":
+        return json.dumps(DOCUMENT_TYPE, ensure_ascii=False)
+
+    schema = _request_schema(body)
+    return json.dumps(_schema_instance(schema), ensure_ascii=False) if schema else "ok"
+
+
+def _tokens(text: str) -> int:
+    """~4 characters per token: enough for usage fields and decode time."""
+    return max(1, len(text) // 4)
+
+
+def service_time(config: MockConfig, rng: random.Random) -> float:
+    mean = config.latency_s
+    if mean <= 0:
+        return 0.0
+    if config.latency_dist == "uniform":
+        return rng.uniform(0.0, 2 * mean)
+    if config.latency_dist == "exponential":
+        return rng.expovariate(1.0 / mean)
+    if config.latency_dist == "lognormal":
+        return rng.lognormvariate(math.log(mean), config.latency_sigma)
+    return mean
+
+
+# ──────────────────── App ────────────────────
+
+def _error(status_code: int, message: str, kind: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": kind, "code": status_code}},
+        headers=headers,
+    )
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="GenA mock LLM")
+    rng = random.Random(config.seed)
+    slots = asyncio.Semaphore(config.max_concurrency) if config.max_concurrency > 0 else None
+    stats = {"requests": Counter(), "outcomes": Counter(), "in_flight": 0, "peak_in_flight": 0}
+    app.state.stats = stats
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {
+            "object": "list",
+            "data": [{"id": name, "object": "model", "created": 0, "owned_by": "mock"} for name in config.models],
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return _error(400, "streaming is not supported by the mock", "invalid_request_error")
+        kind = classify(body.get("messages") or [])
+        stats["requests"][kind] += 1
+
+        draw = rng.random()
+        if draw < config.failure_rate:
+            stats["outcomes"]["503"] += 1
+            return _error(503, "mock: injected failure", "server_error")
+        draw -= config.failure_rate
+        if draw < config.rate_limit_rate:
+            stats["outcomes"]["429"] += 1
+            return _error(429, "mock: rate limited", "rate_limit_error", headers={"retry-after": "1"})
+        draw -= config.rate_limit_rate
+        if draw < config.hang_rate:
+            stats["outcomes"]["hang"] += 1
+            await asyncio.sleep(config.hang_s)
+            return _error(504, "mock: request hung", "timeout")
+
+        choices = [respond(kind, body, rng, config, i) for i in range(max(1, int(body.get("n") or 1)))]
+        completion_tokens = sum(_tokens(c) for c in choices)
+        delay = service_time(config, rng)
+        if config.tokens_per_s > 0:
+            delay += completion_tokens / config.tokens_per_s
+
+        async with slots or nullcontext():
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                stats["in_flight"] -= 1
+
+        stats["outcomes"]["ok"] += 1
+        prompt_tokens = sum(_tokens(m.get("content") if isinstance(m.get("content"), str) else "") for m in body.get("messages") or [])
+        return {
+            "id": f"chatcmpl-mock-{sum(stats['requests'].values())}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or config.models[0],
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                for i, content in enumerate(choices)
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return {
+            "requests": dict(stats["requests"]),
+            "outcomes": dict(stats["outcomes"]),
+            "in_flight": stats["in_flight"],
+            "peak_in_flight": stats["peak_in_flight"],
+        }
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server for GenA load tests")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", action="append", dest="models",
+                        help="model id served by /v1/models (repeatable, default mock-llm)")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-s", type=float, default=0.0,
+                        help="service time: value (fixed), mean (uniform, exponential) or median (lognormal)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal sigma")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="decode speed, 0 = no per-token delay")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that hang for --hang-s")
+    parser.add_argument("--hang-s", type=float, default=600.0)
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="requests served at once (GPU batch), 0 = unlimited")
+    parser.add_argument("--gate-pass-rate", type=float, default=1.0)
+    parser.add_argument("--validator-pass-rate", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    config = MockConfig(
+        models=tuple(args.models or ("mock-llm",)),
+        latency_dist=args.latency_dist,
+        latency_s=args.latency_s,
+        latency_sigma=args.latency_sigma,
+        tokens_per_s=args.tokens_per_s,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        hang_rate=args.hang_rate,
+        hang_s=args.hang_s,
+        max_concurrency=args.max_concurrency,
+        gate_pass_rate=args.gate_pass_rate,
+        validator_pass_rate=args.validator_pass_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,9 @@ WORKER_HEARTBEAT_SECONDS = int(os.getenv("WORKER_HEARTBEAT_SECONDS", "60"))
 # Once exceeded the task is force-failed instead of returned to ``pending``.
 WORKER_MAX_TASK_ATTEMPTS = int(os.getenv("WORKER_MAX_TASK_ATTEMPTS", "3"))
 
+# Port of the Prometheus exporter (/metrics) started by the worker; 0 disables it.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
 DATASET_API_USER = os.getenv("DATASET_API_USER", "expert")
 DATASET_API_PASS = os.getenv("DATASET_API_PASS", "")
 WORKER_TOKEN_TTL=3600
\ No newline at end of file
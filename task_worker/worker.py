@@ -6,6 +6,7 @@ import logging
 import os
 from datetime import datetime
 from typing import Dict, List, Optional
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 from config import (
     TASK_QUEUE_API_URL, 
     AGENT_API_URL, 
@@ -19,6 +20,7 @@ from config import (
     WORKER_RECOVERY_INTERVAL_SECONDS,
     WORKER_HEARTBEAT_SECONDS,
     WORKER_MAX_TASK_ATTEMPTS,
+    WORKER_METRICS_PORT,
 )
 
 # Настройка логирования
@@ -28,6 +30,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Prometheus metrics, exported on WORKER_METRICS_PORT (0 = exporter off).
+# Labels are fixed sets: task outcome, agent request outcome, poll result.
+_TASK_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+
+TASKS_TOTAL = Counter("gena_worker_tasks_total", "Tasks processed by the worker", ["outcome"])
+TASK_DURATION = Histogram(
+    "gena_worker_task_duration_seconds", "Task processing time, agent call and save included",
+    ["outcome"], buckets=_TASK_BUCKETS,
+)
+TASKS_IN_FLIGHT = Gauge("gena_worker_tasks_in_flight", "Tasks being processed")
+AGENT_REQUEST_DURATION = Histogram(
+    "gena_worker_agent_request_duration_seconds", "One attempt of the agent_api /process_prompt/ call",
+    ["outcome"], buckets=_TASK_BUCKETS,
+)
+POLLS_TOTAL = Counter("gena_worker_polls_total", "Polls of /tasks/pending", ["result"])
+
+
+def start_metrics_exporter(port: int = WORKER_METRICS_PORT) -> bool:
+    """Serve /metrics from a daemon thread; returns False when disabled or the port is busy."""
+    if not port:
+        return False
+    try:
+        start_http_server(port)
+    except OSError as e:
+        logger.warning(f"Metrics exporter not started on port {port}: {e}")
+        return False
+    logger.info(f"Metrics exporter listening on :{port}/metrics")
+    return True
+
+
 # #region agent log
 _DBG_PATH = '/tmp/debug-15e35f.log'
 def _dbg(loc, msg, data=None, hyp=None):
@@ -56,11 +88,15 @@ class TaskWorker:
                 params={"limit": self.batch_size}
             )
             if response.status_code == 200:
-                return response.json()
+                tasks = response.json()
+                POLLS_TOTAL.labels("tasks" if tasks else "empty").inc()
+                return tasks
             else:
+                POLLS_TOTAL.labels("error").inc()
                 logger.error(f"Failed to get pending tasks: {response.status_code}")
                 return []
         except Exception as e:
+            POLLS_TOTAL.labels("error").inc()
             logger.error(f"Error getting pending tasks: {str(e)}")
             return []
     
@@ -148,18 +184,35 @@ class TaskWorker:
                 payload["chunk_pre_validated"] = True
             if task.get("pipeline_mode"):
                 payload["pipeline_mode"] = task["pipeline_mode"]
+            if task.get("validation_mode"):
+                payload["validation_mode"] = task["validation_mode"]
+            if task.get("candidates"):
+                payload["candidates"] = task["candidates"]
+            if task.get("language"):
+                payload["language"] = task["language"]
+            if len(task.get("question_types") or []) > 1:
+                # Все типы чанка за один вызов генератора; ответ — result.outputs
+                payload["question_types"] = task["question_types"]
             
             response = None
+            task_started = time.perf_counter()
+            # Время каждой попытки запроса к agent_api (с таймаутами)
+            agent_http_s = []
             _max_attempts = 1 + WORKER_AGENT_MAX_RETRIES
             for attempt in range(_max_attempts):
+                attempt_started = time.perf_counter()
                 try:
                     response = requests.post(
                         f"{self.agent_api_url}/process_prompt/",
                         json=payload,
                         timeout=WORKER_AGENT_TIMEOUT,
                     )
+                    agent_http_s.append(round(time.perf_counter() - attempt_started, 3))
+                    AGENT_REQUEST_DURATION.labels(f"{response.status_code // 100}xx").observe(agent_http_s[-1])
                     break
                 except requests.exceptions.Timeout:
+                    agent_http_s.append(round(time.perf_counter() - attempt_started, 3))
+                    AGENT_REQUEST_DURATION.labels("timeout").observe(agent_http_s[-1])
                     if attempt < WORKER_AGENT_MAX_RETRIES:
                         logger.warning(
                             f"Task {task_id} agent request timeout "
@@ -181,9 +234,16 @@ class TaskWorker:
                 result = response.json()
                 logger.info(f"Task {task_id} completed successfully for chunk {chunk_id}")
                 
+                save_started = time.perf_counter()
                 if dataset_id:
                     self.save_question_to_dataset(task, result)
                 
+                self._attach_worker_telemetry(result, {
+                    "agent_http_s": agent_http_s,
+                    "agent_attempts": len(agent_http_s),
+                    "save_s": round(time.perf_counter() - save_started, 3),
+                    "total_s": round(time.perf_counter() - task_started, 3),
+                })
                 return result
             else:
                 error_msg = f"Agent API error: {response.status_code} - {response.text[:500]}"
@@ -200,6 +260,22 @@ class TaskWorker:
         finally:
             heartbeat_stop.set()
     
+    @staticmethod
+    def _attach_worker_telemetry(result: Dict, timings: Dict) -> None:
+        """Worker-side HTTP timings go next to the agent's per-stage telemetry
+        (result.result.telemetry.worker) and are persisted with the task result."""
+        agent_result = result.get("result")
+        if not isinstance(agent_result, dict):
+            return
+        telemetry = agent_result.get("telemetry")
+        if not isinstance(telemetry, dict):
+            telemetry = agent_result["telemetry"] = {}
+        telemetry["worker"] = timings
+        logger.info(
+            f"Task timings: agent {sum(timings['agent_http_s']):.2f}s in {timings['agent_attempts']} attempt(s), "
+            f"save {timings['save_s']:.2f}s, total {timings['total_s']:.2f}s"
+        )
+
     def save_question_to_dataset(self, task: Dict, result: Dict):
         try:
             dataset_id = task.get("dataset_id")
@@ -207,59 +283,69 @@ class TaskWorker:
                 logger.warning(f"No dataset_id for task {task['_id']}, skipping save")
                 return
             
-            output = result.get("result", {}).get("output", {})
-
-            if output.get("chunk_rejected"):
-                gate = output.get("chunk_gate_result") or {}
-                logger.info(
-                    f"Chunk {task.get('chunk_id')} rejected by gate: "
-                    f"{gate.get('rejection_reason', 'unknown')}"
-                )
-                return
-
-            generated_question = output.get("generated_question") or {}
-            sensitivity_score = output.get("sensitivity_score") or {}
-            validation_result = output.get("validation_result") or {}
-            difficulty_score  = output.get("difficulty_score") or {}
-            
-            options_dict = {}
-            for i in range(1, 10):
-                option_key = f"option_{i}"
-                if option_key in generated_question and generated_question[option_key] not in [None, "None"]:
-                    options_dict[option_key] = generated_question[option_key]
-            
-            question_data = {
-                "chunk_id": task["chunk_id"],
-                "question_type": task["question_type"],
-                "task": generated_question.get("task", ""),
-                "options": options_dict,
-                "correct_answer": str(generated_question.get("outputs", "")),
-                "provocativeness": str(sensitivity_score.get("provocativeness_score", "")),
-                "difficulty": str(difficulty_score.get("difficulty", "")),
-                "validation_passed": str(validation_result.get("passed", False)),
-                "validation_score": f"{validation_result.get('total', 'N/A')}/{validation_result.get('max_total', 'N/A')}",
-                "validation_threshold": str(validation_result.get("threshold", "N/A")),
-                "validation_details": str(validation_result.get("by_block", {})),
-                "validation_justifications": str(validation_result.get("justifications", {})),
-                "retry_count": str(output.get("retry_count", 0)),
-                "source_chunk": task["chunk_text"]
-            }
-            
-            response = self.session.post(
-                f"{self.dataset_api_url}/datasets/{dataset_id}/add-question",
-                json=question_data,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                save_result = response.json()
-                logger.info(f"Question saved to dataset {dataset_id}, total questions: {save_result.get('total_questions')}")
-                self.update_dataset_progress(dataset_id, task.get("dataset_name", "Unknown"))
+            agent_result = result.get("result", {})
+            if "outputs" in agent_result:
+                outputs = agent_result["outputs"]
+                question_types = list(dict.fromkeys(task.get("question_types") or []))
             else:
-                logger.error(f"Failed to save question to dataset {dataset_id}: {response.status_code} {response.text}")
+                outputs = [agent_result.get("output", {})]
+                question_types = [task["question_type"]]
+
+            for question_type, output in zip(question_types, outputs):
+                self._save_output_to_dataset(task, dataset_id, question_type, output)
                 
         except Exception as e:
             logger.error(f"Error saving question to dataset: {str(e)}")
+
+    def _save_output_to_dataset(self, task: Dict, dataset_id: str, question_type: str, output: Dict):
+        if output.get("chunk_rejected"):
+            gate = output.get("chunk_gate_result") or {}
+            logger.info(
+                f"Chunk {task.get('chunk_id')} ({question_type}) rejected by gate: "
+                f"{gate.get('rejection_reason', 'unknown')}"
+            )
+            return
+
+        generated_question = output.get("generated_question") or {}
+        sensitivity_score = output.get("sensitivity_score") or {}
+        validation_result = output.get("validation_result") or {}
+        difficulty_score  = output.get("difficulty_score") or {}
+        
+        options_dict = {}
+        for i in range(1, 10):
+            option_key = f"option_{i}"
+            if option_key in generated_question and generated_question[option_key] not in [None, "None"]:
+                options_dict[option_key] = generated_question[option_key]
+        
+        question_data = {
+            "chunk_id": task["chunk_id"],
+            "question_type": question_type,
+            "task": generated_question.get("task", ""),
+            "options": options_dict,
+            "correct_answer": str(generated_question.get("outputs", "")),
+            "provocativeness": str(sensitivity_score.get("provocativeness_score", "")),
+            "difficulty": str(difficulty_score.get("difficulty", "")),
+            "validation_passed": str(validation_result.get("passed", False)),
+            "validation_score": f"{validation_result.get('total', 'N/A')}/{validation_result.get('max_total', 'N/A')}",
+            "validation_threshold": str(validation_result.get("threshold", "N/A")),
+            "validation_details": str(validation_result.get("by_block", {})),
+            "validation_justifications": str(validation_result.get("justifications", {})),
+            "retry_count": str(output.get("retry_count", 0)),
+            "source_chunk": task["chunk_text"]
+        }
+        
+        response = self.session.post(
+            f"{self.dataset_api_url}/datasets/{dataset_id}/add-question",
+            json=question_data,
+            timeout=10
+        )
+        
+        if response.status_code == 200:
+            save_result = response.json()
+            logger.info(f"Question saved to dataset {dataset_id}, total questions: {save_result.get('total_questions')}")
+            self.update_dataset_progress(dataset_id, task.get("dataset_name", "Unknown"))
+        else:
+            logger.error(f"Failed to save question to dataset {dataset_id}: {response.status_code} {response.text}")
     
     def update_dataset_progress(self, dataset_id: str, dataset_name: str):
         if dataset_id not in self.dataset_progress:
@@ -350,15 +436,22 @@ class TaskWorker:
                 dataset_tasks.setdefault(dataset_id, []).append(task)
         
         for task in tasks:
-            result = self.process_task(task)
+            task_started = time.perf_counter()
+            TASKS_IN_FLIGHT.inc()
+            try:
+                result = self.process_task(task)
+            finally:
+                TASKS_IN_FLIGHT.dec()
             if result:
                 task["result"] = result
                 self.update_task_status(task["_id"], "completed", result=result)
             # Статус уже обновлен в process_task при ошибке, не нужно обновлять повторно
+            outcome = "completed" if result else "failed"
+            TASKS_TOTAL.labels(outcome).inc()
+            TASK_DURATION.labels(outcome).observe(time.perf_counter() - task_started)
         
         # Проверяем завершение датасетов только после обработки всех задач в батче
         # Используем небольшую задержку, чтобы дать время обновиться статусам в БД
-        import time
         time.sleep(1)
         
         for dataset_id, dataset_task_list in dataset_tasks.items():
@@ -453,6 +546,7 @@ class TaskWorker:
         logger.info(f"Task Queue API: {self.task_queue_url}")
         logger.info(f"Agent API: {self.agent_api_url} (using endpoint: {self.agent_api_url}/process_prompt/)")
         logger.info(f"Dataset API: {self.dataset_api_url}")
+        start_metrics_exporter()
         
         self.recover_stuck_tasks()
         self.reconcile_dataset_status()
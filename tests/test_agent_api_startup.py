@@ -0,0 +1,56 @@
+"""Холодный старт agent_api: ``import agent_api`` не тянет граф, LLM-клиенты и опциональные провайдеры."""
+
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+pytest.importorskip("fastapi")
+
+
+def _load_bench():
+    spec = importlib.util.spec_from_file_location("bench_startup", _AGENT_API / "bench_startup.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+B = _load_bench()
+
+
+def test_parse_importtime():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     json.decoder",
+        "import time:       300 |        420 |   json",
+        "import time:      1000 |       1420 | agent_api",
+    ])
+
+    assert B.parse_importtime(stderr) == [
+        ("json.decoder", 120, 120, 2),
+        ("json", 300, 420, 1),
+        ("agent_api", 1000, 1420, 0),
+    ]
+
+
+def test_import_agent_api_skips_heavy_modules():
+    report = B.measure_import()
+    forbidden = B.load_thresholds(B.DEFAULT_THRESHOLDS)["forbidden_on_import"]
+
+    assert report["import_s"] > 0
+    assert not set(forbidden) & set(report["modules"])
+
+
+def test_budget_violations_are_reported():
+    report = {"import_s": 1.0, "ready_s": 2.0, "modules": ["fastapi", "pymongo"]}
+    thresholds = {"max_import_s": 0.5, "max_ready_s": 5, "max_regression": 0.25, "forbidden_on_import": ["pymongo"]}
+
+    violations = B.check_thresholds(report, thresholds, baseline={"import_s": 0.9, "ready_s": 1.0})
+
+    assert len(violations) == 3
+    assert any("pymongo" in v for v in violations)
+    assert any(v.startswith("ready_s") and "baseline" in v for v in violations)
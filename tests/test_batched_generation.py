@@ -0,0 +1,205 @@
+"""Генерация нескольких типов вопросов по чанку одним вызовом LLM:
+цепочка generate_question, GENAAssistant.invoke_many и сохранение в воркере."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+_REPO = Path(__file__).resolve().parent.parent
+_AGENT_API = _REPO / "agent_api"
+_TASK_WORKER = _REPO / "task_worker"
+
+CHUNK = "Статья 1. Граждане имеют право на труд. Статья 2. Труд свободен."
+
+
+def _import_generate_question():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем цепочку со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.nodes.generate_question import generate_question
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return generate_question
+
+
+def _question(kind: str, **fields) -> dict:
+    question = {"task": f"Вопрос {kind}", "outputs": "1", "option_1": "да", "option_2": "нет"}
+    if kind == "open":
+        question = {"task": "Вопрос open", "outputs": "Право на труд"}
+    return {**question, **fields}
+
+
+# ---------- Цепочка ----------
+
+
+@pytest.fixture
+def chain_with_fake_llm(monkeypatch):
+    G = _import_generate_question()
+    calls = []
+
+    def fake_llm(prompt_value):
+        messages = prompt_value.to_messages()
+        calls.append(messages)
+        types = [t.strip() for t in messages[1].content.split("**Типы вопросов**:")[1].split("\n")[0].split(",")]
+        # Модель возвращает типы в другом порядке — цепочка восстанавливает порядок запроса
+        questions = [_question(t, question_type=t) for t in reversed(types)]
+        return AIMessage(content=json.dumps({"questions": questions}, ensure_ascii=False))
+
+    monkeypatch.setattr(G, "create_chat_llm", lambda **kwargs: RunnableLambda(fake_llm))
+    return G.create_generate_question_chain(), calls
+
+
+def test_chain_generates_all_types_in_one_call(chain_with_fake_llm):
+    chain, calls = chain_with_fake_llm
+
+    outs = chain.invoke({
+        "input_text": CHUNK,
+        "question_type": "one",
+        "question_types": ["one", "multi", "open"],
+        "source": "Конституция",
+        "language": "ru",
+    })
+
+    assert len(calls) == 1
+    system, human = calls[0]
+    assert human.content.count(CHUNK) == 1 and CHUNK not in system.content
+    for question_type in ("one", "multi", "open"):
+        assert f"###ТИП ВОПРОСА: {question_type}###" in system.content
+    assert [o["question_type"] for o in outs] == ["one", "multi", "open"]
+    assert all(o["source_text"] == CHUNK for o in outs)
+
+
+# ---------- Граф ----------
+
+
+class _Chain:
+    def __init__(self, fn):
+        self.fn = fn
+        self.inputs = []
+
+    def invoke(self, input_data):
+        self.inputs.append(input_data)
+        return self.fn(input_data)
+
+
+class _Scores:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _validation(_input):
+    return _Scores(type="x", by_block={}, justifications={}, total=10, max_total=10, threshold=5, passed=True)
+
+
+def _assistant(generate, gate=None):
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.assistant_graph import GENAAssistant
+    finally:
+        sys.path.remove(str(_AGENT_API))
+
+    return GENAAssistant(
+        generate_question_chain=generate,
+        provocativeness_chain=_Chain(lambda _: _Scores(provocativeness_score=1, explanation="")),
+        validation_chain=_Chain(_validation),
+        difficulty_chain=_Chain(lambda _: _Scores(difficulty=2, explanation="")),
+        chunk_gate_chain=gate,
+    )
+
+
+def _batched_generator(returned_types=None):
+    def generate(input_data):
+        if "question_types" in input_data:
+            types = returned_types if returned_types is not None else input_data["question_types"]
+            return [_question(t, question_type=t, source_text=input_data["input_text"]) for t in types]
+        return _question(input_data["question_type"], task="отдельный вызов", source_text=input_data["input_text"])
+    return _Chain(generate)
+
+
+def _input():
+    return {"chunk": CHUNK, "source": "Конституция", "source_text": CHUNK, "pipeline_mode": "generator_validator"}
+
+
+def test_invoke_many_generates_once_and_evaluates_each_type():
+    generate = _batched_generator()
+    assistant = _assistant(generate)
+
+    outputs = assistant.invoke_many(_input(), ["one", "open", "one"])
+
+    assert len(generate.inputs) == 1
+    assert generate.inputs[0]["question_types"] == ["one", "open"]
+    assert [o["question_type"] for o in outputs] == ["one", "open"]
+    assert outputs[1]["generated_question"]["task"] == "Вопрос open"
+    assert all(o["validation_result"]["passed"] for o in outputs)
+    assert len(assistant.validation_chain.inputs) == 2
+
+
+def test_type_missing_from_batch_is_generated_separately():
+    generate = _batched_generator(returned_types=["one"])
+    outputs = _assistant(generate).invoke_many(_input(), ["one", "multi"])
+
+    assert [len(i.get("question_types", [])) for i in generate.inputs] == [2, 0]
+    assert outputs[1]["generated_question"]["task"] == "отдельный вызов"
+
+
+def test_gate_rejected_type_is_not_generated():
+    generate = _batched_generator()
+    gate = _Chain(lambda i: {"passed": i["question_type"] != "multi", "rejection_reason": None})
+    data = {**_input(), "pipeline_mode": "full"}
+
+    outputs = _assistant(generate, gate).invoke_many(data, ["multi", "one", "open"])
+
+    assert outputs[0]["chunk_rejected"]
+    assert generate.inputs[0]["question_types"] == ["one", "open"]
+    assert len(generate.inputs) == 1
+
+
+def test_all_types_are_gated_before_shared_generation():
+    generate = _batched_generator()
+    gate = _Chain(lambda i: {"passed": i["question_type"] != "open", "rejection_reason": None})
+    data = {**_input(), "pipeline_mode": "full"}
+
+    outputs = _assistant(generate, gate).invoke_many(data, ["one", "multi", "open"])
+
+    assert generate.inputs[0]["question_types"] == ["one", "multi"]
+    assert [o["chunk_rejected"] for o in outputs] == [False, False, True]
+    assert "generated_question" not in outputs[2]
+    assert [i["question_type"] for i in gate.inputs] == ["one", "multi", "open"]
+
+
+# ---------- Воркер ----------
+
+
+def test_worker_saves_one_question_per_type():
+    sys.path.insert(0, str(_TASK_WORKER))
+    try:
+        from worker import TaskWorker
+    finally:
+        sys.path.remove(str(_TASK_WORKER))
+
+    task = {
+        "_id": "t1", "chunk_id": 7, "chunk_text": CHUNK, "dataset_id": "ds",
+        "question_type": "one", "question_types": ["one", "open"],
+    }
+    result = {"result": {"outputs": [
+        {"generated_question": _question("one")},
+        {"chunk_rejected": True, "chunk_gate_result": {"rejection_reason": "no facts"}},
+    ]}}
+    w = TaskWorker()
+    with patch.object(w.session, "post", return_value=MagicMock(status_code=200)) as post:
+        w.save_question_to_dataset(task, result)
+
+    assert post.call_count == 1
+    assert post.call_args.kwargs["json"]["question_type"] == "one"
@@ -0,0 +1,298 @@
+"""Адаптивный лимитер LLM endpoint-ов в agent_api/endpoint_limiter.py."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from email.utils import formatdate
+from pathlib import Path
+
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_endpoint_limiter():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем endpoint_limiter со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import endpoint_limiter
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return endpoint_limiter
+
+
+L = _import_endpoint_limiter()
+# Транспорты построены на HTTP-библиотеке openai SDK (httpx или httpx2)
+httpx = L.httpx
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(clock=None, **settings):
+    return L.EndpointLimiter("http://llm:8000/v1", L.LimiterSettings(**settings), clock=clock or FakeClock())
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    clock = FakeClock()
+    bucket = L.TokenBucket(rate=2.0, burst=2.0, clock=clock)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    clock.now += 1.5
+    assert bucket.reserve() == pytest.approx(0.0)
+    assert L.TokenBucket(rate=0, burst=0).reserve() == 0.0
+
+
+def test_parse_retry_after():
+    assert L.parse_retry_after("3") == 3.0
+    assert L.parse_retry_after(None) is None
+    assert L.parse_retry_after("soon") is None
+    assert L.parse_retry_after(formatdate(1010.0, usegmt=True), now=1000.0) == pytest.approx(10.0)
+
+
+def test_overload_halves_window_once_per_burst():
+    clock = FakeClock()
+    limiter = _limiter(clock, initial_concurrency=8, min_concurrency=1, decrease_factor=0.5)
+
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release(429, 0.1)
+    assert limiter.limit == 4
+    assert limiter.throttled_total == 3
+
+    clock.now += 2
+    limiter.acquire()
+    limiter.release(503, 0.1)
+    assert limiter.limit == 2
+    assert limiter.snapshot()["decreases_total"] == 2
+
+
+def test_window_grows_only_when_saturated():
+    limiter = _limiter(initial_concurrency=2, max_concurrency=3)
+
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(200, 0.1)
+    assert limiter.limit == 2
+
+    for _ in range(4):
+        limiter.acquire()
+        limiter.acquire()
+        limiter.release(200, 0.1)
+        limiter.release(200, 0.1)
+    assert limiter.limit == 3
+
+
+def test_latency_growth_shrinks_window():
+    limiter = _limiter(initial_concurrency=8, latency_tolerance=2.0)
+
+    for _ in range(L._LATENCY_WARMUP_SAMPLES):
+        limiter.acquire()
+        limiter.release(200, 0.1)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(200, 2.0)
+
+    assert limiter.limit < 8
+
+
+def test_full_window_queues_and_times_out():
+    limiter = _limiter(clock=lambda: 0.0, initial_concurrency=1, queue_timeout_s=0.05)
+    limiter.acquire()
+
+    with pytest.raises(httpx.PoolTimeout):
+        limiter.acquire()
+    assert limiter.snapshot()["queue_timeouts_total"] == 1
+    assert limiter.snapshot()["queue_depth"] == 0
+
+
+def test_released_slot_goes_to_waiter():
+    limiter = L.EndpointLimiter("http://llm", L.LimiterSettings(initial_concurrency=1, queue_timeout_s=5))
+    limiter.acquire()
+    admitted = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), admitted.set()))
+    waiter.start()
+
+    assert not admitted.wait(0.1)
+    assert limiter.snapshot()["queue_depth"] == 1
+    limiter.release(200, 0.1)
+    assert admitted.wait(2)
+    waiter.join()
+    assert limiter.snapshot()["in_flight"] == 1
+
+
+def test_async_acquire_waits_for_slot():
+    limiter = L.EndpointLimiter("http://llm", L.LimiterSettings(initial_concurrency=1, max_concurrency=1,
+                                                                 queue_timeout_s=5))
+
+    async def scenario():
+        await limiter.acquire_async()
+        second = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        limiter.release(200, 0.1)
+        await asyncio.wait_for(second, 1)
+
+        cancelled = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+    asyncio.run(scenario())
+    snapshot = limiter.snapshot()
+    assert (snapshot["in_flight"], snapshot["queue_depth"], snapshot["admitted_total"]) == (1, 0, 2)
+
+
+def test_retry_after_pauses_endpoint():
+    clock = FakeClock()
+    limiter = _limiter(clock, max_retry_after_s=60)
+
+    assert limiter.backoff(0, "30") == 0.0
+    assert limiter.snapshot()["paused_for_s"] == 30.0
+    limiter.backoff(0, "3600")
+    assert limiter.snapshot()["paused_for_s"] == 60.0
+
+    delay = limiter.backoff(3)
+    assert 2.0 <= delay <= 4.0
+    assert limiter.retries_total == 3
+
+
+def test_transport_retries_overloaded_responses():
+    limiter = _limiter(max_retries=3)
+    statuses = iter([429, 503, 200])
+
+    def handler(request):
+        status = next(statuses)
+        return httpx.Response(status, headers={"Retry-After": "0"} if status == 429 else {})
+
+    transport = L.LimitedTransport(httpx.MockTransport(handler), limiter)
+    with httpx.Client(transport=transport) as client:
+        assert client.get("http://llm:8000/v1/models").status_code == 200
+
+    snapshot = limiter.snapshot()
+    assert (snapshot["throttled_total"], snapshot["retries_total"], snapshot["in_flight"]) == (2, 2, 0)
+    assert snapshot["admitted_total"] == 3
+
+
+def test_async_transport_gives_up_after_max_retries():
+    limiter = _limiter(max_retries=1)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    async def scenario():
+        transport = L.AsyncLimitedTransport(httpx.MockTransport(handler), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("http://llm:8000/v1/models")
+
+    assert asyncio.run(scenario()).status_code == 429
+    assert len(calls) == 2
+    assert limiter.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("failure", ["connect_error", 502])
+def test_transport_retries_transient_failures(failure):
+    limiter = _limiter(max_retries=3, backoff_base_s=0.01)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            if failure == "connect_error":
+                raise httpx.ConnectError("connection reset", request=request)
+            return httpx.Response(failure)
+        return httpx.Response(200)
+
+    transport = L.LimitedTransport(httpx.MockTransport(handler), limiter)
+    with httpx.Client(transport=transport) as client:
+        assert client.get("http://llm:8000/v1/models").status_code == 200
+
+    snapshot = limiter.snapshot()
+    assert len(calls) == 2
+    assert (snapshot["retries_total"], snapshot["errors_total"], snapshot["in_flight"]) == (1, 1, 0)
+
+
+def test_async_transport_gives_up_on_persistent_connect_errors():
+    limiter = _limiter(max_retries=2, backoff_base_s=0.01)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    async def scenario():
+        transport = L.AsyncLimitedTransport(httpx.MockTransport(handler), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://llm:8000/v1/models")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(scenario())
+    assert len(calls) == 3
+    assert limiter.snapshot()["in_flight"] == 0
+
+
+def test_cancelled_request_is_not_a_failure(monkeypatch):
+    limiter = _limiter()
+    outcomes = []
+    monkeypatch.setattr(L, "_outcome_listeners", [lambda endpoint, status: outcomes.append(status)])
+
+    async def handler(request):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        transport = L.AsyncLimitedTransport(httpx.MockTransport(handler), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            request = asyncio.create_task(client.get("http://llm:8000/v1/models"))
+            await asyncio.sleep(0.05)
+            request.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await request
+
+    asyncio.run(scenario())
+    snapshot = limiter.snapshot()
+    assert (snapshot["in_flight"], snapshot["errors_total"]) == (0, 0)
+    assert outcomes == []
+
+
+def test_registry_is_per_endpoint_and_configurable():
+    a = L.get_endpoint_limiter("http://registry-a:8000/v1/")
+    assert L.get_endpoint_limiter("http://registry-a:8000/v1") is a
+    assert L.get_endpoint_limiter("http://registry-b:8000/v1") is not a
+
+    L.configure_endpoint_limiter("http://registry-a:8000/v1", max_concurrency=2, rps=5)
+    assert a.limit == 2
+    assert a.snapshot()["rps_limit"] == 5
+    assert "http://registry-a:8000/v1" in {s["endpoint"] for s in L.limiter_snapshots()}
+
+
+def test_model_extra_limits_reach_llm_factory():
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.runnables import _extract_provider_kwargs
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+
+    extra = {"scope": "GIGACHAT_API_CORP", "max_concurrency": 4, "rate_limit_rps": 2, "description": "-"}
+    assert _extract_provider_kwargs({"extra": extra}) == {
+        "scope": "GIGACHAT_API_CORP", "max_concurrency": 4, "rate_limit_rps": 2,
+    }
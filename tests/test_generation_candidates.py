@@ -0,0 +1,207 @@
+"""Режим кандидатов генерации: N вариантов вопроса одним запросом (n=),
+дешёвые проверки generate_question/candidates.py и выбор лучшего в графе."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+CHUNK = "Статья 75. Денежной единицей в Российской Федерации является рубль."
+GOOD = {"task": "Какая денежная единица в РФ?", "option_1": "рубль", "option_2": "евро",
+        "option_3": "доллар", "option_4": "юань", "outputs": "1"}
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import llm_factory
+        from agent.assistant_graph import GENAAssistant
+        from agent.nodes.generate_question import candidates, generate_question
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return llm_factory, GENAAssistant, candidates, generate_question
+
+
+F, GENAAssistant, K, G = _import_modules()
+
+
+# ---------- Проверки ----------
+
+
+@pytest.mark.parametrize(
+    "changes, qtype, issues",
+    [
+        ({}, "one", []),
+        ({"option_2": " Рубль! "}, "one", ["duplicate_options"]),
+        ({"outputs": "5"}, "one", ["invalid_outputs"]),
+        ({"outputs": "1,2"}, "one", ["invalid_outputs"]),
+        ({"outputs": "рубль"}, "one", ["invalid_outputs"]),
+        ({"outputs": "1,2"}, "multi", []),
+        ({"outputs": "1"}, "multi", ["invalid_outputs"]),
+        ({"option_3": "д" * 201}, "one", ["too_long"]),
+        ({"task": ""}, "one", ["empty_task"]),
+    ],
+)
+def test_candidate_issues(changes, qtype, issues):
+    assert K.candidate_issues({**GOOD, **changes}, qtype) == issues
+
+
+def test_language_consistency():
+    russian = {"task": "Какая денежная единица установлена в Российской Федерации?", "outputs": "рубль"}
+    tajik = {"task": "Кадом забони давлатӣ дар Ҷумҳурии Тоҷикистон аст?", "outputs": "тоҷикӣ"}
+
+    assert K.candidate_issues(russian, "open", "ru") == []
+    assert K.candidate_issues(russian, "open", "tg") == ["wrong_language"]
+    assert K.candidate_issues(tajik, "open", "tg") == []
+    assert K.candidate_issues(tajik, "open", "ru") == ["wrong_language"]
+    assert K.candidate_issues(russian, "open") == []
+
+
+def test_language_check_counts_letters_only():
+    numeric = {"task": "Статья 1234567890, пункт 1234567890 — 12345?", "outputs": "1"}
+    assert K.candidate_issues(numeric, "open", "tg") == []
+
+
+def test_rank_keeps_generation_order_on_ties():
+    dup = {**GOOD, "option_2": "рубль"}
+    other = {**GOOD, "task": "Что является денежной единицей РФ?"}
+
+    ranked = K.rank_candidates([dup, GOOD, other], "one")
+
+    assert [c for c, _ in ranked] == [GOOD, other, dup]
+
+
+# ---------- n-сэмплирование ----------
+
+
+def _completion(contents):
+    return {
+        "id": "cmpl-1", "object": "chat.completion", "created": 0, "model": "qwen",
+        "choices": [
+            {"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": c}}
+            for i, c in enumerate(contents)
+        ],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 30, "total_tokens": 130},
+    }
+
+
+@pytest.fixture
+def llm_requests(monkeypatch):
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append(body)
+        return httpx.Response(200, json=_completion([f"ответ {i}" for i in range(body.get("n", 1))]))
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(F, "get_http_client", lambda *args: client)
+    yield bodies
+    client.close()
+
+
+@pytest.mark.parametrize("guided", ["off", "json_schema"])
+def test_openai_candidates_come_from_one_request(monkeypatch, llm_requests, guided):
+    monkeypatch.setattr(F, "LLM_GUIDED_DECODING", guided)
+    llm = F.create_chat_llm(provider="openai", model_name="qwen", base_url="http://n:8000/v1", api_key="k",
+                            temperature=0.7, response_schema=G.StructuredQuestionOutput)
+
+    answers = F.sample_completions(llm, [SystemMessage(content="s"), HumanMessage(content="h")], 3)
+
+    assert [a.content for a in answers] == ["ответ 0", "ответ 1", "ответ 2"]
+    assert len(llm_requests) == 1 and llm_requests[0]["n"] == 3
+    assert ("response_format" in llm_requests[0]) == (guided == "json_schema")
+
+
+def test_other_providers_sample_separately():
+    calls = []
+    llm = RunnableLambda(lambda messages: calls.append(messages) or AIMessage(content=str(len(calls))))
+
+    answers = F.sample_completions(llm, [HumanMessage(content="h")], 3, provider="yandex")
+
+    assert len(calls) == 3 and len(answers) == 3
+
+
+def test_chain_returns_parseable_candidates(monkeypatch):
+    replies = iter([json.dumps(GOOD, ensure_ascii=False), "не JSON", json.dumps({**GOOD, "outputs": "2"})])
+    monkeypatch.setattr(G, "create_chat_llm", lambda **kw: RunnableLambda(lambda _: AIMessage(content=next(replies))))
+    chain = G.create_generate_question_chain()
+
+    outs = chain.invoke({"input_text": CHUNK, "question_type": "one", "source": "Конституция", "language": "ru",
+                         "candidates": 3})
+
+    assert [o["outputs"] for o in outs] == ["1", "2"]
+    assert all(o["source_text"] == CHUNK for o in outs)
+
+
+# ---------- Граф ----------
+
+
+class _Chain:
+    def __init__(self, fn):
+        self.fn = fn
+        self.inputs = []
+
+    def invoke(self, input_data):
+        self.inputs.append(input_data)
+        return self.fn(input_data)
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _assistant(generate):
+    validation = _Chain(lambda _: _Result(type="one", by_block={}, justifications={}, total=20,
+                                          max_total=20.5, threshold=18, passed=True))
+    assistant = GENAAssistant(
+        generate_question_chain=generate,
+        provocativeness_chain=_Chain(lambda _: _Result(provocativeness_score=1, explanation="")),
+        validation_chain=validation,
+        difficulty_chain=_Chain(lambda _: _Result(difficulty=2, explanation="")),
+    )
+    return assistant, validation
+
+
+def _state(**fields):
+    return {"chunk": CHUNK, "question_type": "one", "source": "Конституция",
+            "pipeline_mode": "generator_validator", **fields}
+
+
+def test_graph_validates_only_the_best_candidate():
+    bad = {**GOOD, "option_2": "рубль", "source_text": CHUNK}
+    best = {**GOOD, "task": "Что является денежной единицей РФ?", "source_text": CHUNK}
+    generate = _Chain(lambda i: [bad, best] if i.get("candidates") else None)
+    assistant, validation = _assistant(generate)
+
+    output = assistant.graph.invoke(_state(candidates=2))
+
+    assert generate.inputs[0]["candidates"] == 2 and len(generate.inputs) == 1
+    assert len(validation.inputs) == 1
+    assert validation.inputs[0]["question"]["task"] == best["task"]
+    assert output["candidates_report"] == {"generated": 2, "issues": []}
+
+
+def test_graph_falls_back_when_no_candidate_parses():
+    generate = _Chain(lambda i: [] if i.get("candidates") else {**GOOD, "source_text": CHUNK})
+    assistant, _ = _assistant(generate)
+
+    output = assistant.graph.invoke(_state(candidates=3))
+
+    assert len(generate.inputs) == 2 and "candidates" not in generate.inputs[1]
+    assert output["generated_question"]["task"] == GOOD["task"]
@@ -0,0 +1,100 @@
+"""Guided decoding по JSON-схеме ответа в agent_api/llm_factory.py."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_llm_factory():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем llm_factory со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import llm_factory
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return llm_factory
+
+
+F = _import_llm_factory()
+
+
+class Score(BaseModel):
+    difficulty: int = Field(ge=1, le=3)
+    explanation: str
+
+
+@pytest.fixture
+def llm_requests(monkeypatch):
+    """LLM endpoint в памяти: запоминает тела запросов, отвечает валидным JSON."""
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": "cmpl-1", "object": "chat.completion", "created": 0, "model": "qwen",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                "role": "assistant", "content": '{"difficulty": 2, "explanation": "ok"}',
+            }}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(F, "get_http_client", lambda *args: client)
+    yield bodies
+    client.close()
+
+
+def _llm(**kwargs):
+    return F.create_chat_llm(
+        provider="openai", model_name="qwen", base_url="http://guided:8000/v1", api_key="k",
+        response_schema=Score, **kwargs,
+    )
+
+
+def test_mode_comes_from_env_and_model_extra(monkeypatch):
+    monkeypatch.setattr(F, "LLM_GUIDED_DECODING", "json_schema")
+    assert F.guided_decoding_mode("openai") == "json_schema"
+    assert F.guided_decoding_mode("openai", "guided_json") == "guided_json"
+    assert F.guided_decoding_mode("openai", False) == "off"
+    assert F.guided_decoding_mode("openai", "xml") == "off"
+    assert F.guided_decoding_mode("gigachat") == "off"
+
+
+def test_off_returns_plain_chat_model(monkeypatch):
+    monkeypatch.setattr(F, "LLM_GUIDED_DECODING", "off")
+    assert isinstance(_llm(), ChatOpenAI)
+
+
+def test_json_schema_request_keeps_chat_template_kwargs(llm_requests):
+    chain = ChatPromptTemplate.from_messages([("human", "Оцени")]) | _llm(guided_decoding="json_schema") \
+        | JsonOutputParser(pydantic_object=Score)
+
+    assert chain.invoke({}) == {"difficulty": 2, "explanation": "ok"}
+
+    body = llm_requests[0]
+    assert body["response_format"]["type"] == "json_schema"
+    assert body["response_format"]["json_schema"] == {"name": "Score", "schema": Score.model_json_schema()}
+    assert body["chat_template_kwargs"] == {"enable_thinking": False}
+
+
+def test_guided_json_for_older_vllm(llm_requests):
+    _llm(guided_decoding="guided_json").invoke("Оцени")
+
+    assert llm_requests[0]["guided_json"] == Score.model_json_schema()
+    assert "response_format" not in llm_requests[0]
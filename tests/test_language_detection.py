@@ -0,0 +1,115 @@
+"""Язык генерации: приходит с задачей от chunker'а, без него — быстрое
+определение по классам символов (langdetect — только для текста без
+кириллицы); системный промпт собирается один раз на (тип, язык)."""
+
+from __future__ import annotations
+
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.nodes.generate_question import generate_question, language
+        from agent.handler import GENAHandler
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return generate_question, language, GENAHandler
+
+
+G, L, GENAHandler = _import_modules()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    L.detect_language.cache_clear()
+    yield
+    L.detect_language.cache_clear()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Статья 75. Денежной единицей в Российской Федерации является рубль.", "ru"),
+    ("Рэспубліка Беларусь — унітарная дэмакратычная дзяржава.", "be"),
+    ("Мінск — сталіца Рэспублікі Беларусь.", "be"),
+    ("Ҷумҳурии Тоҷикистон давлати соҳибихтиёр мебошад.", "tg"),
+    ("Забони давлатии Тоҷикистон", "tg"),
+    ("", "ru"),
+    ("12345", "ru"),
+])
+def test_cyrillic_fast_path_skips_langdetect(monkeypatch, text, expected):
+    def fail(_text):
+        raise AssertionError("langdetect для кириллицы не нужен")
+
+    monkeypatch.setattr(L, "_langdetect_language", fail)
+    assert L.detect_language(text) == expected
+
+
+def test_detection_is_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(L, "_langdetect_language", lambda text: calls.append(text) or "ru")
+
+    for _ in range(3):
+        assert L.detect_language("Plain latin text") == "ru"
+
+    assert calls == ["Plain latin text"]
+    assert G.detect_language is L.detect_language
+
+
+def test_explicit_language_skips_detection(monkeypatch):
+    monkeypatch.setattr(G, "detect_language", lambda text: pytest.fail("язык уже известен"))
+
+    assert G._resolve_language({"input_text": "Текст чанка", "language": "be"}) == "be"
+    # Язык документа из задачи не перепроверяется по буквам чанка
+    assert G._resolve_language({"input_text": "Ҷумҳурии Тоҷикистон", "language": "ru"}) == "ru"
+
+
+def test_single_quoted_letter_does_not_change_language():
+    # Как в chunker: буквы языка — не реже 1 на 200, одна цитата язык не меняет
+    russian = "Статья 75. Денежной единицей в Российской Федерации является рубль. " * 10
+    assert L.detect_language(russian + "ҷ") == "ru"
+    assert L.detect_language(russian + "ў") == "ru"
+    assert L.detect_language("Ҷумҳурии Тоҷикистон давлати соҳибихтиёр мебошад.") == "tg"
+
+
+def test_instruction_prompt_is_built_once_per_type_and_language():
+    G._instruction_prompt.cache_clear()
+
+    for _ in range(3):
+        for language in ("ru", "be", "tg"):
+            G._instruction_prompt("one", language)
+    info = G._instruction_prompt.cache_info()
+
+    assert (info.misses, info.hits) == (3, 6)
+    assert "ТАНҲО ЗАБОНИ ТОҶИКӢРО" in G._instruction_prompt("one", "tg")
+    assert "ВЫКАРЫСТОЙЦЕ ВЫКЛЮЧНА БЕЛАРУСКУЮ МОВУ" in G._instruction_prompt("open", "be")
+
+
+@pytest.mark.parametrize("language, expected", [("tg", "tg"), ("de", None), (None, None)])
+def test_handler_passes_supported_language(language, expected):
+    captured = {}
+
+    def invoke_graph(runnables, input_data, *args):
+        captured.update(input_data)
+        return {}
+
+    handler = SimpleNamespace(
+        _lease_model_config=lambda model_id: nullcontext(None),
+        _runnables_for=lambda gen_cfg, val_cfg: None,
+        _invoke_graph=invoke_graph,
+    )
+    GENAHandler.ahandle_prompt(handler, "Текст чанка", "one", "src", "1", language=language)
+
+    assert captured.get("language") == expected
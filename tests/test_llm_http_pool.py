@@ -0,0 +1,175 @@
+"""Общий HTTP-пул клиентов LLM в agent_api/llm_factory.py."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+pytest.importorskip("langchain_openai")
+
+
+def _import_llm_factory():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем llm_factory со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import llm_factory
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return llm_factory
+
+
+F = _import_llm_factory()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_clients():
+    asyncio.run(F.aclose_http_clients())
+    yield
+    asyncio.run(F.aclose_http_clients())
+
+
+def test_chains_to_same_endpoint_share_one_pool():
+    generation = F.create_chat_llm("openai", "qwen", "http://vllm:8000/v1", "key", temperature=0.7)
+    validation = F.create_chat_llm("openai", "qwen-judge", "http://vllm:8000/v1", "key", max_tokens=64)
+
+    assert generation.root_client._client is validation.root_client._client
+    assert generation.root_async_client._client is validation.root_async_client._client
+    assert generation.root_client._client is F.get_http_client("http://vllm:8000/v1", "key")
+
+
+def test_pool_is_per_base_url_and_key():
+    a = F.create_chat_llm("openai", "m", "http://a:8000/v1", "key")
+    b = F.create_chat_llm("openai", "m", "http://b:8000/v1", "key")
+    c = F.create_chat_llm("openai", "m", "http://a:8000/v1", "other-key")
+
+    assert len({id(x.root_client._client) for x in (a, b, c)}) == 3
+
+
+def test_pool_limits_come_from_config(monkeypatch):
+    monkeypatch.setattr(F, "LLM_HTTP_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(F, "LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 3)
+    client = F.get_http_client("http://limits:8000/v1")
+
+    # Под обёртками лимитера и метрик — транспорт httpx с пулом
+    transport = client._transport
+    while hasattr(transport, "_transport"):
+        transport = transport._transport
+    pool = transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+
+
+def test_yandex_uses_shared_pool():
+    llm = F.create_chat_llm("yandex", api_key="yk", folder_id="folder")
+    assert llm.root_client._client is F.get_http_client(F.YANDEX_BASE_URL, "yk")
+
+
+def test_gigachat_wrappers_share_sdk_client():
+    pytest.importorskip("langchain_gigachat")
+    creative = F.create_chat_llm("gigachat", api_key="credentials", temperature=0.9)
+    strict = F.create_chat_llm("gigachat", api_key="credentials", temperature=0.0, max_tokens=16)
+
+    assert creative._client is strict._client
+    assert (creative.temperature, strict.temperature) == (0.9, 0.0)
+
+
+def test_closed_clients_are_recreated():
+    client = F.get_http_client("http://vllm:8000/v1")
+    asyncio.run(F.aclose_http_clients())
+
+    assert client.is_closed
+    assert F.get_http_client("http://vllm:8000/v1") is not client
+
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """Минимальный OpenAI-совместимый /v1/chat/completions."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.status != 200 and self.server.requests <= self.server.failures:
+            self.send_response(self.server.status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps({
+            "id": "cmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"эхо: {body['messages'][-1]['content']}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _base_url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+@pytest.fixture
+def llm_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletionsHandler)
+    # Первые failures запросов получают status
+    server.status, server.requests, server.failures = 200, 0, float("inf")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_invoke_through_real_client_stack(llm_server):
+    """Настоящий пул, лимитер и метрики: транспорты совместимы с клиентом openai SDK."""
+    llm = F.create_chat_llm("openai", "qwen", _base_url(llm_server), "key")
+
+    assert llm.invoke("привет").content == "эхо: привет"
+    assert asyncio.run(llm.ainvoke("пока")).content == "эхо: пока"
+
+
+def test_overload_is_retried_by_limiter_only(llm_server, monkeypatch):
+    """Повторы 429 делает лимитер, SDK не умножает их своими."""
+    monkeypatch.setattr(F, "LLM_LIMIT_ENABLED", True)
+    llm_server.status = 429
+    llm = F.create_chat_llm("openai", "qwen", _base_url(llm_server), "key")
+
+    with pytest.raises(F.openai.RateLimitError):
+        llm.invoke("привет")
+
+    limiter = F.get_endpoint_limiter(_base_url(llm_server))
+    assert llm_server.requests == limiter.settings.max_retries + 1
+
+
+def test_single_bad_gateway_is_retried(llm_server, monkeypatch):
+    """С лимитером SDK не повторяет запросы: разовый 502 повторяет лимитер."""
+    monkeypatch.setattr(F, "LLM_LIMIT_ENABLED", True)
+    llm_server.status, llm_server.failures = 502, 1
+    llm = F.create_chat_llm("openai", "qwen", _base_url(llm_server), "key")
+
+    assert llm.invoke("привет").content == "эхо: привет"
+    assert llm_server.requests == 2
@@ -0,0 +1,460 @@
+"""LLM-валидатор: режим single_call (все блоки критериев одним запросом, те же
+BlockResult / WEIGHTS / MULTIPLIER_INDICES) и калибровка против per_block;
+early exit после обнуления балла мультипликатором; повторная валидация после
+доработки только затронутых блоков; детерминированные правила перед LLM."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+CHUNK = "Статья 75. Денежной единицей в Российской Федерации является рубль."
+QUESTION = {"task": "Какая денежная единица в РФ?", "option_1": "рубль", "option_2": "евро",
+            "option_3": "доллар", "option_4": "юань", "outputs": 1}
+MULTI_QUESTION = {"task": "Какие из перечисленных — государственные символы РФ?", "option_1": "флаг",
+                  "option_2": "герб", "option_3": "гимн", "option_4": "рубль", "option_5": "Кремль",
+                  "option_6": "Конституция", "outputs": "1,2,3"}
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем валидатор со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.nodes.llm_validator import rules, validator
+        from agent.nodes.refine_question import refine_question
+        from agent.assistant_graph import GENAAssistant
+        import calibrate_validator
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return validator, calibrate_validator, GENAAssistant, rules, refine_question
+
+
+V, C, GENAAssistant, R, RQ = _import_modules()
+
+
+def _scores(qtype: str, zero=()) -> dict:
+    """Оценки по всем блокам: единицы, кроме (блок, индекс) из zero."""
+    return {
+        key: [0 if (key, i) in zero else 1 for i in range(V.EXPECTED_COUNTS[qtype][key])]
+        for key in V.BLOCK_ORDER[qtype]
+    }
+
+
+class FakeLLM:
+    """single_call отвечает JSON по всем блокам, per_block — строками «критерий 0/1»."""
+
+    def __init__(self, qtype: str, single_call_blocks=None, single_call_text=None, zero=()):
+        self.qtype = qtype
+        self.scores = _scores(qtype, zero)
+        self.single_call_blocks = single_call_blocks
+        self.single_call_text = single_call_text
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        return RunnableLambda(lambda p: self._respond(p, kwargs.get("response_schema")))
+
+    def _respond(self, prompt_value, schema):
+        system, human = prompt_value.to_messages()
+        self.calls.append((system.content, human.content, schema))
+        if schema is not None:
+            if self.single_call_text is not None:
+                return AIMessage(content=self.single_call_text)
+            keys = self.single_call_blocks or list(self.scores)
+            answer = {k: {"scores": self.scores[k], "justifications": [""] * len(self.scores[k])} for k in keys}
+            return AIMessage(content="```json\n" + json.dumps(answer) + "\n```")
+        key = next(k for k in self.scores if V._load_criterion_template(self.qtype, k).rstrip() in human.content)
+        return AIMessage(content="\n".join(f"критерий {s} — пояснение" for s in self.scores[key]))
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(**kwargs):
+        llm = FakeLLM(**kwargs)
+        monkeypatch.setattr(V, "create_chat_llm", llm)
+        return llm
+    return install
+
+
+def test_single_call_scores_match_per_block(fake_llm):
+    llm = fake_llm(qtype="one", zero={("c1_question", 0), ("c5_phrase", 1)})
+    validator = V.LLMValidator()
+
+    per_block = validator.evaluate("one", CHUNK, QUESTION, mode="per_block")
+    per_block_calls = len(llm.calls)
+    single_call = validator.evaluate("one", CHUNK, QUESTION, mode="single_call")
+
+    assert per_block_calls == len(V.BLOCK_ORDER["one"])
+    assert len(llm.calls) == per_block_calls + 1
+    system, human, schema = llm.calls[-1]
+    assert schema is V.single_call_schema("one")
+    assert CHUNK not in system and human.count(CHUNK) == 1
+    assert all(f"###БЛОК {key}" in system for key in V.BLOCK_ORDER["one"])
+
+    assert single_call["mode"] == "single_call" and per_block["mode"] == "per_block"
+    for field in ("by_block", "total", "passed"):
+        assert single_call[field] == per_block[field]
+    assert single_call["total"] == 20.5 - 0.5 - 1.0
+
+
+def test_single_call_applies_multipliers(fake_llm):
+    fake_llm(qtype="multi", zero={("c2_options", 4)})
+    result = V.LLMValidator(mode="single_call").evaluate("multi", CHUNK, MULTI_QUESTION)
+
+    assert result["total"] == 0 and not result["passed"]
+
+
+def test_missing_blocks_fall_back_to_per_block(fake_llm):
+    llm = fake_llm(qtype="one", single_call_blocks=["c1_question", "c2_options"])
+    result = V.LLMValidator().evaluate("one", CHUNK, QUESTION, mode="single_call")
+
+    assert len(llm.calls) == 1 + 3
+    assert set(result["raw"]) == {"single_call", "c3_outputs", "c4_logic", "c5_phrase"}
+    assert result["passed"]
+
+
+def test_unparseable_answer_evaluates_every_block(fake_llm):
+    llm = fake_llm(qtype="open", single_call_text="Не могу оценить")
+    result = V.LLMValidator().evaluate("open", CHUNK, {"task": "Вопрос", "outputs": "рубль"}, mode="single_call")
+
+    assert len(llm.calls) == 1 + len(V.BLOCK_ORDER["open"])
+    assert result["total"] == V.MAX_POINTS["open"]
+
+
+def test_schema_fixes_vector_lengths():
+    schema = V.single_call_schema("open")
+    props = schema.model_json_schema()["$defs"]["c2_outputs_scores"]["properties"]["scores"]
+    assert props["minItems"] == props["maxItems"] == 6
+
+
+def test_invalid_mode_is_rejected():
+    with pytest.raises(ValueError):
+        V.normalize_validation_mode("batched")
+
+
+def test_zero_multiplier_skips_remaining_blocks(fake_llm):
+    llm = fake_llm(qtype="one", zero={("c1_question", 1)})
+    result = V.LLMValidator(early_exit=True).evaluate("one", CHUNK, QUESTION, mode="per_block")
+
+    assert len(llm.calls) == 1
+    assert result["total"] == 0 and not result["passed"]
+    assert result["skipped_blocks"] == ["c2_options", "c3_outputs", "c4_logic", "c5_phrase"]
+    assert list(result["by_block"]) == V.BLOCK_ORDER["one"]
+    assert result["by_block"]["c2_options"] == [] and result["justifications"]["c5_phrase"] == []
+
+
+def test_early_exit_keeps_non_multiplier_zero_evaluations(fake_llm):
+    llm = fake_llm(qtype="one", zero={("c1_question", 0)})
+    result = V.LLMValidator(early_exit=True).evaluate("one", CHUNK, QUESTION)
+
+    assert len(llm.calls) == len(V.BLOCK_ORDER["one"])
+    assert result["skipped_blocks"] == []
+
+
+def test_early_exit_skips_single_call_fallback(fake_llm):
+    llm = fake_llm(qtype="one", zero={("c2_options", 3)}, single_call_blocks=["c1_question", "c2_options"])
+    result = V.LLMValidator(early_exit=True).evaluate("one", CHUNK, QUESTION, mode="single_call")
+
+    assert len(llm.calls) == 1
+    assert result["skipped_blocks"] == ["c3_outputs", "c4_logic", "c5_phrase"]
+
+
+def test_early_exit_disabled_evaluates_every_block(fake_llm):
+    llm = fake_llm(qtype="open", zero={("c2_outputs", 2)})
+    result = V.LLMValidator(early_exit=False).evaluate("open", CHUNK, {"task": "Вопрос", "outputs": "рубль"})
+
+    assert len(llm.calls) == len(V.BLOCK_ORDER["open"])
+    assert result["total"] == 0 and result["skipped_blocks"] == []
+
+
+# ---------- Повторная валидация после доработки ----------
+
+OPEN_QUESTION = {"task": "Какая денежная единица в РФ?", "outputs": "рубль"}
+
+
+def test_shuffled_options_are_not_a_change():
+    shuffled = {"task": QUESTION["task"], "option_1": "юань", "option_2": "евро", "option_3": "рубль",
+                "option_4": "доллар", "outputs": "3"}
+
+    assert V.changed_fields(QUESTION, shuffled) == set()
+    assert V.changed_fields(QUESTION, {**QUESTION, "task": "Какая валюта в РФ?"}) == {"task"}
+    assert V.changed_fields(QUESTION, {**QUESTION, "option_2": "фунт"}) == {"options"}
+    assert V.changed_fields(QUESTION, {**QUESTION, "option_1": "российский рубль"}) == {"options", "outputs"}
+    assert V.changed_fields(QUESTION, {**QUESTION, "text": "пояснение"}) == {"*"}
+
+
+def test_affected_blocks_follow_field_map():
+    assert V.affected_blocks("one", {"outputs"}) == ["c2_options", "c3_outputs", "c4_logic", "c5_phrase"]
+    assert V.affected_blocks("open", {"outputs"}) == ["c2_outputs", "c4_logic", "c5_phrase"]
+    assert V.affected_blocks("one", set()) == []
+    assert V.affected_blocks("open", {"*"}) == V.BLOCK_ORDER["open"]
+
+
+def test_task_change_rescores_outputs_key():
+    assert "c3_outputs" in V.affected_blocks("one", {"task"})
+    assert "c3_outputs" in V.affected_blocks("multi", {"task"})
+
+
+def _previous_result(qtype: str, zero=()) -> dict:
+    scores = _scores(qtype, zero)
+    return {
+        "type": qtype,
+        "by_block": scores,
+        "justifications": {k: ["старое" if s == 0 else "" for s in v] for k, v in scores.items()},
+        "skipped_blocks": [],
+    }
+
+
+def test_unaffected_blocks_carry_over(fake_llm):
+    llm = fake_llm(qtype="open")
+    previous = _previous_result("open", zero={("c1_question", 0), ("c2_outputs", 0)})
+    refined = {**OPEN_QUESTION, "outputs": "российский рубль"}
+
+    result = V.LLMValidator().evaluate(
+        "open", CHUNK, refined, previous_question=OPEN_QUESTION, previous_result=previous,
+    )
+
+    assert len(llm.calls) == 3
+    assert result["carried_blocks"] == ["c1_question"]
+    assert result["by_block"]["c1_question"] == previous["by_block"]["c1_question"]
+    assert result["justifications"]["c1_question"][0] == "старое"
+    assert result["by_block"]["c2_outputs"] == [1] * 6
+    assert result["total"] == V.MAX_POINTS["open"] - 0.5
+
+
+def test_skipped_blocks_are_not_carried(fake_llm):
+    llm = fake_llm(qtype="one")
+    previous = {**_previous_result("one"), "skipped_blocks": ["c3_outputs"]}
+    previous["by_block"]["c3_outputs"] = []
+
+    result = V.LLMValidator().evaluate(
+        "one", CHUNK, {**QUESTION, "task": "Какая валюта в РФ?"}, previous_question=QUESTION, previous_result=previous,
+    )
+
+    assert result["carried_blocks"] == []
+    assert len(llm.calls) == len(V.BLOCK_ORDER["one"])
+
+
+def test_task_only_refine_rescores_stale_outputs_key(fake_llm):
+    llm = fake_llm(qtype="one")
+    previous = _previous_result("one", zero={("c3_outputs", 0)})
+
+    result = V.LLMValidator().evaluate(
+        "one", CHUNK, {**QUESTION, "task": "Какая валюта в РФ?"}, previous_question=QUESTION, previous_result=previous,
+    )
+
+    assert "c3_outputs" not in result["carried_blocks"]
+    assert result["by_block"]["c3_outputs"] == [1] * len(previous["by_block"]["c3_outputs"])
+    assert len(llm.calls) == len(V.BLOCK_ORDER["one"])
+
+
+def test_single_call_rescores_only_affected_blocks(fake_llm):
+    llm = fake_llm(qtype="open")
+    refined = {**OPEN_QUESTION, "outputs": "российский рубль"}
+
+    result = V.LLMValidator().evaluate(
+        "open", CHUNK, refined, mode="single_call",
+        previous_question=OPEN_QUESTION, previous_result=_previous_result("open"),
+    )
+
+    assert len(llm.calls) == 1
+    system, _, schema = llm.calls[0]
+    assert "###БЛОК c1_question" not in system and "###БЛОК c2_outputs" in system
+    assert set(schema.model_fields) == {"c2_outputs", "c4_logic", "c5_phrase"}
+    assert result["carried_blocks"] == ["c1_question"]
+
+
+def test_incremental_disabled_rescores_everything(fake_llm):
+    llm = fake_llm(qtype="open")
+    V.LLMValidator(incremental=False).evaluate(
+        "open", CHUNK, OPEN_QUESTION, previous_question=OPEN_QUESTION, previous_result=_previous_result("open"),
+    )
+
+    assert len(llm.calls) == len(V.BLOCK_ORDER["open"])
+
+
+class _Chain:
+    def __init__(self, fn):
+        self.fn = fn
+        self.inputs = []
+
+    def invoke(self, input_data):
+        self.inputs.append(input_data)
+        return self.fn(input_data)
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def test_graph_passes_pre_refine_question_to_validator():
+    def validate(input_data):
+        passed = "previous_question" in input_data
+        return _Result(type="open", by_block={}, justifications={}, total=16 if passed else 0,
+                       max_total=16, threshold=14, passed=passed)
+
+    validation = _Chain(validate)
+    assistant = GENAAssistant(
+        generate_question_chain=_Chain(lambda _: {**OPEN_QUESTION, "source_text": CHUNK}),
+        provocativeness_chain=_Chain(lambda _: _Result(provocativeness_score=1, explanation="")),
+        validation_chain=validation,
+        difficulty_chain=_Chain(lambda _: _Result(difficulty=2, explanation="")),
+        refine_question_chain=_Chain(lambda _: {"task": OPEN_QUESTION["task"], "outputs": "российский рубль", "source_text": CHUNK}),
+    )
+
+    output = assistant.graph.invoke({
+        "chunk": CHUNK, "question_type": "open", "source": "Конституция", "pipeline_mode": "full",
+        "chunk_pre_validated": True,
+    })
+
+    assert output["validation_result"]["passed"] and output["retry_count"] == 1
+    first, second = validation.inputs
+    assert "previous_question" not in first
+    assert second["previous_question"] == OPEN_QUESTION
+    assert second["previous_result"]["passed"] is False
+    assert not output.get("refined_from")
+
+
+def test_calibration_agreement():
+    def report(passed, total, c1):
+        return {"passed": passed, "total": total, "by_block": {"c1_question": c1, "c5_phrase": [1, 1]}}
+
+    per_block = [report(True, 19, [1, 1, 1, 1, 1]), report(False, 0, [1, 0, 1, 1, 1])]
+    single_call = [report(True, 18, [0, 1, 1, 1, 1]), report(True, 19, [1, 1, 1, 1, 1])]
+
+    summary = C.compare(per_block, single_call)
+
+    assert summary["n"] == 2
+    assert summary["pass_agreement"] == 0.5
+    assert summary["criteria_agreement_by_block"] == {"c1_question": 0.8, "c5_phrase": 1.0}
+    assert summary["criteria_agreement"] == 12 / 14
+    assert summary["multiplier_agreement"] == 0.5
+    assert summary["total_mae"] == 10
+
+
+def test_calibration_sample_accepts_dataset_rows(tmp_path):
+    sample = tmp_path / "sample.jsonl"
+    sample.write_text(
+        json.dumps({"question_type": "one", "source_text": CHUNK, "question": QUESTION}, ensure_ascii=False) + "\n\n"
+        + json.dumps({"question_type": "open", "chunk_text": CHUNK, "task": "Вопрос", "outputs": "рубль", "_id": "x"}) + "\n",
+        encoding="utf-8",
+    )
+
+    items = C.load_sample(sample)
+
+    assert items[0]["question"] == QUESTION
+    assert items[1] == {"question_type": "open", "source_text": CHUNK, "question": {"task": "Вопрос", "outputs": "рубль"}}
+
+
+# ---------- Детерминированные правила ----------
+
+
+def test_rule_multipliers_match_validator():
+    for qtype, criteria in R.RULE_CRITERIA.items():
+        for block, index, name in criteria:
+            is_multiplier = index in V.MULTIPLIER_INDICES[qtype].get(block, [])
+            assert (name in R.MULTIPLIER_CRITERIA) == is_multiplier, (qtype, name)
+
+
+@pytest.mark.parametrize(
+    "a, b, same",
+    [
+        ("Российский рубль", "российский рубль.", True),
+        ("Российский рубль", "Росийский рубль", True),
+        ("статья 125 Конституции", "статья 126 Конституции", False),
+        ("суд рассматривает дело", "суд не рассматривает дело", False),
+        ("рубль", "рубли", False),
+    ],
+)
+def test_fuzzy_matching(a, b, same):
+    assert R.similar(R.normalize_text(a), R.normalize_text(b)) == same
+
+
+def test_rules_batch():
+    questions = [
+        QUESTION,
+        {**QUESTION, "option_3": "Рубль!"},
+        {**QUESTION, "option_4": "Какая денежная единица в РФ"},
+        {**QUESTION, "outputs": "5"},
+        {**QUESTION, "option_4": "", "outputs": "4"},
+        {k: v for k, v in QUESTION.items() if k != "option_4"},
+        {**QUESTION, "task": ""},
+    ]
+    batch = R.check_questions("one", questions)
+    column = {name: j for j, (_, _, name) in enumerate(batch.criteria)}
+
+    assert batch.scores.shape == (len(questions), len(R.RULE_CRITERIA["one"]))
+    assert batch.rejected.tolist() == [False, True, True, True, True, False, True]
+    assert batch.scores[:, column["options_count"]].tolist() == [1, 1, 1, 1, 0, 0, 1]
+    assert batch.scores[0, column["options_duplication"]] == R.UNDECIDED
+    assert batch.scores[1, column["options_duplication"]] == 0
+    assert batch.scores[2, column["options_question_duplication"]] == 0
+    assert batch.scores[3, [column["outputs_include"], column["outputs_exclude"]]].tolist() == [0, 0]
+    assert [v.code for v in batch.violations[1]] == ["options_duplication"]
+    assert batch.violations[1][0].reason == "совпадают варианты 1 и 3"
+    assert batch.report(6).violations[-1].code == "empty_task"
+
+
+def test_multi_correct_count_and_open_answer():
+    multi = R.check_questions("multi", [
+        MULTI_QUESTION,
+        {**MULTI_QUESTION, "outputs": "1"},
+        {**MULTI_QUESTION, "outputs": "1,2,3,4,5,6"},
+        {**MULTI_QUESTION, "outputs": "1,7"},
+    ])
+    # Число правильных ответов вне 2..5 — балл options_right_count, а не отказ
+    assert multi.rejected.tolist() == [False, False, False, True]
+    assert multi.report(1).decided["c2_options"][1] == 0
+    assert "c3_outputs" not in multi.report(1).decided
+    assert multi.report(2).decided["c2_options"][1] == 0
+    assert multi.report(3).decided["c3_outputs"] == {1: 0}
+
+    open_rules = R.check_questions("open", [OPEN_QUESTION, {**OPEN_QUESTION, "outputs": OPEN_QUESTION["task"]}])
+    assert open_rules.rejected.tolist() == [False, True]
+    assert open_rules.report(1).decided == {"c2_outputs": {1: 0}}
+
+
+def test_rejected_question_skips_llm(fake_llm):
+    llm = fake_llm(qtype="one")
+    result = V.LLMValidator().evaluate("one", CHUNK, {**QUESTION, "option_2": "рубль"})
+
+    assert llm.calls == []
+    assert result["rules_rejected"] and result["total"] == 0 and not result["passed"]
+    assert result["skipped_blocks"] == V.BLOCK_ORDER["one"]
+    assert result["rule_violations"] == [{
+        "code": "options_duplication", "block": "c2_options", "index": 4, "reason": "совпадают варианты 1 и 2",
+    }]
+    issues = RQ._build_issues_section(result)
+    assert "[c2_options] совпадают варианты 1 и 2" in issues
+
+
+def test_rules_override_llm_scores(fake_llm):
+    llm = fake_llm(qtype="one")
+    three_options = {k: v for k, v in QUESTION.items() if k != "option_4"}
+    result = V.LLMValidator().evaluate("one", CHUNK, three_options)
+
+    assert len(llm.calls) == len(V.BLOCK_ORDER["one"]) and not result["rules_rejected"]
+    assert result["by_block"]["c2_options"][0] == 0
+    assert result["justifications"]["c2_options"][0] == "вариантов 3, нужно 4"
+    assert result["total"] == 20.5 - 1.0
+    assert "[c2_options][0] оценка 0 — вариантов 3, нужно 4" in RQ._build_issues_section(result)
+
+
+def test_rules_disabled(fake_llm):
+    llm = fake_llm(qtype="one")
+    result = V.LLMValidator(rules=False).evaluate("one", CHUNK, {**QUESTION, "option_2": "рубль"})
+
+    assert len(llm.calls) == len(V.BLOCK_ORDER["one"])
+    assert result["passed"] and result["rule_violations"] == []
@@ -0,0 +1,130 @@
+"""Метрики Prometheus agent_api: /metrics, время запросов по шаблонам маршрутов,
+прогоны графа, этапы телеметрии, запросы к LLM по endpoint-ам и кэши."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+from prometheus_client import REGISTRY
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import agent_api
+        import metrics
+        from agent.nodes.generate_question import language
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return agent_api, metrics, language
+
+
+A, M, L = _import_modules()
+# Транспорты построены на HTTP-библиотеке openai SDK (httpx или httpx2)
+httpx = M.httpx
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_endpoint_and_route_templates():
+    client = TestClient(A.app)
+    before = _value("gena_http_request_duration_seconds_count", method="GET", route="/health/", status="2xx")
+
+    client.get("/health/")
+    client.get("/no/such/path/42")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "gena_http_request_duration_seconds_bucket" in response.text
+    assert _value("gena_http_request_duration_seconds_count", method="GET", route="/health/", status="2xx") == before + 1
+    assert _value("gena_http_request_duration_seconds_count", method="GET", route="unmatched", status="4xx") >= 1
+    assert 'route="/metrics"' not in response.text
+
+
+@pytest.mark.parametrize("status_code, label", [(200, "2xx"), (429, "429"), (503, "5xx"), (None, "error")])
+def test_status_class(status_code, label):
+    assert M.status_class(status_code) == label
+
+
+def test_llm_requests_are_timed_per_endpoint():
+    responses = iter([httpx.Response(200, json={}), httpx.Response(503)])
+    transport = M.MetricsTransport(httpx.MockTransport(lambda request: next(responses)), "http://gpu-1:8000/v1/")
+    endpoint = "http://gpu-1:8000/v1"
+    before_ok = _value("gena_llm_request_duration_seconds_count", endpoint=endpoint, status="2xx")
+    before_err = _value("gena_llm_request_duration_seconds_count", endpoint=endpoint, status="5xx")
+
+    with httpx.Client(transport=transport) as client:
+        client.get("http://gpu-1:8000/v1/models")
+        client.get("http://gpu-1:8000/v1/models")
+
+    assert _value("gena_llm_request_duration_seconds_count", endpoint=endpoint, status="2xx") == before_ok + 1
+    assert _value("gena_llm_request_duration_seconds_count", endpoint=endpoint, status="5xx") == before_err + 1
+    assert _value("gena_llm_requests_in_flight", endpoint=endpoint) == 0
+
+
+def test_llm_transport_errors_are_counted():
+    def fail(request):
+        raise httpx.ConnectError("refused")
+
+    transport = M.MetricsTransport(httpx.MockTransport(fail), "http://gpu-2:8000/v1")
+    before = _value("gena_llm_request_duration_seconds_count", endpoint="http://gpu-2:8000/v1", status="error")
+
+    with httpx.Client(transport=transport) as client, pytest.raises(httpx.ConnectError):
+        client.get("http://gpu-2:8000/v1/models")
+
+    assert _value("gena_llm_request_duration_seconds_count", endpoint="http://gpu-2:8000/v1", status="error") == before + 1
+    assert _value("gena_llm_requests_in_flight", endpoint="http://gpu-2:8000/v1") == 0
+
+
+def test_pipeline_in_flight_and_outcome():
+    before = _value("gena_pipeline_duration_seconds_count", pipeline_mode="full", outcome="error")
+
+    with M.track_pipeline("full"):
+        assert _value("gena_pipelines_in_flight") == 1
+    with pytest.raises(RuntimeError), M.track_pipeline("full"):
+        raise RuntimeError("LLM недоступна")
+
+    assert _value("gena_pipelines_in_flight") == 0
+    assert _value("gena_pipeline_duration_seconds_count", pipeline_mode="full", outcome="error") == before + 1
+
+
+def test_telemetry_tokens_count_top_level_stages_only():
+    before = _value("gena_llm_tokens_total", stage="validation", kind="prompt")
+    summary = {"stages": [
+        {"stage": "validation", "wall_s": 2.0, "prompt_tokens": 300, "completion_tokens": 30},
+        {"stage": "validation_block", "parent": "validation", "block": "c1", "wall_s": 1.0,
+         "prompt_tokens": 300, "completion_tokens": 30},
+    ]}
+
+    M.observe_telemetry(summary)
+
+    assert _value("gena_llm_tokens_total", stage="validation", kind="prompt") == before + 300
+    assert _value("gena_llm_tokens_total", stage="validation_block", kind="prompt") == 0
+    assert _value("gena_stage_duration_seconds_count", stage="validation_block") >= 1
+
+
+def test_cache_hit_rates_are_exported():
+    L.detect_language("Кэш метрик: Рубль — денежная единица.")
+    L.detect_language("Кэш метрик: Рубль — денежная единица.")
+    info = L.detect_language.cache_info()
+
+    M.refresh_caches()
+
+    assert _value("gena_cache_hits", cache="language") == info.hits
+    assert _value("gena_cache_misses", cache="language") == info.misses
@@ -0,0 +1,198 @@
+"""Mock LLM для нагрузочных тестов (scripts/mock_llm_server.py): настоящие
+цепочки agent_api проходят через него целиком, отказы и задержки — по
+настройкам; отчёт драйвера (scripts/load_test.py) — перцентили и пропускная
+способность."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+pytest.importorskip("fastapi")
+uvicorn = pytest.importorskip("uvicorn")
+from fastapi.testclient import TestClient
+
+_ROOT = Path(__file__).resolve().parent.parent
+_AGENT_API = _ROOT / "agent_api"
+if str(_ROOT / "scripts") not in sys.path:
+    sys.path.insert(0, str(_ROOT / "scripts"))
+
+import load_test
+import mock_llm_server as S
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import llm_factory
+        import models_registry
+        from agent.assistant_graph import GENAAssistant
+        from agent.runnables import create_GENA_runnables_ollama
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return llm_factory, models_registry, GENAAssistant, create_GENA_runnables_ollama
+
+
+F, R, GENAAssistant, create_runnables = _import_modules()
+
+CHUNK = ("Статья 10. Брак заключается в органах записи актов гражданского состояния. Права и обязанности "
+         "супругов возникают со дня государственной регистрации заключения брака.")
+
+
+@pytest.fixture
+def mock_llm():
+    """Mock на настоящем порту: цепочки ходят в него через create_chat_llm
+    и общий HTTP-стек llm_factory (пул, лимитер, метрики) — без подмен."""
+    servers = []
+
+    def start(**config):
+        app = S.create_app(S.MockConfig(seed=1, **config))
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+        thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+        thread.start()
+        servers.append((server, thread, sock))
+        deadline = time.monotonic() + 10
+        while not server.started:
+            assert time.monotonic() < deadline, "mock LLM не запустился"
+            time.sleep(0.01)
+        base_url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+        return app, {"model_name": "mock-llm", "base_url": base_url, "api_key": "k"}
+
+    yield start
+    asyncio.run(F.aclose_http_clients())
+    for server, thread, sock in servers:
+        server.should_exit = True
+        thread.join(timeout=10)
+        sock.close()
+
+
+def _assistant(model):
+    return GENAAssistant(**vars(create_runnables(model, model)))
+
+
+@pytest.mark.parametrize("question_type", ["one", "multi", "open"])
+@pytest.mark.parametrize("validation_mode", ["per_block", "single_call"])
+def test_pipeline_passes_through_mock(mock_llm, question_type, validation_mode):
+    app, model = mock_llm()
+
+    out = _assistant(model).graph.invoke({"chunk": CHUNK, "question_type": question_type, "source": "СК РФ",
+                                     "pipeline_mode": "full", "validation_mode": validation_mode})
+
+    assert out["chunk_gate_result"]["passed"]
+    assert out["validation_result"]["passed"]
+    assert out["validation_result"]["rule_violations"] == []
+    requests = app.state.stats["requests"]
+    assert requests[f"generate_{question_type}"] == 1
+    assert requests["validate_block" if validation_mode == "per_block" else "validate_single_call"] >= 1
+    assert requests["other"] == 0
+
+
+def test_failed_validation_goes_to_refine(mock_llm):
+    app, model = mock_llm(validator_pass_rate=0.0)
+
+    out = _assistant(model).graph.invoke({"chunk": CHUNK, "question_type": "one", "source": "СК РФ",
+                                     "pipeline_mode": "full", "validation_mode": "single_call"})
+
+    assert not out["validation_result"]["passed"]
+    assert app.state.stats["requests"]["refine"] >= 1
+    assert out["generated_question"]["task"] == S.QUESTION_ONE["task"]
+
+
+def test_multi_type_and_candidates(mock_llm):
+    _, model = mock_llm()
+    chain = create_runnables(model, model).generate_question_chain
+
+    typed = chain.invoke({"input_text": CHUNK, "question_type": "one", "question_types": ["one", "open"],
+                          "source": "СК"})
+    candidates = chain.invoke({"input_text": CHUNK, "question_type": "multi", "source": "СК", "candidates": 3})
+
+    assert [q["question_type"] for q in typed] == ["one", "open"]
+    assert len({q["task"] for q in candidates}) == 3
+
+
+def test_gate_rejects_at_pass_rate_zero(mock_llm):
+    _, model = mock_llm(gate_pass_rate=0.0)
+
+    out = _assistant(model).graph.invoke({"chunk": CHUNK, "question_type": "one", "source": "СК РФ",
+                                     "pipeline_mode": "full"})
+
+    assert out["chunk_rejected"]
+    assert not out.get("generated_question")
+
+
+def test_models_endpoint_is_probed():
+    registry = R.ModelsRegistry()
+    app = S.create_app(S.MockConfig(models=("qwen-mock",)))
+    registry._probe_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+
+    assert asyncio.run(registry._probe_model("http://mock/v1")) == "qwen-mock"
+
+
+@pytest.mark.parametrize("config, status", [({"failure_rate": 1.0}, 503), ({"rate_limit_rate": 1.0}, 429)])
+def test_injected_failures(config, status):
+    client = TestClient(S.create_app(S.MockConfig(**config)))
+
+    resp = client.post("/v1/chat/completions", json={"model": "mock-llm", "messages": [{"role": "user", "content": "q"}]})
+
+    assert resp.status_code == status
+    assert resp.json()["error"]["code"] == status
+    assert client.get("/mock/stats").json()["outcomes"] == {str(status): 1}
+
+
+def test_latency_includes_decode_time():
+    rng = random.Random(0)
+    assert S.service_time(S.MockConfig(latency_s=0.5), rng) == 0.5
+    samples = [S.service_time(S.MockConfig(latency_dist="lognormal", latency_s=1.0), rng) for _ in range(2000)]
+    assert 0.9 < load_test.percentile(samples, 50) < 1.1
+
+    client = TestClient(S.create_app(S.MockConfig(tokens_per_s=2000)))
+    body = {"model": "mock-llm", "messages": [{"role": "user", "content": "q"}], "n": 2}
+    resp = client.post("/v1/chat/completions", json=body).json()
+    assert [c["message"]["content"] for c in resp["choices"]] == ["ok", "ok"]
+    assert resp["usage"]["completion_tokens"] == 2
+
+
+def test_unknown_prompt_follows_response_schema():
+    schema = {"type": "object", "properties": {
+        "score": {"type": "integer", "minimum": 1},
+        "labels": {"type": "array", "items": {"enum": ["a", "b"]}, "minItems": 2},
+    }}
+    body = {"messages": [{"role": "user", "content": "q"}],
+            "response_format": {"type": "json_schema", "json_schema": {"name": "x", "schema": schema}}}
+
+    assert S.respond("other", body, random.Random(0), S.MockConfig()) == '{"score": 1, "labels": ["a", "a"]}'
+
+
+def test_load_report_percentiles_and_throughput():
+    tasks = [
+        {"dataset_id": "d1", "status": "completed", "created_at": "2026-01-01T00:00:00",
+         "updated_at": f"2026-01-01T00:00:{s:02d}", "result": {"result": {"telemetry": {"worker": {"total_s": s}}}}}
+        for s in (2, 4, 6, 8, 10)
+    ] + [{"dataset_id": "d2", "status": "pending", "created_at": "2026-01-01T00:00:00", "updated_at": None}]
+    documents = [{"dataset_id": "d1", "chunk_s": 1.0, "tasks": 5}, {"dataset_id": "d2", "chunk_s": 3.0, "tasks": 1}]
+
+    report = load_test.task_report(tasks, documents, wall_s=20.0)
+
+    assert report["tasks_by_status"] == {"completed": 5, "pending": 1}
+    assert report["throughput"] == {"tasks_per_s": 0.25, "documents_per_min": 3.0}
+    assert report["task_e2e_s"]["p50"] == 6.0
+    assert report["task_e2e_s"]["p90"] == pytest.approx(9.2)
+    assert report["worker_s"]["count"] == 5
+    assert report["chunk_s"]["max"] == 3.0
+    assert report["document_s"] == {"count": 1, "p50": 11.0, "p90": 11.0, "p99": 11.0, "max": 11.0}
@@ -0,0 +1,145 @@
+"""Группы моделей, circuit breaker и least-outstanding маршрутизация в agent_api/models_registry.py."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_models_registry():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем models_registry со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import models_registry
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return models_registry
+
+
+R = _import_models_registry()
+
+ENDPOINTS = [
+    {"id": "qwen-a", "name": "Qwen A", "base_url": "http://qwen-a:8000/v1", "model_name": "qwen", "group": "qwen"},
+    {"id": "qwen-b", "name": "Qwen B", "base_url": "http://qwen-b:8000/v1/", "model_name": "qwen", "group": "qwen"},
+    {"id": "phi", "name": "Phi", "base_url": "http://phi:8000/v1", "model_name": "phi"},
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setenv("MODEL_ENDPOINTS", json.dumps(ENDPOINTS))
+    monkeypatch.setenv("MODEL_GROUPS", json.dumps({"any": ["qwen-a", "phi", "missing"]}))
+    monkeypatch.setattr(R, "BREAKER_FAILURE_THRESHOLD", 2)
+    return R.ModelsRegistry()
+
+
+def test_group_routes_to_least_outstanding_replica(registry):
+    with registry.lease("qwen") as first:
+        with registry.lease("qwen") as second:
+            assert {first.id, second.id} == {"qwen-a", "qwen-b"}
+            with registry.lease(second.id):
+                assert registry.get_model("qwen").id == first.id
+
+    assert registry.get_model("phi").id == "phi"
+    assert {m.id for m in registry.list_groups()["any"]} == {"qwen-a", "phi"}
+
+
+def test_live_errors_eject_replica(registry):
+    registry.record_outcome("http://qwen-b:8000/v1", 502)
+    registry.record_outcome("http://qwen-b:8000/v1", None)
+
+    assert {registry.get_model("qwen").id for _ in range(20)} == {"qwen-a"}
+    health = {h["id"]: h for h in registry.get_health()}
+    assert health["qwen-b"]["circuit"] == "open"
+    assert health["qwen-b"]["available"] is False
+    assert health["qwen"]["available"] is True
+
+
+def test_throttling_and_client_errors_do_not_trip_breaker(registry):
+    for status in (429, 503, 400, 429, 503):
+        registry.record_outcome("http://qwen-b:8000/v1", status)
+
+    assert {h["id"]: h for h in registry.get_health()}["qwen-b"]["circuit"] == "closed"
+
+
+def test_failed_probe_opens_circuit(registry, monkeypatch):
+    monkeypatch.setattr(R, "KNOWN_SERVICES", [("qwen-a", "vLLM")])
+
+    async def unavailable(base_url):
+        return None
+
+    monkeypatch.setattr(registry, "_probe_model", unavailable)
+    asyncio.run(registry._do_probe())
+
+    with registry.lease("qwen") as model:
+        assert model.id == "qwen-b"
+
+
+def test_all_replicas_open_still_routes(registry):
+    for endpoint in ("http://qwen-a:8000/v1", "http://qwen-b:8000/v1"):
+        registry.record_outcome(endpoint, 502)
+        registry.record_outcome(endpoint, 502)
+
+    assert registry.get_model("qwen").id in {"qwen-a", "qwen-b"}
+
+
+def test_half_open_allows_single_trial_then_closes(registry, monkeypatch):
+    monkeypatch.setattr(R, "BREAKER_COOLDOWN_S", 0.0)
+    registry.record_outcome("http://qwen-b:8000/v1", 500)
+    registry.record_outcome("http://qwen-b:8000/v1", 500)
+
+    with registry.lease("qwen-a"), registry.lease("qwen-a"):
+        with registry.lease("qwen") as trial:
+            assert trial.id == "qwen-b"
+            # Пока пробный запрос не завершён, реплика не получает новых
+            assert registry.get_model("qwen").id == "qwen-a"
+            registry.record_outcome("http://qwen-b:8000/v1", 200)
+
+    assert {h["id"]: h for h in registry.get_health()}["qwen-b"]["circuit"] == "closed"
+
+
+def test_breaker_cooldown_doubles_after_failed_trial():
+    clock = FakeClock()
+    breaker = R.CircuitBreaker(failure_threshold=1, cooldown_s=10, max_cooldown_s=15, clock=clock)
+
+    assert breaker.record_failure()
+    assert not breaker.allows_request()
+    clock.now = 10
+    assert breaker.state == "half_open"
+    breaker.on_dispatch()
+    assert not breaker.allows_request()
+    assert breaker.record_failure()
+    assert breaker.snapshot()["retry_in_s"] == 15
+    clock.now = 25
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_limiter_outcomes_reach_registry(registry):
+    import endpoint_limiter
+
+    limiter = endpoint_limiter.get_endpoint_limiter("http://phi:8000/v1")
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release(None, 1.0)
+
+    assert {h["id"]: h for h in registry.get_health()}["phi"]["circuit"] == "open"
@@ -0,0 +1,155 @@
+"""Асинхронный probe моделей в agent_api/models_registry.py."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_models_registry():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем models_registry со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import models_registry
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return models_registry
+
+
+R = _import_models_registry()
+
+DELAY_S = 0.2
+
+
+async def _slow_backend(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(DELAY_S)
+    if "dead" in request.url.path:
+        return httpx.Response(502)
+    name = request.url.path.strip("/").split("/")[0]
+    return httpx.Response(200, json={"data": [{"id": f"{name}-model"}]})
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setenv("MODEL_ENDPOINTS", json.dumps([
+        {"id": f"m{i}", "name": f"M{i}", "base_url": f"http://llm/m{i}/v1", "model_name": f"m{i}"}
+        for i in range(4)
+    ] + [{"id": "dead", "name": "Dead", "base_url": "http://llm/dead/v1", "model_name": "dead"}]))
+    monkeypatch.setattr(R, "TRAEFIK_HOST", "traefik")
+    monkeypatch.setattr(R, "KNOWN_SERVICES", [(f"svc{i}", "vLLM") for i in range(5)] + [("dead", "vLLM")])
+    registry = R.ModelsRegistry()
+    registry._probe_client = httpx.AsyncClient(transport=httpx.MockTransport(_slow_backend))
+    yield registry
+    asyncio.run(registry.stop_probing())
+
+
+def test_import_does_not_start_probing():
+    assert R.registry._probe_task is None
+
+
+def test_probe_runs_services_concurrently(registry):
+    started = time.perf_counter()
+    changed = asyncio.run(registry._do_probe())
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < DELAY_S * 3
+    assert changed
+    health = {h["id"]: h["available"] for h in registry.get_health()}
+    assert all(health[f"svc{i}"] for i in range(5))
+    assert health["dead"] is False
+    assert registry.get_model("svc3").model_name == "svc3-model"
+
+    assert not asyncio.run(registry._do_probe())
+
+
+def test_discover_latency_is_slowest_endpoint(registry):
+    started = time.perf_counter()
+    discovered = asyncio.run(registry.discover_models())
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < DELAY_S * 3
+    by_id = {m["id"]: m for m in discovered}
+    assert by_id["m2"]["available"] and by_id["m2"]["served_models"] == ["m2-model"]
+    assert by_id["dead"]["available"] is False
+
+
+def test_probe_interval_backs_off_while_stable(registry, monkeypatch):
+    monkeypatch.setattr(R, "PROBE_JITTER", 0.0)
+    delays = [registry._next_probe_delay(changed) for changed in (True, False, False, False, False, False)]
+
+    assert delays[0] == R.PROBE_INTERVAL
+    assert delays == sorted(delays)
+    assert delays[-1] == min(R.PROBE_MAX_INTERVAL, R.PROBE_INTERVAL * 1.5 ** 5)
+    assert registry._next_probe_delay(True) == R.PROBE_INTERVAL
+
+
+def test_start_and_stop_probing(registry, monkeypatch):
+    probes = []
+
+    async def fake_probe():
+        probes.append(time.monotonic())
+        return False
+
+    monkeypatch.setattr(registry, "_do_probe", fake_probe)
+    monkeypatch.setattr(registry, "_next_probe_delay", lambda changed: 0.01)
+
+    async def scenario():
+        await registry.start_probing()
+        await asyncio.sleep(0.1)
+        client = registry._probe_client
+        await registry.stop_probing()
+        return client
+
+    client = asyncio.run(scenario())
+    assert len(probes) > 1
+    assert client.is_closed
+    assert registry._probe_task is None
+
+
+def test_process_prompt_does_not_block_event_loop(monkeypatch):
+    """Прогон графа идёт в пуле потоков: /health/ отвечает, пока генерация занята."""
+    pytest.importorskip("fastapi")
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        import agent_api
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+
+    class SlowHandler:
+        def ahandle_prompt(self, **kwargs):
+            time.sleep(DELAY_S * 2)
+            return {"questions": []}
+
+    monkeypatch.setattr(agent_api, "handler", SlowHandler())
+    prompt = {"prompt": "текст", "question_type": "one", "source": "ГК РФ", "chat_id": 1}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=agent_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+            started = time.perf_counter()
+            generation = asyncio.create_task(client.post("/process_prompt/", json=prompt))
+            await asyncio.sleep(0.05)
+            health = await client.get("/health/")
+            health_s = time.perf_counter() - started
+            return (await generation).status_code, health.status_code, health_s
+
+    generation_status, health_status, health_s = asyncio.run(scenario())
+    assert (generation_status, health_status) == (200, 200)
+    assert health_s < DELAY_S
@@ -0,0 +1,154 @@
+"""Стабильный префикс промптов: статичная часть (инструкция, критерии, формат
+вывода) байт-в-байт одинакова между запросами, а чанк и вопрос идут в конце —
+так серверный кэш префиксов vLLM / llama.cpp переиспользует KV."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+CHUNKS = [
+    "Статья 1. Граждане имеют право на труд. Труд свободен.",
+    "Статья 75. Денежной единицей в Российской Федерации является рубль.",
+]
+QUESTIONS = [
+    {"task": "Какое право имеют граждане?", "option_1": "на труд", "option_2": "на отдых", "outputs": 1},
+    {"task": "Какая денежная единица в РФ?", "option_1": "рубль", "option_2": "евро", "outputs": 1},
+]
+
+
+def _import_nodes():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем ноды со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.nodes.assess_difficulty import estimation as difficulty
+        from agent.nodes.assess_sensitivity import estimation as sensitivity
+        from agent.nodes.generate_question import generate_question
+        from agent.nodes.llm_validator import validator
+        from agent.nodes.refine_question import refine_question
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return generate_question, difficulty, sensitivity, validator, refine_question
+
+
+G, D, S, V, R = _import_nodes()
+
+
+class RecordingLLM:
+    """Вместо LLM: запоминает отрендеренные сообщения и отвечает заготовкой."""
+
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.prompts = []
+
+    def __call__(self, **_kwargs):
+        return RunnableLambda(self._respond)
+
+    def _respond(self, prompt_value):
+        self.prompts.append([(m.type, m.content) for m in prompt_value.to_messages()])
+        return AIMessage(content=self.answer)
+
+
+def _flatten(messages) -> str:
+    return "".join(f"<{role}>{content}" for role, content in messages)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _assert_static_prefix(prompts, static_len: int):
+    """Первые два промпта различаются только после статичной части."""
+    first, second = (_flatten(p) for p in prompts[:2])
+    assert first != second
+    assert _common_prefix(first, second) >= static_len
+
+
+@pytest.mark.parametrize("language", ["ru", "tg"])
+@pytest.mark.parametrize("question_type", ["one", "multi", "open"])
+def test_generator_system_prompt_is_byte_identical(monkeypatch, question_type, language):
+    question = {"task": "Вопрос", "outputs": "1", "option_1": "да"}
+    llm = RecordingLLM(json.dumps(question, ensure_ascii=False))
+    monkeypatch.setattr(G, "create_chat_llm", llm)
+    chain = G.create_generate_question_chain()
+
+    for chunk, source in zip(CHUNKS, ["Конституция РФ", "Трудовой кодекс"]):
+        chain.invoke({"input_text": chunk, "question_type": question_type, "source": source, "language": language})
+
+    (sys_a, human_a), (sys_b, human_b) = llm.prompts
+    assert sys_a[1] == sys_b[1] == G.build_system_prompt(question_type, language)
+    assert human_a[1].rstrip().endswith("**JSON**:") and CHUNKS[0] in human_a[1]
+    _assert_static_prefix(llm.prompts, len(f"<system>{sys_a[1]}<human>"))
+
+
+def test_generator_prefix_differs_per_language():
+    assert G.build_system_prompt("one", "ru") != G.build_system_prompt("one", "be")
+    assert G.build_system_prompt("one", "ru") is G.build_system_prompt("one", "ru")
+
+
+@pytest.mark.parametrize(
+    "module, factory, answer",
+    [
+        (D, "create_difficulty_chain", '{"difficulty": 1, "explanation": "—"}'),
+        (S, "create_provocativeness_chain", '{"provocativeness_score": 1, "explanation": "—"}'),
+    ],
+)
+def test_scoring_prompts_put_question_last(monkeypatch, module, factory, answer):
+    llm = RecordingLLM(answer)
+    monkeypatch.setattr(module, "create_chat_llm", llm)
+    chain = getattr(module, factory)()
+
+    for question in QUESTIONS:
+        chain.invoke({"generated_question": question})
+
+    system = llm.prompts[0][0][1]
+    assert "{question}" not in system and QUESTIONS[0]["task"] not in system
+    assert llm.prompts[1][0][1] == system
+    _assert_static_prefix(llm.prompts, len(f"<system>{system}<human>"))
+
+
+def test_validator_criterion_template_is_the_prefix(monkeypatch):
+    llm = RecordingLLM("\n".join(["critery 1 — ок"] * 9))
+    monkeypatch.setattr(V, "create_chat_llm", llm)
+    validator = V.LLMValidator()
+
+    for chunk, question in zip(CHUNKS, QUESTIONS):
+        validator.evaluate("one", chunk, question)
+
+    per_question = len(V.EXPECTED_COUNTS["one"])
+    for first, second in zip(llm.prompts[:per_question], llm.prompts[per_question:]):
+        system, human = first
+        template = human[1].split("\n\nИсходный текст: \n\n")[0]
+        assert len(template) > 1000
+        _assert_static_prefix([first, second], len(f"<system>{system[1]}<human>{template}"))
+
+
+def test_refine_format_instructions_precede_request_data(monkeypatch):
+    llm = RecordingLLM(json.dumps({"task": "Исправленный вопрос", "outputs": 1}, ensure_ascii=False))
+    monkeypatch.setattr(R, "create_chat_llm", llm)
+    chain = R.create_refine_question_chain()
+    failed = {"by_block": {"c1_question": [0, 1]}, "justifications": {"c1_question": ["длинный", ""]}}
+
+    for chunk, question in zip(CHUNKS, QUESTIONS):
+        chain.invoke({"question_type": "one", "source_text": chunk, "question": question, "validation_result": failed})
+
+    system = llm.prompts[0][0][1]
+    assert "JSON" in system and CHUNKS[0] not in system
+    _assert_static_prefix(llm.prompts, len(f"<system>{system}<human>"))
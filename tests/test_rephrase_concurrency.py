@@ -0,0 +1,115 @@
+"""Перефразирование датасета: цепочка на модель создаётся один раз, вопросы
+идут параллельно с ограничением и отдаются по мере готовности."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.nodes.dynamic_implementation import rephrase_question
+        from agent.handler import GENAHandler
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return rephrase_question, GENAHandler
+
+
+RQ, GENAHandler = _import_modules()
+
+
+class FakeLLM:
+    """Отвечает «<вопрос> (перефразировано)», считает клиентов и одновременные запросы."""
+
+    def __init__(self, delay=0.02, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.clients = 0
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        self.clients += 1
+        return RunnableLambda(self._respond)
+
+    def _respond(self, prompt_value):
+        question = prompt_value.to_messages()[-1].content.split("Вопрос: ", 1)[1].split("\n", 1)[0]
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if question == self.fail_on:
+                raise RuntimeError("LLM недоступна")
+            return AIMessage(content=f'{{"rephrased_question": "{question} (перефразировано)"}}')
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(**kwargs):
+        llm = FakeLLM(**kwargs)
+        monkeypatch.setattr(RQ, "create_chat_llm", llm)
+        monkeypatch.setattr(RQ, "_CHAINS", {})
+        return llm
+    return install
+
+
+def test_chain_is_built_once_per_model(fake_llm):
+    llm = fake_llm(delay=0)
+
+    RQ.rephrase_questions(["Вопрос 1", "Вопрос 2"], model_name="a", base_url="http://a/v1")
+    RQ.rephrase_question("Вопрос 3", model_name="a", base_url="http://a/v1")
+    RQ.rephrase_questions(["Вопрос 4"], model_name="b", base_url="http://b/v1")
+
+    assert llm.clients == 2
+
+
+def test_concurrency_is_bounded_and_order_kept(fake_llm):
+    llm = fake_llm()
+    questions = [f"Вопрос {i}" for i in range(12)]
+
+    result = RQ.rephrase_questions(questions, max_concurrency=3)
+
+    assert result == [f"{q} (перефразировано)" for q in questions]
+    assert 1 < llm.peak <= 3
+
+
+def test_failures_and_empty_questions_are_kept(fake_llm):
+    fake_llm(fail_on="Вопрос 2")
+
+    result = RQ.rephrase_questions(["Вопрос 1", "", "Вопрос 2"])
+
+    assert result == ["Вопрос 1 (перефразировано)", "", "Вопрос 2"]
+
+
+def test_handler_yields_questions_as_they_complete(fake_llm):
+    fake_llm(delay=0)
+    handler = SimpleNamespace(_lease_model_config=lambda model_id: nullcontext(None))
+    questions = [{"task": "Вопрос 1", "options": {"option_1": "а"}}, {"task": "Вопрос 2"}]
+
+    seen = [i for i, _ in GENAHandler.iter_rephrase_questions(handler, questions)]
+
+    assert sorted(seen) == [0, 1]
+    assert questions[0] == {"task": "Вопрос 1 (перефразировано)", "options": {"option_1": "а"}}
+    assert questions[1]["task"] == "Вопрос 2 (перефразировано)"
@@ -0,0 +1,152 @@
+"""Офлайн-переоценка датасета: векторный пересчёт баллов (scoring.py) против
+LLMValidator._score, правила и повторная LLM-оценка блоков (rescore_dataset.py)."""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent.nodes.llm_validator import scoring, validator
+        import rescore_dataset
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return scoring, validator, rescore_dataset
+
+
+S, V, RD = _import_modules()
+
+QUESTION = {"task": "Какая денежная единица в РФ?", "options": {"option_1": "рубль", "option_2": "евро",
+            "option_3": "доллар", "option_4": "юань"}, "correct_answer": "1"}
+
+
+def _ones(qtype: str, zero=()) -> dict:
+    return {
+        key: [0 if (key, i) in zero else 1 for i in range(V.EXPECTED_COUNTS[qtype][key])]
+        for key in V.BLOCK_ORDER[qtype]
+    }
+
+
+def _row(qtype="one", by_block=None, passed=True, **fields):
+    return {"chunk_id": 1, "question_type": qtype, **QUESTION, "provocativeness": "1",
+            "validation_passed": str(passed), "validation_score": "20.5/20.5",
+            "validation_details": str(by_block if by_block is not None else _ones(qtype)),
+            "validation_justifications": "{}", "source_chunk": "Рубль — денежная единица РФ.", **fields}
+
+
+@pytest.mark.parametrize("qtype", ["open", "one", "multi"])
+def test_matrix_scoring_matches_validator(qtype):
+    rng = random.Random(7)
+    by_blocks = []
+    for _ in range(200):
+        by_block = {}
+        for key in V.BLOCK_ORDER[qtype]:
+            skipped = rng.random() < 0.15
+            by_block[key] = [] if skipped else [int(rng.random() < 0.85) for _ in range(V.EXPECTED_COUNTS[qtype][key])]
+        by_blocks.append(by_block)
+
+    matrix = S.build_score_matrix(qtype, by_blocks)
+    total, passed = S.score_matrix(matrix)
+
+    fake_self = SimpleNamespace(thresholds=V.THRESHOLDS)
+    for i, by_block in enumerate(by_blocks):
+        blocks = [V.BlockResult(key=k, scores=v, justifications=[], raw="") for k, v in by_block.items() if v]
+        expected = V.LLMValidator._score(fake_self, qtype, blocks)
+        if blocks:
+            assert total[i] == pytest.approx(expected["total"])
+            assert passed[i] == expected["passed"]
+            assert matrix.by_block(i) == by_block
+
+
+def test_unreadable_details_are_left_alone():
+    matrix = S.build_score_matrix("one", [None, {}, {"c1_question": [1, 1]}, _ones("one")])
+    assert matrix.valid.tolist() == [False, False, False, True]
+
+
+def test_new_thresholds_without_llm(monkeypatch):
+    rows = [
+        _row(),
+        _row(by_block=_ones("one", zero={("c4_logic", 0), ("c5_phrase", 0)})),
+        _row("open", by_block=_ones("open", zero={("c2_outputs", 1)}), passed=False, options={}, correct_answer="рубль"),
+        _row(validation_details="", passed=False),
+    ]
+    out, summary = RD.rescore_questions(rows, thresholds={**V.THRESHOLDS, "one": 19.0})
+
+    assert [r["validation_passed"] for r in out] == ["True", "False", "False", "False"]
+    assert out[1]["validation_score"] == "18.5/20.5" and out[1]["validation_threshold"] == "19.0"
+    assert out[2]["validation_score"] == "0.0/16.0"
+    assert out[3] == rows[3]
+    assert summary["one"] == {"questions": 3, "rescored": 2, "passed_before": 2, "passed_after": 1, "changed": 1}
+
+
+def test_rules_override_stored_scores():
+    row = _row(options={**QUESTION["options"], "option_2": "Рубль"})
+    out, _ = RD.rescore_questions([row], rules=True)
+
+    assert out[0]["validation_passed"] == "False" and out[0]["validation_score"] == "0.0/20.5"
+    assert RD.parse_stored(out[0]["validation_details"])["c2_options"][4] == 0
+    assert RD.parse_stored(out[0]["validation_justifications"])["c2_options"][4] == "совпадают варианты 1 и 2"
+
+
+class _FakeValidator:
+    """evaluate_blocks с задержкой: считает одновременные вызовы."""
+
+    def __init__(self):
+        self.active = self.peak = 0
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def evaluate_blocks(self, qtype, source_text, question, keys):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls.append((qtype, tuple(keys)))
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        n = V.EXPECTED_COUNTS[qtype][keys[0]]
+        return {keys[0]: V.BlockResult(key=keys[0], scores=[0] + [1] * (n - 1), justifications=["заново"] + [""] * (n - 1), raw="")}
+
+
+def test_selected_blocks_rerun_with_bounded_concurrency():
+    rows = [_row() for _ in range(6)] + [_row("open", options={}, correct_answer="рубль"), _row(validation_details="")]
+    validator = _FakeValidator()
+
+    out, _ = RD.rescore_questions(rows, blocks=["c3_outputs"], validator=validator, concurrency=2)
+
+    assert len(validator.calls) == 6 and validator.peak == 2
+    assert RD.parse_stored(out[0]["validation_details"])["c3_outputs"] == [0, 1]
+    assert RD.parse_stored(out[0]["validation_justifications"])["c3_outputs"] == ["заново", ""]
+    assert out[0]["validation_passed"] == "False"
+    assert out[6]["validation_passed"] == "True" and out[7] == rows[7]
+
+
+def test_cli_file_roundtrip(tmp_path):
+    source = tmp_path / "dataset.json"
+    source.write_text(json.dumps({"questions": [_row(by_block=_ones("one", zero={("c1_question", 1)}))]},
+                                 ensure_ascii=False), encoding="utf-8")
+    target = tmp_path / "out" / "rescored.json"
+
+    assert RD.main([f"--input={source}", f"--output={target}"]) == 0
+
+    result = json.loads(target.read_text(encoding="utf-8"))
+    assert result["questions"][0]["validation_passed"] == "False"
+    assert result["rescored"]["summary"]["one"]["changed"] == 1
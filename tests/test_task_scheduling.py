@@ -0,0 +1,110 @@
+"""Order of GET /tasks/pending (dataset_api/scheduling.py): strict priority
+classes, aging, weighted fairness across (queue, dataset) flows."""
+
+from __future__ import annotations
+
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_DATASET_API = Path(__file__).resolve().parent.parent / "dataset_api"
+if str(_DATASET_API) not in sys.path:
+    sys.path.insert(0, str(_DATASET_API))
+
+import scheduling as S
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _tasks(name, n, priority=1, age_s=0):
+    created = NOW - timedelta(seconds=age_s)
+    return [{"_id": f"{name}-{i}", "priority": priority, "created_at": created + timedelta(milliseconds=i)}
+            for i in range(n)]
+
+
+def _flow(name, n, priority=1, age_s=0, weight=1.0, served=0, last_served_s=None):
+    last_served_at = NOW - timedelta(seconds=last_served_s) if last_served_s is not None else None
+    return S.Flow(key=name, weight=weight, tasks=_tasks(name, n, priority, age_s),
+                  served=served, last_served_at=last_served_at)
+
+
+def _owners(picked):
+    return [task["_id"].split("-")[0] for task in picked]
+
+
+def test_small_flow_is_not_blocked_by_large_batch():
+    batch = _flow("batch", 10_000, age_s=3600, served=40, last_served_s=1)
+    experiment = _flow("exp", 20)
+
+    picked = S.schedule([batch, experiment], 10, NOW, aging_s=600)
+
+    assert _owners(picked).count("exp") == 10
+
+
+def test_equal_flows_alternate():
+    picked = S.schedule([_flow("a", 10, age_s=10), _flow("b", 10)], 6, NOW, aging_s=0)
+
+    assert _owners(picked) == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_weights_split_slots():
+    picked = S.schedule([_flow("heavy", 100, weight=3), _flow("light", 100, weight=1)], 40, NOW, aging_s=0)
+
+    assert Counter(_owners(picked)) == {"heavy": 30, "light": 10}
+
+
+def test_higher_class_is_strict():
+    urgent = _flow("urgent", 3, priority=5, served=1000, last_served_s=1)
+    normal = _flow("normal", 10, priority=1, age_s=60)
+
+    picked = S.schedule([normal, urgent], 5, NOW, aging_s=600)
+
+    assert _owners(picked) == ["urgent"] * 3 + ["normal"] * 2
+
+
+def test_aging_lifts_starved_low_priority():
+    busy = _flow("busy", 100, priority=3, served=50, last_served_s=1)
+    starved = _flow("starved", 5, priority=1, age_s=1900)
+
+    picked = S.schedule([busy, starved], 2, NOW, aging_s=600)
+
+    # 1900 s / 600 s → three classes: 1 + 3 = 4 > 3; after one task it is served and drops back
+    assert _owners(picked) == ["starved", "busy"]
+    assert _owners(S.schedule([busy, starved], 1, NOW, aging_s=0)) == ["busy"]
+
+
+def test_single_flow_keeps_priority_then_fifo_order():
+    tasks = _tasks("q", 2, priority=2) + _tasks("q", 3, priority=1, age_s=100)
+    flow = S.Flow(key="q", weight=1, tasks=tasks)
+
+    assert S.schedule([flow], 10, NOW, aging_s=600) == tasks
+
+
+def test_queue_weight_defaults():
+    assert S.queue_weight(3) == 3.0
+    assert S.queue_weight(None) == S.queue_weight(0) == S.queue_weight("x") == 1.0
+
+
+def test_build_flows_joins_service_and_weights():
+    candidates = [
+        {"_id": {"queue_id": "q1", "dataset_id": "d1"}, "tasks": _tasks("x", 2)},
+        {"_id": {"queue_id": "q2", "dataset_id": "d2"}, "tasks": _tasks("y", 1)},
+    ]
+    service = [{"_id": {"queue_id": "q1", "dataset_id": "d1"}, "served": 7, "last_served_at": NOW}]
+
+    flows = S.build_flows(candidates, service, {"q1": 2.0})
+
+    assert [(f.key, f.weight, f.served, f.last_served_at) for f in flows] == [
+        (("q1", "d1"), 2.0, 7, NOW), (("q2", "d2"), 1.0, 0, None),
+    ]
+
+
+def test_candidates_pipeline_keeps_per_flow_head():
+    pipeline = S.candidates_pipeline({"status": "pending"}, 5)
+
+    assert pipeline[0] == {"$match": {"status": "pending"}}
+    # Each flow's head is kept inside $group; pending tasks are not all pushed
+    top = pipeline[1]["$group"]["tasks"]["$topN"]
+    assert (top["n"], top["sortBy"]) == (5, {"priority": -1, "created_at": 1})
+    assert len(pipeline) == 2
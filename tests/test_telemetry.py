@@ -0,0 +1,232 @@
+"""Телеметрия прогона графа: время, токены, повторы и модели по узлам и
+блокам валидатора — в результате ahandle_prompt под ключом telemetry."""
+
+from __future__ import annotations
+
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import httpx
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_AGENT_API = Path(__file__).resolve().parent.parent / "agent_api"
+
+
+def _import_modules():
+    """agent_api/config.py и task_worker/config.py — оба модуль ``config``:
+    импортируем модули со своим config и не оставляем его в sys.modules."""
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, str(_AGENT_API))
+    try:
+        from agent import handler, telemetry
+        from agent.assistant_graph import GENAAssistant
+        from agent.nodes.llm_validator import validator
+        import llm_factory
+    finally:
+        sys.path.remove(str(_AGENT_API))
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return handler, telemetry, GENAAssistant, validator, llm_factory
+
+
+H, T, GENAAssistant, V, F = _import_modules()
+
+
+class FakeChat(BaseChatModel):
+    """Чат-модель с usage: 10 токенов промпта на сообщение, 5 — ответа."""
+
+    model_name: str = "fake-model"
+    answer: str = "ok"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        usage = {"input_tokens": 10 * len(messages), "output_tokens": 5, "total_tokens": 10 * len(messages) + 5}
+        message = AIMessage(content=self.answer, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class _Chain:
+    """Узловая цепочка: один вызов модели, затем готовый ответ."""
+
+    def __init__(self, llm, result):
+        self.llm = llm
+        self.result = result
+
+    def invoke(self, input_data):
+        self.llm.invoke([HumanMessage(content="q")])
+        return self.result(input_data) if callable(self.result) else self.result
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _assistant(validation_chain=None):
+    llm = FakeChat()
+    question = {"task": "Какая денежная единица в РФ?", "option_1": "рубль", "option_2": "евро",
+                "option_3": "доллар", "option_4": "юань", "outputs": "1"}
+    return GENAAssistant(
+        generate_question_chain=_Chain(llm, lambda _: dict(question)),
+        provocativeness_chain=_Chain(llm, _Result(provocativeness_score=1, explanation="")),
+        validation_chain=validation_chain or _Chain(llm, _Result(
+            type="one", by_block={}, justifications={}, total=20, max_total=20.5, threshold=18, passed=True)),
+        difficulty_chain=_Chain(llm, _Result(difficulty=2, explanation="")),
+    )
+
+
+STATE = {"chunk": "Рубль — денежная единица РФ.", "question_type": "one", "source": "Конституция",
+         "pipeline_mode": "generator_validator"}
+
+
+def test_stages_record_time_tokens_and_model():
+    assistant = _assistant()
+
+    with T.collect() as telemetry:
+        assistant.graph.invoke(dict(STATE))
+    summary = telemetry.summary()
+
+    stages = {s["stage"]: s for s in summary["stages"]}
+    assert list(stages) == ["chunk_gate", "generate_question", "provocativeness", "difficulty", "validation"]
+    assert stages["chunk_gate"]["llm_calls"] == 0
+    for name in ("generate_question", "provocativeness", "difficulty", "validation"):
+        assert stages[name]["llm_calls"] == 1
+        assert (stages[name]["prompt_tokens"], stages[name]["completion_tokens"]) == (10, 5)
+        assert stages[name]["models"] == ["fake-model"]
+        assert stages[name]["question_type"] == "one"
+        assert stages[name]["wall_s"] >= 0
+    assert (summary["llm_calls"], summary["prompt_tokens"], summary["completion_tokens"]) == (4, 40, 20)
+
+
+def test_validator_blocks_are_nested_stages(monkeypatch):
+    monkeypatch.setattr(V, "create_chat_llm", lambda **kwargs: FakeChat(answer="Критерий 1\n" * 9))
+    validator = V.LLMValidator(rules=False)
+    validation = SimpleNamespace(invoke=lambda data: _Result(**{
+        "type": data["question_type"], "justifications": {}, "skipped_blocks": [], "carried_blocks": [],
+        **validator.evaluate(data["question_type"], data["source_text"], data["question"], mode="per_block"),
+    }))
+    assistant = _assistant(validation_chain=validation)
+
+    with T.collect() as telemetry:
+        assistant.graph.invoke(dict(STATE))
+    stages = telemetry.summary()["stages"]
+
+    blocks = [s for s in stages if s["stage"] == "validation_block"]
+    validation_stage = next(s for s in stages if s["stage"] == "validation")
+    assert [b["block"] for b in blocks] == V._evaluation_order("one")
+    assert all(b["parent"] == "validation" and b["llm_calls"] == 1 for b in blocks)
+    assert validation_stage["llm_calls"] == len(blocks)
+    assert validation_stage["prompt_tokens"] == sum(b["prompt_tokens"] for b in blocks)
+
+
+def test_llm_errors_are_counted():
+    class Failing(FakeChat):
+        def _generate(self, *args, **kwargs):
+            raise RuntimeError("503")
+
+    with T.collect() as telemetry:
+        with T.stage("generate_question"):
+            with pytest.raises(RuntimeError):
+                Failing().invoke("q")
+    summary = telemetry.summary()
+
+    assert (summary["llm_calls"], summary["errors"]) == (1, 1)
+    assert summary["stages"][0]["errors"] == 1
+
+
+def test_sdk_retries_are_counted(monkeypatch):
+    # Без лимитера 503 повторяет openai SDK
+    monkeypatch.setattr(F, "LLM_LIMIT_ENABLED", False)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, headers={"retry-after-ms": "1"}, json={"error": {"message": "busy"}})
+        return httpx.Response(200, json={
+            "id": "c", "object": "chat.completion", "created": 0, "model": "qwen",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+        })
+
+    client = httpx.Client(transport=httpx.MockTransport(handler), event_hooks={"request": [T.record_http_request]})
+    monkeypatch.setattr(F, "get_http_client", lambda *args: client)
+    llm = F.create_chat_llm(provider="openai", model_name="qwen", base_url="http://telemetry:8000/v1", api_key="k")
+
+    with T.collect() as telemetry:
+        with T.stage("generate_question"):
+            llm.invoke("q")
+    stage = telemetry.summary()["stages"][0]
+
+    assert len(calls) == 2
+    assert (stage["llm_calls"], stage["retries"], stage["errors"]) == (1, 1, 0)
+    assert (stage["prompt_tokens"], stage["completion_tokens"]) == (12, 3)
+    assert stage["models"] == ["qwen"]
+
+
+def test_limiter_retries_are_counted():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status = 503 if len(calls) == 1 else 200
+        return F.httpx.Response(status, headers={"retry-after": "0"})
+
+    limiter = F.get_endpoint_limiter("http://telemetry-limiter:8000/v1")
+    transport = F.LimitedTransport(F.httpx.MockTransport(handler), limiter, on_retry=T.record_retry)
+
+    with T.collect() as telemetry, F.httpx.Client(transport=transport) as client:
+        with T.stage("generate_question"):
+            response = client.post("http://telemetry-limiter:8000/v1/chat/completions")
+    stage = telemetry.summary()["stages"][0]
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert stage["retries"] == 1
+
+
+def test_shared_clients_carry_retry_hook():
+    assert T.record_http_request in F.get_http_client("http://hook:8000/v1", "k").event_hooks["request"]
+    assert T.arecord_http_request in F.get_async_http_client("http://hook:8000/v1", "k").event_hooks["request"]
+
+
+def test_without_collect_nothing_is_recorded():
+    with T.stage("generate_question"):
+        FakeChat().invoke("q")
+    assert T.current() is None
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_handler_returns_telemetry(monkeypatch, enabled):
+    monkeypatch.setattr(H, "LLM_TELEMETRY", enabled)
+
+    def invoke_graph(runnables, input_data, *args):
+        with T.stage("generate_question"):
+            FakeChat().invoke("q")
+        return {"generated_question": {}}
+
+    handler = SimpleNamespace(
+        _lease_model_config=lambda model_id: nullcontext(None),
+        _runnables_for=lambda gen_cfg, val_cfg: None,
+        _invoke_graph=invoke_graph,
+    )
+    result = H.GENAHandler.ahandle_prompt(handler, "Текст чанка", "one", "src", "1", generation_model_id="qwen-7b")
+
+    assert result["output"] == {"generated_question": {}}
+    if not enabled:
+        assert "telemetry" not in result
+        return
+    assert result["telemetry"]["generation_model_id"] == "qwen-7b"
+    assert result["telemetry"]["llm_calls"] == 1
+    assert result["telemetry"]["stages"][0]["stage"] == "generate_question"
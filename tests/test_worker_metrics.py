@@ -0,0 +1,70 @@
+"""Worker Prometheus metrics: task outcomes and durations, agent request
+attempts and the optional exporter."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import requests
+from prometheus_client import REGISTRY
+
+_TASK_WORKER = Path(__file__).resolve().parent.parent / "task_worker"
+if str(_TASK_WORKER) not in sys.path:
+    sys.path.insert(0, str(_TASK_WORKER))
+
+TASK = {"_id": "abc", "question_type": "one", "chunk_text": "x" * 50, "chunk_id": 1}
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@patch("worker.time.sleep")
+def test_batch_counts_task_outcomes(sleep):
+    from worker import TaskWorker
+
+    w = TaskWorker()
+    completed = _value("gena_worker_tasks_total", outcome="completed")
+    failed = _value("gena_worker_tasks_total", outcome="failed")
+    with (
+        patch.object(w, "process_task", side_effect=[{"status": "success"}, None]),
+        patch.object(w, "update_task_status", MagicMock()),
+    ):
+        w.process_batch([dict(TASK), dict(TASK, _id="def")])
+
+    assert _value("gena_worker_tasks_total", outcome="completed") == completed + 1
+    assert _value("gena_worker_tasks_total", outcome="failed") == failed + 1
+    assert _value("gena_worker_task_duration_seconds_count", outcome="completed") >= 1
+    assert _value("gena_worker_tasks_in_flight") == 0
+
+
+@patch("worker.requests.post")
+def test_agent_attempts_are_timed_by_outcome(post):
+    from worker import TaskWorker
+
+    w = TaskWorker()
+    response = MagicMock(status_code=200, text="{}")
+    response.json = MagicMock(return_value={"status": "success", "result": {"output": {}}})
+    post.side_effect = [requests.exceptions.Timeout(), response]
+    timeouts = _value("gena_worker_agent_request_duration_seconds_count", outcome="timeout")
+    ok = _value("gena_worker_agent_request_duration_seconds_count", outcome="2xx")
+    with (
+        patch.object(w, "update_task_status", MagicMock()),
+        patch.object(w, "_start_heartbeat", return_value=MagicMock()),
+        patch("worker.WORKER_AGENT_MAX_RETRIES", 1),
+    ):
+        w.process_task(dict(TASK))
+
+    assert _value("gena_worker_agent_request_duration_seconds_count", outcome="timeout") == timeouts + 1
+    assert _value("gena_worker_agent_request_duration_seconds_count", outcome="2xx") == ok + 1
+
+
+def test_exporter_is_off_by_default():
+    import worker
+
+    with patch("worker.start_http_server") as start:
+        assert worker.start_metrics_exporter(0) is False
+        assert worker.start_metrics_exporter(9464) is True
+    start.assert_called_once_with(9464)
@@ -0,0 +1,53 @@
+"""Worker-side HTTP timings are stored next to the agent's per-stage
+telemetry in the task result (result.result.telemetry.worker)."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import requests
+
+_TASK_WORKER = Path(__file__).resolve().parent.parent / "task_worker"
+if str(_TASK_WORKER) not in sys.path:
+    sys.path.insert(0, str(_TASK_WORKER))
+
+TASK = {"_id": "abc", "question_type": "one", "chunk_text": "x" * 50, "chunk_id": 1, "dataset_id": "ds"}
+
+
+def _process(post, body):
+    from worker import TaskWorker
+
+    w = TaskWorker()
+    response = MagicMock(status_code=200, text="{}")
+    response.json = MagicMock(return_value=body)
+    post.side_effect = [requests.exceptions.Timeout(), response]
+    with (
+        patch.object(w, "update_task_status", MagicMock()),
+        patch.object(w, "save_question_to_dataset", MagicMock()) as save,
+        patch.object(w, "_start_heartbeat", return_value=MagicMock()),
+        patch("worker.WORKER_AGENT_MAX_RETRIES", 1),
+    ):
+        result = w.process_task(dict(TASK))
+    save.assert_called_once()
+    return result
+
+
+@patch("worker.requests.post")
+def test_worker_timings_join_agent_telemetry(post):
+    agent_telemetry = {"total_s": 3.2, "llm_calls": 4, "stages": [{"stage": "generate_question"}]}
+    result = _process(post, {"status": "success", "result": {"output": {}, "telemetry": agent_telemetry}})
+
+    telemetry = result["result"]["telemetry"]
+    assert telemetry["llm_calls"] == 4 and telemetry["stages"] == [{"stage": "generate_question"}]
+    worker = telemetry["worker"]
+    assert worker["agent_attempts"] == 2 and len(worker["agent_http_s"]) == 2
+    assert worker["total_s"] >= worker["save_s"] >= 0
+
+
+@patch("worker.requests.post")
+def test_worker_timings_without_agent_telemetry(post):
+    result = _process(post, {"status": "success", "result": {"output": {}}})
+
+    assert set(result["result"]["telemetry"]) == {"worker"}